@@ -208,13 +208,16 @@ REST_API_VERSION_HISTORY = """
     * 2.88 - Added support for update Share access rule.
     * 2.89 - Added support for passing Share network subnet metadata updates
              to driver.
+    * 2.90 - Added keyset pagination with the 'marker' query parameter to
+             the share, share snapshot, share instance, share access rule
+             and user message list APIs.
 """
 
 # The minimum and maximum versions of the API supported
 # The default api version request is defined to be the
 # minimum version of the API supported.
 _MIN_API_VERSION = "2.0"
-_MAX_API_VERSION = "2.89"
+_MAX_API_VERSION = "2.90"
 DEFAULT_API_VERSION = _MIN_API_VERSION
 
 
@@ -108,6 +108,12 @@ index_request_query_v252['properties'].update({
     }),
 })
 
+index_request_query_v290 = copy.deepcopy(index_request_query_v252)
+index_request_query_v290['properties'].update({
+    'marker': parameter_types.single_param({
+        'type': 'string',
+    }),
+})
 
 _messages_response = {
     'type': 'object',
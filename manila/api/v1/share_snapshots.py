@@ -82,6 +82,7 @@ class ShareSnapshotMixin(object):
         req.GET.pop('name~', None)
         req.GET.pop('description~', None)
         req.GET.pop('description', None)
+        req.GET.pop('marker', None)
         return self._get_snapshots(req, is_detail=False)
 
     def detail(self, req):
@@ -89,6 +90,7 @@ class ShareSnapshotMixin(object):
         req.GET.pop('name~', None)
         req.GET.pop('description~', None)
         req.GET.pop('description', None)
+        req.GET.pop('marker', None)
         return self._get_snapshots(req, is_detail=True)
 
     def _get_snapshots(self, req, is_detail):
@@ -98,11 +100,13 @@ class ShareSnapshotMixin(object):
         search_opts = {}
         search_opts.update(req.GET)
         params = common.get_pagination_params(req)
-        limit, offset = [params.get('limit'), params.get('offset')]
+        limit, offset, marker = [params.get('limit'), params.get('offset'),
+                                 params.get('marker')]
 
         # Remove keys that are not related to share attrs
         search_opts.pop('limit', None)
         search_opts.pop('offset', None)
+        search_opts.pop('marker', None)
 
         show_count = False
         if 'with_count' in search_opts:
@@ -148,15 +152,21 @@ class ShareSnapshotMixin(object):
                                       self._get_snapshots_search_options())
 
         total_count = None
-        if show_count:
-            count, snapshots = self.share_api.get_all_snapshots_with_count(
-                context, search_opts=search_opts, limit=limit, offset=offset,
-                sort_key=sort_key, sort_dir=sort_dir)
-            total_count = count
-        else:
-            snapshots = self.share_api.get_all_snapshots(
-                context, search_opts=search_opts, limit=limit, offset=offset,
-                sort_key=sort_key, sort_dir=sort_dir)
+        try:
+            if show_count:
+                count, snapshots = (
+                    self.share_api.get_all_snapshots_with_count(
+                        context, search_opts=search_opts, limit=limit,
+                        offset=offset, sort_key=sort_key, sort_dir=sort_dir,
+                        marker=marker))
+                total_count = count
+            else:
+                snapshots = self.share_api.get_all_snapshots(
+                    context, search_opts=search_opts, limit=limit,
+                    offset=offset, sort_key=sort_key, sort_dir=sort_dir,
+                    marker=marker)
+        except exception.MarkerNotFound as e:
+            raise exc.HTTPBadRequest(explanation=e.msg)
 
         if is_detail:
             snapshots = self._view_builder.detail_list(
@@ -101,6 +101,7 @@ class ShareTypeExtraSpecsController(wsgi.Controller):
         self._check_key_names(specs.keys())
         specs = share_types.sanitize_extra_specs(specs)
         db.share_type_extra_specs_update_or_create(context, type_id, specs)
+        share_types.invalidate_cache()
         notifier_info = dict(type_id=type_id, specs=specs)
         notifier = rpc.get_notifier('shareTypeExtraSpecs')
         notifier.info(context, 'share_type_extra_specs.create', notifier_info)
@@ -122,6 +123,7 @@ class ShareTypeExtraSpecsController(wsgi.Controller):
         self._verify_extra_specs(body, False)
         specs = share_types.sanitize_extra_specs(body)
         db.share_type_extra_specs_update_or_create(context, type_id, specs)
+        share_types.invalidate_cache()
         notifier_info = dict(type_id=type_id, id=id)
         notifier = rpc.get_notifier('shareTypeExtraSpecs')
         notifier.info(context, 'share_type_extra_specs.update', notifier_info)
@@ -172,6 +174,7 @@ class ShareTypeExtraSpecsController(wsgi.Controller):
             db.share_type_extra_specs_delete(context, type_id, id)
         except exception.ShareTypeExtraSpecsNotFound as error:
             raise webob.exc.HTTPNotFound(explanation=error.msg)
+        share_types.invalidate_cache()
 
         notifier_info = dict(type_id=type_id, id=id)
         notifier = rpc.get_notifier('shareTypeExtraSpecs')
@@ -109,6 +109,7 @@ class ShareMixin(object):
         req.GET.pop('description~', None)
         req.GET.pop('description', None)
         req.GET.pop('with_count', None)
+        req.GET.pop('marker', None)
         return self._get_shares(req, is_detail=False)
 
     @wsgi.Controller.authorize("get_all")
@@ -120,6 +121,7 @@ class ShareMixin(object):
         req.GET.pop('description~', None)
         req.GET.pop('description', None)
         req.GET.pop('with_count', None)
+        req.GET.pop('marker', None)
         return self._get_shares(req, is_detail=True)
 
     def _get_shares(self, req, is_detail):
@@ -175,15 +177,18 @@ class ShareMixin(object):
             context, search_opts, self._get_share_search_options())
 
         total_count = None
-        if show_count:
-            count, shares = self.share_api.get_all_with_count(
-                context, search_opts=search_opts, sort_key=sort_key,
-                sort_dir=sort_dir)
-            total_count = count
-        else:
-            shares = self.share_api.get_all(
-                context, search_opts=search_opts, sort_key=sort_key,
-                sort_dir=sort_dir)
+        try:
+            if show_count:
+                count, shares = self.share_api.get_all_with_count(
+                    context, search_opts=search_opts, sort_key=sort_key,
+                    sort_dir=sort_dir)
+                total_count = count
+            else:
+                shares = self.share_api.get_all(
+                    context, search_opts=search_opts, sort_key=sort_key,
+                    sort_dir=sort_dir)
+        except exception.MarkerNotFound as e:
+            raise exc.HTTPBadRequest(explanation=e.msg)
 
         if is_detail:
             shares = self._view_builder.detail_list(req, shares, total_count)
@@ -203,8 +208,8 @@ class ShareMixin(object):
             'is_public', 'metadata', 'extra_specs', 'sort_key', 'sort_dir',
             'share_group_id', 'share_group_snapshot_id', 'export_location_id',
             'export_location_path', 'display_name~', 'display_description~',
-            'display_description', 'limit', 'offset', 'is_soft_deleted',
-            'mount_point_name')
+            'display_description', 'limit', 'offset', 'marker',
+            'is_soft_deleted', 'mount_point_name')
 
     @wsgi.Controller.authorize
     def update(self, req, id, body):
@@ -25,6 +25,7 @@ import webob
 from webob import exc
 
 from manila.api import common
+from manila.api.openstack import api_version_request as api_version
 from manila.api.openstack import wsgi
 from manila.api.schemas import messages as schema
 from manila.api import validation
@@ -35,6 +36,7 @@ from manila.message import api as message_api
 
 MESSAGES_BASE_MICRO_VERSION = '2.37'
 MESSAGES_QUERY_BY_TIMESTAMP = '2.52'
+MESSAGES_QUERY_BY_MARKER = '2.90'
 
 
 @validation.validated
@@ -103,7 +105,10 @@ class MessagesController(wsgi.Controller):
 
     @wsgi.Controller.api_version(MESSAGES_QUERY_BY_TIMESTAMP)   # noqa: F811
     @wsgi.Controller.authorize('get_all')
-    @validation.request_query_schema(schema.index_request_query_v252)
+    @validation.request_query_schema(schema.index_request_query_v252,
+                                     MESSAGES_QUERY_BY_TIMESTAMP, '2.89')
+    @validation.request_query_schema(schema.index_request_query_v290,
+                                     MESSAGES_QUERY_BY_MARKER)
     @validation.response_body_schema(schema.index_response_body)
     def index(self, req):  # pylint: disable=function-redefined  # noqa F811
         """Returns a list of messages, transformed through view builder."""
@@ -114,6 +119,11 @@ class MessagesController(wsgi.Controller):
         limit, offset = [params.get('limit'), params.get('offset')]
         sort_key, sort_dir = common.get_sort_params(filters)
 
+        marker = None
+        if req.api_version_request >= api_version.APIVersionRequest(
+                MESSAGES_QUERY_BY_MARKER):
+            marker = params.get('marker')
+
         for time_comparison_filter in ['created_since', 'created_before']:
             if time_comparison_filter in filters:
                 time_str = filters.get(time_comparison_filter)
@@ -126,11 +136,15 @@ class MessagesController(wsgi.Controller):
 
                 filters[time_comparison_filter] = parsed_time
 
-        messages = self.message_api.get_all(context, search_opts=filters,
-                                            limit=limit,
-                                            offset=offset,
-                                            sort_key=sort_key,
-                                            sort_dir=sort_dir)
+        try:
+            messages = self.message_api.get_all(context, search_opts=filters,
+                                                limit=limit,
+                                                offset=offset,
+                                                sort_key=sort_key,
+                                                sort_dir=sort_dir,
+                                                marker=marker)
+        except exception.MarkerNotFound as e:
+            raise exc.HTTPBadRequest(explanation=e.msg)
 
         return self._view_builder.index(req, messages)
 
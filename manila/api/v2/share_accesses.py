@@ -99,7 +99,8 @@ class ShareAccessesController(wsgi.Controller, wsgi.AdminActionsMixin):
             raise exception.InvalidShareAccessLevel(level=access_level)
 
     @wsgi.Controller.authorize('index')
-    def _index(self, req, support_for_access_filters=False):
+    def _index(self, req, support_for_access_filters=False,
+               support_pagination=False):
         """Returns the list of access rules for a given share."""
         context = req.environ['manila.context']
         search_opts = {}
@@ -108,6 +109,11 @@ class ShareAccessesController(wsgi.Controller, wsgi.AdminActionsMixin):
             msg = _("The field 'share_id' has to be specified.")
             raise webob.exc.HTTPBadRequest(explanation=msg)
         share_id = search_opts.pop('share_id', None)
+        search_opts.pop('limit', None)
+        search_opts.pop('marker', None)
+        if support_pagination:
+            search_opts.update(common.get_pagination_params(req))
+            search_opts.pop('offset', None)
 
         if 'metadata' in search_opts:
             search_opts['metadata'] = ast.literal_eval(
@@ -123,8 +129,11 @@ class ShareAccessesController(wsgi.Controller, wsgi.AdminActionsMixin):
         except exception.NotFound:
             msg = _("Share %s not found.") % share_id
             raise webob.exc.HTTPBadRequest(explanation=msg)
-        access_rules = self.share_api.access_get_all(
-            context, share, search_opts)
+        try:
+            access_rules = self.share_api.access_get_all(
+                context, share, search_opts)
+        except exception.MarkerNotFound as e:
+            raise webob.exc.HTTPBadRequest(explanation=e.msg)
         rule_list = []
         for rule in access_rules:
             restricted = self._is_rule_restricted(context, rule['id'])
@@ -140,10 +149,15 @@ class ShareAccessesController(wsgi.Controller, wsgi.AdminActionsMixin):
     def index(self, req):
         return self._index(req)
 
-    @wsgi.Controller.api_version('2.82')
+    @wsgi.Controller.api_version('2.82', '2.89')
     def index(self, req): # pylint: disable=function-redefined  # noqa F811
         return self._index(req, support_for_access_filters=True)
 
+    @wsgi.Controller.api_version('2.90')
+    def index(self, req): # pylint: disable=function-redefined  # noqa F811
+        return self._index(req, support_for_access_filters=True,
+                           support_pagination=True)
+
     @wsgi.Controller.api_version('2.88')
     @wsgi.Controller.authorize('update')
     def update(self, req, id, body):
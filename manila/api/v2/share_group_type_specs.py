@@ -86,6 +86,7 @@ class ShareGroupTypeSpecsController(wsgi.Controller):
         self._verify_group_specs(specs)
         self._check_key_names(specs.keys())
         db.share_group_type_specs_update_or_create(context, id, specs)
+        share_group_types.invalidate_cache()
         return body
 
     @wsgi.Controller.api_version('2.31', '2.54', experimental=True)
@@ -111,6 +112,7 @@ class ShareGroupTypeSpecsController(wsgi.Controller):
             raise webob.exc.HTTPBadRequest(explanation=expl)
         self._verify_group_specs(body)
         db.share_group_type_specs_update_or_create(context, id, body)
+        share_group_types.invalidate_cache()
         return body
 
     @wsgi.Controller.api_version('2.31', '2.54', experimental=True)
@@ -151,6 +153,7 @@ class ShareGroupTypeSpecsController(wsgi.Controller):
             db.share_group_type_specs_delete(context, id, key)
         except exception.ShareGroupTypeSpecsNotFound as error:
             raise webob.exc.HTTPNotFound(explanation=error.msg)
+        share_group_types.invalidate_cache()
         return webob.Response(status_int=http_client.NO_CONTENT)
 
     @wsgi.Controller.api_version('2.31', '2.54', experimental=True)
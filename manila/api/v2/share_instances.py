@@ -77,6 +77,8 @@ class ShareInstancesController(wsgi.Controller, wsgi.AdminActionsMixin):
     @wsgi.Controller.authorize
     def index(self, req):  # pylint: disable=function-redefined  # noqa F811
         context = req.environ['manila.context']
+        req.GET.pop('limit', None)
+        req.GET.pop('marker', None)
         filters = {}
         filters.update(req.GET)
         common.remove_invalid_options(
@@ -85,21 +87,37 @@ class ShareInstancesController(wsgi.Controller, wsgi.AdminActionsMixin):
         instances = db.share_instance_get_all(context, filters)
         return self._view_builder.detail_list(req, instances)
 
-    @wsgi.Controller.api_version("2.69")  # noqa
+    @wsgi.Controller.api_version("2.69", "2.89")  # noqa
     @wsgi.Controller.authorize
     def index(self, req):  # pylint: disable=function-redefined  # noqa F811
+        req.GET.pop('limit', None)
+        req.GET.pop('marker', None)
+        return self._index(req)
+
+    @wsgi.Controller.api_version("2.90")  # noqa
+    @wsgi.Controller.authorize
+    def index(self, req):  # pylint: disable=function-redefined  # noqa F811
+        return self._index(req, support_pagination=True)
+
+    def _index(self, req, support_pagination=False):
         context = req.environ['manila.context']
         filters = {}
         filters.update(req.GET)
-        common.remove_invalid_options(
-            context, filters, ('export_location_id', 'export_location_path',
-                               'is_soft_deleted'))
+        valid_options = ('export_location_id', 'export_location_path',
+                         'is_soft_deleted')
+        if support_pagination:
+            filters.update(common.get_pagination_params(req))
+            valid_options += ('limit', 'marker')
+        common.remove_invalid_options(context, filters, valid_options)
         if 'is_soft_deleted' in filters:
             is_soft_deleted = utils.get_bool_from_api_params(
                 'is_soft_deleted', filters)
             filters['is_soft_deleted'] = is_soft_deleted
 
-        instances = db.share_instance_get_all(context, filters)
+        try:
+            instances = db.share_instance_get_all(context, filters)
+        except exception.MarkerNotFound as e:
+            raise exc.HTTPBadRequest(explanation=e.msg)
         return self._view_builder.detail_list(req, instances)
 
     @wsgi.Controller.api_version("2.3")
@@ -343,6 +343,9 @@ class ShareSnapshotsController(share_snapshots.ShareSnapshotMixin,
         if req.api_version_request < api_version.APIVersionRequest("2.79"):
             req.GET.pop('with_count', None)
 
+        if req.api_version_request < api_version.APIVersionRequest("2.90"):
+            req.GET.pop('marker', None)
+
         return self._get_snapshots(req, is_detail=False)
 
     @wsgi.Controller.api_version("2.0")
@@ -352,6 +355,10 @@ class ShareSnapshotsController(share_snapshots.ShareSnapshotMixin,
             req.GET.pop('name~', None)
             req.GET.pop('description~', None)
             req.GET.pop('description', None)
+
+        if req.api_version_request < api_version.APIVersionRequest("2.90"):
+            req.GET.pop('marker', None)
+
         return self._get_snapshots(req, is_detail=True)
 
     @wsgi.Controller.api_version("2.73")
@@ -605,6 +605,9 @@ class ShareController(wsgi.Controller,
         if req.api_version_request < api_version.APIVersionRequest("2.69"):
             req.GET.pop('is_soft_deleted', None)
 
+        if req.api_version_request < api_version.APIVersionRequest("2.90"):
+            req.GET.pop('marker', None)
+
         return self._get_shares(req, is_detail=False)
 
     @wsgi.Controller.api_version("2.0")
@@ -623,6 +626,9 @@ class ShareController(wsgi.Controller,
         if req.api_version_request < api_version.APIVersionRequest("2.69"):
             req.GET.pop('is_soft_deleted', None)
 
+        if req.api_version_request < api_version.APIVersionRequest("2.90"):
+            req.GET.pop('marker', None)
+
         return self._get_shares(req, is_detail=True)
 
     def _validate_metadata_for_update(self, req, share_id, metadata,
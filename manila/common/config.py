@@ -98,6 +98,17 @@ global_opts = [
                help='Default share type to use.'),
     cfg.StrOpt('default_share_group_type',
                help='Default share group type to use.'),
+    cfg.IntOpt('share_type_cache_ttl',
+               default=0,
+               min=0,
+               help='Number of seconds share types, share group types and '
+                    'their extra specs are cached for by each service. '
+                    'Changes are only dropped from the cache of the process '
+                    'that made them, other processes, including the other '
+                    'workers of the same API service, keep using the cached '
+                    'entries for up to this long. This includes share types '
+                    'deleted or whose access was revoked. Set to 0 to '
+                    'disable the cache.'),
     cfg.StrOpt('rootwrap_config',
                help='Path to the rootwrap configuration file to use for '
                     'running commands as root.'),
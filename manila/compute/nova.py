@@ -148,6 +148,10 @@ class API(base.Base):
             novaclient(context).servers.get(instance_id)
         )
 
+    def server_list(self, context, search_opts=None):
+        return [_untranslate_server_summary_view(server) for server in
+                novaclient(context).servers.list(search_opts=search_opts)]
+
     def server_get_by_name_or_id(self, context, instance_name_or_id):
         try:
             server = utils.find_resource(
@@ -198,6 +202,11 @@ class API(base.Base):
             novaclient(context).servers.update(instance_id, name=name)
         )
 
+    @translate_server_exception
+    def server_interface_attach(self, context, instance_id, port_id):
+        return novaclient(context).servers.interface_attach(
+            instance_id, port_id, None, None)
+
     def keypair_import(self, context, name, public_key):
         return novaclient(context).keypairs.create(name, public_key)
 
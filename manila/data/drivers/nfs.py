@@ -16,8 +16,12 @@
 """Implementation of a backup service that uses NFS storage as the backend."""
 
 from oslo_config import cfg
+from oslo_utils import units
 
 from manila.data import backup_driver
+from manila.data import utils as data_utils
+from manila import exception
+from manila.i18n import _
 
 
 nfsbackup_service_opts = [
@@ -37,6 +41,30 @@ nfsbackup_service_opts = [
                default='',
                help='Mount options passed to the NFS client. See NFS '
                     'man page for details.'),
+    cfg.BoolOpt('backup_incremental',
+                default=False,
+                help='Store backups as content-addressed chunks plus a '
+                     'manifest per backup, so that each new backup of a '
+                     'share only writes the data that changed since its '
+                     'previous backup. Backups taken before enabling this '
+                     'option can still be restored.'),
+    cfg.IntOpt('backup_chunk_size',
+               default=4,
+               min=1,
+               help='Size in MiB of the chunks incremental backups are '
+                    'split into.'),
+    cfg.StrOpt('backup_compression',
+               default=data_utils.COMPRESSION_NONE,
+               choices=data_utils.COMPRESSIONS,
+               help='Compression applied to the chunks of incremental '
+                    'backups. zstd requires the zstandard library.'),
+    cfg.IntOpt('backup_max_bytes_per_second',
+               default=0,
+               min=0,
+               help='Maximum rate, in bytes per second, at which each backup '
+                    'or restore reads and writes data. 0 means the '
+                    'data_copy_max_bytes_per_second limit of the data '
+                    'service applies.'),
 ]
 
 CONF = cfg.CONF
@@ -52,6 +80,15 @@ class NFSBackupDriver(backup_driver.BackupDriver):
         self.backup_unmount_template = CONF.backup_unmount_template
         self.backup_mount_options = CONF.backup_mount_options
         self.backup_mount_proto = CONF.backup_mount_proto
+        self.backup_incremental = CONF.backup_incremental
+        self.backup_chunk_size = CONF.backup_chunk_size * units.Mi
+        self.backup_compression = CONF.backup_compression
+        self.backup_max_bytes_per_second = CONF.backup_max_bytes_per_second
+        if (self.backup_compression == data_utils.COMPRESSION_ZSTD and
+                not data_utils.zstandard):
+            raise exception.BackupException(
+                reason=_("The zstandard library is required to compress "
+                         "backups with zstd"))
         super(NFSBackupDriver, self).__init__()
 
     def get_backup_info(self, backup):
@@ -69,6 +106,10 @@ class NFSBackupDriver(backup_driver.BackupDriver):
         backup_info = {
             'mount': mount_template,
             'unmount': unmount_template,
+            'incremental': self.backup_incremental,
+            'chunk_size': self.backup_chunk_size,
+            'compression': self.backup_compression,
+            'max_bytes_per_second': self.backup_max_bytes_per_second,
         }
 
         return backup_info
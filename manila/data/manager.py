@@ -19,9 +19,11 @@ Data Service
 import os
 import shutil
 
+import eventlet
 from oslo_config import cfg
 from oslo_config import types
 from oslo_log import log
+from oslo_serialization import jsonutils
 from oslo_service import periodic_task
 from oslo_utils import excutils
 from oslo_utils import importutils
@@ -92,6 +94,62 @@ data_opts = [
         default=False,
         help="Chooses whether hash of each file should be checked on data "
              "copying."),
+    cfg.StrOpt(
+        'check_hash_mode',
+        default='read-back',
+        choices=['read-back', 'trust-on-write'],
+        help="How the 'native' data copy engine checks hashes when "
+             "check_hash is enabled. The hash of each source file is always "
+             "computed while its data is copied. With 'read-back', the "
+             "destination file is then read once more to be verified. With "
+             "'trust-on-write', the data written is trusted and only the "
+             "source hash is recorded. The 'rootwrap' engine always reads "
+             "both files again after copying them."),
+    cfg.StrOpt(
+        'data_copy_engine',
+        default='rootwrap',
+        choices=['rootwrap', 'native'],
+        help="Engine used to copy share contents during migration, backup "
+             "and restore. 'rootwrap' runs ls, stat, cp, chmod, touch and "
+             "chown through rootwrap for each file and folder. 'native' "
+             "walks and copies the share contents within the data service "
+             "process using a pool of workers, which is much faster for "
+             "shares with many files, but requires the data service to run "
+             "as root or with the CAP_CHOWN, CAP_DAC_OVERRIDE, "
+             "CAP_DAC_READ_SEARCH and CAP_FOWNER capabilities."),
+    cfg.IntOpt(
+        'data_copy_workers',
+        default=8,
+        min=1,
+        help="Number of files copied concurrently by the 'native' data "
+             "copy engine."),
+    cfg.IntOpt(
+        'data_copy_checkpoint_interval',
+        default=60,
+        min=0,
+        help="Interval, in seconds, at which the 'native' data copy engine "
+             "records the files it has copied in a journal kept in the "
+             "destination, so that a copy interrupted by a restart of the "
+             "data service resumes where it stopped. 0 disables "
+             "checkpoints."),
+    cfg.IntOpt(
+        'data_copy_max_bytes_per_second',
+        default=0,
+        min=0,
+        help="Maximum rate, in bytes per second, at which each data copy "
+             "of the 'native' engine reads and writes data. Backup drivers "
+             "may set a different limit for backups and restores. 0 means "
+             "unlimited."),
+    cfg.BoolOpt(
+        'resume_data_copies',
+        default=False,
+        help="Whether the data service resumes, when it starts, the data "
+             "copies of share migrations, backups and restores that were "
+             "interrupted when it stopped. Otherwise their task state is "
+             "set to 'data_copying_error'. When "
+             "'data_copy_checkpoint_interval' is set, copies of the "
+             "'native' engine and incremental backups continue where they "
+             "stopped, other copies start over."),
     cfg.IntOpt(
         'backup_continue_update_interval',
         default=10,
@@ -111,6 +169,10 @@ CONF = cfg.CONF
 CONF.register_opts(data_opts)
 CONF.register_opts(backup_opts)
 
+COPY_OPERATION_KEY = 'data_copy_operation'
+# Size of the value column of the async_operation_data table.
+COPY_OPERATION_MAX_SIZE = 1023
+
 
 class DataManager(manager.Manager):
     """Receives requests to handle data and sends responses."""
@@ -121,6 +183,7 @@ class DataManager(manager.Manager):
         super(DataManager, self).__init__(*args, **kwargs)
         self.backup_driver = importutils.import_object(CONF.backup_driver)
         self.busy_tasks_shares = {}
+        self.resuming_shares = set()
         self.service_id = None
 
     def init_host(self, service_id=None):
@@ -129,10 +192,95 @@ class DataManager(manager.Manager):
         shares = self.db.share_get_all(ctxt)
         for share in shares:
             if share['task_state'] in constants.BUSY_COPYING_STATES:
+                if (CONF.resume_data_copies and
+                        self._resume_copy(ctxt, share['id'])):
+                    continue
                 self.db.share_update(
                     ctxt, share['id'],
                     {'task_state': constants.TASK_STATE_DATA_COPYING_ERROR})
 
+    def _save_copy_operation(self, context, share_id, operation, **kwargs):
+        """Records a data copy, so it can be resumed after a restart."""
+        if not CONF.resume_data_copies:
+            return
+
+        details = dict(kwargs, operation=operation, host=self.host)
+        record = jsonutils.dumps(details, separators=(',', ':'))
+        if len(record) > COPY_OPERATION_MAX_SIZE:
+            LOG.error("The %(operation)s data copy of share %(share)s will "
+                      "not be resumed if the data service restarts, its "
+                      "record takes %(size)s characters, more than the "
+                      "%(max)s that can be stored.",
+                      {'operation': operation, 'share': share_id,
+                       'size': len(record), 'max': COPY_OPERATION_MAX_SIZE})
+            # Do not resume an earlier data copy of the share instead.
+            self._clear_copy_operation(context, share_id)
+            return
+        try:
+            self.db.async_operation_data_update(
+                context, share_id, {COPY_OPERATION_KEY: record})
+        except Exception:
+            LOG.exception("Could not record the %(operation)s data copy of "
+                          "share %(share)s, it will not be resumed if the "
+                          "data service restarts.",
+                          {'operation': operation, 'share': share_id})
+
+    def _clear_copy_operation(self, context, share_id):
+        try:
+            self.db.async_operation_data_delete(
+                context, share_id, key=COPY_OPERATION_KEY)
+        except Exception:
+            LOG.warning("Could not remove the record of the data copy of "
+                        "share %s.", share_id)
+
+    def _resume_copy(self, context, share_id):
+        """Resumes a data copy interrupted by a restart of this service.
+
+        :returns: whether the data copy of the share is being resumed.
+        """
+        details = self.db.async_operation_data_get(
+            context, share_id, COPY_OPERATION_KEY)
+        if not details:
+            return False
+        details = jsonutils.loads(details)
+        if details.pop('host') != self.host:
+            return False
+
+        operation = details.pop('operation')
+        if operation == 'migration':
+            func = self.migration_start
+            kwargs = dict(details, share_id=share_id)
+        elif operation == 'backup':
+            func = self.create_backup
+            kwargs = {'backup': self.db.share_backup_get(
+                context, details['backup_id'])}
+        elif operation == 'restore':
+            func = self.restore_backup
+            kwargs = {'backup': self.db.share_backup_get(
+                context, details['backup_id']), 'share_id': share_id}
+        else:
+            return False
+
+        LOG.info("Resuming the %(operation)s data copy of share %(share)s.",
+                 {'operation': operation, 'share': share_id})
+        self.resuming_shares.add(share_id)
+        eventlet.spawn_n(self._run_resumed_copy, context, share_id, func,
+                         **kwargs)
+        return True
+
+    def _run_resumed_copy(self, context, share_id, func, **kwargs):
+        try:
+            func(context, **kwargs)
+        except Exception:
+            LOG.exception("Resumed data copy of share %s failed.", share_id)
+        finally:
+            self.resuming_shares.discard(share_id)
+
+    def _is_copy_starting(self, share_id):
+        """Whether a resumed data copy has not started copying yet."""
+        return (share_id in self.resuming_shares and
+                share_id not in self.busy_tasks_shares)
+
     def migration_start(self, context, ignore_list, share_id,
                         share_instance_id, dest_share_instance_id,
                         connection_info_src, connection_info_dest):
@@ -151,8 +299,15 @@ class DataManager(manager.Manager):
 
         mount_path = CONF.mount_tmp_location
 
+        self._save_copy_operation(
+            context, share_id, 'migration', ignore_list=ignore_list,
+            share_instance_id=share_instance_id,
+            dest_share_instance_id=dest_share_instance_id,
+            connection_info_src=connection_info_src,
+            connection_info_dest=connection_info_dest)
+
         try:
-            copy = data_utils.Copy(
+            copy = self._get_copy(
                 os.path.join(mount_path, share_instance_id),
                 os.path.join(mount_path, dest_share_instance_id),
                 ignore_list, CONF.check_hash)
@@ -197,6 +352,7 @@ class DataManager(manager.Manager):
             raise exception.ShareDataCopyFailed(reason=msg)
         finally:
             self.busy_tasks_shares.pop(share_id, None)
+            self._clear_copy_operation(context, share_id)
 
         LOG.info(
             "Completed copy operation of migrating share content from share "
@@ -233,6 +389,19 @@ class DataManager(manager.Manager):
             LOG.error(msg)
             raise exception.InvalidShare(reason=msg)
 
+    def _get_copy(self, src, dest, ignore_list, check_hash=False,
+                  max_bytes_per_second=None):
+        if CONF.data_copy_engine == 'native':
+            return data_utils.ParallelCopy(
+                src, dest, ignore_list, check_hash=check_hash,
+                workers=CONF.data_copy_workers,
+                verify_written=CONF.check_hash_mode == 'read-back',
+                checkpoint_interval=CONF.data_copy_checkpoint_interval,
+                max_bytes_per_second=(
+                    max_bytes_per_second or
+                    CONF.data_copy_max_bytes_per_second))
+        return data_utils.Copy(src, dest, ignore_list, check_hash)
+
     def _copy_share_data(self, context, copy, info_src, info_dest):
         """Copy share data between source and destination.
 
@@ -434,6 +603,8 @@ class DataManager(manager.Manager):
         for backup in backups:
             backup_id = backup['id']
             share_id = backup['share_id']
+            if self._is_copy_starting(share_id):
+                continue
             result = {}
             try:
                 result = self.data_copy_get_progress(context, share_id)
@@ -491,6 +662,16 @@ class DataManager(manager.Manager):
                 result[access_type].append(share_proto)
         return result
 
+    def _get_latest_backup(self, context, backup):
+        """Returns the most recent available backup of the same share."""
+        filters = {
+            'share_id': backup['share_id'],
+            'status': constants.STATUS_AVAILABLE,
+        }
+        backups = self.db.share_backups_get_all(
+            context, filters, sort_key='created_at', sort_dir='desc')
+        return next((b for b in backups if b['id'] != backup['id']), None)
+
     def _run_backup(self, context, backup, share):
         share_instance_id = share.instance.get('id')
         share_instance = self.db.share_instance_get(
@@ -506,12 +687,32 @@ class DataManager(manager.Manager):
 
         dest_backup_mount_point = os.path.join(backup_mount_path, backup['id'])
         backup_folder = os.path.join(dest_backup_mount_point, backup['id'])
+        max_bytes_per_second = (
+            dest_backup_info.get('max_bytes_per_second') or
+            CONF.data_copy_max_bytes_per_second)
+
+        self._save_copy_operation(context, share['id'], 'backup',
+                                  backup_id=backup['id'])
 
         try:
-            copy = data_utils.Copy(
-                os.path.join(mount_path, share_instance_id),
-                backup_folder,
-                ignore_list)
+            if dest_backup_info.get('incremental'):
+                parent = self._get_latest_backup(context, backup)
+                copy = data_utils.ChunkedBackupCopy(
+                    os.path.join(mount_path, share_instance_id),
+                    dest_backup_mount_point, backup['id'], ignore_list,
+                    parent_id=parent['id'] if parent else None,
+                    chunk_size=dest_backup_info['chunk_size'],
+                    workers=CONF.data_copy_workers,
+                    checkpoint_interval=CONF.data_copy_checkpoint_interval,
+                    compression=dest_backup_info.get(
+                        'compression', data_utils.COMPRESSION_NONE),
+                    max_bytes_per_second=max_bytes_per_second)
+            else:
+                copy = self._get_copy(
+                    os.path.join(mount_path, share_instance_id),
+                    backup_folder,
+                    ignore_list,
+                    max_bytes_per_second=max_bytes_per_second)
 
             info_src = {
                 'share_id': share['id'],
@@ -545,6 +746,7 @@ class DataManager(manager.Manager):
             raise exception.ShareDataCopyFailed(reason=msg)
         finally:
             self.busy_tasks_shares.pop(share['id'], None)
+            self._clear_copy_operation(context, share['id'])
 
     def delete_backup(self, context, backup):
         backup_id = backup['id']
@@ -586,6 +788,11 @@ class DataManager(manager.Manager):
                                   "%(err)s", {'file_path': file_path,
                                               'err': e})
                 shutil.rmtree(backup_folder)
+            removed = data_utils.remove_unreferenced_chunks(mount_point)
+            if removed:
+                LOG.debug("Removed %(count)s chunks no longer referenced "
+                          "after deleting backup %(backup)s.",
+                          {'count': removed, 'backup': backup['id']})
             utils.execute(*(unmount_command.split()), run_as_root=True)
         except Exception:
             with excutils.save_and_reraise_exception():
@@ -668,6 +875,8 @@ class DataManager(manager.Manager):
                     continue
 
                 share_id = share['id']
+                if self._is_copy_starting(share_id):
+                    continue
                 result = {}
                 try:
                     result = self.data_copy_get_progress(context, share_id)
@@ -709,13 +918,24 @@ class DataManager(manager.Manager):
         src_backup_info = self.backup_driver.get_backup_info(backup)
 
         src_backup_mount_point = os.path.join(backup_mount_path, backup['id'])
-        backup_folder = os.path.join(src_backup_mount_point, backup['id'])
+        max_bytes_per_second = (
+            src_backup_info.get('max_bytes_per_second') or
+            CONF.data_copy_max_bytes_per_second)
+
+        self._save_copy_operation(context, share['id'], 'restore',
+                                  backup_id=backup['id'])
 
         try:
-            copy = data_utils.Copy(
-                backup_folder,
+            # NOTE: Whether a backup is chunked is only known once its
+            # folder is mounted, and does not depend on the current
+            # settings of the backup driver: backups without a manifest are
+            # copied file by file.
+            copy = data_utils.ChunkedRestoreCopy(
+                src_backup_mount_point, backup['id'],
                 os.path.join(mount_path, share_instance_id),
-                ignore_list)
+                ignore_list, workers=CONF.data_copy_workers,
+                checkpoint_interval=CONF.data_copy_checkpoint_interval,
+                max_bytes_per_second=max_bytes_per_second)
 
             info_src = {
                 'share_id': None,
@@ -750,3 +970,4 @@ class DataManager(manager.Manager):
             raise exception.ShareDataCopyFailed(reason=msg)
         finally:
             self.busy_tasks_shares.pop(share['id'], None)
+            self._clear_copy_operation(context, share['id'])
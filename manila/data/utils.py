@@ -12,16 +12,50 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import errno
+import fcntl
+import functools
+import gzip
+import hashlib
 import os
+import stat
+import tempfile
+import time
 
+from eventlet import greenpool
+from eventlet import patcher
+from eventlet import tpool
 from oslo_log import log
+from oslo_serialization import jsonutils
+from oslo_utils import importutils
+from oslo_utils import units
 
 from manila import exception
 from manila.i18n import _
 from manila import utils
 
+zstandard = importutils.try_import('zstandard')
+
+# Workers of the in-process copy engines run in native threads, which
+# must neither take green locks nor sleep through the eventlet hub.
+native_threading = patcher.original('threading')
+native_time = patcher.original('time')
+
 LOG = log.getLogger(__name__)
 
+CHUNKS_DIR = 'chunks'
+JOURNAL_FILE = '.manila-data-copy-journal'
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_IN_PROGRESS = 'manifest.json.in-progress'
+MANIFEST_VERSION = 1
+REPOSITORY_LOCK = '.manila-repository.lock'
+DEFAULT_CHUNK_SIZE = 4 * units.Mi
+COMPRESSION_NONE = 'none'
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_ZSTD = 'zstd'
+COMPRESSIONS = (COMPRESSION_NONE, COMPRESSION_GZIP, COMPRESSION_ZSTD)
+
 
 class Copy(object):
 
@@ -179,11 +213,872 @@ class Copy(object):
                               run_as_root=True)
 
 
+class ParallelCopy(Copy):
+    """Copies share contents in-process using a pool of workers.
+
+    The source tree is walked with os.scandir, file contents are copied
+    with copy_file_range(2) or sendfile(2) and attributes are applied with
+    os.chown, os.chmod and os.utime, so no process is spawned per item.
+    Blocking filesystem calls run in native threads so that the data
+    service keeps answering progress and cancel requests. The data
+    service must be allowed to read every source file and to set the
+    ownership of the copies, so it needs to run as root or hold the
+    CAP_CHOWN, CAP_DAC_OVERRIDE, CAP_DAC_READ_SEARCH and CAP_FOWNER
+    capabilities.
+    """
+
+    def __init__(self, src, dest, ignore_list, check_hash=False, workers=1,
+                 verify_written=True, copied_files=None,
+                 checkpoint_interval=0, max_bytes_per_second=0):
+        super(ParallelCopy, self).__init__(src, dest, ignore_list,
+                                           check_hash=check_hash)
+        self.workers = max(1, workers)
+        self.verify_written = verify_written
+        self.lock = native_threading.Lock()
+        self.throttle = (_Throttle(max_bytes_per_second)
+                         if max_bytes_per_second else None)
+        # Bytes read or written by this run of the copy, used to report
+        # its throughput.
+        self.transferred_size = 0
+        self.start_time = None
+        # When set, the items copied are periodically appended to a journal
+        # in the destination, so that a copy interrupted by a restart of
+        # the data service can be resumed.
+        self.checkpoint_interval = checkpoint_interval
+        self.journal_path = os.path.join(dest, JOURNAL_FILE)
+        self.journal_pending = collections.deque()
+        self.last_checkpoint = time.monotonic()
+        # Bytes copied so far of the files currently being copied,
+        # indexed by destination path.
+        self.in_flight = {}
+        # Size, modification time and, when hashes are checked, digest of
+        # every regular file copied, indexed by path relative to src.
+        # Files recorded by a previous run of the same copy are skipped.
+        self.copied_files = dict(copied_files or {})
+
+    def get_progress(self):
+
+        # Empty share or empty contents
+        if self.completed and self.total_size == 0:
+            return {'total_progress': 100}
+
+        if not self.initialized or self.current_copy is None:
+            return {'total_progress': 0}
+
+        current_file_path = self.current_copy['file_path']
+        current_file_size = self.current_copy['size']
+        in_flight = dict(self.in_flight)
+
+        current_file_progress = 0
+        if current_file_size > 0:
+            copied = in_flight.get(current_file_path, current_file_size)
+            current_file_progress = int(copied * 100 / current_file_size)
+
+        total_progress = 0
+        if self.total_size > 0:
+            total_progress = min(100, int(
+                (self.current_size + sum(in_flight.values())) *
+                100 / self.total_size))
+
+        throughput = 0
+        if self.start_time is not None:
+            elapsed = time.monotonic() - self.start_time
+            if elapsed > 0:
+                throughput = int(self.transferred_size / elapsed)
+
+        return {
+            'total_progress': total_progress,
+            'current_file_path': current_file_path,
+            'current_file_progress': current_file_progress,
+            'throughput': throughput,
+        }
+
+    def run(self):
+
+        tpool.execute(self.scan)
+        self.initialized = True
+        tpool.execute(self.make_dirs)
+        if self.checkpoint_interval:
+            tpool.execute(self.load_journal)
+        self.copy_files()
+        tpool.execute(self.copy_dir_stats)
+        if self.checkpoint_interval and not self.cancelled:
+            _remove_existing(self.journal_path)
+        self.completed = True
+
+        LOG.info(self.get_progress())
+
+    def scan(self):
+        """Walks the source tree, collecting directories and files.
+
+        Directories are recorded before their contents, so walking
+        self.dirs backwards visits children before their parents.
+        """
+        pending = ['']
+        while pending:
+            if self.cancelled:
+                return
+            rel_dir = pending.pop()
+            with os.scandir(os.path.join(self.src, rel_dir)) as entries:
+                for entry in entries:
+                    if (entry.name in self.ignore_list or
+                            entry.name == JOURNAL_FILE):
+                        continue
+                    rel_path = os.path.join(rel_dir, entry.name)
+                    item_stat = entry.stat(follow_symlinks=False)
+                    if stat.S_ISDIR(item_stat.st_mode):
+                        self.dirs.append((rel_path, item_stat))
+                        pending.append(rel_path)
+                    else:
+                        self.files.append((rel_path, item_stat))
+                        if stat.S_ISREG(item_stat.st_mode):
+                            self.total_size += item_stat.st_size
+
+    def make_dirs(self):
+        for rel_path, item_stat in self.dirs:
+            if self.cancelled:
+                return
+            os.makedirs(os.path.join(self.dest, rel_path), exist_ok=True)
+
+    def copy_files(self):
+        errors = []
+
+        def _copy(rel_path, item_stat):
+            try:
+                self._copy_item(rel_path, item_stat)
+            except Exception as e:
+                errors.append(e)
+
+        self.start_time = time.monotonic()
+        pool = greenpool.GreenPool(self.workers)
+        for rel_path, item_stat in self.files:
+            if self.cancelled or errors:
+                break
+            pool.spawn_n(_copy, rel_path, item_stat)
+            if (self.checkpoint_interval and
+                    time.monotonic() - self.last_checkpoint >=
+                    self.checkpoint_interval):
+                tpool.execute(self.write_checkpoint)
+        # Let the items already being copied finish before failing.
+        pool.waitall()
+        if self.checkpoint_interval:
+            tpool.execute(self.write_checkpoint)
+        if errors:
+            raise errors[0]
+
+    def load_journal(self):
+        """Loads the items copied by a previous run of this copy."""
+        try:
+            journal = open(self.journal_path)
+        except FileNotFoundError:
+            return
+        with journal:
+            for line in journal:
+                try:
+                    item = jsonutils.loads(line)
+                except ValueError:
+                    # The last checkpoint was interrupted while written.
+                    break
+                if 'path' in item:
+                    self._resume_record(item['path'], item['record'])
+        self.last_checkpoint = time.monotonic()
+
+    def write_checkpoint(self):
+        """Appends the items copied since the last checkpoint to the journal.
+
+        Each checkpoint ends with the progress of the copy at that time.
+        """
+        lines = []
+        while self.journal_pending:
+            rel_path, record = self.journal_pending.popleft()
+            lines.append(jsonutils.dumps({'path': rel_path,
+                                          'record': record}))
+        lines.append(jsonutils.dumps({'checkpoint': {
+            'bytes_copied': self.current_size,
+            'files_copied': len(self.copied_files),
+        }}))
+        with open(self.journal_path, 'a') as journal:
+            journal.write('\n'.join(lines) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+        self.last_checkpoint = time.monotonic()
+
+    def _resume_record(self, rel_path, record):
+        self.copied_files[rel_path] = record
+
+    def _record_copied(self, rel_path, record):
+        self.copied_files[rel_path] = record
+        self._journal_record(rel_path, record)
+
+    def _journal_record(self, rel_path, record):
+        if self.checkpoint_interval:
+            self.journal_pending.append((rel_path, record))
+
+    def _add_copied(self, size):
+        with self.lock:
+            self.current_size += size
+
+    def _add_transferred(self, size):
+        """Accounts for data transferred, waiting if it must be throttled."""
+        with self.lock:
+            self.transferred_size += size
+        if self.throttle:
+            self.throttle.consume(size)
+
+    def copy_dir_stats(self):
+        for rel_path, item_stat in reversed(self.dirs):
+            if self.cancelled:
+                return
+            _copy_attributes(os.path.join(self.src, rel_path),
+                             os.path.join(self.dest, rel_path), item_stat)
+
+    @utils.retry(retry_param=exception.ShareDataCopyFailed, retries=2)
+    def _copy_item(self, rel_path, item_stat):
+        tpool.execute(self._copy_item_sync, rel_path, item_stat)
+
+    def _copy_item_sync(self, rel_path, item_stat):
+        src_item = os.path.join(self.src, rel_path)
+        dest_item = os.path.join(self.dest, rel_path)
+
+        digest = None
+        if stat.S_ISREG(item_stat.st_mode):
+            if self._is_copied(rel_path, dest_item, item_stat.st_size,
+                               item_stat.st_mtime_ns):
+                self._add_copied(item_stat.st_size)
+                return
+            self.in_flight[dest_item] = 0
+            self.current_copy = {'file_path': dest_item,
+                                 'size': item_stat.st_size}
+            try:
+                digest = self._copy_file(src_item, dest_item)
+            finally:
+                self.in_flight.pop(dest_item, None)
+        elif stat.S_ISLNK(item_stat.st_mode):
+            _remove_existing(dest_item)
+            os.symlink(os.readlink(src_item), dest_item)
+        else:
+            _remove_existing(dest_item)
+            os.mknod(dest_item, item_stat.st_mode, item_stat.st_rdev)
+
+        _copy_attributes(src_item, dest_item, item_stat)
+
+        if stat.S_ISREG(item_stat.st_mode) and not self.cancelled:
+            self._record_copied(rel_path, {
+                'size': item_stat.st_size,
+                'mtime_ns': item_stat.st_mtime_ns,
+                'sha256': digest,
+            })
+            self._add_copied(item_stat.st_size)
+
+    def _is_copied(self, rel_path, dest_item, size, mtime_ns):
+        """Whether a previous run of this copy already copied a file."""
+        record = self.copied_files.get(rel_path)
+        if (not record or record['size'] != size or
+                record['mtime_ns'] != mtime_ns or
+                (self.check_hash and not record['sha256'])):
+            return False
+        try:
+            return os.lstat(dest_item).st_size == size
+        except FileNotFoundError:
+            return False
+
+    def _copy_file(self, src_item, dest_item):
+        """Copies the contents of a file.
+
+        When hashes are checked, the source digest is computed while the
+        data is streamed to the destination, which is then read back once
+        to be verified unless verify_written is False.
+
+        :returns: the sha256 digest of the source if hashes are checked.
+        """
+        digest = hashlib.sha256() if self.check_hash else None
+        src_fd = os.open(src_item, os.O_RDONLY)
+        try:
+            dest_fd = os.open(dest_item,
+                              os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                self._copy_contents(src_fd, dest_fd, dest_item, digest)
+            finally:
+                os.close(dest_fd)
+        finally:
+            os.close(src_fd)
+
+        if not self.check_hash:
+            return None
+        if self.verify_written and (digest.hexdigest() !=
+                                    _file_digest(dest_item)):
+            msg = _("Data corrupted while copying. Aborting data copy.")
+            raise exception.ShareDataCopyFailed(reason=msg)
+        return digest.hexdigest()
+
+    def _copy_contents(self, src_fd, dest_fd, dest_item, digest=None):
+        """Copies data between descriptors, avoiding userspace buffers.
+
+        copy_file_range(2) is preferred since it lets the filesystem
+        offload the copy, then sendfile(2), then plain reads and writes.
+        The data has to go through userspace to update a digest, so only
+        reads and writes are used in that case.
+        """
+        if digest is not None:
+            methods = [functools.partial(_copy_chunk_read_write,
+                                         digest=digest)]
+        else:
+            methods = [_copy_chunk_sendfile, _copy_chunk_read_write]
+            if hasattr(os, 'copy_file_range'):
+                methods.insert(0, _copy_chunk_copy_file_range)
+
+        copied = 0
+        while not self.cancelled:
+            try:
+                count = methods[0](src_fd, dest_fd)
+            except OSError as e:
+                if (copied == 0 and len(methods) > 1 and
+                        e.errno in _UNSUPPORTED_COPY_ERRNOS):
+                    methods.pop(0)
+                    continue
+                raise
+            if count == 0:
+                return
+            copied += count
+            self.in_flight[dest_item] = copied
+            self._add_transferred(count)
+
+
+class ChunkedBackupCopy(ParallelCopy):
+    """Backs up share contents into a content-addressed chunk repository.
+
+    Files are split into fixed size chunks, each stored once in the
+    repository under its sha256 digest, and the entries of the share along
+    with the chunks of each file are listed in a manifest kept in the
+    folder of the backup. Files whose size and modification time match the
+    manifest of the parent backup reuse its chunks without being read, and
+    chunks already present in the repository are not written again, so a
+    new backup only writes data that changed. Chunks may be compressed
+    with gzip or, if the zstandard library is installed, zstd.
+    """
+
+    def __init__(self, src, repository, backup_id, ignore_list,
+                 parent_id=None, chunk_size=DEFAULT_CHUNK_SIZE, workers=1,
+                 checkpoint_interval=0, compression=COMPRESSION_NONE,
+                 max_bytes_per_second=0):
+        super(ChunkedBackupCopy, self).__init__(
+            src, os.path.join(repository, backup_id), ignore_list,
+            workers=workers, checkpoint_interval=checkpoint_interval,
+            max_bytes_per_second=max_bytes_per_second)
+        _get_codec(compression)
+        self.repository = repository
+        self.backup_id = backup_id
+        self.parent_id = parent_id
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.entries = {}
+        self.parent_entries = {}
+        self.resumed_entries = {}
+        # Size of the chunks written by this backup, before and after
+        # being compressed.
+        self.stored_size = 0
+        self.stored_compressed_size = 0
+        self.repository_lock = None
+
+    def get_progress(self):
+        progress = super(ChunkedBackupCopy, self).get_progress()
+        if (self.compression != COMPRESSION_NONE and
+                self.stored_compressed_size):
+            progress['compression_ratio'] = round(
+                self.stored_size / self.stored_compressed_size, 2)
+        return progress
+
+    def run(self):
+
+        tpool.execute(self.scan)
+        self.initialized = True
+        try:
+            tpool.execute(self.start_manifest)
+            if self.checkpoint_interval:
+                tpool.execute(self.load_journal)
+            self.copy_files()
+            if not self.cancelled:
+                tpool.execute(self.write_manifest)
+        finally:
+            if self.repository_lock is not None:
+                os.close(self.repository_lock)
+                self.repository_lock = None
+        self.completed = True
+
+        LOG.info("Backup %(backup)s stored %(stored)s new bytes out of "
+                 "%(total)s bytes, taking %(compressed)s bytes once "
+                 "compressed.", {'backup': self.backup_id,
+                                 'stored': self.stored_size,
+                                 'total': self.total_size,
+                                 'compressed': self.stored_compressed_size})
+
+    def start_manifest(self):
+        """Marks the backup as in progress and loads the parent manifest."""
+        os.makedirs(self.dest, exist_ok=True)
+        # Chunks already in the repository are reused by this backup, so
+        # they must not be removed until its manifest refers to them.
+        self.repository_lock = _lock_repository(self.repository)
+        with open(os.path.join(self.dest, MANIFEST_IN_PROGRESS), 'w'):
+            pass
+        if self.parent_id:
+            manifest = read_manifest(self.repository, self.parent_id)
+            if manifest:
+                compression = manifest.get('compression', COMPRESSION_NONE)
+                for entry in manifest['entries']:
+                    if entry['type'] == 'file':
+                        entry.setdefault('compression', compression)
+                        self.parent_entries[entry['path']] = entry
+
+    def write_manifest(self):
+        entries = [_manifest_entry(rel_path, item_stat)
+                   for rel_path, item_stat in self.dirs]
+        entries.extend(self.entries[rel_path]
+                       for rel_path, item_stat in self.files)
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'backup_id': self.backup_id,
+            'parent_id': self.parent_id,
+            'chunk_size': self.chunk_size,
+            'compression': self.compression,
+            'size': self.total_size,
+            'entries': entries,
+        }
+        _write_atomically(os.path.join(self.dest, MANIFEST_FILE),
+                          jsonutils.dump_as_bytes(manifest))
+        os.unlink(os.path.join(self.dest, MANIFEST_IN_PROGRESS))
+        _remove_existing(self.journal_path)
+
+    def _copy_item_sync(self, rel_path, item_stat):
+        src_item = os.path.join(self.src, rel_path)
+        entry = _manifest_entry(rel_path, item_stat)
+
+        if entry['type'] == 'file':
+            parent = (self.resumed_entries.get(rel_path) or
+                      self.parent_entries.get(rel_path))
+            if (parent and parent['type'] == 'file' and
+                    parent['size'] == entry['size'] and
+                    parent['mtime_ns'] == entry['mtime_ns']):
+                # Reused chunks keep the compression they were stored with.
+                entry['chunks'] = parent['chunks']
+                entry['compression'] = parent.get('compression',
+                                                  self.compression)
+            else:
+                entry['compression'] = self.compression
+                self.in_flight[src_item] = 0
+                self.current_copy = {'file_path': src_item,
+                                     'size': item_stat.st_size}
+                try:
+                    entry['chunks'] = self._store_file(src_item)
+                finally:
+                    self.in_flight.pop(src_item, None)
+            self._add_copied(item_stat.st_size)
+        elif entry['type'] == 'symlink':
+            entry['target'] = os.readlink(src_item)
+
+        if not self.cancelled:
+            self.entries[rel_path] = entry
+            self._journal_record(rel_path, entry)
+
+    def _resume_record(self, rel_path, record):
+        self.resumed_entries[rel_path] = record
+
+    def _store_file(self, src_item):
+        chunks = []
+        read = 0
+        with open(src_item, 'rb') as f:
+            while not self.cancelled:
+                data = f.read(self.chunk_size)
+                if not data:
+                    break
+                digest = hashlib.sha256(data).hexdigest()
+                stored = _store_chunk(self.repository, digest, data,
+                                      self.compression)
+                with self.lock:
+                    if stored:
+                        self.stored_size += len(data)
+                        self.stored_compressed_size += stored
+                chunks.append(digest)
+                read += len(data)
+                self.in_flight[src_item] = read
+                self._add_transferred(len(data) + stored)
+        return chunks
+
+
+class ChunkedRestoreCopy(ParallelCopy):
+    """Restores share contents from a content-addressed chunk repository.
+
+    Backups taken before the repository was used for chunked backups have
+    no manifest, and are copied file by file from the backup folder.
+    """
+
+    def __init__(self, repository, backup_id, dest, ignore_list, workers=1,
+                 checkpoint_interval=0, max_bytes_per_second=0):
+        super(ChunkedRestoreCopy, self).__init__(
+            os.path.join(repository, backup_id), dest, ignore_list,
+            workers=workers, checkpoint_interval=checkpoint_interval,
+            max_bytes_per_second=max_bytes_per_second)
+        self.repository = repository
+        self.backup_id = backup_id
+        self.manifest = None
+
+    def scan(self):
+        self.manifest = read_manifest(self.repository, self.backup_id)
+        if not self.manifest:
+            return super(ChunkedRestoreCopy, self).scan()
+
+        for entry in self.manifest['entries']:
+            if entry['type'] == 'dir':
+                self.dirs.append((entry['path'], entry))
+            else:
+                self.files.append((entry['path'], entry))
+                if entry['type'] == 'file':
+                    self.total_size += entry['size']
+
+    def copy_dir_stats(self):
+        if not self.manifest:
+            return super(ChunkedRestoreCopy, self).copy_dir_stats()
+
+        for rel_path, entry in reversed(self.dirs):
+            if self.cancelled:
+                return
+            _set_entry_attributes(os.path.join(self.dest, rel_path), entry)
+
+    def _copy_item_sync(self, rel_path, entry):
+        if not self.manifest:
+            return super(ChunkedRestoreCopy, self)._copy_item_sync(
+                rel_path, entry)
+
+        dest_item = os.path.join(self.dest, rel_path)
+        if entry['type'] == 'file':
+            if self._is_copied(rel_path, dest_item, entry['size'],
+                               entry['mtime_ns']):
+                self._add_copied(entry['size'])
+                return
+            self.in_flight[dest_item] = 0
+            self.current_copy = {'file_path': dest_item,
+                                 'size': entry['size']}
+            try:
+                self._restore_file(
+                    entry['chunks'], dest_item,
+                    entry.get('compression', self.manifest.get(
+                        'compression', COMPRESSION_NONE)))
+            finally:
+                self.in_flight.pop(dest_item, None)
+        elif entry['type'] == 'symlink':
+            _remove_existing(dest_item)
+            os.symlink(entry['target'], dest_item)
+        else:
+            _remove_existing(dest_item)
+            os.mknod(dest_item, entry['mode'], entry['rdev'])
+
+        _set_entry_attributes(dest_item, entry)
+
+        if entry['type'] == 'file' and not self.cancelled:
+            self._record_copied(rel_path, {
+                'size': entry['size'],
+                'mtime_ns': entry['mtime_ns'],
+                'sha256': None,
+            })
+            self._add_copied(entry['size'])
+
+    def _restore_file(self, chunks, dest_item, compression):
+        written = 0
+        with open(dest_item, 'wb') as f:
+            for digest in chunks:
+                if self.cancelled:
+                    return
+                data, stored = _load_chunk(self.repository, digest,
+                                           compression)
+                f.write(data)
+                written += len(data)
+                self.in_flight[dest_item] = written
+                self._add_transferred(len(data) + stored)
+
+
+def read_manifest(repository, backup_id):
+    """Returns the manifest of a chunked backup, or None if it has none."""
+    try:
+        with open(os.path.join(repository, backup_id, MANIFEST_FILE),
+                  'rb') as f:
+            return jsonutils.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def remove_unreferenced_chunks(repository):
+    """Removes chunks that no backup manifest of a repository refers to.
+
+    Chunks of a backup being written are only referenced once its manifest
+    is complete, so nothing is removed while any backup is in progress.
+
+    :returns: the number of chunks removed.
+    """
+    chunks_dir = os.path.join(repository, CHUNKS_DIR)
+    if not os.path.isdir(chunks_dir):
+        return 0
+
+    lock = _lock_repository(repository, exclusive=True)
+    if lock is None:
+        LOG.info("Not removing unreferenced chunks from %s while a backup "
+                 "is being written to it.", repository)
+        return 0
+    try:
+        return _remove_unreferenced_chunks(repository, chunks_dir)
+    finally:
+        os.close(lock)
+
+
+def _remove_unreferenced_chunks(repository, chunks_dir):
+    referenced = set()
+    for name in os.listdir(repository):
+        backup_folder = os.path.join(repository, name)
+        if name == CHUNKS_DIR or not os.path.isdir(backup_folder):
+            continue
+        if os.path.exists(os.path.join(backup_folder, MANIFEST_IN_PROGRESS)):
+            LOG.info("Not removing unreferenced chunks from %(repo)s while "
+                     "backup %(backup)s is in progress.",
+                     {'repo': repository, 'backup': name})
+            return 0
+        manifest = read_manifest(repository, name)
+        if manifest:
+            for entry in manifest['entries']:
+                referenced.update(entry.get('chunks', []))
+
+    removed = 0
+    for prefix in os.listdir(chunks_dir):
+        prefix_dir = os.path.join(chunks_dir, prefix)
+        for name in os.listdir(prefix_dir):
+            # Chunks are named after their digest, with the suffix of
+            # their compression if any.
+            if name.split('.')[0] not in referenced:
+                os.unlink(os.path.join(prefix_dir, name))
+                removed += 1
+    return removed
+
+
+def _lock_repository(repository, exclusive=False):
+    """Locks a chunk repository for all the hosts it is mounted on.
+
+    Backups being written hold a shared lock, waiting for the removal of
+    unreferenced chunks to complete, which in turn needs an exclusive lock.
+
+    :returns: the file descriptor holding the lock, or None if an exclusive
+        lock was requested while the repository is locked.
+    """
+    fd = os.open(os.path.join(repository, REPOSITORY_LOCK),
+                 os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if exclusive:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    except Exception:
+        os.close(fd)
+        raise
+    return fd
+
+
+def _manifest_entry(rel_path, item_stat):
+    mode = item_stat.st_mode
+    if stat.S_ISDIR(mode):
+        item_type = 'dir'
+    elif stat.S_ISREG(mode):
+        item_type = 'file'
+    elif stat.S_ISLNK(mode):
+        item_type = 'symlink'
+    else:
+        item_type = 'special'
+
+    entry = {
+        'path': rel_path,
+        'type': item_type,
+        'mode': mode,
+        'uid': item_stat.st_uid,
+        'gid': item_stat.st_gid,
+        'atime_ns': item_stat.st_atime_ns,
+        'mtime_ns': item_stat.st_mtime_ns,
+    }
+    if item_type == 'file':
+        entry['size'] = item_stat.st_size
+    elif item_type == 'special':
+        entry['rdev'] = item_stat.st_rdev
+    return entry
+
+
+def _set_entry_attributes(path, entry):
+    _set_attributes(path, entry['mode'], entry['uid'], entry['gid'],
+                    entry['atime_ns'], entry['mtime_ns'])
+
+
+def _get_codec(compression):
+    """Returns the file suffix, compressor and decompressor of chunks."""
+    if compression == COMPRESSION_NONE:
+        return '', None, None
+    if compression == COMPRESSION_GZIP:
+        return '.gz', gzip.compress, gzip.decompress
+    if compression == COMPRESSION_ZSTD:
+        if not zstandard:
+            msg = _("The zstandard library is required to compress "
+                    "backups with zstd.")
+            raise exception.ShareDataCopyFailed(reason=msg)
+        # Compressors and decompressors must not be shared across threads.
+        return ('.zst',
+                lambda data: zstandard.ZstdCompressor().compress(data),
+                lambda data: zstandard.ZstdDecompressor().decompress(data))
+    msg = _("Unsupported backup compression %s.") % compression
+    raise exception.ShareDataCopyFailed(reason=msg)
+
+
+def _chunk_path(repository, digest, compression=COMPRESSION_NONE):
+    suffix = _get_codec(compression)[0]
+    return os.path.join(repository, CHUNKS_DIR, digest[:2], digest + suffix)
+
+
+def _store_chunk(repository, digest, data, compression=COMPRESSION_NONE):
+    """Stores a chunk unless the repository already has it.
+
+    :returns: the number of bytes written, which is 0 if the chunk was
+        already stored.
+    """
+    suffix, compress, decompress = _get_codec(compression)
+    path = _chunk_path(repository, digest, compression)
+    if os.path.exists(path):
+        return 0
+    if compress:
+        data = compress(data)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_atomically(path, data)
+    return len(data)
+
+
+def _load_chunk(repository, digest, compression=COMPRESSION_NONE):
+    """Reads and verifies a chunk.
+
+    :returns: the data of the chunk and the number of bytes read.
+    """
+    suffix, compress, decompress = _get_codec(compression)
+    with open(_chunk_path(repository, digest, compression), 'rb') as f:
+        stored = f.read()
+    try:
+        data = decompress(stored) if decompress else stored
+    except Exception:
+        data = None
+    if data is None or hashlib.sha256(data).hexdigest() != digest:
+        msg = _("Backup chunk %s is corrupted. Aborting data "
+                "restore.") % digest
+        raise exception.ShareDataCopyFailed(reason=msg)
+    return data, len(stored)
+
+
+def _write_atomically(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                    prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        _remove_existing(tmp_path)
+        raise
+
+
+class _Throttle(object):
+    """Limits the rate at which the workers of a copy transfer data.
+
+    Workers account for the data they transferred and wait until the
+    average rate since the copy got idle fits within the limit.
+    """
+
+    def __init__(self, max_bytes_per_second):
+        self.max_bytes_per_second = max_bytes_per_second
+        self.lock = native_threading.Lock()
+        self.next_time = time.monotonic()
+
+    def consume(self, size):
+        with self.lock:
+            now = time.monotonic()
+            self.next_time = (max(self.next_time, now) +
+                              size / self.max_bytes_per_second)
+            delay = self.next_time - now
+        if delay > 0:
+            native_time.sleep(delay)
+
+
+_COPY_CHUNK_SIZE = 8 * units.Mi
+
+_UNSUPPORTED_COPY_ERRNOS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL,
+                            errno.EOPNOTSUPP, errno.EBADF)
+
+
+def _copy_chunk_copy_file_range(src_fd, dest_fd):
+    return os.copy_file_range(src_fd, dest_fd, _COPY_CHUNK_SIZE)
+
+
+def _copy_chunk_sendfile(src_fd, dest_fd):
+    return os.sendfile(dest_fd, src_fd, None, _COPY_CHUNK_SIZE)
+
+
+def _copy_chunk_read_write(src_fd, dest_fd, digest=None):
+    data = os.read(src_fd, _COPY_CHUNK_SIZE)
+    if digest is not None:
+        digest.update(data)
+    view = memoryview(data)
+    while view:
+        view = view[os.write(dest_fd, view):]
+    return len(data)
+
+
+def _remove_existing(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _copy_attributes(src_item, dest_item, item_stat):
+    """Applies ownership, mode, times and extended attributes of an item.
+
+    Like 'cp --preserve=all', failing to copy extended attributes is not
+    considered an error. This runs in native threads, so it must not log.
+    """
+    try:
+        for name in os.listxattr(src_item, follow_symlinks=False):
+            os.setxattr(dest_item, name,
+                        os.getxattr(src_item, name, follow_symlinks=False),
+                        follow_symlinks=False)
+    except OSError:
+        pass
+
+    _set_attributes(dest_item, item_stat.st_mode, item_stat.st_uid,
+                    item_stat.st_gid, item_stat.st_atime_ns,
+                    item_stat.st_mtime_ns)
+
+
+def _set_attributes(path, mode, uid, gid, atime_ns, mtime_ns):
+    os.chown(path, uid, gid, follow_symlinks=False)
+    # Linux does not support changing the mode of a symbolic link.
+    if not stat.S_ISLNK(mode):
+        os.chmod(path, stat.S_IMODE(mode))
+    os.utime(path, ns=(atime_ns, mtime_ns), follow_symlinks=False)
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_COPY_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def _validate_item(src_item, dest_item):
-    src_sum, err = utils.execute(
-        "sha256sum", "%s" % src_item, run_as_root=True)
-    dest_sum, err = utils.execute(
-        "sha256sum", "%s" % dest_item, run_as_root=True)
+    out, err = utils.execute(
+        "sha256sum", "%s" % src_item, "%s" % dest_item, run_as_root=True)
+    src_sum, dest_sum = out.splitlines()[:2]
     if src_sum.split()[0] != dest_sum.split()[0]:
         msg = _("Data corrupted while copying. Aborting data copy.")
         raise exception.ShareDataCopyFailed(reason=msg)
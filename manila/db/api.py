@@ -370,6 +370,11 @@ def share_instance_get_all_by_host(
         context, host, with_share_data=with_share_data, status=status)
 
 
+def share_instance_provisioned_capacity_get_all(context):
+    """Returns the sum of share sizes of every host, keyed by host."""
+    return IMPL.share_instance_provisioned_capacity_get_all(context)
+
+
 def share_instance_get_all_by_share_network(context, share_network_id):
     """Returns list of shares that belong to given share network."""
     return IMPL.share_instance_get_all_by_share_network(
@@ -637,6 +642,17 @@ def share_instance_access_update(context, access_id, instance_id, updates):
         context, access_id, instance_id, updates)
 
 
+def share_instance_access_update_all(context, instance_id, access_ids,
+                                     updates, state=None):
+    """Update the access mapping rows of a share instance at once.
+
+    Only the mappings of the given access rules that are in the given state,
+    if any, are updated. Returns the number of mappings updated.
+    """
+    return IMPL.share_instance_access_update_all(
+        context, instance_id, access_ids, updates, state=state)
+
+
 def share_instance_access_delete(context, mapping_id):
     """Deny access to share instance."""
     return IMPL.share_instance_access_delete(context, mapping_id)
@@ -710,39 +726,39 @@ def share_snapshot_get(context, snapshot_id, project_only=True):
 
 
 def share_snapshot_get_all(context, filters=None, limit=None, offset=None,
-                           sort_key=None, sort_dir=None):
+                           sort_key=None, sort_dir=None, marker=None):
     """Get all snapshots."""
     return IMPL.share_snapshot_get_all(
         context, filters=filters, limit=limit, offset=offset,
-        sort_key=sort_key, sort_dir=sort_dir)
+        sort_key=sort_key, sort_dir=sort_dir, marker=marker)
 
 
 def share_snapshot_get_all_with_count(context, filters=None, limit=None,
                                       offset=None, sort_key=None,
-                                      sort_dir=None):
+                                      sort_dir=None, marker=None):
     """Get all snapshots."""
     return IMPL.share_snapshot_get_all_with_count(
         context, filters=filters, limit=limit, offset=offset,
-        sort_key=sort_key, sort_dir=sort_dir)
+        sort_key=sort_key, sort_dir=sort_dir, marker=marker)
 
 
 def share_snapshot_get_all_by_project(context, project_id, filters=None,
                                       limit=None, offset=None, sort_key=None,
-                                      sort_dir=None):
+                                      sort_dir=None, marker=None):
     """Get all snapshots belonging to a project."""
     return IMPL.share_snapshot_get_all_by_project(
         context, project_id, filters=filters, limit=limit, offset=offset,
-        sort_key=sort_key, sort_dir=sort_dir)
+        sort_key=sort_key, sort_dir=sort_dir, marker=marker)
 
 
 def share_snapshot_get_all_by_project_with_count(context, project_id,
                                                  filters=None, limit=None,
                                                  offset=None, sort_key=None,
-                                                 sort_dir=None):
+                                                 sort_dir=None, marker=None):
     """Get all snapshots belonging to a project."""
     return IMPL.share_snapshot_get_all_by_project_with_count(
         context, project_id, filters=filters, limit=limit, offset=offset,
-        sort_key=sort_key, sort_dir=sort_dir)
+        sort_key=sort_key, sort_dir=sort_dir, marker=marker)
 
 
 def share_snapshot_get_all_for_share(context, share_id, filters=None,
@@ -786,6 +802,14 @@ def share_snapshot_access_get_all_for_snapshot_instance(
         context, snapshot_instance_id)
 
 
+def share_snapshot_access_get_all_for_snapshot_instances(
+    context, snapshot_instance_ids, filters=None,
+):
+    """Get all access rules related to a set of snapshot instances."""
+    return IMPL.share_snapshot_access_get_all_for_snapshot_instances(
+        context, snapshot_instance_ids, filters=filters)
+
+
 def share_snapshot_access_get_all_for_share_snapshot(context,
                                                      share_snapshot_id,
                                                      filters):
@@ -1258,6 +1282,12 @@ def network_allocations_get_by_ip_address(context, ip_address):
     return IMPL.network_allocations_get_by_ip_address(context, ip_address)
 
 
+def network_allocations_get_ip_addresses(context, ip_version=None):
+    """Get the IP addresses of all network allocations."""
+    return IMPL.network_allocations_get_ip_addresses(
+        context, ip_version=ip_version)
+
+
 ##################
 
 
@@ -1637,11 +1667,14 @@ def share_resources_host_update(context, current_host, new_host):
 ####################
 
 def share_replicas_get_all(context, with_share_server=False,
-                           with_share_data=False):
-    """Returns all share replicas regardless of share."""
+                           with_share_data=False, host=None):
+    """Returns all share replicas regardless of share.
+
+    If host is given, only the replicas on that host are returned.
+    """
     return IMPL.share_replicas_get_all(
         context, with_share_server=with_share_server,
-        with_share_data=with_share_data)
+        with_share_data=with_share_data, host=host)
 
 
 def share_replicas_get_all_by_share(context, share_id, with_share_server=False,
@@ -1784,11 +1817,11 @@ def message_get(context, message_id):
 
 
 def message_get_all(context, filters=None, limit=None, offset=None,
-                    sort_key=None, sort_dir=None):
+                    sort_key=None, sort_dir=None, marker=None):
     """Returns all messages with the project of the specified context."""
     return IMPL.message_get_all(context, filters=filters, limit=limit,
                                 offset=offset, sort_key=sort_key,
-                                sort_dir=sort_dir)
+                                sort_dir=sort_dir, marker=marker)
 
 
 def message_create(context, values):
@@ -281,6 +281,25 @@ def apply_sorting(model, query, sort_key, sort_dir):
     return query
 
 
+def _get_marker_values(query, marker_attr, marker, sort_attr, id_attr):
+    """Returns the sort key and id values of the marker row of a listing.
+
+    :param query: query to look the marker row up with
+    :param marker_attr: the column identifying the marker row
+    :param marker: the value of marker_attr for the marker row
+    :param sort_attr: the column the listing is sorted by
+    :param id_attr: the unique column the listing is sorted by after
+                    sort_attr
+    :returns: tuple -- (sort key value, id value)
+    :raises: exception.MarkerNotFound
+    """
+    result = query.with_entities(sort_attr, id_attr).filter(
+        marker_attr == marker).first()
+    if result is None:
+        raise exception.MarkerNotFound(marker=marker)
+    return tuple(result)
+
+
 def handle_db_data_error(f):
     def wrapper(*args, **kwargs):
         try:
@@ -1851,6 +1870,22 @@ def _share_instance_get_all(context, filters=None):
     if status:
         query = query.filter(models.ShareInstance.status == status)
 
+    marker = filters.get('marker')
+    if marker or 'limit' in filters:
+        sort_attr = models.ShareInstance.created_at
+        query = apply_sorting(
+            models.ShareInstance, query, 'created_at', 'desc')
+        if marker:
+            sort_value, marker_id = _get_marker_values(
+                model_query(context, models.ShareInstance, read_deleted="no"),
+                models.ShareInstance.id, marker, sort_attr,
+                models.ShareInstance.id)
+            query = utils.apply_marker(query, sort_attr,
+                                       models.ShareInstance.id, sort_value,
+                                       marker_id, 'desc')
+        if 'limit' in filters:
+            query = query.limit(filters['limit'])
+
     # Returns list of share instances that satisfy filters.
     query = query.all()
     return query
@@ -1993,6 +2028,25 @@ def share_instance_get_all_by_host(context, host, with_share_data=False,
     return instances
 
 
+@require_admin_context
+@context_manager.reader
+def share_instance_provisioned_capacity_get_all(context):
+    """Retrieves the sum of share sizes of every host, in one query."""
+    query = model_query(
+        context, models.ShareInstance,
+        models.ShareInstance.host,
+        func.sum(models.Share.size),
+    ).join(
+        models.Share,
+        models.ShareInstance.share_id == models.Share.id,
+    ).filter(
+        models.ShareInstance.host.isnot(None),
+    ).group_by(
+        models.ShareInstance.host,
+    )
+    return {host: size or 0 for host, size in query.all()}
+
+
 @require_context
 @context_manager.reader
 def share_instance_get_all_by_share_network(context, share_network_id):
@@ -2058,7 +2112,7 @@ def share_instance_get_all_by_share_group_id(context, share_group_id):
 
 def _share_replica_get_with_filters(context, share_id=None, replica_id=None,
                                     replica_state=None, status=None,
-                                    with_share_server=True):
+                                    with_share_server=True, host=None):
 
     query = model_query(context, models.ShareInstance, read_deleted="no")
 
@@ -2085,6 +2139,12 @@ def _share_replica_get_with_filters(context, share_id=None, replica_id=None,
     if status is not None:
         query = query.filter(models.ShareInstance.status == status)
 
+    if host is not None:
+        query = query.filter(
+            or_(models.ShareInstance.host == host,
+                models.ShareInstance.host.like("{0}#%".format(host)))
+        )
+
     if with_share_server:
         query = query.options(
             orm.joinedload(models.ShareInstance.share_server),
@@ -2096,10 +2156,10 @@ def _share_replica_get_with_filters(context, share_id=None, replica_id=None,
 @require_context
 @context_manager.reader
 def share_replicas_get_all(context, with_share_data=False,
-                           with_share_server=True):
+                           with_share_server=True, host=None):
     """Returns replica instances for all available replicated shares."""
     result = _share_replica_get_with_filters(
-        context, with_share_server=with_share_server,
+        context, with_share_server=with_share_server, host=host,
     )
 
     if with_share_data:
@@ -2417,7 +2477,7 @@ def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
     :param sort_key: key of models.Share to be used for sorting
     :param sort_dir: desired direction of sorting, can be 'asc' and 'desc'
     :returns: list -- models.Share
-    :raises: exception.InvalidInput
+    :raises: exception.InvalidInput, exception.MarkerNotFound
     """
     if filters is None:
         filters = {}
@@ -2449,9 +2509,11 @@ def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
     query = _process_share_filters(
         query, filters, project_id, is_public=is_public)
 
+    sort_model = models.Share
     try:
         query = apply_sorting(models.Share, query, sort_key, sort_dir)
     except AttributeError:
+        sort_model = models.ShareInstance
         try:
             query = apply_sorting(
                 models.ShareInstance, query, sort_key, sort_dir)
@@ -2465,6 +2527,25 @@ def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
     if show_count:
         count = query.order_by(models.Share.id).distinct().count()
 
+    if filters.get('marker'):
+        sort_attr = getattr(sort_model, sort_key)
+        marker_query = model_query(context, models.Share).join(
+            models.ShareInstance,
+            models.ShareInstance.share_id == models.Share.id)
+        if project_id:
+            if is_public:
+                marker_query = marker_query.filter(
+                    or_(models.Share.project_id == project_id,
+                        models.Share.is_public))
+            else:
+                marker_query = marker_query.filter(
+                    models.Share.project_id == project_id)
+        sort_value, marker_id = _get_marker_values(
+            marker_query, models.Share.id, filters['marker'], sort_attr,
+            sort_model.id)
+        query = utils.apply_marker(query, sort_attr, sort_model.id,
+                                   sort_value, marker_id, sort_dir)
+
     if 'limit' in filters:
         offset = filters.get('offset', 0)
         query = query.limit(filters['limit']).offset(offset)
@@ -3114,6 +3195,23 @@ def share_access_get_all_for_share(context, share_id, filters=None):
     query = exact_filter(
         query, share_access_mapping, filters, legal_filter_keys)
 
+    marker = filters.get('marker')
+    if marker or 'limit' in filters:
+        sort_attr = share_access_mapping.created_at
+        query = apply_sorting(
+            share_access_mapping, query, 'created_at', 'desc')
+        if marker:
+            sort_value, marker_id = _get_marker_values(
+                model_query(context, share_access_mapping).filter_by(
+                    share_id=share_id),
+                share_access_mapping.id, marker, sort_attr,
+                share_access_mapping.id)
+            query = utils.apply_marker(query, sort_attr,
+                                       share_access_mapping.id, sort_value,
+                                       marker_id, 'desc')
+        if 'limit' in filters:
+            query = query.limit(filters['limit'])
+
     return query.all()
 
 
@@ -3125,7 +3223,8 @@ def share_access_get_all_for_instance(context, instance_id, filters=None,
     filters = copy.deepcopy(filters) if filters else {}
     filters.update({'share_instance_id': instance_id})
     legal_filter_keys = ('id', 'share_instance_id', 'access_id', 'state')
-    query = _share_instance_access_query(context)
+    query = _share_instance_access_query(context).options(
+        orm.selectinload(models.ShareInstanceAccessMapping.instance))
 
     query = exact_filter(
         query, models.ShareInstanceAccessMapping, filters, legal_filter_keys)
@@ -3144,10 +3243,25 @@ def _set_instances_share_access_data(context, instance_accesses):
     if instance_accesses and not isinstance(instance_accesses, list):
         instance_accesses = [instance_accesses]
 
+    if not instance_accesses:
+        return instance_accesses
+
+    # NOTE: Load the access rules of all the mappings at once rather than
+    # one by one; share instances can have thousands of access rules. Only
+    # the proxified attributes are needed, so the mappings of the rules to
+    # the other share instances are not loaded.
+    access_ids = set(ia['access_id'] for ia in instance_accesses)
+    share_accesses = _share_access_get_query(context, {}).filter(
+        models.ShareAccessMapping.id.in_(access_ids)
+    ).options(
+        orm.lazyload(models.ShareAccessMapping.instance_mappings),
+    ).all()
+    share_accesses = {access['id']: access for access in share_accesses}
+
     for instance_access in instance_accesses:
-        share_access = _share_access_get(
-            context, instance_access['access_id']
-        )
+        share_access = share_accesses.get(instance_access['access_id'])
+        if share_access is None:
+            raise exception.NotFound()
         instance_access.set_share_access_data(share_access)
 
     return instance_accesses
@@ -3300,6 +3414,40 @@ def share_instance_access_update(context, access_id, instance_id, updates):
 
     return instance_access_ref
 
+
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@context_manager.writer
+def share_instance_access_update_all(context, instance_id, access_ids,
+                                     updates, state=None):
+    share_access_fields = ('access_type', 'access_to', 'access_key',
+                           'access_level')
+
+    share_access_map_updates, share_instance_access_map_updates = (
+        _extract_subdict_by_fields(updates, share_access_fields)
+    )
+    updated_at = timeutils.utcnow()
+    share_instance_access_map_updates['updated_at'] = updated_at
+
+    query = _share_instance_access_query(
+        context, instance_id=instance_id
+    ).filter(models.ShareInstanceAccessMapping.access_id.in_(access_ids))
+    if state is not None:
+        query = query.filter_by(state=state)
+
+    if share_access_map_updates:
+        share_access_map_updates['updated_at'] = updated_at
+        model_query(
+            context, models.ShareAccessMapping,
+        ).filter(
+            models.ShareAccessMapping.id.in_(
+                query.with_entities(
+                    models.ShareInstanceAccessMapping.access_id))
+        ).update(share_access_map_updates, synchronize_session=False)
+
+    return query.update(share_instance_access_map_updates,
+                        synchronize_session=False)
+
 ###################
 
 
@@ -3564,7 +3712,7 @@ def _share_snapshot_get_all_with_filters(context, project_id=None,
                                          share_id=None, filters=None,
                                          limit=None, offset=None,
                                          sort_key=None, sort_dir=None,
-                                         show_count=False):
+                                         show_count=False, marker=None):
     """Retrieves all snapshots.
 
     If no sorting parameters are specified then returned snapshots are sorted
@@ -3576,6 +3724,7 @@ def _share_snapshot_get_all_with_filters(context, project_id=None,
     :param sort_key: attribute by which results should be sorted,default is
                      created_at
     :param sort_dir: direction in which results should be sorted
+    :param marker: ID of the last snapshot of the previous page
     :returns: list of matching snapshots
     """
     # Init data
@@ -3652,6 +3801,17 @@ def _share_snapshot_get_all_with_filters(context, project_id=None,
     if show_count:
         count = query.order_by(models.ShareSnapshot.id).distinct().count()
 
+    if marker:
+        sort_attr = getattr(models.ShareSnapshot, sort_key)
+        marker_query = model_query(context, models.ShareSnapshot)
+        if project_id:
+            marker_query = marker_query.filter_by(project_id=project_id)
+        sort_value, marker_id = _get_marker_values(
+            marker_query, models.ShareSnapshot.id, marker, sort_attr,
+            models.ShareSnapshot.id)
+        query = utils.apply_marker(query, sort_attr, models.ShareSnapshot.id,
+                                   sort_value, marker_id, sort_dir)
+
     if limit is not None:
         query = query.limit(limit)
 
@@ -3670,21 +3830,21 @@ def _share_snapshot_get_all_with_filters(context, project_id=None,
 @require_admin_context
 @context_manager.reader
 def share_snapshot_get_all(context, filters=None, limit=None, offset=None,
-                           sort_key=None, sort_dir=None):
+                           sort_key=None, sort_dir=None, marker=None):
     return _share_snapshot_get_all_with_filters(
         context, filters=filters, limit=limit,
-        offset=offset, sort_key=sort_key, sort_dir=sort_dir)
+        offset=offset, sort_key=sort_key, sort_dir=sort_dir, marker=marker)
 
 
 @require_admin_context
 @context_manager.reader
 def share_snapshot_get_all_with_count(context, filters=None, limit=None,
                                       offset=None, sort_key=None,
-                                      sort_dir=None):
+                                      sort_dir=None, marker=None):
     count, query = _share_snapshot_get_all_with_filters(
         context, filters=filters, limit=limit,
         offset=offset, sort_key=sort_key, sort_dir=sort_dir,
-        show_count=True)
+        show_count=True, marker=marker)
     return count, query
 
 
@@ -3692,11 +3852,12 @@ def share_snapshot_get_all_with_count(context, filters=None, limit=None,
 @context_manager.reader
 def share_snapshot_get_all_by_project(context, project_id, filters=None,
                                       limit=None, offset=None,
-                                      sort_key=None, sort_dir=None):
+                                      sort_key=None, sort_dir=None,
+                                      marker=None):
     authorize_project_context(context, project_id)
     return _share_snapshot_get_all_with_filters(
         context, project_id=project_id, filters=filters, limit=limit,
-        offset=offset, sort_key=sort_key, sort_dir=sort_dir)
+        offset=offset, sort_key=sort_key, sort_dir=sort_dir, marker=marker)
 
 
 @require_context
@@ -3704,12 +3865,12 @@ def share_snapshot_get_all_by_project(context, project_id, filters=None,
 def share_snapshot_get_all_by_project_with_count(context, project_id,
                                                  filters=None, limit=None,
                                                  offset=None, sort_key=None,
-                                                 sort_dir=None):
+                                                 sort_dir=None, marker=None):
     authorize_project_context(context, project_id)
     count, query = _share_snapshot_get_all_with_filters(
         context, project_id=project_id, filters=filters, limit=limit,
         offset=offset, sort_key=sort_key, sort_dir=sort_dir,
-        show_count=True)
+        show_count=True, marker=marker)
     return count, query
 
 
@@ -4007,6 +4168,17 @@ def share_snapshot_access_get_all_for_snapshot_instance(
     )
 
 
+@require_context
+@context_manager.reader
+def share_snapshot_access_get_all_for_snapshot_instances(
+    context, snapshot_instance_ids, filters=None,
+):
+    return _share_snapshot_access_get_all_for_snapshot_instance(
+        context, list(snapshot_instance_ids), filters=filters,
+        with_snapshot_access_data=False,
+    )
+
+
 def _share_snapshot_access_get_all_for_snapshot_instance(
     context, snapshot_instance_id, filters=None,
     with_snapshot_access_data=True,
@@ -5573,6 +5745,8 @@ def share_server_get_all_with_filters(context, filters):
 def _share_server_get_all_with_filters(context, filters):
     query = _share_server_get_query(context)
 
+    if filters.get('ids'):
+        query = query.filter(models.ShareServer.id.in_(filters.get('ids')))
     if filters.get('host'):
         query = query.filter_by(host=filters.get('host'))
     if filters.get('status'):
@@ -5829,6 +6003,22 @@ def network_allocations_get_by_ip_address(context, ip_address):
     return result or []
 
 
+@require_context
+@context_manager.reader
+def network_allocations_get_ip_addresses(context, ip_version=None):
+    query = model_query(
+        context, models.NetworkAllocation,
+        models.NetworkAllocation.ip_address,
+    ).distinct()
+    if ip_version:
+        # NOTE: allocations that predate the ip_version field have it unset.
+        query = query.filter(or_(
+            models.NetworkAllocation.ip_version == None,  # noqa
+            models.NetworkAllocation.ip_version == ip_version,
+        ))
+    return [ip_address for (ip_address,) in query.all()]
+
+
 @require_context
 @context_manager.reader
 def network_allocations_get_for_share_server(
@@ -7284,7 +7474,7 @@ def message_get(context, message_id):
 @require_context
 @context_manager.reader
 def message_get_all(context, filters=None, limit=None, offset=None,
-                    sort_key='created_at', sort_dir='desc'):
+                    sort_key='created_at', sort_dir='desc', marker=None):
     """Retrieves all messages.
 
     If no sort parameters are specified then the returned messages are
@@ -7300,6 +7490,7 @@ def message_get_all(context, filters=None, limit=None, offset=None,
                     or sets cause an 'IN' operation, while exact matching
                     is used for other values, see exact_filter function for
                     more information
+    :param marker: ID of the last message of the previous page
     :returns: list of matching messages
     """
     messages = models.Message
@@ -7318,10 +7509,21 @@ def message_get_all(context, filters=None, limit=None, offset=None,
 
     query = exact_filter(query, messages, filters, legal_filter_keys)
 
+    if marker:
+        sort_attr = getattr(messages, sort_key, None)
+        if sort_attr is None:
+            raise exception.InvalidInput(
+                reason='Invalid sort key %s' % sort_key)
+        marker_query = model_query(context, messages, read_deleted="no",
+                                   project_only="yes")
+        marker = _get_marker_values(marker_query, messages.id, marker,
+                                    sort_attr, messages.id)
+
     query = utils.paginate_query(query, messages, limit,
                                  sort_key=sort_key,
                                  sort_dir=sort_dir,
-                                 offset=offset)
+                                 offset=offset,
+                                 marker=marker)
 
     return query.all()
 
@@ -17,7 +17,7 @@ import sqlalchemy
 
 
 def paginate_query(query, model, limit, sort_key='created_at',
-                   sort_dir='desc', offset=None):
+                   sort_dir='desc', offset=None, marker=None):
     """Returns a query with sorting / pagination criteria added.
 
     :param query: the query object to which we should add paging/sorting
@@ -28,6 +28,9 @@ def paginate_query(query, model, limit, sort_key='created_at',
     :param sort_dir: direction in which results should be sorted (asc, desc)
     :param offset: the number of items to skip from the marker or from the
                     first element.
+    :param marker: tuple with the value of the sort key and the id of the
+                   last item of the previous page. When provided, results
+                   start right after that item.
 
     :rtype: sqlalchemy.orm.query.Query
     :return: The query with sorting/pagination added.
@@ -37,10 +40,17 @@ def paginate_query(query, model, limit, sort_key='created_at',
         sort_key_attr = getattr(model, sort_key)
     except AttributeError:
         raise exception.InvalidInput(reason='Invalid sort key %s' % sort_key)
-    if sort_dir == 'desc':
-        query = query.order_by(sqlalchemy.desc(sort_key_attr))
-    else:
-        query = query.order_by(sqlalchemy.asc(sort_key_attr))
+    sort_method = sqlalchemy.desc if sort_dir == 'desc' else sqlalchemy.asc
+    query = query.order_by(sort_method(sort_key_attr))
+    # NOTE: Sorting by id as well keeps the order of items with the same
+    # sort key value stable across pages.
+    if sort_key != 'id':
+        query = query.order_by(sort_method(model.id))
+
+    if marker is not None:
+        sort_value, marker_id = marker
+        query = apply_marker(query, sort_key_attr, model.id, sort_value,
+                             marker_id, sort_dir)
 
     if limit is not None:
         query = query.limit(limit)
@@ -49,3 +59,51 @@ def paginate_query(query, model, limit, sort_key='created_at',
         query = query.offset(offset)
 
     return query
+
+
+def apply_marker(query, sort_attr, id_attr, sort_value, marker_id,
+                 sort_dir='desc'):
+    """Returns a query restricted to the rows that follow a marker.
+
+    The query is expected to be ordered by ``sort_attr`` and then by
+    ``id_attr``, both in ``sort_dir`` direction. Rows are selected by
+    comparing against the marker's (sort value, id) pair instead of skipping
+    over the preceding rows, so the cost of fetching a page does not depend
+    on how deep into the listing it is.
+
+    :param query: the query object to restrict
+    :param sort_attr: the column the query is sorted by
+    :param id_attr: the unique column the query is sorted by after sort_attr
+    :param sort_value: the value of sort_attr for the marker row
+    :param marker_id: the value of id_attr for the marker row
+    :param sort_dir: direction in which results are sorted (asc, desc)
+
+    :rtype: sqlalchemy.orm.query.Query
+    :return: The query with the marker criteria added.
+    """
+    ascending = sort_dir != 'desc'
+    if sort_attr is id_attr:
+        after = id_attr > marker_id if ascending else id_attr < marker_id
+        return query.filter(after)
+
+    def _after(attr, value):
+        return attr > value if ascending else attr < value
+
+    # NOTE: NULL values sort before any other value in ascending order on
+    # MySQL and SQLite, and after them on PostgreSQL.
+    dialect = query.session.get_bind().dialect.name
+    nulls_first = ascending == (dialect != 'postgresql')
+
+    if sort_value is None:
+        criteria = sqlalchemy.and_(sort_attr.is_(None),
+                                   _after(id_attr, marker_id))
+        if nulls_first:
+            criteria = sqlalchemy.or_(criteria, sort_attr.isnot(None))
+    else:
+        criteria = sqlalchemy.or_(
+            _after(sort_attr, sort_value),
+            sqlalchemy.and_(sort_attr == sort_value,
+                            _after(id_attr, marker_id)))
+        if not nulls_first:
+            criteria = sqlalchemy.or_(criteria, sort_attr.is_(None))
+    return query.filter(criteria)
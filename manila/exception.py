@@ -217,6 +217,10 @@ class ResourceLockNotFound(NotFound):
     message = _("Resource lock %(lock_id)s could not be found.")
 
 
+class MarkerNotFound(NotFound):
+    message = _("Marker %(marker)s could not be found.")
+
+
 class ResourceVisibilityLockExists(ManilaException):
     message = _("Resource %(resource_id)s is already locked.")
 
@@ -51,6 +51,7 @@ This module provides Manager, a base class for managers.
 
 """
 
+import copy
 
 from eventlet import greenpool
 from oslo_config import cfg
@@ -59,6 +60,7 @@ from oslo_service import periodic_task
 
 from manila.db import base
 from manila.scheduler import rpcapi as scheduler_rpcapi
+from manila.scheduler import utils as scheduler_utils
 from manila import version
 
 CONF = cfg.CONF
@@ -149,10 +151,16 @@ class SchedulerDependentManager(Manager):
     manager.Manager directly. Updates are only sent after
     update_service_capabilities is called with non-None values.
 
+    Updates are versioned: the first one, and the ones sent on request of
+    the schedulers, carry the whole capabilities, while the following ones
+    only carry what changed since the previous update.
+
     """
 
     def __init__(self, host=None, db_driver=None, service_name='undefined'):
         self.last_capabilities = None
+        self._published_capabilities = None
+        self._capabilities_version = 0
         self.service_name = service_name
         self.scheduler_rpcapi = scheduler_rpcapi.SchedulerAPI()
         self._tp = greenpool.GreenPool()
@@ -166,12 +174,27 @@ class SchedulerDependentManager(Manager):
         self.last_capabilities = capabilities
 
     @periodic_task.periodic_task
-    def _publish_service_capabilities(self, context):
+    def _publish_service_capabilities(self, context, full_update=False):
         """Pass data back to the scheduler at a periodic interval."""
         if self.last_capabilities:
             LOG.debug('Notifying Schedulers of capabilities ...')
-            self.scheduler_rpcapi.update_service_capabilities(
-                context,
-                self.service_name,
-                self.host,
-                self.last_capabilities)
+            capabilities = copy.deepcopy(self.last_capabilities)
+            self._capabilities_version += 1
+            if (full_update or self._published_capabilities is None or
+                    not self.scheduler_rpcapi.can_send_capabilities_delta()):
+                self.scheduler_rpcapi.update_service_capabilities(
+                    context,
+                    self.service_name,
+                    self.host,
+                    capabilities,
+                    capabilities_version=self._capabilities_version)
+            else:
+                self.scheduler_rpcapi.update_service_capabilities(
+                    context,
+                    self.service_name,
+                    self.host,
+                    None,
+                    capabilities_version=self._capabilities_version,
+                    capabilities_delta=scheduler_utils.capabilities_delta(
+                        self._published_capabilities, capabilities))
+            self._published_capabilities = capabilities
@@ -73,7 +73,7 @@ class API(base.Base):
         return self.db.message_get(context, id)
 
     def get_all(self, context, search_opts=None, limit=None,
-                offset=None, sort_key=None, sort_dir=None):
+                offset=None, sort_key=None, sort_dir=None, marker=None):
         """Return messages for the given context."""
         LOG.debug("Searching for messages by: %s", search_opts)
 
@@ -81,7 +81,8 @@ class API(base.Base):
         messages = self.db.message_get_all(context, filters=search_opts,
                                            limit=limit, offset=offset,
                                            sort_key=sort_key,
-                                           sort_dir=sort_dir)
+                                           sort_dir=sort_dir,
+                                           marker=marker)
 
         return messages
 
@@ -233,7 +233,11 @@ class API(object):
 
     def list_ports(self, **search_opts):
         """List ports for the client based on search options."""
-        return self.client.list_ports(**search_opts).get('ports')
+        try:
+            return self.client.list_ports(**search_opts).get('ports')
+        except neutron_client_exc.NeutronClientException as e:
+            raise exception.NetworkException(code=e.status_code,
+                                             message=e.message)
 
     @utils.retry(retry_param=ks_exec.ConnectFailure, retries=5)
     def show_port(self, port_id):
@@ -37,6 +37,13 @@ neutron_network_plugin_opts = [
         help="The name of the physical network to determine which net segment "
              "is used. This opt is optional and will only be used for "
              "networks configured with multiple segments."),
+    cfg.IntOpt(
+        'neutron_port_operations_concurrency',
+        default=4,
+        min=1,
+        help="Maximum number of neutron ports created or deleted at the "
+             "same time when allocating or deallocating the network of a "
+             "share server."),
 ]
 
 neutron_single_network_plugin_opts = [
@@ -166,17 +173,27 @@ class NeutronNetworkPlugin(network.NetworkBaseAPI):
         allocation_count = kwargs.get('count', 1)
         device_owner = kwargs.get('device_owner', 'share')
 
-        ports = []
-        for current_count in range(0, allocation_count):
-            ports.append(
-                self._create_port(context,
-                                  share_server,
-                                  share_network,
-                                  share_network_subnet,
-                                  device_owner,
-                                  current_count,
-                                  is_external_network=is_external_network),
-            )
+        def _create_port(current_count):
+            return self._create_port(context,
+                                     share_server,
+                                     share_network,
+                                     share_network_subnet,
+                                     device_owner,
+                                     current_count,
+                                     is_external_network=is_external_network)
+
+        results = self._run_port_operations(_create_port,
+                                            range(allocation_count))
+        ports = [port for port, error in results if error is None]
+        errors = [error for port, error in results if error is not None]
+        if errors:
+            LOG.error("Failed to create %(failed)s of %(count)s ports for "
+                      "share server %(server)s. Deleting the ports that "
+                      "were created.",
+                      {'failed': len(errors), 'count': allocation_count,
+                       'server': share_server['id']})
+            self._delete_ports(context, ports, raise_on_error=False)
+            raise errors[0]
 
         return ports
 
@@ -322,8 +339,7 @@ class NeutronNetworkPlugin(network.NetworkBaseAPI):
         ports = self.db.network_allocations_get_for_share_server(
             context, share_server_id)
 
-        for port in ports:
-            self._delete_port(context, port)
+        self._delete_ports(context, ports)
 
         # It may be possible that there are ports existing without a
         # corresponding manila network allocation entry in the manila db,
@@ -344,7 +360,33 @@ class NeutronNetworkPlugin(network.NetworkBaseAPI):
                 LOG.debug(f"Deleting orphaned port {port['id']} belonging to "
                           f"share server {share_server_id} in neutron "
                           f"network {share_network_subnet['neutron_net_id']}")
-                self._delete_port(context, port, ignore_db=True)
+            self._delete_ports(context, ports, ignore_db=True)
+
+    def _run_port_operations(self, func, items):
+        """Call func on each of items, a few of them at a time.
+
+        :return: a list holding a (result, exception) pair per item, in the
+                 order of items.
+        """
+        return utils.run_concurrently(
+            func, items,
+            self.neutron_api.configuration.neutron_port_operations_concurrency)
+
+    def _delete_ports(self, context, ports, ignore_db=False,
+                      raise_on_error=True):
+        """Delete the given ports, and raise the first error if any."""
+        results = self._run_port_operations(
+            lambda port: self._delete_port(context, port,
+                                           ignore_db=ignore_db),
+            ports)
+        errors = []
+        for port, (__, error) in zip(ports, results):
+            if error is not None:
+                LOG.error("Failed to delete port %(port)s: %(err)s",
+                          {'port': port['id'], 'err': error})
+                errors.append(error)
+        if errors and raise_on_error:
+            raise errors[0]
 
     def _get_port_create_args(self, share_server, share_network_subnet,
                               device_owner, count=0,
@@ -609,8 +651,17 @@ class NeutronBindNetworkPlugin(NeutronNetworkPlugin):
     @utils.retry(retry_param=exception.NetworkBindException, retries=20)
     def _wait_for_ports_bind(self, ports, share_server):
         inactive_ports = []
-        for port in ports:
-            port = self._neutron_api.show_port(port['id'])
+        port_ids = [port['id'] for port in ports]
+        neutron_ports = {
+            port['id']: port
+            for port in (self.neutron_api.list_ports(id=port_ids)
+                         if port_ids else [])
+        }
+        for port_id in port_ids:
+            port = neutron_ports.get(port_id)
+            if port is None:
+                msg = _("Port %s not found.") % port_id
+                raise exception.NetworkException(msg)
             if (port['status'] == neutron_constants.PORT_STATUS_ERROR or
                     ('binding:vif_type' in port and
                      port['binding:vif_type'] ==
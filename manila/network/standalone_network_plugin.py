@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import bisect
+
 import netaddr
 from oslo_config import cfg
 from oslo_log import log
@@ -63,6 +65,10 @@ standalone_network_plugin_opts = [
 CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
+# Number of times allocate_network picks new IP addresses when the ones it
+# picked were allocated concurrently by another service.
+ALLOCATION_ATTEMPTS = 3
+
 
 class StandaloneNetworkPlugin(network.NetworkBaseAPI):
     """Standalone network plugin for share drivers.
@@ -229,26 +235,51 @@ class StandaloneNetworkPlugin(network.NetworkBaseAPI):
 
         return cidrs
 
-    def _get_available_ips(self, context, amount):
+    def _get_used_ips(self, context):
+        """Returns the IP addresses that can not be allocated as integers."""
+        used_ips = set()
+        for ip in (self.db.network_allocations_get_ip_addresses(
+                context, ip_version=self.ip_version) +
+                list(self.reserved_addresses)):
+            try:
+                ip = netaddr.IPAddress(ip)
+            except (netaddr.AddrFormatError, TypeError, ValueError):
+                continue
+            if ip.version == self.ip_version:
+                used_ips.add(int(ip))
+        return used_ips
+
+    def _get_available_ips(self, context, amount, exclude=()):
         """Returns IP addresses from allowed IP range if there are unused IPs.
 
+        The IP addresses in use are loaded with a single query and kept
+        sorted, so that the free addresses are found by walking the gaps
+        between them, whatever the size of the allowed IP ranges.
+
         :returns: IP addresses as list of text types
         :raises: exception.NetworkBadConfigurationException
         """
         ips = []
         if amount < 1:
             return ips
-        iterator = netaddr.iter_unique_ips(*self.allowed_cidrs)
-        for ip in iterator:
-            ip = str(ip)
-            if (ip in self.reserved_addresses or
-                    self.db.network_allocations_get_by_ip_address(context,
-                                                                  ip)):
-                continue
-            else:
-                ips.append(ip)
-            if len(ips) == amount:
-                return ips
+        used_ips = self._get_used_ips(context)
+        used_ips.update(int(netaddr.IPAddress(ip)) for ip in exclude)
+        used_ips = sorted(used_ips)
+        for cidr in self.allowed_cidrs:
+            cidr = netaddr.IPNetwork(cidr)
+            ip = cidr.first
+            i = bisect.bisect_left(used_ips, ip)
+            while ip <= cidr.last:
+                if i < len(used_ips) and used_ips[i] == ip:
+                    i += 1
+                else:
+                    ips.append(str(netaddr.IPAddress(ip, self.ip_version)))
+                    if len(ips) == amount:
+                        return ips
+                    # Allowed IP ranges may overlap.
+                    bisect.insort(used_ips, ip)
+                    i += 1
+                ip += 1
         msg = _("No available IP addresses left in CIDRs %(cidrs)s. "
                 "Requested amount of IPs to be provided '%(amount)s', "
                 "available only '%(available)s'.") % {
@@ -293,26 +324,63 @@ class StandaloneNetworkPlugin(network.NetworkBaseAPI):
             share_network_subnet = share_network_subnet or {}
         self._save_network_info(context, share_network_subnet)
         allocations = []
-        ip_addresses = self._get_available_ips(context, allocation_count)
-        for ip_address in ip_addresses:
-            data = {
-                'share_server_id': share_server['id'],
-                'ip_address': ip_address,
-                'status': constants.STATUS_ACTIVE,
-                'label': self.label,
-                'network_type': share_network_subnet['network_type'],
-                'segmentation_id': share_network_subnet['segmentation_id'],
-                'cidr': share_network_subnet['cidr'],
-                'gateway': share_network_subnet['gateway'],
-                'ip_version': share_network_subnet['ip_version'],
-                'mtu': share_network_subnet['mtu'],
-            }
-            if self.label != 'admin':
-                data['share_network_subnet_id'] = (
-                    share_network_subnet['id'])
-            allocations.append(
-                self.db.network_allocation_create(context, data))
-        return allocations
+        conflicting_ips = set()
+        for attempt in range(ALLOCATION_ATTEMPTS):
+            ip_addresses = self._get_available_ips(
+                context, allocation_count - len(allocations),
+                exclude=conflicting_ips.union(
+                    a['ip_address'] for a in allocations))
+            for ip_address in ip_addresses:
+                data = {
+                    'share_server_id': share_server['id'],
+                    'ip_address': ip_address,
+                    'status': constants.STATUS_ACTIVE,
+                    'label': self.label,
+                    'network_type': share_network_subnet['network_type'],
+                    'segmentation_id': share_network_subnet['segmentation_id'],
+                    'cidr': share_network_subnet['cidr'],
+                    'gateway': share_network_subnet['gateway'],
+                    'ip_version': share_network_subnet['ip_version'],
+                    'mtu': share_network_subnet['mtu'],
+                }
+                if self.label != 'admin':
+                    data['share_network_subnet_id'] = (
+                        share_network_subnet['id'])
+                allocation = self.db.network_allocation_create(context, data)
+                if self._is_allocation_conflicting(context, allocation):
+                    self.db.network_allocation_delete(context,
+                                                      allocation['id'])
+                    conflicting_ips.add(ip_address)
+                else:
+                    allocations.append(allocation)
+            if len(allocations) == allocation_count:
+                return allocations
+            LOG.debug("IP addresses %(ips)s were allocated concurrently by "
+                      "another service, retrying.",
+                      {'ips': sorted(conflicting_ips)})
+
+        for allocation in allocations:
+            self.db.network_allocation_delete(context, allocation['id'])
+        msg = _("Could not allocate %(amount)s IP addresses from CIDRs "
+                "%(cidrs)s after %(attempts)s attempts, as they kept being "
+                "allocated concurrently.") % {
+                    'amount': allocation_count,
+                    'cidrs': self.allowed_cidrs,
+                    'attempts': ALLOCATION_ATTEMPTS}
+        raise exception.NetworkException(msg)
+
+    def _is_allocation_conflicting(self, context, allocation):
+        """Checks if another allocation of the same IP address exists.
+
+        The interprocess lock of allocate_network does not cover services
+        running on other hosts. When two of them pick the same IP address,
+        the one that sees the allocation of the other backs off; if both
+        do, both retry with other addresses.
+        """
+        return any(
+            other['id'] != allocation['id']
+            for other in self.db.network_allocations_get_by_ip_address(
+                context, allocation['ip_address']))
 
     def deallocate_network(self, context, share_server_id,
                            share_network=None, share_network_subnet=None):
@@ -88,12 +88,18 @@ class Scheduler(object):
         return self.host_manager.get_service_capabilities()
 
     def update_service_capabilities(self, service_name, host,
-                                    capabilities, timestamp):
-        """Process a capability update from a service node."""
-        self.host_manager.update_service_capabilities(service_name,
-                                                      host,
-                                                      capabilities,
-                                                      timestamp)
+                                    capabilities, timestamp,
+                                    capabilities_version=None,
+                                    capabilities_delta=None):
+        """Process a capability update from a service node.
+
+        Returns False if the update is a delta that could not be applied,
+        in which case the whole capabilities of the service are needed.
+        """
+        return self.host_manager.update_service_capabilities(
+            service_name, host, capabilities, timestamp,
+            capabilities_version=capabilities_version,
+            capabilities_delta=capabilities_delta)
 
     def hosts_up(self, context, topic):
         """Return the list of hosts that have a running service for topic."""
@@ -111,6 +117,26 @@ class Scheduler(object):
         """Must override schedule method for scheduler to work."""
         raise NotImplementedError(_("Must implement schedule_create_share"))
 
+    def schedule_create_shares(self, context, request_specs,
+                               filter_properties_list):
+        """Schedule many shares.
+
+        Schedulers that can place many shares more efficiently than one by
+        one should override this method.
+
+        :returns: a list of (request_spec, exception) tuples for the shares
+            that could not be scheduled.
+        """
+        failures = []
+        for request_spec, filter_properties in zip(request_specs,
+                                                   filter_properties_list):
+            try:
+                self.schedule_create_share(context, request_spec,
+                                           filter_properties)
+            except Exception as ex:
+                failures.append((request_spec, ex))
+        return failures
+
     def schedule_create_share_group(self, context, share_group_id,
                                     request_spec,
                                     filter_properties):
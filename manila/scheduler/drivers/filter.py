@@ -22,6 +22,7 @@ filters and weighing functions.
 
 from oslo_config import cfg
 from oslo_log import log
+from oslo_serialization import jsonutils
 
 from manila import exception
 from manila.i18n import _
@@ -92,6 +93,119 @@ class FilterScheduler(base.Scheduler):
                                             request_spec,
                                             filter_properties)
 
+        self._create_share_on_host(context, request_spec, filter_properties,
+                                   weighed_host)
+
+    def schedule_create_shares(self, context, request_specs,
+                               filter_properties_list):
+        """Schedule many shares, filtering the hosts once per share kind.
+
+        Shares whose requests only differ in their identity are grouped
+        together. The hosts are filtered once for each group, and the
+        pools that passed are weighed again after each placement so that
+        the capacity consumed within the batch is accounted for.
+        """
+        elevated = context.elevated()
+        failures = []
+        groups = {}
+        for request_spec, filter_properties in zip(request_specs,
+                                                   filter_properties_list):
+            try:
+                filter_properties, share_properties = (
+                    self._format_filter_properties(
+                        context, filter_properties, request_spec))
+            except Exception as ex:
+                failures.append((request_spec, ex))
+                continue
+            key = self._get_share_batch_key(request_spec, filter_properties)
+            groups.setdefault(key, []).append(
+                (request_spec, filter_properties, share_properties))
+
+        all_hosts = {}
+        for shares in groups.values():
+            filter_properties = shares[0][1]
+            consider_disabled = self._consider_disabled_hosts(
+                context, filter_properties)
+            try:
+                if consider_disabled not in all_hosts:
+                    all_hosts[consider_disabled] = list(
+                        self.host_manager.get_all_host_states_share(
+                            elevated, consider_disabled=consider_disabled))
+            except Exception as ex:
+                failures.extend((share[0], ex) for share in shares)
+                continue
+            hosts = all_hosts[consider_disabled]
+            if not hosts:
+                for request_spec, __, __ in shares:
+                    try:
+                        self._check_share_hosts_available(
+                            context, request_spec, hosts)
+                    except exception.WillNotSchedule as ex:
+                        failures.append((request_spec, ex))
+                continue
+            try:
+                hosts, last_filter = self.host_manager.get_filtered_hosts(
+                    hosts, filter_properties)
+            except Exception as ex:
+                failures.extend((share[0], ex) for share in shares)
+                continue
+            LOG.debug("Filtered %(count)d shares %(hosts)s",
+                      {"count": len(shares), "hosts": hosts})
+
+            for request_spec, filter_properties, share_properties in shares:
+                try:
+                    hosts = self._schedule_share_in_batch(
+                        context, request_spec, filter_properties,
+                        share_properties, hosts, last_filter)
+                except Exception as ex:
+                    failures.append((request_spec, ex))
+        return failures
+
+    def _get_share_batch_key(self, request_spec, filter_properties):
+        """Returns what the filtering of hosts for a share depends on."""
+        share_properties = request_spec['share_properties']
+        share_type = request_spec.get('share_type') or {}
+        return jsonutils.dumps({
+            'share_type_id': share_type.get('id'),
+            'share_proto': request_spec.get('share_proto'),
+            'size': share_properties['size'],
+            'user_id': share_properties.get('user_id'),
+            'project_id': share_properties.get('project_id'),
+            'snapshot_id': request_spec.get('snapshot_id'),
+            'snapshot_host': request_spec.get('snapshot_host'),
+            'share_group': request_spec.get('share_group'),
+            'availability_zone_id': request_spec.get('availability_zone_id'),
+            'availability_zones': request_spec.get('availability_zones'),
+            'az_request_multiple_subnet_support_map': request_spec.get(
+                'az_request_multiple_subnet_support_map'),
+            'share_network_id': request_spec.get(
+                'share_instance_properties', {}).get('share_network_id'),
+            'scheduler_hints': filter_properties.get('scheduler_hints'),
+        }, sort_keys=True)
+
+    def _schedule_share_in_batch(self, context, request_spec,
+                                 filter_properties, share_properties, hosts,
+                                 last_filter):
+        """Places a share on the best of the already filtered hosts.
+
+        :returns: the hosts that can still accommodate shares of this kind.
+        """
+        best_host = self._select_share_host(
+            hosts, last_filter, filter_properties, share_properties)
+
+        # NOTE: Only the capacity of the chosen host changed, so it is the
+        # only one that needs to be filtered again for the next shares.
+        passing_hosts, __ = self.host_manager.get_filtered_hosts(
+            [best_host.obj], filter_properties)
+        if not passing_hosts:
+            hosts = [host for host in hosts if host is not best_host.obj]
+
+        self._create_share_on_host(context, request_spec, filter_properties,
+                                   best_host)
+        return hosts
+
+    def _create_share_on_host(self, context, request_spec, filter_properties,
+                              weighed_host):
         host = weighed_host.obj.host
         share_id = request_spec['share_id']
         snapshot_id = request_spec['snapshot_id']
@@ -241,16 +355,33 @@ class FilterScheduler(base.Scheduler):
 
         # Note: remember, we are using an iterator here. So only
         # traverse this list once.
-        consider_disabled = False
-        if policy.check_is_host_admin(context) and filter_properties.get(
-                'scheduler_hints', {}).get('only_host'):
-            # Admin user can schedule share on disabled host
-            consider_disabled = True
+        consider_disabled = self._consider_disabled_hosts(
+            context, filter_properties)
 
         hosts = self.host_manager.get_all_host_states_share(
             elevated,
             consider_disabled=consider_disabled
         )
+        self._check_share_hosts_available(context, request_spec, hosts)
+
+        # Filter local hosts based on requirements ...
+        hosts, last_filter = self.host_manager.get_filtered_hosts(
+            hosts, filter_properties)
+
+        if hosts:
+            LOG.debug("Filtered share %(hosts)s", {"hosts": hosts})
+        return self._select_share_host(
+            hosts, last_filter, filter_properties, share_properties)
+
+    def _consider_disabled_hosts(self, context, filter_properties):
+        """Whether disabled hosts can be chosen for a share."""
+        # Admin user can schedule share on disabled host
+        return bool(policy.check_is_host_admin(context) and
+                    filter_properties.get('scheduler_hints', {}).get(
+                        'only_host'))
+
+    def _check_share_hosts_available(self, context, request_spec, hosts):
+        """Tells the user when there are no hosts to place a share on."""
         if not hosts:
             msg = _("There are no hosts to fulfill this "
                     "provisioning request. Are share "
@@ -264,10 +395,9 @@ class FilterScheduler(base.Scheduler):
                 detail=message_field.Detail.SHARE_BACKEND_NOT_READY_YET)
             raise exception.WillNotSchedule(msg)
 
-        # Filter local hosts based on requirements ...
-        hosts, last_filter = self.host_manager.get_filtered_hosts(
-            hosts, filter_properties)
-
+    def _select_share_host(self, hosts, last_filter, filter_properties,
+                           share_properties):
+        """Returns the best of the filtered hosts for a share."""
         if not hosts:
             msg = _('Failed to find a weighted host, the last executed filter'
                     ' was %s.')
@@ -275,7 +405,6 @@ class FilterScheduler(base.Scheduler):
                 reason=msg % last_filter,
                 detail_data={'last_filter': last_filter})
 
-        LOG.debug("Filtered share %(hosts)s", {"hosts": hosts})
         # weighted_host = WeightedHost() ... the best
         # host for the job.
         weighed_hosts = self.host_manager.get_weighed_hosts(hosts,
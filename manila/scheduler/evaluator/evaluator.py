@@ -36,21 +36,33 @@ def _operatorOperands(tokenList):
 class EvalConstant(object):
     def __init__(self, toks):
         self.value = toks[0]
+        # NOTE: Parsed expressions are cached and evaluated many times, so
+        # tell variables from literals, and convert literals, only once.
+        self.variable = None
+        if (isinstance(self.value, str) and
+                re.match(r"^[a-zA-Z_]+\.[a-zA-Z_]+$", self.value)):
+            self.variable = self.value.split('.')
+        else:
+            self.value = self._convert(self.value)
 
     def eval(self):
-        result = self.value
-        if (isinstance(result, str) and
-                re.match(r"^[a-zA-Z_]+\.[a-zA-Z_]+$", result)):
-            (which_dict, entry) = result.split('.')
-            try:
-                result = _vars[which_dict][entry]
-            except KeyError as e:
-                msg = _("KeyError: %s") % e
-                raise exception.EvaluatorParseException(reason=msg)
-            except TypeError as e:
-                msg = _("TypeError: %s") % e
-                raise exception.EvaluatorParseException(reason=msg)
+        if self.variable is None:
+            return self.value
 
+        (which_dict, entry) = self.variable
+        try:
+            result = _vars[which_dict][entry]
+        except KeyError as e:
+            msg = _("KeyError: %s") % e
+            raise exception.EvaluatorParseException(reason=msg)
+        except TypeError as e:
+            msg = _("TypeError: %s") % e
+            raise exception.EvaluatorParseException(reason=msg)
+
+        return self._convert(result)
+
+    @staticmethod
+    def _convert(result):
         try:
             result = int(result)
         except ValueError:
@@ -223,6 +235,9 @@ class EvalBoolOrOp(object):
 
 _parser = None
 _vars = {}
+# Parsed expressions, keyed by their text
+_expressions = {}
+_MAX_CACHED_EXPRESSIONS = 1024
 
 
 def _def_parser():
@@ -231,6 +246,7 @@ def _def_parser():
 
     alphas = pyparsing.alphas
     Combine = pyparsing.Combine
+    FollowedBy = pyparsing.FollowedBy
     Forward = pyparsing.Forward
     nums = pyparsing.nums
     quoted_string = pyparsing.quotedString
@@ -244,7 +260,10 @@ def _def_parser():
     variable = Word(alphas + '_' + '.')
     number = real | integer
     expr = Forward()
-    fn = Word(alphas + '_' + '.')
+    # NOTE: Only words followed by parentheses, that are not negations,
+    # are function calls; anything else is a variable.
+    fn = (~oneOf('NOT not', asKeyword=True) + Word(alphas + '_' + '.') +
+          FollowedBy('('))
     operand = number | variable | fn | quoted_string
 
     signop = oneOf('+ -')
@@ -281,18 +300,35 @@ def evaluate(expression, **kwargs):
 
     Supports both integer and floating point values, and automatic
     promotion where necessary.
+
+    Expressions are parsed once, and the parsed form is reused whenever
+    the same expression is evaluated again with other variables.
     """
-    global _parser
-    if _parser is None:
-        _parser = _def_parser()
+    result = _parse(expression)
 
     global _vars
     _vars = kwargs
 
+    return result.eval()
+
+
+def _parse(expression):
+    try:
+        return _expressions[expression]
+    except KeyError:
+        pass
+
+    global _parser
+    if _parser is None:
+        _parser = _def_parser()
+
     try:
         result = _parser.parseString(expression, parseAll=True)[0]
     except pyparsing.ParseException as e:
         msg = _("ParseException: %s") % e
         raise exception.EvaluatorParseException(reason=msg)
 
-    return result.eval()
+    if len(_expressions) >= _MAX_CACHED_EXPRESSIONS:
+        _expressions.clear()
+    _expressions[expression] = result
+    return result
@@ -78,3 +78,43 @@ def match(value, req):
         pass
 
     return False
+
+
+def index_keys(value):
+    """Returns the keys a capability value is indexed under.
+
+    A capability index maps these keys to the hosts that report the value,
+    so that requirements with :func:`required_index_keys` can be checked
+    for all hosts at once, instead of calling :func:`match` for each host.
+    """
+    if value is None:
+        return []
+    keys = [('<is>', strutils.bool_from_string(value))]
+    if isinstance(value, bool):
+        keys.append(('=', 'bool', value))
+    elif isinstance(value, str):
+        keys.append(('=', 'str', value.lower()))
+    return keys
+
+
+def required_index_keys(req):
+    """Returns the index keys of the capability values matching req.
+
+    Returns None if the values matching req can't be looked up in an index.
+    """
+    req = req.lower()
+    words = req.split()
+    op = words[0] if words else None
+
+    if op == '<is>':
+        if len(words) < 2:
+            return []
+        return [('<is>', strutils.bool_from_string(words[1]))]
+    if op == '<or>' or op in _op_methods:
+        return None
+
+    keys = [('=', 'str', req)]
+    bool_req = strutils.bool_from_string(req, strict=False, default=req)
+    if isinstance(bool_req, bool):
+        keys.append(('=', 'bool', bool_req))
+    return keys
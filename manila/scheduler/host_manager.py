@@ -116,6 +116,31 @@ class ReadOnlyDict(collections.UserDict):
             raise TypeError
 
 
+class ProvisionedCapacityCache(object):
+    """Provisioned capacity of all pools, estimated from their share sizes.
+
+    The sizes of the shares of all pools are summed up by a single database
+    query the first time a pool needs its estimate after the cache was
+    invalidated, and are updated in place as shares are scheduled to pools.
+    """
+
+    def __init__(self):
+        self._capacity = None
+
+    def invalidate(self):
+        self._capacity = None
+
+    def get(self, context, host):
+        if self._capacity is None:
+            self._capacity = (
+                db.share_instance_provisioned_capacity_get_all(context))
+        return self._capacity.get(host, 0)
+
+    def consume(self, host, size):
+        if self._capacity is not None:
+            self._capacity[host] = self._capacity.get(host, 0) + size
+
+
 class HostState(object):
     """Mutable and immutable information tracked for a host."""
 
@@ -180,7 +205,8 @@ class HostState(object):
         self.service = ReadOnlyDict(service)
 
     def update_from_share_capability(
-            self, capability, service=None, context=None):
+            self, capability, service=None, context=None,
+            provisioned_capacity=None):
         """Update information about a host from its share_node info.
 
         'capability' is the status info reported by share backend, a typical
@@ -240,9 +266,11 @@ class HostState(object):
             self.update_backend(capability)
 
             # Update pool level info
-            self.update_pools(capability, service, context=context)
+            self.update_pools(capability, service, context=context,
+                              provisioned_capacity=provisioned_capacity)
 
-    def update_pools(self, capability, service, context=None):
+    def update_pools(self, capability, service, context=None,
+                     provisioned_capacity=None):
         """Update storage pools information from backend reported info."""
         if not capability:
             return
@@ -261,7 +289,8 @@ class HostState(object):
                     cur_pool = PoolState(self.host, pool_cap, pool_name)
                     self.pools[pool_name] = cur_pool
                 cur_pool.update_from_share_capability(
-                    pool_cap, service, context=context)
+                    pool_cap, service, context=context,
+                    provisioned_capacity=provisioned_capacity)
 
                 active_pools.add(pool_name)
         elif pools is None:
@@ -289,7 +318,8 @@ class HostState(object):
                     self.pools[pool_name] = single_pool
 
             single_pool.update_from_share_capability(
-                capability, service, context=context)
+                capability, service, context=context,
+                provisioned_capacity=provisioned_capacity)
             active_pools.add(pool_name)
 
         # Remove non-active pools from self.pools
@@ -442,9 +472,15 @@ class PoolState(HostState):
         self.pool_name = pool_name
         # No pools in pool
         self.pools = None
+        # Cache the provisioned capacity was estimated from, if any
+        self.provisioned_capacity_cache = None
 
-    def _estimate_provisioned_capacity(self, host_name, context=None):
+    def _estimate_provisioned_capacity(self, host_name, context=None,
+                                       provisioned_capacity=None):
         """Estimate provisioned capacity from share sizes on backend."""
+        if provisioned_capacity is not None:
+            return provisioned_capacity.get(context, host_name)
+
         provisioned_capacity = 0
 
         instances = db.share_instance_get_all_by_host(
@@ -456,7 +492,8 @@ class PoolState(HostState):
         return provisioned_capacity
 
     def update_from_share_capability(
-            self, capability, service=None, context=None):
+            self, capability, service=None, context=None,
+            provisioned_capacity=None):
         """Update information about a pool from its share_node info."""
         self.update_capabilities(capability, service)
         if capability:
@@ -488,11 +525,14 @@ class PoolState(HostState):
             # on thin provisioned pools
             self.provisioned_capacity_gb = capability.get(
                 'provisioned_capacity_gb')
+            self.provisioned_capacity_cache = None
 
             if self.thin_provisioning and self.provisioned_capacity_gb is None:
                 self.provisioned_capacity_gb = (
-                    self._estimate_provisioned_capacity(self.host,
-                                                        context=context))
+                    self._estimate_provisioned_capacity(
+                        self.host, context=context,
+                        provisioned_capacity=provisioned_capacity))
+                self.provisioned_capacity_cache = provisioned_capacity
 
             self.max_over_subscription_ratio = capability.get(
                 'max_over_subscription_ratio',
@@ -516,6 +556,12 @@ class PoolState(HostState):
             self.share_replicas_migration_support = capability.get(
                 'share_replicas_migration_support', False)
 
+    def consume_from_share(self, share):
+        """Incrementally update pool state from an share."""
+        super(PoolState, self).consume_from_share(share)
+        if self.provisioned_capacity_cache is not None:
+            self.provisioned_capacity_cache.consume(self.host, share['size'])
+
     def update_pools(self, capability):
         # Do nothing, since we don't have pools within pool, yet
         pass
@@ -528,7 +574,13 @@ class HostManager(object):
 
     def __init__(self):
         self.service_states = {}  # { <host>: {<service>: {cap k : v}}}
+        self.capabilities_versions = {}  # { <host>: <version> }
         self.host_state_map = {}
+        self.provisioned_capacity = ProvisionedCapacityCache()
+        # { (<capability>, <op>, ...): set(<pool host>) }
+        self.capability_index = {}
+        self.capability_indexed_hosts = set()
+        self._capability_index_stale = True
         self.filter_handler = base_host_filter.HostFilterHandler(
             'manila.scheduler.filters')
         self.filter_classes = self.filter_handler.get_all_classes()
@@ -597,6 +649,17 @@ class HostManager(object):
                            filter_class_names=None):
         """Filter hosts and return only ones passing all filters."""
         filter_classes = self._choose_host_filters(filter_class_names)
+        if any(cls.__name__ == 'CapabilitiesFilter'
+               for cls in filter_classes):
+            hosts = list(hosts)
+            candidates = self._get_hosts_with_capabilities(hosts,
+                                                           filter_properties)
+            if hosts and not candidates:
+                # The filters are skipped, report the one that would have
+                # rejected the hosts.
+                LOG.info("Filter CapabilitiesFilter returned 0 host(s)")
+                return [], 'CapabilitiesFilter'
+            hosts = candidates
         return self.filter_handler.get_filtered_objects(filter_classes,
                                                         hosts,
                                                         filter_properties)
@@ -613,14 +676,58 @@ class HostManager(object):
                                                        hosts,
                                                        weight_properties)
 
+    def _get_hosts_with_capabilities(self, hosts, filter_properties):
+        """Drop the indexed hosts that can't satisfy the extra specs."""
+        resource_type = filter_properties.get('resource_type') or {}
+        extra_specs = resource_type.get('extra_specs') or {}
+        candidates = scheduler_utils.hosts_satisfying_capabilities(
+            self.capability_index, extra_specs)
+        if candidates is None:
+            return hosts
+        return [host for host in hosts
+                if host.host in candidates or
+                host.host not in self.capability_indexed_hosts]
+
+    def _update_capability_index(self):
+        capability_index = {}
+        indexed_hosts = set()
+        for host_state in self.host_state_map.values():
+            for pool in host_state.pools.values():
+                indexed_hosts.add(pool.host)
+                for key in scheduler_utils.capability_index_keys(
+                        pool.capabilities):
+                    capability_index.setdefault(key, set()).add(pool.host)
+        self.capability_index = capability_index
+        self.capability_indexed_hosts = indexed_hosts
+        self._capability_index_stale = False
+
     def update_service_capabilities(self, service_name, host,
-                                    capabilities, timestamp):
-        """Update the per-service capabilities based on this notification."""
+                                    capabilities, timestamp,
+                                    capabilities_version=None,
+                                    capabilities_delta=None):
+        """Update the per-service capabilities based on this notification.
+
+        Services may send only what changed since their previous update in
+        'capabilities_delta'. Returns False if such a delta does not follow
+        the last known capabilities of the service.
+        """
         if service_name not in ('share',):
             LOG.debug('Ignoring %(service_name)s service update '
                       'from %(host)s',
                       {'service_name': service_name, 'host': host})
-            return
+            return True
+
+        if capabilities_delta is not None:
+            known_version = self.capabilities_versions.get(host)
+            if (host not in self.service_states or known_version is None or
+                    capabilities_version != known_version + 1):
+                LOG.info('Capability update %(version)s from %(host)s does '
+                         'not follow the last known one (%(known)s).',
+                         {'version': capabilities_version, 'host': host,
+                          'known': known_version})
+                return False
+            capabilities = scheduler_utils.apply_capabilities_delta(
+                self.service_states[host], capabilities_delta)
 
         # Copy the capabilities, so we don't modify the original dict
         capability_copy = dict(capabilities)
@@ -631,14 +738,20 @@ class HostManager(object):
         # Ignore older updates
         if capab_old['timestamp'] and timestamp < capab_old['timestamp']:
             LOG.info('Ignoring old capability report from %s.', host)
-            return
+            return True
 
         self.service_states[host] = capability_copy
+        self.capabilities_versions[host] = capabilities_version
+        # NOTE: Shares may have been created, resized or deleted on the
+        # reporting backend, so estimate provisioned capacities anew.
+        self.provisioned_capacity.invalidate()
+        self._capability_index_stale = True
 
         LOG.debug("Received %(service_name)s service update from "
                   "%(host)s: %(cap)s",
                   {'service_name': service_name, 'host': host,
                    'cap': capabilities})
+        return True
 
     def _update_host_state_map(self, context, consider_disabled=False):
         # Get resource usage across the available share nodes:
@@ -672,7 +785,8 @@ class HostManager(object):
 
             # Update capabilities and attributes in host_state
             host_state.update_from_share_capability(
-                capabilities, service=dict(service.items()), context=context)
+                capabilities, service=dict(service.items()), context=context,
+                provisioned_capacity=self.provisioned_capacity)
             active_hosts.add(host)
 
         # remove non-active hosts from host_state_map
@@ -682,6 +796,9 @@ class HostManager(object):
                      "scheduler cache.", {'host': host})
             self.host_state_map.pop(host, None)
 
+        if self._capability_index_stale:
+            self._update_capability_index()
+
     def get_all_host_states_share(self, context, consider_disabled=False):
         """Returns a dict of all the hosts the HostManager knows about.
 
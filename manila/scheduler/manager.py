@@ -68,7 +68,7 @@ MAPPING = {
 class SchedulerManager(manager.Manager):
     """Chooses a host to create shares."""
 
-    RPC_API_VERSION = '1.11'
+    RPC_API_VERSION = '1.13'
 
     def __init__(self, scheduler_driver=None, service_name=None,
                  *args, **kwargs):
@@ -105,17 +105,23 @@ class SchedulerManager(manager.Manager):
 
     def update_service_capabilities(self, context, service_name=None,
                                     host=None, capabilities=None,
-                                    timestamp=None, **kwargs):
+                                    timestamp=None, capabilities_version=None,
+                                    capabilities_delta=None, **kwargs):
         """Process a capability update from a service node."""
         if capabilities is None:
             capabilities = {}
-        elif timestamp:
+        if timestamp:
             timestamp = datetime.strptime(timestamp,
                                           timeutils.PERFECT_TIME_FORMAT)
-        self.driver.update_service_capabilities(service_name,
-                                                host,
-                                                capabilities,
-                                                timestamp)
+        in_sync = self.driver.update_service_capabilities(
+            service_name, host, capabilities, timestamp,
+            capabilities_version=capabilities_version,
+            capabilities_delta=capabilities_delta)
+        if in_sync is False:
+            # NOTE: We missed an update of this service, so ask it for the
+            # whole of its capabilities.
+            share_rpcapi.ShareAPI().publish_service_capabilities(
+                context, host=host)
 
     def create_share_instance(self, context, request_spec=None,
                               filter_properties=None):
@@ -133,6 +139,20 @@ class SchedulerManager(manager.Manager):
                     'create_share', {'status': constants.STATUS_ERROR},
                     context, ex, request_spec)
 
+    def create_share_instances(self, context, request_specs=None,
+                               filter_properties_list=None):
+        """Schedule many shares, filtering and weighing hosts once."""
+        failures = self.driver.schedule_create_shares(
+            context, request_specs or [],
+            filter_properties_list or [{}] * len(request_specs or []))
+        for request_spec, ex in failures:
+            action = None
+            if isinstance(ex, exception.NoValidHost):
+                action = message_field.Action.ALLOCATE_HOST
+            self._set_share_state_and_notify(
+                'create_share', {'status': constants.STATUS_ERROR},
+                context, ex, request_spec, action)
+
     def get_pools(self, context, filters=None, cached=False):
         """Get active pools from the scheduler's cache."""
         return self.driver.get_pools(context, filters, cached)
@@ -44,9 +44,12 @@ class SchedulerAPI(object):
         1.9  - Add cached parameter to get_pools method
         1.10 - Add timestamp to update_service_capabilities
         1.11 - Add extend_share
+        1.12 - Add create_share_instances
+        1.13 - Add capabilities_version and capabilities_delta to
+        update_service_capabilities
     """
 
-    RPC_API_VERSION = '1.11'
+    RPC_API_VERSION = '1.13'
 
     def __init__(self):
         super(SchedulerAPI, self).__init__()
@@ -63,17 +66,47 @@ class SchedulerAPI(object):
                                  request_spec=request_spec_p,
                                  filter_properties=filter_properties)
 
+    def create_share_instances(self, context, request_specs=None,
+                               filter_properties_list=None):
+        """Casts an rpc to the scheduler to schedule many shares at once.
+
+        'filter_properties_list' holds the filter properties of each of the
+        'request_specs', in the same order.
+        """
+        request_specs_p = jsonutils.to_primitive(request_specs)
+        call_context = self.client.prepare(version='1.12')
+        return call_context.cast(context,
+                                 'create_share_instances',
+                                 request_specs=request_specs_p,
+                                 filter_properties_list=filter_properties_list)
+
+    def can_send_capabilities_delta(self):
+        return self.client.can_send_version('1.13')
+
     def update_service_capabilities(self, context,
                                     service_name, host,
-                                    capabilities):
-        call_context = self.client.prepare(fanout=True, version='1.10')
-        timestamp = jsonutils.to_primitive(timeutils.utcnow())
-        call_context.cast(context,
-                          'update_service_capabilities',
-                          service_name=service_name,
-                          host=host,
-                          capabilities=capabilities,
-                          timestamp=timestamp)
+                                    capabilities, capabilities_version=None,
+                                    capabilities_delta=None):
+        """Casts the capabilities of a service to all the schedulers.
+
+        If 'capabilities_delta' is given, 'capabilities' is expected to be
+        None and the schedulers merge the delta into the capabilities of
+        version 'capabilities_version' - 1 they already hold.
+        """
+        msg_args = {
+            'service_name': service_name,
+            'host': host,
+            'capabilities': capabilities,
+            'timestamp': jsonutils.to_primitive(timeutils.utcnow()),
+        }
+        version = '1.10'
+        if (capabilities_version is not None and
+                self.can_send_capabilities_delta()):
+            version = '1.13'
+            msg_args['capabilities_version'] = capabilities_version
+            msg_args['capabilities_delta'] = capabilities_delta
+        call_context = self.client.prepare(fanout=True, version=version)
+        call_context.cast(context, 'update_service_capabilities', **msg_args)
 
     def get_pools(self, context, filters=None, cached=False):
         call_context = self.client.prepare(version='1.9')
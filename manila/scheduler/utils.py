@@ -141,16 +141,17 @@ def thin_provisioning(host_state_thin_provisioning):
     return True in thin_capability
 
 
-def capabilities_satisfied(capabilities, extra_specs):
+# These extra-specs are not capabilities for matching hosts
+IGNORED_EXTRA_SPECS = (
+    'availability_zones', 'capabilities:availability_zones',
+)
+
 
-    # These extra-specs are not capabilities for matching hosts
-    ignored_extra_specs = (
-        'availability_zones', 'capabilities:availability_zones',
-    )
+def capabilities_satisfied(capabilities, extra_specs):
 
     for key, req in extra_specs.items():
         # Ignore some extra_specs if told to
-        if key in ignored_extra_specs:
+        if key in IGNORED_EXTRA_SPECS:
             continue
 
         # Either not scoped format, or in capabilities scope
@@ -190,3 +191,119 @@ def capabilities_satisfied(capabilities, extra_specs):
                       {'key': key, 'req': req, 'cap': cap})
             return False
     return True
+
+
+def capability_index_keys(capabilities):
+    """Yields the keys a host is found under in a capability index."""
+    for key, cap in capabilities.items():
+        cap_list = [cap] if not isinstance(cap, list) else cap
+        for value in cap_list:
+            for index_key in extra_specs_ops.index_keys(value):
+                yield (key,) + index_key
+
+
+def hosts_satisfying_capabilities(capability_index, extra_specs):
+    """Looks up the hosts that may satisfy extra specs in an index.
+
+    Only the extra specs that can be looked up in the index are taken into
+    account, so the hosts still have to be checked with
+    :func:`capabilities_satisfied`.
+
+    :param capability_index: a dict mapping the keys returned by
+        :func:`capability_index_keys` to sets of hosts.
+    :returns: a set of hosts, or None if none of the extra specs could be
+        looked up.
+    """
+    hosts = None
+    for key, req in extra_specs.items():
+        if key in IGNORED_EXTRA_SPECS or not isinstance(req, str):
+            continue
+
+        scope = key.split(':')
+        if len(scope) > 1 and scope[0] != "capabilities":
+            continue
+        elif scope[0] == "capabilities":
+            del scope[0]
+        if len(scope) != 1:
+            continue
+
+        required_keys = extra_specs_ops.required_index_keys(req)
+        if required_keys is None:
+            continue
+
+        matching_hosts = set()
+        for required_key in required_keys:
+            matching_hosts.update(
+                capability_index.get((scope[0],) + required_key, ()))
+        hosts = matching_hosts if hosts is None else hosts & matching_hosts
+    return hosts
+
+
+def _dict_delta(old, new):
+    return {
+        'changed': {key: value for key, value in new.items()
+                    if key not in old or old[key] != value},
+        'removed': [key for key in old if key not in new],
+    }
+
+
+def _apply_dict_delta(old, delta):
+    removed = set(delta['removed'])
+    result = {key: value for key, value in old.items() if key not in removed}
+    result.update(delta['changed'])
+    return result
+
+
+def _has_named_pools(pools):
+    return isinstance(pools, list) and all(
+        isinstance(pool, dict) and 'pool_name' in pool for pool in pools)
+
+
+def capabilities_delta(old, new):
+    """Returns what changed between two capability reports of a backend.
+
+    Capabilities are compared key by key, except for 'pools' which are
+    compared pool by pool, so that a change in the free capacity of a pool
+    only carries the keys of that pool that changed. The returned delta can
+    be merged into the old capabilities with
+    :func:`apply_capabilities_delta`.
+    """
+    old_pools = old.get('pools')
+    new_pools = new.get('pools')
+    if not (_has_named_pools(old_pools) and _has_named_pools(new_pools)):
+        return _dict_delta(old, new)
+
+    delta = _dict_delta(
+        {key: value for key, value in old.items() if key != 'pools'},
+        {key: value for key, value in new.items() if key != 'pools'})
+    old_pools = {pool['pool_name']: pool for pool in old_pools}
+    changed_pools = {}
+    for pool in new_pools:
+        pool_delta = _dict_delta(old_pools.pop(pool['pool_name'], {}), pool)
+        if pool_delta['changed'] or pool_delta['removed']:
+            changed_pools[pool['pool_name']] = pool_delta
+    delta['pools'] = {'changed': changed_pools, 'removed': list(old_pools)}
+    return delta
+
+
+def apply_capabilities_delta(capabilities, delta):
+    """Returns the capabilities resulting from merging a delta into them."""
+    result = _apply_dict_delta(capabilities, delta)
+    pools_delta = delta.get('pools')
+    if pools_delta is None:
+        return result
+
+    changed_pools = dict(pools_delta['changed'])
+    removed_pools = set(pools_delta['removed'])
+    pools = []
+    for pool in capabilities.get('pools') or []:
+        if pool['pool_name'] in removed_pools:
+            continue
+        pool_delta = changed_pools.pop(pool['pool_name'], None)
+        if pool_delta is not None:
+            pool = _apply_dict_delta(pool, pool_delta)
+        pools.append(pool)
+    for pool_delta in changed_pools.values():
+        pools.append(_apply_dict_delta({}, pool_delta))
+    result['pools'] = pools
+    return result
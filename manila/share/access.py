@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import copy
 import ipaddress
 
@@ -156,17 +157,23 @@ class ShareInstanceAccessDatabaseMixin(object):
                 updates = {}
             if not conditionally_change:
                 conditionally_change = {}
+            # Rules in the same state get the same updates; apply them with
+            # a single statement per state rather than rule by rule.
+            rules_by_state = collections.defaultdict(list)
             for rule in instance_rules:
-                mapping_state = rule['state']
+                rules_by_state[rule['state']].append(rule['access_id'])
+            for mapping_state, access_ids in rules_by_state.items():
                 rule_updates = copy.deepcopy(updates)
+                expected_state = None
                 try:
                     rule_updates['state'] = conditionally_change[mapping_state]
+                    expected_state = mapping_state
                 except KeyError:
                     pass
                 if rule_updates:
-                    self.db.share_instance_access_update(
-                        context, rule['access_id'], share_instance_id,
-                        rule_updates)
+                    self.db.share_instance_access_update_all(
+                        context, share_instance_id, access_ids,
+                        rule_updates, state=expected_state)
 
             # Refresh the rules after the updates
             rules_to_get = {
@@ -350,7 +357,8 @@ class ShareInstanceAccess(ShareInstanceAccessDatabaseMixin):
                 constants.ACCESS_STATE_UPDATING: constants.ACCESS_STATE_ACTIVE,
             }
             self.get_and_update_share_instance_access_rules(
-                context, share_instance_id=share_instance_id,
+                context, filters={'state': tuple(conditionally_change)},
+                share_instance_id=share_instance_id,
                 conditionally_change=conditionally_change)
 
         except Exception:
@@ -360,7 +368,9 @@ class ShareInstanceAccess(ShareInstanceAccessDatabaseMixin):
                 constants.ACCESS_STATE_UPDATING: constants.ACCESS_STATE_ERROR,
             }
             self.get_and_update_share_instance_access_rules(
-                context, share_instance_id=share_instance_id,
+                context,
+                filters={'state': tuple(conditionally_change_rule_state)},
+                share_instance_id=share_instance_id,
                 conditionally_change=conditionally_change_rule_state)
 
             conditionally_change_access_rules_status = {
@@ -633,5 +643,6 @@ class ShareInstanceAccess(ShareInstanceAccessDatabaseMixin):
             },
         )
         self.get_and_update_share_instance_access_rules(
-            context, share_instance_id=share_instance_id,
+            context, filters={'state': tuple(conditional_updates)},
+            share_instance_id=share_instance_id,
             conditionally_change=conditional_updates)
@@ -286,8 +286,12 @@ class API(base.Base):
                share_group_id=None, share_group_snapshot_member=None,
                availability_zones=None, scheduler_hints=None,
                az_request_multiple_subnet_support_map=None,
-               mount_point_name=None):
-        """Create new share."""
+               mount_point_name=None, scheduling_batch=None):
+        """Create new share.
+
+        If 'scheduling_batch' is a list, the request to schedule the share
+        is appended to it instead of being sent to the scheduler.
+        """
 
         api_common.check_metadata_properties(metadata)
 
@@ -517,13 +521,40 @@ class API(base.Base):
             snapshot_host=snapshot_host, scheduler_hints=scheduler_hints,
             az_request_multiple_subnet_support_map=(
                 az_request_multiple_subnet_support_map),
-            mount_point_name=mount_point_name)
+            mount_point_name=mount_point_name,
+            scheduling_batch=scheduling_batch)
 
         # Retrieve the share with instance details
         share = self.db.share_get(context, share['id'])
 
         return share
 
+    def create_shares(self, context, share_requests):
+        """Create many shares, scheduling them in a single batch.
+
+        :param share_requests: a list with the keyword arguments of
+            :meth:`create` for each share.
+        :returns: the created shares, in the order they were requested.
+        """
+        scheduling_batch = []
+        shares = []
+        try:
+            for share_request in share_requests:
+                shares.append(self.create(
+                    context, scheduling_batch=scheduling_batch,
+                    **share_request))
+        finally:
+            # NOTE: Shares created before a failure still need to be
+            # scheduled.
+            if scheduling_batch:
+                request_specs, filter_properties_list = zip(
+                    *scheduling_batch)
+                self.scheduler_rpcapi.create_share_instances(
+                    context,
+                    request_specs=list(request_specs),
+                    filter_properties_list=list(filter_properties_list))
+        return shares
+
     def update_metadata_from_share_type_extra_specs(self, context, share_type,
                                                     user_metadata):
         extra_specs = share_type.get('extra_specs', {})
@@ -677,7 +708,7 @@ class API(base.Base):
                         share_type_id=None, availability_zones=None,
                         snapshot_host=None, scheduler_hints=None,
                         az_request_multiple_subnet_support_map=None,
-                        mount_point_name=None):
+                        mount_point_name=None, scheduling_batch=None):
         request_spec, share_instance = (
             self.create_share_instance_and_get_request_spec(
                 context, share, availability_zone=availability_zone,
@@ -715,6 +746,9 @@ class API(base.Base):
                 filter_properties={'scheduler_hints': scheduler_hints},
                 snapshot_id=share['snapshot_id'],
             )
+        elif scheduling_batch is not None:
+            scheduling_batch.append(
+                (request_spec, {'scheduler_hints': scheduler_hints}))
         else:
             # Create share instance from scratch or from snapshot could happen
             # on hosts other than the source host.
@@ -2338,7 +2372,7 @@ class API(base.Base):
             'display_name', 'share_group_id', 'display_name~',
             'display_description', 'display_description~', 'snapshot_id',
             'status', 'share_type_id', 'project_id', 'export_location_id',
-            'export_location_path', 'limit', 'offset', 'host',
+            'export_location_path', 'limit', 'offset', 'marker', 'host',
             'share_network_id', 'is_soft_deleted', 'mount_point_name']
 
         for key in filter_keys:
@@ -2444,22 +2478,25 @@ class API(base.Base):
         return snapshot
 
     def get_all_snapshots(self, context, search_opts=None, limit=None,
-                          offset=None, sort_key='share_id', sort_dir='desc'):
+                          offset=None, sort_key='share_id', sort_dir='desc',
+                          marker=None):
         return self._get_all_snapshots(context, search_opts=search_opts,
                                        limit=limit, offset=offset,
-                                       sort_key=sort_key, sort_dir=sort_dir)
+                                       sort_key=sort_key, sort_dir=sort_dir,
+                                       marker=marker)
 
     def get_all_snapshots_with_count(self, context, search_opts=None,
                                      limit=None, offset=None,
-                                     sort_key='share_id', sort_dir='desc'):
+                                     sort_key='share_id', sort_dir='desc',
+                                     marker=None):
         return self._get_all_snapshots(context, search_opts=search_opts,
                                        limit=limit, offset=offset,
                                        sort_key=sort_key, sort_dir=sort_dir,
-                                       show_count=True)
+                                       show_count=True, marker=marker)
 
     def _get_all_snapshots(self, context, search_opts=None, limit=None,
                            offset=None, sort_key='share_id', sort_dir='desc',
-                           show_count=False):
+                           show_count=False, marker=None):
         policy.check_policy(context, 'share_snapshot', 'get_all_snapshots')
 
         search_opts = search_opts or {}
@@ -2502,12 +2539,12 @@ class API(base.Base):
         if list_all_projects:
             result = get_methods['get_all'](
                 context, filters=search_opts, limit=limit, offset=offset,
-                sort_key=sort_key, sort_dir=sort_dir)
+                sort_key=sort_key, sort_dir=sort_dir, marker=marker)
         else:
             result = get_methods['get_all_by_project'](
                 context, context.project_id, filters=search_opts,
                 limit=limit, offset=offset, sort_key=sort_key,
-                sort_dir=sort_dir)
+                sort_dir=sort_dir, marker=marker)
 
         if show_count:
             count = result[0]
@@ -713,8 +713,8 @@ class ShareDriver(object):
         providing a 'creating_from_snapshot' status in the model update.
 
         When answering asynchronously, drivers must implement the call
-        'get_share_status' in order to provide updates for shares with
-        'creating_from_snapshot' status.
+        'get_share_status' (or 'get_share_statuses') in order to provide
+        updates for shares with 'creating_from_snapshot' status.
 
         It is expected that the driver returns a model update to the share
         manager that contains: share status and a list of export_locations.
@@ -1432,7 +1432,8 @@ class ShareDriver(object):
         'creating_from_snapshot'.
 
         In order to provide updates for shares with 'creating_from_snapshot'
-        status, drivers must implement the call 'get_share_status'.
+        status, drivers must implement the call 'get_share_status' (or
+        'get_share_statuses').
 
         :param context:
         :param share_group_dict: The share group details
@@ -2328,6 +2329,26 @@ class ShareDriver(object):
         """
         raise NotImplementedError()
 
+    def update_replica_states(self, context, replica_updates):
+        """Update the replica_state of several replicas at once.
+
+        Drivers that can report the health of many replicas with a single
+        query to the backend should implement this method. If it is not
+        implemented, the share manager calls update_replica_state for each
+        of the replicas instead.
+
+        :param context: Current context
+        :param replica_updates: A list of dictionaries, one per replica,
+            holding the arguments update_replica_state would be called with
+            for that replica: 'replica_list', 'replica', 'access_rules',
+            'replica_snapshots' and 'share_server'.
+        :return: A dictionary mapping the ID of each replica to its new
+            replica_state, with the same semantics as the value returned by
+            update_replica_state. Replicas that are left out keep their
+            current replica_state.
+        """
+        raise NotImplementedError()
+
     def create_replicated_snapshot(self, context, replica_list,
                                    replica_snapshots,
                                    share_server=None):
@@ -2968,6 +2989,39 @@ class ShareDriver(object):
         """
         raise NotImplementedError()
 
+    def get_share_statuses(self, context, shares):
+        """Invoked periodically to get the current status of several shares.
+
+        Drivers that can report the status of many pending shares with a
+        single query to the backend should implement this method. By
+        default, get_share_status is called for each of the shares.
+
+        :param context: Current context
+        :param shares: list of shares to get updated status from. The share
+            server of each share, if any, is set in its 'share_server' key.
+        :returns: a dictionary mapping the ID of each share to the updates
+            get_share_status would return for it. Shares that are left out
+            are not updated. A share whose status could not be retrieved
+            should be mapped to {'status': 'error'}; if this method raises
+            instead, none of the shares are updated until the next periodic
+            run.
+        """
+        share_updates = {}
+        for share in shares:
+            try:
+                share_updates[share['id']] = self.get_share_status(
+                    share, share.get('share_server'))
+            except Exception:
+                LOG.exception(
+                    "Unexpected driver error occurred while updating status "
+                    "for share instance %(id)s that belongs to share "
+                    "'%(share_id)s'",
+                    {'id': share['id'], 'share_id': share['share_id']})
+                share_updates[share['id']] = {
+                    'status': constants.STATUS_ERROR,
+                }
+        return share_updates
+
     def share_server_migration_start(self, context, src_share_server,
                                      dest_share_server, shares, snapshots):
         """Starts migration of a given share server to another host.
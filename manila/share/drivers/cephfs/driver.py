@@ -21,6 +21,7 @@ import re
 import socket
 import sys
 
+from eventlet import tpool
 from oslo_config import cfg
 from oslo_config import types
 from oslo_log import log
@@ -37,6 +38,7 @@ from manila.share import driver
 from manila.share.drivers import ganesha
 from manila.share.drivers.ganesha import utils as ganesha_utils
 from manila.share.drivers import helpers as driver_helpers
+from manila import utils
 
 rados = None
 json_command = None
@@ -167,7 +169,15 @@ cephfs_opts = [
                default=60,
                help="The maximum time in seconds that the cached pool "
                     "data will be considered updated. If it is expired when "
-                    "trying to read the pool data, it must be refreshed.")
+                    "trying to read the pool data, it must be refreshed."),
+    cfg.IntOpt('cephfs_max_concurrent_commands',
+               min=1,
+               default=16,
+               help="The maximum number of commands the driver keeps in "
+                    "flight against the Ceph cluster when it issues them in "
+                    "bulk, e.g., when applying the access rules of a share "
+                    "or ensuring shares on startup. Set to 1 to issue them "
+                    "one at a time.")
 ]
 
 cephfsnfs_opts = [
@@ -249,12 +259,15 @@ def rados_command(rados_client, prefix=None, args=None,
                "ib": inbuf, "to": RADOS_TIMEOUT})
 
     try:
-        ret, outbuf, outs = json_command(rados_client,
-                                         target=target,
-                                         prefix=prefix,
-                                         argdict=argdict,
-                                         inbuf=inbuf,
-                                         timeout=RADOS_TIMEOUT)
+        # librados blocks the native thread it is called from, so the
+        # command is run from eventlet's pool of native threads. Nothing
+        # else is, since logging from native threads can deadlock.
+        ret, outbuf, outs = tpool.execute(json_command, rados_client,
+                                          target=target,
+                                          prefix=prefix,
+                                          argdict=argdict,
+                                          inbuf=inbuf,
+                                          timeout=RADOS_TIMEOUT)
         if ret != 0:
             raise rados.Error(outs, ret)
         if not json_obj:
@@ -341,10 +354,17 @@ class CephFSDriver(driver.ExecuteMixin, driver.GaneshaMixin,
         argdict = {"vol_name": self.volname}
         subvolumes = rados_command(
             self.rados_client, "fs subvolume ls", argdict, json_obj=True)
-        for sub_vol in subvolumes:
+
+        def _get_subvolume_info(sub_vol):
             argdict = {"vol_name": self.volname, "sub_name": sub_vol["name"]}
-            sub_info = rados_command(
+            return rados_command(
                 self.rados_client, "fs subvolume info", argdict, json_obj=True)
+
+        for sub_info, error in utils.run_concurrently(
+                _get_subvolume_info, subvolumes,
+                self.configuration.cephfs_max_concurrent_commands):
+            if error:
+                raise error
             size = sub_info.get('bytes_quota', 0)
             if size == "infinite":
                 # If we have a share that has infinite quota, we should not
@@ -825,21 +845,32 @@ class CephFSDriver(driver.ExecuteMixin, driver.GaneshaMixin,
         return self.protocol_helper.get_backend_info(context)
 
     def ensure_shares(self, context, shares):
+        def _get_share_data(share):
+            share_metadata = (
+                self.get_optional_share_creation_data(share).get(
+                    "metadata", {})
+            )
+            return {
+                'export_locations': self._get_export_locations(share),
+                "metadata": share_metadata
+            }
+
+        # Each share takes a round trip or two to the Ceph cluster; keep
+        # several of them in flight rather than ensuring shares serially.
+        share_data = utils.run_concurrently(
+            _get_share_data, shares,
+            self.configuration.cephfs_max_concurrent_commands)
+
         share_updates = {}
-        for share in shares:
+        for share, (data, error) in zip(shares, share_data):
             share_updates[share['id']] = {
                 'reapply_access_rules':
                     self.protocol_helper.reapply_rules_while_ensuring_shares,
             }
             try:
-                share_metadata = (
-                    self.get_optional_share_creation_data(share).get(
-                        "metadata", {})
-                )
-                share_updates[share['id']].update({
-                    'export_locations': self._get_export_locations(share),
-                    "metadata": share_metadata
-                })
+                if error:
+                    raise error
+                share_updates[share['id']].update(data)
             except exception.ShareBackendException as e:
                 if 'does not exist' in str(e).lower():
                     msg = ("Share instance %(si)s belonging to share "
@@ -1041,6 +1072,36 @@ class CephFSDriver(driver.ExecuteMixin, driver.GaneshaMixin,
             return
         return self._update_create_from_snapshot_status(share)
 
+    def get_share_statuses(self, context, shares):
+        """Returns the current status of several shares.
+
+        Ceph has no call returning the status of many clones at once, so the
+        clones are queried concurrently, from green threads.
+        """
+        pending = []
+        for share in shares:
+            if share['status'] != constants.STATUS_CREATING_FROM_SNAPSHOT:
+                LOG.warning("Caught an unexpected share status '%s' during "
+                            "share status update routine. Skipping.",
+                            share['status'])
+                continue
+            pending.append(share)
+
+        results = utils.run_concurrently(
+            self._update_create_from_snapshot_status, pending,
+            self.configuration.cephfs_max_concurrent_commands)
+
+        share_updates = {}
+        for share, (updates, error) in zip(pending, results):
+            if error is not None:
+                LOG.error("[%(be)s]: failed to get the status of share "
+                          "%(id)s: %(err)s",
+                          {"be": self.backend_name, "id": share["id"],
+                           "err": error})
+                updates = {'status': constants.STATUS_ERROR}
+            share_updates[share['id']] = updates
+        return share_updates
+
     def create_share_from_snapshot(self, context, share, snapshot,
                                    share_server=None, parent_share=None):
         """Create a CephFS subvolume from a snapshot"""
@@ -1263,13 +1324,19 @@ class NativeProtocolHelper(ganesha.NASHelperBase):
         # were already granted access by the backend. Do this to fetch their
         # access keys and ensure that after recovery, manila and the Ceph
         # backend are in sync.
-        for rule in add_rules:
-            try:
-                access_key = self._allow_access(
-                    context, share, rule, sub_name=sub_name
-                )
-            except (exception.InvalidShareAccessLevel,
-                    exception.InvalidShareAccessType):
+        max_in_flight = self.configuration.cephfs_max_concurrent_commands
+        allow_results = utils.run_concurrently(
+            lambda rule: self._allow_access(
+                context, share, rule, sub_name=sub_name),
+            add_rules, max_in_flight)
+        deny_results = utils.run_concurrently(
+            lambda rule: self._deny_access(
+                context, share, rule, sub_name=sub_name),
+            delete_rules, max_in_flight)
+
+        for rule, (access_key, error) in zip(add_rules, allow_results):
+            if isinstance(error, (exception.InvalidShareAccessLevel,
+                                  exception.InvalidShareAccessType)):
                 self.message_api.create(
                     context,
                     message_field.Action.UPDATE_ACCESS_RULES,
@@ -1280,11 +1347,11 @@ class NativeProtocolHelper(ganesha.NASHelperBase):
                 log_args = {'id': rule['access_id'],
                             'access_level': rule['access_level'],
                             'access_to': rule['access_to']}
-                LOG.exception("Failed to provide %(access_level)s access to "
-                              "%(access_to)s (Rule ID: %(id)s). Setting rule "
-                              "to 'error' state.", log_args)
+                LOG.error("Failed to provide %(access_level)s access to "
+                          "%(access_to)s (Rule ID: %(id)s). Setting rule "
+                          "to 'error' state.", log_args, exc_info=error)
                 access_updates.update({rule['access_id']: {'state': 'error'}})
-            except exception.InvalidShareAccess:
+            elif isinstance(error, exception.InvalidShareAccess):
                 self.message_api.create(
                     context,
                     message_field.Action.UPDATE_ACCESS_RULES,
@@ -1295,17 +1362,20 @@ class NativeProtocolHelper(ganesha.NASHelperBase):
                 log_args = {'id': rule['access_id'],
                             'access_level': rule['access_level'],
                             'access_to': rule['access_to']}
-                LOG.exception("Failed to provide %(access_level)s access to "
-                              "%(access_to)s (Rule ID: %(id)s). Setting rule "
-                              "to 'error' state.", log_args)
+                LOG.error("Failed to provide %(access_level)s access to "
+                          "%(access_to)s (Rule ID: %(id)s). Setting rule "
+                          "to 'error' state.", log_args, exc_info=error)
                 access_updates.update({rule['access_id']: {'state': 'error'}})
+            elif error:
+                raise error
             else:
                 access_updates.update({
                     rule['access_id']: {'access_key': access_key},
                 })
 
-        for rule in delete_rules:
-            self._deny_access(context, share, rule, sub_name=sub_name)
+        for result, error in deny_results:
+            if error:
+                raise error
 
         return access_updates
 
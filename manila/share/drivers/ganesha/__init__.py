@@ -172,16 +172,19 @@ class GaneshaNASHelper(NASHelperBase):
             self.ganesha.reset_exports()
             self.ganesha.restart_service()
 
-        for rule in add_rules:
-            try:
-                self._allow_access('/', share, rule)
-            except (exception.InvalidShareAccess,
-                    exception.InvalidShareAccessLevel):
-                rule_state_map[rule['id']] = {'state': 'error'}
-                continue
-
-        for rule in delete_rules:
-            self._deny_access('/', share, rule)
+        # Each rule is an export of its own; have them reach Ganesha in one
+        # burst with a single update of the export index.
+        with self.ganesha.coalesce():
+            for rule in add_rules:
+                try:
+                    self._allow_access('/', share, rule)
+                except (exception.InvalidShareAccess,
+                        exception.InvalidShareAccessLevel):
+                    rule_state_map[rule['id']] = {'state': 'error'}
+                    continue
+
+            for rule in delete_rules:
+                self._deny_access('/', share, rule)
         return rule_state_map
 
 
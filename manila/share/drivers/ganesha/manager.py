@@ -13,11 +13,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import io
+import collections
+import contextlib
+import errno
 import os
 import re
 import shlex
 import sys
+import threading
 
 from oslo_log import log
 from oslo_serialization import jsonutils
@@ -30,132 +33,157 @@ from manila import utils
 
 LOG = log.getLogger(__name__)
 IWIDTH = 4
+# Number of attempts at a compare-and-swap update of a RADOS object (the URL
+# index or the export counter) before giving up on racing writers.
+RADOS_UPDATE_ATTEMPTS = 10
+# Export ids are 16 bit unsigned integers. They are reserved from the export
+# counter in blocks and handed out from memory.
+MAX_EXPORT_ID = 65535
+EXPORT_ID_BLOCK_SIZE = 64
+
+
+# Lexical tokens of the Ganesha config format. Whitespace and comments are
+# matched without a group so that they can be skipped; a lone double quote
+# only matches when a quoted string is not terminated.
+_CONF_TOKEN_RE = re.compile(r'''
+    \s+
+  | \#[^\n]*
+  | ("(?:[^"\\]|\\.)*")
+  | ([{};=])
+  | ([^\s{};="\#]+)
+  | (")
+''', re.VERBOSE | re.DOTALL)
+_CONF_NUMBER_RE = re.compile(r'-?[1-9]\d*(\.\d+)?\Z')
+_EXPORT_ID_RE = re.compile(r'\bExport_Id\s*=\s*(\d+)', re.IGNORECASE)
+
+
+def _conf_add(block, key, value):
+    # Multiple occurrences of a key (e.g., CLIENT blocks) in a block are
+    # collected in a list.
+    if key in block:
+        if isinstance(block[key], list):
+            block[key].append(value)
+        else:
+            block[key] = [block[key], value]
+    else:
+        block[key] = value
 
 
-def _conf2json(conf):
-    """Convert Ganesha config to JSON."""
-
-    # tokenize config string
-    token_list = [io.StringIO()]
-    state = {
-        'in_quote': False,
-        'in_comment': False,
-        'escape': False,
-    }
-
-    cbk = []
-    for char in conf:
-        if state['in_quote']:
-            if not state['escape']:
-                if char == '"':
-                    state['in_quote'] = False
-                    cbk.append(lambda: token_list.append(io.StringIO()))
-                elif char == '\\':
-                    cbk.append(lambda: state.update({'escape': True}))
-        else:
-            if char == "#":
-                state['in_comment'] = True
-            if state['in_comment']:
-                if char == "\n":
-                    state['in_comment'] = False
-            else:
-                if char == '"':
-                    token_list.append(io.StringIO())
-                    state['in_quote'] = True
-        state['escape'] = False
-        if not state['in_comment']:
-            token_list[-1].write(char)
-        while cbk:
-            cbk.pop(0)()
-
-    if state['in_quote']:
-        raise RuntimeError("Unterminated quoted string")
-
-    # jsonify tokens
-    js_token_list = ["{"]
-    for tok in token_list:
-        tok = tok.getvalue()
-
-        if tok[0] == '"':
-            js_token_list.append(tok)
-            continue
+def _conf_value(words, quoted):
+    if len(words) == 1 and not quoted:
+        number = _CONF_NUMBER_RE.match(words[0])
+        if number:
+            return float(words[0]) if number.group(1) else int(words[0])
+    # Like Ganesha, concatenate adjacent strings.
+    return ''.join(words)
 
-        for pat, s in [
-                # add omitted "=" signs to block openings
-                (r'([^=\s])\s*{', '\\1={'),
-                # delete trailing semicolons in blocks
-                (r';\s*}', '}'),
-                # add omitted semicolons after blocks
-                (r'}\s*([^}\s])', '};\\1'),
-                # separate syntactically significant characters
-                (r'([;{}=])', ' \\1 ')]:
-            tok = re.sub(pat, s, tok)
-
-        # map tokens to JSON equivalents
-        for word in tok.split():
-            if word == "=":
-                word = ":"
-            elif word == ";":
-                word = ','
-            elif (word in ['{', '}'] or
-                  re.search(r'\A-?[1-9]\d*(\.\d+)?\Z', word)):
-                pass
-            else:
-                word = jsonutils.dumps(word)
-            js_token_list.append(word)
-    js_token_list.append("}")
-
-    # group quoted strings
-    token_grp_list = []
-    for tok in js_token_list:
-        if tok[0] == '"':
-            if not (token_grp_list and isinstance(token_grp_list[-1], list)):
-                token_grp_list.append([])
-            token_grp_list[-1].append(tok)
-        else:
-            token_grp_list.append(tok)
 
-    # process quoted string groups by joining them
-    js_token_list2 = []
-    for x in token_grp_list:
-        if isinstance(x, list):
-            x = ''.join(['"'] + [tok[1:-1] for tok in x] + ['"'])
-        js_token_list2.append(x)
+def _parse_conf(conf):
+    """Parse Ganesha config into a (nested) dictionary.
 
-    return ''.join(js_token_list2)
+    The config is scanned in a single pass; blocks are mapped to dicts and
+    repeated keys of a block to a list of their values.
+    """
+    block = {}
+    stack = []
+    key = None
+    words = []
+    quoted = False
+
+    for match in _CONF_TOKEN_RE.finditer(conf):
+        group = match.lastindex
+        if group is None:
+            # whitespace or comment
+            continue
+        token = match.group(group)
+        if group == 3:
+            words.append(token)
+        elif group == 1:
+            token = token[1:-1]
+            if '\\' in token:
+                token = jsonutils.loads('"%s"' % token)
+            words.append(token)
+            quoted = True
+        elif group == 4:
+            raise RuntimeError("Unterminated quoted string")
+        elif token == '=':
+            if key is not None or not words:
+                raise ValueError("Unexpected '=' at offset %d" %
+                                 match.start())
+            key, words, quoted = ''.join(words), [], False
+        elif token == '{':
+            if key is None:
+                key, words, quoted = ''.join(words), [], False
+            if not key or words:
+                raise ValueError("Unexpected '{' at offset %d" %
+                                 match.start())
+            sub_block = {}
+            _conf_add(block, key, sub_block)
+            stack.append(block)
+            block, key = sub_block, None
+        else:
+            # ';' or '}' terminate a pending assignment
+            if key is not None:
+                if not words:
+                    raise ValueError("Missing value for %s" % key)
+                _conf_add(block, key, _conf_value(words, quoted))
+                key, words, quoted = None, [], False
+            elif words:
+                raise ValueError("Missing '=' after %s" % ''.join(words))
+            if token == '}':
+                if not stack:
+                    raise ValueError("Unexpected '}' at offset %d" %
+                                     match.start())
+                block = stack.pop()
+
+    if key is not None:
+        if not words:
+            raise ValueError("Missing value for %s" % key)
+        _conf_add(block, key, _conf_value(words, quoted))
+    elif words:
+        raise ValueError("Missing '=' after %s" % ''.join(words))
+    if stack:
+        raise ValueError("Unterminated block")
+    return block
+
+
+def _emit_conf(confdict, parts, indent=0):
+    """Append the Ganesha config format rendering of confdict to parts."""
+    prefix = ' ' * (indent * IWIDTH)
+
+    def _emit_item(k, v):
+        if isinstance(v, dict):
+            parts.append(prefix + k + ' {\n')
+            _emit_conf(v, parts, indent + 1)
+            parts.append(prefix + '}\n')
+        # The 'CLIENTS' Ganesha string option is an exception in that it's
+        # string value can't be enclosed within quotes as can be done for
+        # other string options in a valid Ganesha conf file.
+        elif k.upper() == 'CLIENTS':
+            parts.append(prefix + k + ' = ' + v + ';\n')
+        else:
+            parts.append(prefix + k + ' = ' + jsonutils.dumps(v) + ';\n')
+
+    for k, v in confdict.items():
+        if v is None:
+            continue
+        if isinstance(v, list):
+            # Repeated blocks or values of a key, as parsed by _parse_conf.
+            for item in v:
+                _emit_item(k, item)
+            parts.append('\n')
+        else:
+            _emit_item(k, v)
 
 
 def _dump_to_conf(confdict, out=sys.stdout, indent=0):
     """Output confdict in Ganesha config format."""
     if isinstance(confdict, dict):
-        for k, v in confdict.items():
-            if v is None:
-                continue
-            if isinstance(v, dict):
-                out.write(' ' * (indent * IWIDTH) + k + ' ')
-                out.write("{\n")
-                _dump_to_conf(v, out, indent + 1)
-                out.write(' ' * (indent * IWIDTH) + '}')
-            elif isinstance(v, list):
-                for item in v:
-                    out.write(' ' * (indent * IWIDTH) + k + ' ')
-                    out.write("{\n")
-                    _dump_to_conf(item, out, indent + 1)
-                    out.write(' ' * (indent * IWIDTH) + '}\n')
-            # The 'CLIENTS' Ganesha string option is an exception in that it's
-            # string value can't be enclosed within quotes as can be done for
-            # other string options in a valid Ganesha conf file.
-            elif k.upper() == 'CLIENTS':
-                out.write(' ' * (indent * IWIDTH) + k + ' = ' + v + ';')
-            else:
-                out.write(' ' * (indent * IWIDTH) + k + ' ')
-                out.write('= ')
-                _dump_to_conf(v, out, indent)
-                out.write(';')
-            out.write('\n')
+        parts = []
+        _emit_conf(confdict, parts, indent)
+        out.write(''.join(parts))
     else:
-        dj = jsonutils.dumps(confdict)
-        out.write(dj)
+        out.write(jsonutils.dumps(confdict))
 
 
 def parseconf(conf):
@@ -165,44 +193,19 @@ def parseconf(conf):
 
     Convert config to a (nested) dictionary.
     """
-    def list_to_dict(src_list):
-        # Convert a list of key-value pairs stored as tuples to a dict.
-        # For tuples with identical keys, preserve all the values in a
-        # list. e.g., argument [('k', 'v1'), ('k', 'v2')] to function
-        # returns {'k': ['v1', 'v2']}.
-        dst_dict = {}
-        for i in src_list:
-            if isinstance(i, tuple):
-                k, v = i
-                if isinstance(v, list):
-                    v = list_to_dict(v)
-                if k in dst_dict:
-                    dst_dict[k] = [dst_dict[k]]
-                    dst_dict[k].append(v)
-                else:
-                    dst_dict[k] = v
-        return dst_dict
-
     try:
         # allow config to be specified in JSON --
         # for sake of people who might feel Ganesha config foreign.
-        d = jsonutils.loads(conf)
+        return jsonutils.loads(conf)
     except ValueError:
-        # Customize JSON decoder to convert Ganesha config to a list
-        # of key-value pairs stored as tuples. This allows multiple
-        # occurrences of a config block to be later converted to a
-        # dict key-value pair, with block name being the key and a
-        # list of block contents being the value.
-        li = jsonutils.loads(_conf2json(conf), object_pairs_hook=lambda x: x)
-        d = list_to_dict(li)
-    return d
+        return _parse_conf(conf)
 
 
 def mkconf(confdict):
     """Create Ganesha config string from confdict."""
-    s = io.StringIO()
-    _dump_to_conf(confdict, s)
-    return s.getvalue()
+    parts = []
+    _emit_conf(confdict, parts)
+    return ''.join(parts)
 
 
 rados = None
@@ -225,6 +228,10 @@ class GaneshaManager(object):
         self.confrx = re.compile(r'\.conf\Z')
         self.ganesha_config_path = kwargs['ganesha_config_path']
         self.tag = tag
+        # export changes deferred by coalesce(), per (green)thread
+        self._coalescing = threading.local()
+        # export ids reserved from the export counter, not handed out yet
+        self._export_ids = collections.deque()
 
         def _execute(*args, **kwargs):
             msg = kwargs.pop('message', args[0])
@@ -256,13 +263,15 @@ class GaneshaManager(object):
             self.ganesha_rados_export_index = (
                 kwargs['ganesha_rados_export_index'])
             self.rados_client = kwargs['rados_client']
+            self._export_id_base = 1000
             try:
                 self._get_rados_object(self.ganesha_rados_export_counter)
             except rados.ObjectNotFound:
                 self._put_rados_object(self.ganesha_rados_export_counter,
-                                       str(1000))
+                                       str(self._export_id_base))
         else:
             self.ganesha_db_path = kwargs['ganesha_db_path']
+            self._export_id_base = 100
             self.execute('mkdir', '-p', os.path.dirname(self.ganesha_db_path))
             # Here we are to make sure that an SQLite database of the
             # required scheme exists at self.ganesha_db_path.
@@ -275,7 +284,8 @@ class GaneshaManager(object):
                 "sqlite3", self.ganesha_db_path,
                 'create table ganesha(key varchar(20) primary key, '
                 'value int); insert into ganesha values("exportid", '
-                '100);', run_as_root=False, check_exit_code=False)
+                '%d);' % self._export_id_base, run_as_root=False,
+                check_exit_code=False)
             self.get_export_id(bump=False)
 
     def _getpath(self, name):
@@ -326,6 +336,40 @@ class GaneshaManager(object):
             self._write_conf_file("INDEX", index)
         _mkindex()
 
+    def _update_index_file(self, added, removed):
+        """Add and remove the include directives of exports in the index.
+
+        Only the lines of the given exports are touched, the index is not
+        regenerated from the contents of the export directory.
+        """
+        @utils.synchronized("ganesha-index-" + self.tag, external=True)
+        def _update_index_file():
+            path = self._getpath("INDEX")
+            lines = []
+            if self._check_file_exists(path):
+                lines = self.execute(
+                    'cat', path, message='reading export index')[0].split('\n')
+            removed_lines = {"%include " + self._getpath(name)
+                             for name in removed}
+            lines = [line for line in lines
+                     if line and line not in removed_lines]
+            present = set(lines)
+            for name in added:
+                line = "%include " + self._getpath(name)
+                if line not in present:
+                    lines.append(line)
+                    present.add(line)
+            self._write_conf_file(
+                "INDEX", "".join(line + "\n" for line in lines))
+        _update_index_file()
+
+    def _update_index(self, added=(), removed=()):
+        """Add and remove exports in the export index."""
+        if self.ganesha_rados_store_enable:
+            self._update_rados_export_index(added, removed)
+        else:
+            self._update_index_file(added, removed)
+
     def _read_export_rados_object(self, name):
         return parseconf(self._get_rados_object(
             self._get_export_rados_object_name(name)))
@@ -404,6 +448,13 @@ class GaneshaManager(object):
         """Remove export object of name."""
         self._delete_rados_object(self._get_export_rados_object_name(name))
 
+    def _rm_export(self, name):
+        """Remove the export file or RADOS object of name."""
+        if self.ganesha_rados_store_enable:
+            self._rm_export_rados_object(name)
+        else:
+            self._rm_export_file(name)
+
     def _dbus_send_ganesha(self, method, *args, **kwargs):
         """Send a message to Ganesha via dbus."""
         service = kwargs.pop("service", "exportmgr")
@@ -416,119 +467,207 @@ class GaneshaManager(object):
         """Remove an export from Ganesha runtime with given export id."""
         self._dbus_send_ganesha("RemoveExport", "uint16:%d" % xid)
 
-    def _add_rados_object_url_to_index(self, name):
-        """Add an export RADOS object's URL to the RADOS URL index."""
-
-        # TODO(rraja): Ensure that the export index object's update is atomic,
-        # e.g., retry object update until the object version between the 'get'
-        # and 'put' operations remains the same.
-        index_data = self._get_rados_object(self.ganesha_rados_export_index)
-
-        want_url = "%url rados://{0}/{1}".format(
+    def _get_export_rados_object_url(self, name):
+        return "%url rados://{0}/{1}".format(
             self.ganesha_rados_store_pool_name,
             self._get_export_rados_object_name(name))
 
-        if index_data:
-            self._put_rados_object(
-                self.ganesha_rados_export_index,
-                '\n'.join([index_data, want_url])
-            )
-        else:
-            self._put_rados_object(self.ganesha_rados_export_index, want_url)
-
-    def _remove_rados_object_url_from_index(self, name):
-        """Remove an export RADOS object's URL from the RADOS URL index."""
+    @staticmethod
+    def _is_rados_version_mismatch(e):
+        # A write op asserting an object version fails with ERANGE if the
+        # object is newer and with EOVERFLOW if it is older than asserted.
+        return getattr(e, 'errno', None) in (errno.ERANGE, errno.EOVERFLOW)
+
+    def _update_rados_export_index(self, added, removed):
+        """Add and remove export RADOS object URLs in the RADOS URL index.
+
+        Added URLs are appended to the index object, which is rewritten
+        only if URLs are to be removed from it. Either write asserts the
+        version of the index object it was computed from and is retried
+        if the object has been changed in the meantime.
+        """
+        added_urls = [self._get_export_rados_object_url(name)
+                      for name in added]
+        removed_urls = {self._get_export_rados_object_url(name)
+                        for name in removed}
+
+        for attempt in range(RADOS_UPDATE_ATTEMPTS):
+            index_data, version = self._get_rados_object_and_version(
+                self.ganesha_rados_export_index)
+            urls = index_data.split('\n') if index_data else []
+            present_urls = set(urls)
+            new_urls = [url for url in added_urls if url not in present_urls]
+            if removed_urls & present_urls:
+                data = '\n'.join(
+                    [url for url in urls if url not in removed_urls] +
+                    new_urls)
+                append = False
+            elif new_urls:
+                data = '\n'.join(([''] if urls else []) + new_urls)
+                append = True
+            else:
+                return
 
-        # TODO(rraja): Ensure that the export index object's update is atomic,
-        # e.g., retry object update until the object version between the 'get'
-        # and 'put' operations remains the same.
-        index_data = self._get_rados_object(self.ganesha_rados_export_index)
-        if not index_data:
+            try:
+                self._put_rados_object(self.ganesha_rados_export_index,
+                                       data, version=version, append=append)
+                return
+            except rados.OSError as e:
+                if not self._is_rados_version_mismatch(e):
+                    raise
+                LOG.debug("RADOS URL index object %(index)s changed while "
+                          "being updated (attempt %(attempt)d), retrying.",
+                          {'index': self.ganesha_rados_export_index,
+                           'attempt': attempt + 1})
+
+        msg = _("Could not update RADOS URL index object %(index)s after "
+                "%(attempts)d attempts.") % {
+            'index': self.ganesha_rados_export_index,
+            'attempts': RADOS_UPDATE_ATTEMPTS}
+        raise exception.ShareBackendException(msg=msg)
+
+    @contextlib.contextmanager
+    def coalesce(self):
+        """Coalesce the export changes made within the context.
+
+        The DBus calls and export index updates of the exports added,
+        updated or removed within the context are deferred, and issued in
+        one burst, with a single index update, when the context is left.
+        Nested contexts are folded into the outermost one.
+        """
+        if getattr(self._coalescing, 'changes', None) is not None:
+            yield
             return
 
-        unwanted_url = "%url rados://{0}/{1}".format(
-            self.ganesha_rados_store_pool_name,
-            self._get_export_rados_object_name(name))
-
-        rados_urls = index_data.split('\n')
-        new_rados_urls = [url for url in rados_urls if url != unwanted_url]
-
-        self._put_rados_object(self.ganesha_rados_export_index,
-                               '\n'.join(new_rados_urls))
-
-    def add_export(self, name, confdict):
-        """Add an export to Ganesha specified by confdict."""
-        xid = confdict["EXPORT"]["Export_Id"]
-        undos = []
-        _mkindex_called = False
+        self._coalescing.changes = {}
+        self._coalescing.removed = []
         try:
-            path = self._write_export(name, confdict)
-            if self.ganesha_rados_store_enable:
-                undos.append(lambda: self._rm_export_rados_object(name))
-                undos.append(lambda: self._rm_file(path))
-            else:
-                undos.append(lambda: self._rm_export_file(name))
+            yield
+        finally:
+            changes = self._coalescing.changes
+            removed = self._coalescing.removed
+            self._coalescing.changes = self._coalescing.removed = None
+            self._apply_export_changes(changes, removed)
+
+    def _queue_export_change(self, name, change):
+        """Apply an export change, or defer it when coalescing."""
+        changes = getattr(self._coalescing, 'changes', None)
+        if changes is None:
+            self._apply_export_changes({name: change}, [])
+            return
 
-            self._dbus_send_ganesha("AddExport", "string:" + path,
-                                    "string:EXPORT(Export_Id=%d)" % xid)
-            undos.append(lambda: self._remove_export_dbus(xid))
+        previous = changes.pop(name, None)
+        if previous:
+            # An export added or updated earlier in the batch is sent to
+            # Ganesha once, as it was first changed, with its latest config.
+            change['method'] = previous['method']
+            change['old_confdict'] = previous.get('old_confdict')
+            if self.ganesha_rados_store_enable:
+                self._rm_file(previous['path'])
+        changes[name] = change
 
+    def _revert_export_change(self, name, change):
+        if change['method'] == 'AddExport':
+            self._rm_export(name)
+        else:
+            path = self._write_export(name, change['old_confdict'])
             if self.ganesha_rados_store_enable:
-                # Clean up temp export file used for the DBus call
                 self._rm_file(path)
-                self._add_rados_object_url_to_index(name)
+
+    def _apply_export_changes(self, changes, removed):
+        """Send export changes to Ganesha and update the export index.
+
+        :param changes: dict of export names to the DBus method ('AddExport'
+            or 'UpdateExport'), config path and export id of their change
+        :param removed: names of the exports removed from Ganesha
+        """
+        failure = None
+        added = []
+        for name, change in changes.items():
+            try:
+                self._dbus_send_ganesha(
+                    change['method'], "string:" + change['path'],
+                    "string:EXPORT(Export_Id=%d)" % change['xid'])
+            except exception.ProcessExecutionError as e:
+                failure = failure or e
+                self._revert_export_change(name, change)
             else:
-                _mkindex_called = True
-                self._mkindex()
-        except exception.ProcessExecutionError as e:
-            for u in undos:
-                u()
-            if not self.ganesha_rados_store_enable and not _mkindex_called:
-                self._mkindex()
+                if change['method'] == 'AddExport':
+                    added.append(name)
+            finally:
+                if self.ganesha_rados_store_enable:
+                    # Clean up temp export file used for the DBus call
+                    self._rm_file(change['path'])
+
+        if added or removed:
+            try:
+                self._update_index(added, removed)
+            except exception.ProcessExecutionError as e:
+                failure = failure or e
+                for name in added:
+                    self._rm_export(name)
+                    self._remove_export_dbus(changes[name]['xid'])
+
+        if failure:
             raise exception.GaneshaCommandFailure(
-                stdout=e.stdout, stderr=e.stderr, exit_code=e.exit_code,
-                cmd=e.cmd)
+                stdout=failure.stdout, stderr=failure.stderr,
+                exit_code=failure.exit_code, cmd=failure.cmd)
+
+    def add_export(self, name, confdict):
+        """Add an export to Ganesha specified by confdict."""
+        xid = confdict["EXPORT"]["Export_Id"]
+        path = self._write_export(name, confdict)
+        self._queue_export_change(
+            name, {'method': 'AddExport', 'path': path, 'xid': xid})
 
     def update_export(self, name, confdict):
         """Update an export to Ganesha specified by confdict."""
         xid = confdict["EXPORT"]["Export_Id"]
-        old_confdict = self._read_export(name)
+        changes = getattr(self._coalescing, 'changes', None) or {}
+        if name in changes:
+            old_confdict = changes[name].get('old_confdict')
+        else:
+            old_confdict = self._read_export(name)
 
         path = self._write_export(name, confdict)
-        try:
-            self._dbus_send_ganesha("UpdateExport", "string:" + path,
-                                    "string:EXPORT(Export_Id=%d)" % xid)
-        except exception.ProcessExecutionError as e:
-            # Revert the export update.
-            self._write_export(name, old_confdict)
-            raise exception.GaneshaCommandFailure(
-                stdout=e.stdout, stderr=e.stderr, exit_code=e.exit_code,
-                cmd=e.cmd)
-        finally:
-            if self.ganesha_rados_store_enable:
-                # Clean up temp export file used for the DBus update call
-                self._rm_file(path)
+        self._queue_export_change(
+            name, {'method': 'UpdateExport', 'path': path, 'xid': xid,
+                   'old_confdict': old_confdict})
 
     def remove_export(self, name):
         """Remove an export from Ganesha."""
+        changes = getattr(self._coalescing, 'changes', None)
+        pending = changes.pop(name, None) if changes else None
         try:
-            confdict = self._read_export(name)
-            self._remove_export_dbus(confdict["EXPORT"]["Export_Id"])
+            # An export added within the current batch is not known to
+            # Ganesha yet.
+            if not (pending and pending['method'] == 'AddExport'):
+                confdict = self._read_export(name)
+                self._remove_export_dbus(confdict["EXPORT"]["Export_Id"])
         except Exception:
             LOG.exception("There was a problem removing the export. "
                           "Ignoring errors and continuing operation.")
         finally:
-            if self.ganesha_rados_store_enable:
-                self._delete_rados_object(
-                    self._get_export_rados_object_name(name))
-                self._remove_rados_object_url_from_index(name)
+            if pending and self.ganesha_rados_store_enable:
+                self._rm_file(pending['path'])
+            self._rm_export(name)
+            if changes is not None:
+                self._coalescing.removed.append(name)
             else:
-                self._rm_export_file(name)
-                self._mkindex()
+                self._update_index(removed=[name])
 
     def _get_rados_object(self, object_name):
         """Synchronously read data from Ceph RADOS object as a text string.
 
+        :param object_name: name of the object
+        :type object_name: str
+        :returns: object data
+        """
+        return self._get_rados_object_and_version(object_name)[0]
+
+    def _get_rados_object_and_version(self, object_name):
+        """Synchronously read data from Ceph RADOS object as a text string.
+
         :param pool_name: name of the pool
         :type pool_name: str
         :param object_name: name of the object
@@ -548,14 +687,16 @@ class GaneshaManager(object):
                     (ioctx.read(object_name, 1, offset=max_size))):
                 LOG.warning("Size of object %s exceeds '%d' bytes "
                             "read", object_name, max_size)
+            version = ioctx.get_last_version()
         finally:
             ioctx.close()
 
         bytes_read_decoded = bytes_read.decode('utf-8')
 
-        return bytes_read_decoded
+        return bytes_read_decoded, version
 
-    def _put_rados_object(self, object_name, data):
+    def _put_rados_object(self, object_name, data, version=None,
+                          append=False):
         """Synchronously write data as a byte string in a Ceph RADOS object.
 
         :param pool_name: name of the pool
@@ -564,6 +705,12 @@ class GaneshaManager(object):
         :type object_name: str
         :param data: data to write
         :type data: bytes
+        :param version: if set, the write fails unless the object is at
+            this version
+        :type version: int
+        :param append: append data to the object instead of replacing its
+            contents
+        :type append: bool
         """
 
         pool_name = self.ganesha_rados_store_pool_name
@@ -581,10 +728,17 @@ class GaneshaManager(object):
 
         try:
             with rados.WriteOpCtx() as wop:
-                wop.write_full(encoded_data)
+                if version is not None:
+                    wop.assert_version(version)
+                if append:
+                    wop.append(encoded_data)
+                else:
+                    wop.write_full(encoded_data)
                 ioctx.operate_write_op(wop, object_name)
         except rados.OSError as e:
-            LOG.error(e)
+            if not (version is not None and
+                    self._is_rados_version_mismatch(e)):
+                LOG.error(e)
             raise e
         finally:
             ioctx.close()
@@ -599,39 +753,134 @@ class GaneshaManager(object):
         finally:
             ioctx.close()
 
-    def get_export_id(self, bump=True):
-        """Get a new export id."""
-        # XXX overflowing the export id (16 bit unsigned integer)
-        # is not handled
-        if self.ganesha_rados_store_enable:
-            # TODO(rraja): Ensure that the export counter object's update is
-            # atomic, e.g., retry object update until the object version
-            # between the 'get' and 'put' operations remains the same.
-            export_id = int(
-                self._get_rados_object(self.ganesha_rados_export_counter))
-            if not bump:
+    def _bump_rados_export_counter(self, count):
+        """Add count to the RADOS export counter and return its new value.
+
+        The update asserts the version of the counter object it was
+        computed from and is retried if the object has been changed in
+        the meantime.
+        """
+        for attempt in range(RADOS_UPDATE_ATTEMPTS):
+            data, version = self._get_rados_object_and_version(
+                self.ganesha_rados_export_counter)
+            export_id = int(data) + count
+            try:
+                self._put_rados_object(self.ganesha_rados_export_counter,
+                                       str(export_id), version=version)
                 return export_id
-            export_id += 1
-            self._put_rados_object(self.ganesha_rados_export_counter,
-                                   str(export_id))
-            return export_id
+            except rados.OSError as e:
+                if not self._is_rados_version_mismatch(e):
+                    raise
+                LOG.debug("RADOS export counter object %(counter)s changed "
+                          "while being updated (attempt %(attempt)d), "
+                          "retrying.",
+                          {'counter': self.ganesha_rados_export_counter,
+                           'attempt': attempt + 1})
+
+        msg = _("Could not update RADOS export counter object %(counter)s "
+                "after %(attempts)d attempts.") % {
+            'counter': self.ganesha_rados_export_counter,
+            'attempts': RADOS_UPDATE_ATTEMPTS}
+        raise exception.ShareBackendException(msg=msg)
+
+    def _bump_sqlite_export_counter(self, count):
+        """Add count to the SQLite export counter and return its new value."""
+        if count:
+            # The transaction keeps concurrent bumps from interleaving
+            # between the update and the select.
+            sql = ('begin immediate;'
+                   'update ganesha set value = value + %d;'
+                   'select * from ganesha '  # nosec B608
+                   'where key = "exportid";'
+                   'commit;' % count)
         else:
-            if bump:
-                bumpcode = 'update ganesha set value = value + 1;'
-            else:
-                bumpcode = ''
-            out = self.execute(
-                "sqlite3", self.ganesha_db_path,
-                bumpcode + 'select * from ganesha '  # nosec B608
-                'where key = "exportid";',
-                run_as_root=False)[0]
-            match = re.search(r'\Aexportid\|(\d+)$', out)
-            if not match:
-                LOG.error("Invalid export database on "
-                          "Ganesha node %(tag)s: %(db)s.",
-                          {'tag': self.tag, 'db': self.ganesha_db_path})
-                raise exception.InvalidSqliteDB()
-            return int(match.groups()[0])
+            sql = 'select * from ganesha where key = "exportid";'
+        out = self.execute("sqlite3", self.ganesha_db_path, sql,
+                           run_as_root=False)[0]
+        match = re.search(r'\Aexportid\|(\d+)$', out)
+        if not match:
+            LOG.error("Invalid export database on "
+                      "Ganesha node %(tag)s: %(db)s.",
+                      {'tag': self.tag, 'db': self.ganesha_db_path})
+            raise exception.InvalidSqliteDB()
+        return int(match.groups()[0])
+
+    def _bump_export_counter(self, count):
+        """Add count to the export counter and return its new value."""
+        if self.ganesha_rados_store_enable:
+            if not count:
+                return int(self._get_rados_object(
+                    self.ganesha_rados_export_counter))
+            return self._bump_rados_export_counter(count)
+        else:
+            return self._bump_sqlite_export_counter(count)
+
+    def _get_export_ids_in_use(self):
+        """Return the set of export ids of the exports of Ganesha."""
+        if self.ganesha_rados_store_enable:
+            data = []
+            index_data = self._get_rados_object(
+                self.ganesha_rados_export_index)
+            for url in filter(None, index_data.split('\n')):
+                try:
+                    data.append(self._get_rados_object(url.split('/')[-1]))
+                except rados.ObjectNotFound:
+                    continue
+            data = '\n'.join(data)
+        else:
+            paths = [os.path.join(self.ganesha_export_dir, f) for f in
+                     self.execute('ls', self.ganesha_export_dir,
+                                  run_as_root=False)[0].split('\n')
+                     if self.confrx.search(f) and f != "INDEX.conf"]
+            # Exports removed since the listing make cat fail, the ids of
+            # the other exports are still read.
+            data = self.execute(
+                'cat', *paths, check_exit_code=False,
+                message='reading export ids')[0] if paths else ''
+        return {int(xid) for xid in _EXPORT_ID_RE.findall(data)}
+
+    def _reserve_export_ids(self):
+        """Reserve a block of export ids from the export counter.
+
+        Counter values beyond MAX_EXPORT_ID wrap around to the start of the
+        export id range; once that happened, the ids still used by
+        exports are left out of the block.
+        """
+        counter = self._bump_export_counter(EXPORT_ID_BLOCK_SIZE)
+        first, span = self._export_id_base + 1, (
+            MAX_EXPORT_ID - self._export_id_base)
+        export_ids = [
+            first + (value - first) % span if value > MAX_EXPORT_ID else value
+            for value in range(counter - EXPORT_ID_BLOCK_SIZE + 1,
+                               counter + 1)]
+        if counter > MAX_EXPORT_ID:
+            in_use = self._get_export_ids_in_use()
+            export_ids = [xid for xid in export_ids if xid not in in_use]
+        return export_ids
+
+    def get_export_id(self, bump=True):
+        """Get a new export id.
+
+        With bump=False, return the current value of the export counter
+        without reserving any export id.
+        """
+        if not bump:
+            return self._bump_export_counter(0)
+
+        @utils.synchronized("ganesha-export-id-" + self.tag)
+        def _get_export_id():
+            blocks = 0
+            while not self._export_ids:
+                # Give up once a full round over the export id range has
+                # not yielded a free id.
+                if blocks > MAX_EXPORT_ID // EXPORT_ID_BLOCK_SIZE:
+                    raise exception.GaneshaException(
+                        _("No free export id left on Ganesha node %s.") %
+                        self.tag)
+                self._export_ids.extend(self._reserve_export_ids())
+                blocks += 1
+            return self._export_ids.popleft()
+        return _get_export_id()
 
     def restart_service(self):
         """Restart the Ganesha service."""
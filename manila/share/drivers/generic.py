@@ -178,6 +178,8 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
         self.compute_api = compute.API()
         self.volume_api = volume.API()
         self._setup_helpers()
+        if self.driver_handles_share_servers:
+            self.service_instance_manager.fill_service_instance_pool()
 
         common_sv_available = False
         share_server = None
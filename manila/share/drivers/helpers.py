@@ -13,6 +13,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import collections
 import copy
 import ipaddress
 import os
@@ -27,6 +28,10 @@ from manila import utils
 
 LOG = log.getLogger(__name__)
 
+# Maximum number of clients passed to a single exportfs command, so that the
+# command line stays well below the length limits of the shell it runs in.
+EXPORTFS_MAX_CLIENTS = 500
+
 
 class NASHelperBase(object):
     """Interface to work with share."""
@@ -180,6 +185,11 @@ def nfs_synchronized(f):
     return wrapped_func
 
 
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
 def escaped_address(address):
     addr = ipaddress.ip_address(str(address))
     if addr.version == 4:
@@ -239,20 +249,10 @@ class NFSHelper(NASHelperBase):
                 (const.ACCESS_LEVEL_RO, const.ACCESS_LEVEL_RW))
 
             hosts = self.get_host_list(out, local_path)
-            for host in hosts:
-                parsed_host = self._get_parsed_address_or_cidr(host)
-                self._ssh_exec(server, ['sudo', 'exportfs', '-u',
-                                        ':'.join((parsed_host, local_path))])
-            self._sync_nfs_temp_and_perm_files(server)
-            for access in access_rules:
-                rules_options = '%s,no_subtree_check,no_root_squash'
-                access_to = self._get_parsed_address_or_cidr(
-                    access['access_to'])
-                self._ssh_exec(
-                    server,
-                    ['sudo', 'exportfs', '-o',
-                     rules_options % access['access_level'],
-                     ':'.join((access_to, local_path))])
+            self._unexport(
+                server, share_name, local_path,
+                [self._get_parsed_address_or_cidr(host) for host in hosts])
+            self._export(server, local_path, access_rules)
             self._sync_nfs_temp_and_perm_files(server)
         # Adding/Deleting specific rules
         else:
@@ -261,6 +261,7 @@ class NFSHelper(NASHelperBase):
                 add_rules, ('ip',),
                 (const.ACCESS_LEVEL_RO, const.ACCESS_LEVEL_RW))
 
+            hosts_to_unexport = []
             for access in delete_rules:
                 try:
                     self.validate_access_rules(
@@ -275,22 +276,11 @@ class NFSHelper(NASHelperBase):
                                     'type': access['access_type'],
                                     'to': access['access_to']})
                     continue
-                access_to = self._get_parsed_address_or_cidr(
-                    access['access_to'])
-                try:
-                    self._ssh_exec(server, ['sudo', 'exportfs', '-u',
-                                            ':'.join((access_to, local_path))])
-                except exception.ProcessExecutionError as e:
-                    if "could not find" in e.stderr.lower():
-                        LOG.debug(
-                            "Client/s with IP address/es %(host)s did not "
-                            "have access to %(share)s. Nothing to deny.",
-                            {'host': access_to, 'share': share_name})
-                    else:
-                        raise
-
-            if delete_rules:
-                self._sync_nfs_temp_and_perm_files(server)
+                hosts_to_unexport.append(
+                    self._get_parsed_address_or_cidr(access['access_to']))
+            self._unexport(server, share_name, local_path, hosts_to_unexport)
+
+            rules_to_export = []
             for access in add_rules:
                 access_to = self._get_parsed_address_or_cidr(
                     access['access_to'])
@@ -305,15 +295,48 @@ class NFSHelper(NASHelperBase):
                                     'name': share_name
                                 })
                 else:
-                    rules_options = '%s,no_subtree_check,no_root_squash'
-                    self._ssh_exec(
-                        server,
-                        ['sudo', 'exportfs', '-o',
-                         rules_options % access['access_level'],
-                         ':'.join((access_to, local_path))])
-            if add_rules:
+                    rules_to_export.append(access)
+            self._export(server, local_path, rules_to_export)
+
+            if delete_rules or add_rules:
                 self._sync_nfs_temp_and_perm_files(server)
 
+    def _export(self, server, local_path, access_rules):
+        """Exports local_path to the clients of the given access rules.
+
+        exportfs takes any number of clients, so the clients sharing an
+        access level are exported with as few commands as possible.
+        """
+        clients_by_level = collections.defaultdict(list)
+        for access in access_rules:
+            access_to = self._get_parsed_address_or_cidr(access['access_to'])
+            clients_by_level[access['access_level']].append(
+                ':'.join((access_to, local_path)))
+        rules_options = '%s,no_subtree_check,no_root_squash'
+        for access_level, clients in clients_by_level.items():
+            for chunk in _chunks(clients, EXPORTFS_MAX_CLIENTS):
+                self._ssh_exec(
+                    server,
+                    ['sudo', 'exportfs', '-o', rules_options % access_level] +
+                    chunk)
+
+    def _unexport(self, server, share_name, local_path, hosts):
+        """Unexports local_path from the given hosts."""
+        clients = [':'.join((host, local_path)) for host in hosts]
+        for chunk in _chunks(clients, EXPORTFS_MAX_CLIENTS):
+            try:
+                self._ssh_exec(server, ['sudo', 'exportfs', '-u'] + chunk)
+            except exception.ProcessExecutionError as e:
+                errors = [line for line in e.stderr.lower().splitlines()
+                          if line.strip()]
+                if not errors or any("could not find" not in line
+                                     for line in errors):
+                    raise
+                LOG.debug(
+                    "Some of the clients %(hosts)s did not have access to "
+                    "%(share)s. Nothing to deny for them.",
+                    {'hosts': chunk, 'share': share_name})
+
     @staticmethod
     def _get_parsed_address_or_cidr(access_to):
         network = ipaddress.ip_network(str(access_to))
@@ -383,10 +406,10 @@ class NFSHelper(NASHelperBase):
                                   share_name)
         out, err = self._ssh_exec(server, ['sudo', 'exportfs'])
         hosts = self.get_host_list(out, local_path)
-        for host in hosts:
-            self._ssh_exec(server,
-                           ['sudo', 'exportfs', '-u',
-                            '"{}"'.format(':'.join((host, local_path)))])
+        clients = ['"{}"'.format(':'.join((host, local_path)))
+                   for host in hosts]
+        for chunk in _chunks(clients, EXPORTFS_MAX_CLIENTS):
+            self._ssh_exec(server, ['sudo', 'exportfs', '-u'] + chunk)
         self._sync_nfs_temp_and_perm_files(server)
 
     @nfs_synchronized
@@ -558,31 +558,38 @@ class LVMShareDriver(LVMMixin, driver.ShareDriver):
 
     def update_share_usage_size(self, context, shares):
         updated_shares = []
-        out, err = self._execute(
-            'df', '-l', '--output=target,used',
-            '--block-size=g')
+        used_sizes = self._get_used_sizes()
         gathered_at = timeutils.utcnow()
 
         for share in shares:
             try:
                 mount_path = self._get_mount_path(share)
-                if os.path.exists(mount_path):
-                    used_size = (re.findall(
-                        mount_path + r"\s*[0-9.]+G", out)[0].
-                        split(' ')[-1][:-1])
-                    updated_shares.append({'id': share['id'],
-                                           'used_size': used_size,
-                                           'gathered_at': gathered_at})
-                else:
+                if mount_path not in used_sizes:
                     raise exception.NotFound(
                         _("Share mount path %s could not be "
                           "found.") % mount_path)
+                updated_shares.append({'id': share['id'],
+                                       'used_size': used_sizes[mount_path],
+                                       'gathered_at': gathered_at})
             except Exception:
                 LOG.exception("Failed to gather 'used_size' for share %s.",
                               share['id'])
 
         return updated_shares
 
+    def _get_used_sizes(self):
+        """Returns the used size of local mounts, in GiB, by mount path."""
+        out, err = self._execute(
+            'df', '-l', '--output=target,used',
+            '--block-size=g')
+        used_sizes = {}
+        # The first line is the header; mount paths may contain spaces.
+        for line in out.splitlines()[1:]:
+            target, _, used = line.rstrip().rpartition(' ')
+            if target and used.endswith('G'):
+                used_sizes[target.rstrip()] = used[:-1]
+        return used_sizes
+
     def get_backend_info(self, context):
         return {
             'export_ips': ','.join(self.share_server['public_addresses']),
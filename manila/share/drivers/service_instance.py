@@ -18,13 +18,17 @@
 
 import abc
 import os
+import re
 import time
 
+import eventlet
 import netaddr
 from oslo_config import cfg
 from oslo_log import log
+from oslo_utils import excutils
 from oslo_utils import importutils
 from oslo_utils import netutils
+from oslo_utils import uuidutils
 
 from manila.common import constants as const
 from manila import compute
@@ -126,6 +130,19 @@ share_servers_handling_mode_opts = [
         help="ID of neutron subnet used to communicate with admin network,"
              " to create additional admin export locations on. "
              "Related to 'admin_network_id'."),
+    cfg.IntOpt(
+        "service_instance_pool_size",
+        default=0,
+        min=0,
+        help="Number of service instances to keep booted ahead of share "
+             "server creation. A new share server takes one of them and "
+             "attaches it to its networks instead of booting a new "
+             "instance, and the pool is refilled in the background. Pooled "
+             "instances are booted without network interfaces, which "
+             "requires the nova 'api_microversion' to be 2.37 or newer, and "
+             "the service image must configure network interfaces attached "
+             "after boot. Set to 0 to disable the pool. "
+             "Only used if driver_handles_share_servers=True."),
 ]
 
 no_share_servers_handling_mode_opts = [
@@ -242,6 +259,12 @@ class ServiceInstanceManager(object):
             self.path_to_public_key = self.get_config_option(
                 "path_to_public_key")
             self._network_helper = None
+            self.pool_size = self.get_config_option(
+                "service_instance_pool_size")
+            # NOTE: IDs of the pooled instances that are ready to be taken,
+            # None until the pool is loaded from Nova.
+            self._pool = None
+            self._pool_filling = False
 
     @property
     @utils.synchronized("instantiate_network_helper")
@@ -446,6 +469,102 @@ class ServiceInstanceManager(object):
                   "Giving up.") % {
                       'id': server_id, 's': self.max_time_to_build_instance})
 
+    def _get_pool_instance_name_prefix(self):
+        config_group = (
+            self.driver_config and self.driver_config.config_group or
+            'DEFAULT')
+        return 'manila-service-pool-%s-%s-' % (CONF.host, config_group)
+
+    def fill_service_instance_pool(self):
+        """Refills the pool of service instances in the background."""
+        # NOTE: no green thread switch can happen between the check and the
+        # update of the flag, so only one refill runs at a time.
+        if not self.pool_size or self._pool_filling:
+            return
+        self._pool_filling = True
+        eventlet.spawn_n(self._fill_service_instance_pool)
+
+    def _fill_service_instance_pool(self):
+        try:
+            if self._pool is None:
+                self._pool = self._load_service_instance_pool()
+            while len(self._pool) < self.pool_size:
+                self._pool.append(self._create_pool_service_instance())
+        except Exception:
+            LOG.exception("Failed to fill the pool of service instances.")
+        finally:
+            self._pool_filling = False
+
+    def _load_service_instance_pool(self):
+        """Finds the pooled instances left by a previous run."""
+        prefix = self._get_pool_instance_name_prefix()
+        instance_ids = []
+        servers = self.compute_api.server_list(
+            self.admin_context, {'name': '^%s' % re.escape(prefix)})
+        for server in servers:
+            if not server['name'].startswith(prefix):
+                continue
+            if server['status'] == 'ACTIVE':
+                instance_ids.append(server['id'])
+            else:
+                LOG.warning("Deleting pooled service instance %(id)s in "
+                            "status %(status)s.",
+                            {'id': server['id'], 'status': server['status']})
+                self._delete_server(self.admin_context, server['id'])
+        return instance_ids
+
+    def _create_pool_service_instance(self):
+        """Boots a service instance with no network interfaces."""
+        service_image_id = self._get_service_image(self.admin_context)
+        key_name, __ = self._get_key(self.admin_context)
+        service_instance = self.compute_api.server_create(
+            self.admin_context,
+            name=(self._get_pool_instance_name_prefix() +
+                  uuidutils.generate_uuid()),
+            image=service_image_id,
+            flavor=self.get_config_option("service_instance_flavor_id"),
+            key_name=key_name,
+            nics='none',
+            availability_zone=self.availability_zone,
+            **self._get_service_instance_create_kwargs())
+        try:
+            self.wait_for_instance_to_be_active(
+                service_instance['id'], self.max_time_to_build_instance,
+                require_networks=False)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self._delete_server(self.admin_context,
+                                    service_instance['id'])
+        LOG.debug("Service instance %s added to the pool.",
+                  service_instance['id'])
+        return service_instance['id']
+
+    def _claim_pool_service_instance(self, context, instance_name):
+        """Takes a service instance out of the pool.
+
+        :returns: ID of the instance, renamed to instance_name, or None if
+                  the pool has no instance ready.
+        """
+        if not self.pool_size:
+            return None
+        try:
+            while self._pool:
+                instance_id = self._pool.pop(0)
+                try:
+                    self.compute_api.server_update(
+                        context, instance_id, instance_name)
+                except exception.InstanceNotFound:
+                    LOG.warning("Pooled service instance %s no longer "
+                                "exists.", instance_id)
+                    continue
+                LOG.debug("Took service instance %(id)s out of the pool "
+                          "for %(name)s.",
+                          {'id': instance_id, 'name': instance_name})
+                return instance_id
+            return None
+        finally:
+            self.fill_service_instance_pool()
+
     def set_up_service_instance(self, context, network_info):
         """Finds or creates and sets up service vm.
 
@@ -584,22 +703,30 @@ class ServiceInstanceManager(object):
             fail_safe_data['admin_port_id'] = (
                 network_data['admin_port']['id'])
         try:
-            create_kwargs = self._get_service_instance_create_kwargs()
-            service_instance = self.compute_api.server_create(
-                context,
-                name=instance_name,
-                image=service_image_id,
-                flavor=self.get_config_option("service_instance_flavor_id"),
-                key_name=key_name,
-                nics=network_data['nics'],
-                availability_zone=self.availability_zone,
-                **create_kwargs)
-
-            fail_safe_data['instance_id'] = service_instance['id']
+            instance_id = self._claim_pool_service_instance(
+                context, instance_name)
+            if instance_id:
+                fail_safe_data['instance_id'] = instance_id
+                for nic in network_data['nics']:
+                    self.compute_api.server_interface_attach(
+                        context, instance_id, nic['port-id'])
+            else:
+                create_kwargs = self._get_service_instance_create_kwargs()
+                service_instance = self.compute_api.server_create(
+                    context,
+                    name=instance_name,
+                    image=service_image_id,
+                    flavor=self.get_config_option(
+                        "service_instance_flavor_id"),
+                    key_name=key_name,
+                    nics=network_data['nics'],
+                    availability_zone=self.availability_zone,
+                    **create_kwargs)
+                instance_id = service_instance['id']
+                fail_safe_data['instance_id'] = instance_id
 
             service_instance = self.wait_for_instance_to_be_active(
-                service_instance['id'],
-                self.max_time_to_build_instance)
+                instance_id, self.max_time_to_build_instance)
 
             if self.get_config_option("limit_ssh_access"):
                 try:
@@ -703,7 +830,8 @@ class ServiceInstanceManager(object):
         self._delete_server(context, instance_id)
         self.network_helper.teardown_network(server_details)
 
-    def wait_for_instance_to_be_active(self, instance_id, timeout):
+    def wait_for_instance_to_be_active(self, instance_id, timeout,
+                                       require_networks=True):
         t = time.time()
         while time.time() - t < timeout:
             try:
@@ -719,7 +847,8 @@ class ServiceInstanceManager(object):
             # NOTE(vponomaryov): emptiness of 'networks' field checked as
             #                    workaround for nova/neutron bug #1210483.
             if (instance_status == 'ACTIVE' and
-                    service_instance.get('networks', {})):
+                    (service_instance.get('networks', {}) or
+                     not require_networks)):
                 return service_instance
             elif service_instance['status'] == 'ERROR':
                 break
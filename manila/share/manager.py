@@ -47,6 +47,7 @@ from manila import quota
 from manila.share import access
 from manila.share import api
 from manila.share import configuration
+from manila.share import driver
 from manila.share import drivers_private_data
 from manila.share import migration
 from manila.share import rpcapi as share_rpcapi
@@ -101,6 +102,12 @@ share_manager_opts = [
                help='This value, specified in seconds, determines how often '
                     'the share manager will poll for the health '
                     '(replica_state) of each replica instance.'),
+    cfg.IntOpt('replica_state_update_concurrency',
+               default=8,
+               min=1,
+               help='Maximum number of share replicas and replica snapshots '
+                    'the share manager polls the health of concurrently '
+                    'during its periodic updates.'),
     cfg.IntOpt('migration_driver_continue_update_interval',
                default=60,
                help='This value, specified in seconds, determines how often '
@@ -312,6 +319,11 @@ class ShareManager(manager.SchedulerDependentManager):
             snapshot_access.ShareSnapshotInstanceAccess(self.db, self.driver))
         self.migration_wait_access_rules_timeout = (
             CONF.migration_wait_access_rules_timeout)
+        # Replicas are polled one by one unless the driver implements
+        # polling them in bulk.
+        self._bulk_replica_state_update = getattr(
+            type(self.driver), 'update_replica_states', None) not in (
+                None, driver.ShareDriver.update_replica_states)
 
         self.message_api = message_api.API()
         self.share_api = api.API()
@@ -354,6 +366,7 @@ class ShareManager(manager.SchedulerDependentManager):
                     share_instance['host'], pool)
                 self.db.share_instance_update(
                     ctxt, share_instance['id'], {'host': new_host})
+                share_instance['host'] = new_host
 
         return pool
 
@@ -446,12 +459,15 @@ class ShareManager(manager.SchedulerDependentManager):
                     {'host': self.host})
                 return
 
+        stopwatch = timeutils.StopWatch()
+        stopwatch.start()
         share_instances = self.db.share_instance_get_all_by_host(
-            ctxt, self.host)
+            ctxt, self.host, with_share_data=True)
         LOG.debug("Re-exporting %s shares", len(share_instances))
 
+        ensurable_instances = []
         for share_instance in share_instances:
-            share_ref = self.db.share_get(ctxt, share_instance['share_id'])
+            share_ref = share_instance['share']
 
             if share_ref.is_busy:
                 LOG.info(
@@ -472,10 +488,13 @@ class ShareManager(manager.SchedulerDependentManager):
                 continue
 
             self._ensure_share_instance_has_pool(ctxt, share_instance)
-            share_instance = self.db.share_instance_get(
-                ctxt, share_instance['id'], with_share_data=True)
+            ensurable_instances.append(share_instance)
+
+        share_servers = self._get_share_servers_by_id(
+            ctxt, ensurable_instances)
+        for share_instance in ensurable_instances:
             share_instance_dict = self._get_share_instance_dict(
-                ctxt, share_instance)
+                ctxt, share_instance, share_servers=share_servers)
             update_share_instances.append(share_instance_dict)
 
         do_service_status_update = False
@@ -486,11 +505,9 @@ class ShareManager(manager.SchedulerDependentManager):
                 ctxt, self.host, 'manila-share')
             self.db.service_update(ctxt, service['id'], {'ensuring': True})
             if update_instances_status:
-                for instance in update_share_instances:
-                    self.db.share_instance_update(
-                        ctxt, instance['id'],
-                        {'status': constants.STATUS_ENSURING}
-                    )
+                self.db.share_instance_status_update(
+                    ctxt, [instance['id'] for instance in ensurable_instances],
+                    {'status': constants.STATUS_ENSURING})
             try:
                 update_share_instances = self.driver.ensure_shares(
                     ctxt, update_share_instances) or {}
@@ -510,10 +527,17 @@ class ShareManager(manager.SchedulerDependentManager):
             self.db.backend_info_update(
                 ctxt, self.host, new_backend_info_hash)
 
+        updated_instances = [
+            share_instance for share_instance in ensurable_instances
+            if share_instance['id'] in update_share_instances
+        ]
+        snapshot_instances_to_update = (
+            self._get_snapshot_instances_with_pending_access_rules(
+                ctxt, [instance['id'] for instance in updated_instances]))
+
         shares_with_metadata_already_updated = set()
-        for share_instance in share_instances:
-            if share_instance['id'] not in update_share_instances:
-                continue
+        available_instance_ids = []
+        for share_instance in updated_instances:
             share_instance_update_dict = (
                 update_share_instances[share_instance['id']]
             )
@@ -541,7 +565,7 @@ class ShareManager(manager.SchedulerDependentManager):
                 self.db.export_locations_update(
                     ctxt, share_instance['id'], update_export_locations)
 
-            share_server = self._get_share_server(ctxt, share_instance)
+            share_server = share_servers.get(share_instance['share_server_id'])
             driver_has_to_reapply_access_rules = (
                 share_instance_update_dict.get('reapply_access_rules') is True
             )
@@ -565,41 +589,80 @@ class ShareManager(manager.SchedulerDependentManager):
                         {'s_id': share_instance['id']},
                     )
 
-            snapshot_instances = (
-                self.db.share_snapshot_instance_get_all_with_filters(
-                    ctxt, {'share_instance_ids': share_instance['id']},
-                    with_share_data=True))
-
-            for snap_instance in snapshot_instances:
-
-                rules = (
-                    self.db.
-                    share_snapshot_access_get_all_for_snapshot_instance(
-                        ctxt, snap_instance['id']))
-
-                # NOTE(ganso): We don't invoke update_access for snapshots if
-                # we don't have invalid rules or pending updates
-                if any(r['state'] in (constants.ACCESS_STATE_DENYING,
-                                      constants.ACCESS_STATE_QUEUED_TO_DENY,
-                                      constants.ACCESS_STATE_APPLYING,
-                                      constants.ACCESS_STATE_QUEUED_TO_APPLY)
-                       for r in rules):
-                    try:
-                        self.snapshot_access_helper.update_access_rules(
-                            ctxt, snap_instance['id'], share_server)
-                    except Exception:
-                        LOG.exception(
-                            "Unexpected error occurred while updating "
-                            "access rules for snapshot instance %s.",
-                            snap_instance['id'])
+            for snap_instance in snapshot_instances_to_update.get(
+                    share_instance['id'], []):
+                try:
+                    self.snapshot_access_helper.update_access_rules(
+                        ctxt, snap_instance['id'], share_server)
+                except Exception:
+                    LOG.exception(
+                        "Unexpected error occurred while updating "
+                        "access rules for snapshot instance %s.",
+                        snap_instance['id'])
             if not backend_provided_status and update_instances_status:
-                self.db.share_instance_update(
-                    ctxt, share_instance['id'],
-                    {'status': constants.STATUS_AVAILABLE}
-                )
+                available_instance_ids.append(share_instance['id'])
+        if available_instance_ids:
+            self.db.share_instance_status_update(
+                ctxt, available_instance_ids,
+                {'status': constants.STATUS_AVAILABLE})
         if do_service_status_update:
             self.db.service_update(ctxt, service['id'], {'ensuring': False})
 
+        stopwatch.stop()
+        LOG.info("Ensured %(count)s of %(total)s share instances on host "
+                 "%(host)s in %(elapsed).2f seconds.",
+                 {'count': len(ensurable_instances),
+                  'total': len(share_instances),
+                  'host': self.host,
+                  'elapsed': stopwatch.elapsed()})
+
+    def _get_share_servers_by_id(self, ctxt, share_instances):
+        """Fetch the share servers of the given instances in one query."""
+        share_server_ids = {
+            instance['share_server_id'] for instance in share_instances
+            if instance['share_server_id']
+        }
+        if not share_server_ids:
+            return {}
+        share_servers = self.db.share_server_get_all_with_filters(
+            ctxt, {'ids': list(share_server_ids)})
+        return {server['id']: server for server in share_servers}
+
+    def _get_snapshot_instances_with_pending_access_rules(
+            self, ctxt, share_instance_ids):
+        """Map share instance IDs to snapshot instances to be updated.
+
+        We don't invoke update_access for snapshots if we don't have invalid
+        rules or pending updates, so only snapshot instances with rules in
+        a transitional state are returned.
+        """
+        if not share_instance_ids:
+            return {}
+        snapshot_instances = (
+            self.db.share_snapshot_instance_get_all_with_filters(
+                ctxt, {'share_instance_ids': share_instance_ids}))
+        if not snapshot_instances:
+            return {}
+
+        pending_rules = (
+            self.db.share_snapshot_access_get_all_for_snapshot_instances(
+                ctxt, [si['id'] for si in snapshot_instances],
+                filters={'state': [constants.ACCESS_STATE_DENYING,
+                                   constants.ACCESS_STATE_QUEUED_TO_DENY,
+                                   constants.ACCESS_STATE_APPLYING,
+                                   constants.ACCESS_STATE_QUEUED_TO_APPLY]}))
+        pending_ids = {
+            rule['share_snapshot_instance_id'] for rule in pending_rules
+        }
+
+        snapshot_instances_to_update = {}
+        for snapshot_instance in snapshot_instances:
+            if snapshot_instance['id'] in pending_ids:
+                snapshot_instances_to_update.setdefault(
+                    snapshot_instance['share_instance_id'], []).append(
+                        snapshot_instance)
+        return snapshot_instances_to_update
+
     def _ensure_share(self, ctxt, share_instance):
         export_locations = None
         try:
@@ -2783,25 +2846,81 @@ class ShareManager(manager.SchedulerDependentManager):
         LOG.info("Share replica %s: promoted to active state "
                  "successfully.", share_replica['id'])
 
+    def _get_host_replicas(self, context):
+        """Get the non-active share replicas of this backend."""
+        # we will need: id, host, replica_state, share_id
+        replicas = self.db.share_replicas_get_all(
+            context, with_share_data=False, with_share_server=False,
+            host=share_utils.extract_host(self.host))
+        return [r for r in replicas
+                if r['replica_state'] != constants.REPLICA_STATE_ACTIVE]
+
+    def _run_concurrently(self, func, items):
+        """Call func on each of items with bounded concurrency."""
+        results = utils.run_concurrently(
+            func, items, self.configuration.replica_state_update_concurrency)
+        for item, (__, error) in zip(items, results):
+            if error is not None:
+                LOG.error("Failed to update the state of %(id)s: %(err)s",
+                          {'id': item['id'], 'err': error})
+
     @periodic_task.periodic_task(spacing=CONF.replica_state_update_interval)
     @utils.require_driver_initialized
     def periodic_share_replica_update(self, context):
         LOG.debug("Updating status of share replica instances.")
-        # we will need: id, host, replica_state, share_id
-        replicas = self.db.share_replicas_get_all(context,
-                                                  with_share_data=False,
-                                                  with_share_server=False)
+        replicas = self._get_host_replicas(context)
+        if not replicas:
+            return
 
-        # Filter only non-active replicas belonging to this backend
-        def qualified_replica(r):
-            return (share_utils.extract_host(r['host']) ==
-                    share_utils.extract_host(self.host) and
-                    r['replica_state'] != constants.REPLICA_STATE_ACTIVE)
+        if self._bulk_replica_state_update:
+            try:
+                self._share_replicas_bulk_update(context, replicas)
+                return
+            except NotImplementedError:
+                LOG.debug("Driver does not update the state of replicas in "
+                          "bulk, polling replicas one by one.")
+                self._bulk_replica_state_update = False
+
+        self._run_concurrently(
+            lambda replica: self._share_replica_update(
+                context, replica['id'], share_id=replica['share_id']),
+            replicas)
+
+    def _share_replicas_bulk_update(self, context, replicas):
+        replica_updates = []
+
+        def _get_replica_update(replica):
+            replica_update = self._get_share_replica_update(
+                context, replica['id'])
+            if replica_update:
+                replica_updates.append(replica_update)
+
+        self._run_concurrently(_get_replica_update, replicas)
+        if not replica_updates:
+            return
 
-        replicas = list(filter(lambda x: qualified_replica(x), replicas))
-        for replica in replicas:
-            self._share_replica_update(
-                context, replica['id'], share_id=replica['share_id'])
+        try:
+            replica_states = self.driver.update_replica_states(
+                context, replica_updates)
+        except NotImplementedError:
+            raise
+        except Exception as excep:
+            LOG.exception("Driver error when updating the replica state of "
+                          "%d replicas.", len(replica_updates))
+            for replica_update in replica_updates:
+                share_replica = replica_update['replica']
+                self._set_polled_share_replica_update_error(
+                    context, share_replica['id'], excep,
+                    share_id=share_replica['share_id'])
+            return
+
+        for replica_update in replica_updates:
+            share_replica = replica_update['replica']
+            replica_state = replica_states.get(share_replica['id'])
+            if replica_state:
+                self._set_polled_share_replica_state(
+                    context, share_replica['id'], replica_state,
+                    share_id=share_replica['share_id'])
 
     @add_hooks
     @utils.require_driver_initialized
@@ -2810,9 +2929,20 @@ class ShareManager(manager.SchedulerDependentManager):
         self._share_replica_update(
             context, share_replica_id, share_id=share_id)
 
-    @locked_share_replica_operation
-    def _share_replica_update(self, context, share_replica_id, share_id=None):
-        # share_id is used by the locked_share_replica_operation decorator
+    def _is_share_replica_pollable(self, share_replica):
+        # We don't poll for replicas that are busy in some operation,
+        # or if they are the 'active' instance.
+        return not (
+            share_replica['status'] in constants.TRANSITIONAL_STATUSES
+            or share_replica['status'] == constants.STATUS_ERROR_DELETING
+            or share_replica['replica_state'] ==
+            constants.REPLICA_STATE_ACTIVE)
+
+    def _get_share_replica_update(self, context, share_replica_id):
+        """Get the arguments to poll the replica_state of a replica with.
+
+        Returns None if the replica is not to be polled.
+        """
         # Grab the replica:
         try:
             # _get_share_instance_dict will fetch share server
@@ -2823,12 +2953,7 @@ class ShareManager(manager.SchedulerDependentManager):
             # Replica may have been deleted, nothing to do here
             return
 
-        # We don't poll for replicas that are busy in some operation,
-        # or if they are the 'active' instance.
-        if (share_replica['status'] in constants.TRANSITIONAL_STATUSES
-            or share_replica['status'] == constants.STATUS_ERROR_DELETING
-            or share_replica['replica_state'] ==
-                constants.REPLICA_STATE_ACTIVE):
+        if not self._is_share_replica_pollable(share_replica):
             return
 
         share_server = self._get_share_server(context, share_replica)
@@ -2880,38 +3005,100 @@ class ShareManager(manager.SchedulerDependentManager):
 
         share_replica = self._get_share_instance_dict(context, share_replica)
 
-        try:
-            replica_state = self.driver.update_replica_state(
-                context, replica_list, share_replica, access_rules,
-                available_share_snapshots, share_server=share_server)
-        except Exception as excep:
-            msg = ("Driver error when updating replica "
-                   "state for replica %s.")
-            LOG.exception(msg, share_replica['id'])
-            self.db.share_replica_update(
-                context, share_replica['id'],
-                {'replica_state': constants.STATUS_ERROR,
-                 'status': constants.STATUS_ERROR})
-            self.message_api.create(
-                context,
-                message_field.Action.UPDATE,
-                share_replica['project_id'],
-                resource_type=message_field.Resource.SHARE_REPLICA,
-                resource_id=share_replica['id'],
-                exception=excep)
-            return
+        return {
+            'replica_list': replica_list,
+            'replica': share_replica,
+            'access_rules': access_rules,
+            'replica_snapshots': available_share_snapshots,
+            'share_server': share_server,
+        }
 
+    def _set_share_replica_update_error(self, context, share_replica, excep):
+        self.db.share_replica_update(
+            context, share_replica['id'],
+            {'replica_state': constants.STATUS_ERROR,
+             'status': constants.STATUS_ERROR})
+        self.message_api.create(
+            context,
+            message_field.Action.UPDATE,
+            share_replica['project_id'],
+            resource_type=message_field.Resource.SHARE_REPLICA,
+            resource_id=share_replica['id'],
+            exception=excep)
+
+    def _set_share_replica_state(self, context, share_replica_id,
+                                 replica_state):
         if replica_state in (constants.REPLICA_STATE_IN_SYNC,
                              constants.REPLICA_STATE_OUT_OF_SYNC,
                              constants.STATUS_ERROR):
-            self.db.share_replica_update(context, share_replica['id'],
+            self.db.share_replica_update(context, share_replica_id,
                                          {'replica_state': replica_state})
         elif replica_state:
             msg = (("Replica %(id)s cannot be set to %(state)s "
                     "through update call.") %
-                   {'id': share_replica['id'], 'state': replica_state})
+                   {'id': share_replica_id, 'state': replica_state})
             LOG.warning(msg)
 
+    def _get_polled_share_replica(self, context, share_replica_id):
+        """Returns a replica polled without the lock if still pollable.
+
+        Returns None if another operation got hold of the replica in the
+        meantime.
+        """
+        try:
+            share_replica = self.db.share_replica_get(
+                context, share_replica_id, with_share_data=False,
+                with_share_server=False)
+        except exception.ShareReplicaNotFound:
+            return
+        if self._is_share_replica_pollable(share_replica):
+            return share_replica
+
+    @locked_share_replica_operation
+    def _set_polled_share_replica_state(self, context, share_replica_id,
+                                        replica_state, share_id=None):
+        # share_id is used by the locked_share_replica_operation decorator
+        if self._get_polled_share_replica(context, share_replica_id):
+            self._set_share_replica_state(
+                context, share_replica_id, replica_state)
+
+    @locked_share_replica_operation
+    def _set_polled_share_replica_update_error(self, context,
+                                               share_replica_id, excep,
+                                               share_id=None):
+        # share_id is used by the locked_share_replica_operation decorator
+        share_replica = self._get_polled_share_replica(
+            context, share_replica_id)
+        if share_replica:
+            self._set_share_replica_update_error(
+                context, share_replica, excep)
+
+    @locked_share_replica_operation
+    def _share_replica_update(self, context, share_replica_id, share_id=None):
+        # share_id is used by the locked_share_replica_operation decorator
+        replica_update = self._get_share_replica_update(
+            context, share_replica_id)
+        if not replica_update:
+            return
+        share_replica = replica_update['replica']
+
+        try:
+            replica_state = self.driver.update_replica_state(
+                context, replica_update['replica_list'], share_replica,
+                replica_update['access_rules'],
+                replica_update['replica_snapshots'],
+                share_server=replica_update['share_server'])
+        except Exception as excep:
+            msg = ("Driver error when updating replica "
+                   "state for replica %s.")
+            LOG.exception(msg, share_replica['id'])
+            self._set_share_replica_update_error(
+                context, share_replica, excep)
+            return
+
+        self._set_share_replica_state(
+            context, share_replica['id'], replica_state)
+
     def _validate_share_and_driver_mode(self, share_instance):
         driver_dhss = self.driver.driver_handles_share_servers
 
@@ -4318,47 +4505,46 @@ class ShareManager(manager.SchedulerDependentManager):
         LOG.debug("Updating status of share replica snapshots.")
         transitional_statuses = (constants.STATUS_CREATING,
                                  constants.STATUS_DELETING)
-        # we will need: id, host, replica_state
-        replicas = self.db.share_replicas_get_all(context,
-                                                  with_share_data=False,
-                                                  with_share_server=False)
-
-        def qualified_replica(r):
-            # Filter non-active replicas belonging to this backend
-            return (share_utils.extract_host(r['host']) ==
-                    share_utils.extract_host(self.host) and
-                    r['replica_state'] != constants.REPLICA_STATE_ACTIVE)
-
-        host_replicas = list(filter(
-            lambda x: qualified_replica(x), replicas))
-        transitional_replica_snapshots = []
-
-        # Get snapshot instances for each replica that are in 'creating' or
+        host_replicas = self._get_host_replicas(context)
+        if not host_replicas:
+            return
+
+        # Get snapshot instances of the replicas that are in 'creating' or
         # 'deleting' states.
-        for replica in host_replicas:
-            filters = {
-                'share_instance_ids': replica['id'],
-                'statuses': transitional_statuses,
-            }
-            # we will need: id, snapshot_id, share_instance_id and
-            # share['share_id']
-            replica_snapshots = (
-                self.db.share_snapshot_instance_get_all_with_filters(
-                    context, filters, with_share_data=True)
-            )
-            transitional_replica_snapshots.extend(replica_snapshots)
+        filters = {
+            'share_instance_ids': [r['id'] for r in host_replicas],
+            'statuses': transitional_statuses,
+        }
+        # we will need: id, snapshot_id, share_instance_id and
+        # share['share_id']
+        transitional_replica_snapshots = (
+            self.db.share_snapshot_instance_get_all_with_filters(
+                context, filters, with_share_data=True)
+        )
+        if not transitional_replica_snapshots:
+            return
 
-        for replica_snapshot in transitional_replica_snapshots:
-            replica_snapshots = (
-                self.db.share_snapshot_instance_get_all_with_filters(
-                    context,
-                    {'snapshot_ids': replica_snapshot['snapshot_id']},
-                    with_share_data=False)
-            )
-            share_id = replica_snapshot['share']['share_id']
-            self._update_replica_snapshot(
+        # Get all the instances of these snapshots at once.
+        snapshot_ids = list(dict.fromkeys(
+            s['snapshot_id'] for s in transitional_replica_snapshots))
+        snapshot_instances = (
+            self.db.share_snapshot_instance_get_all_with_filters(
+                context, {'snapshot_ids': snapshot_ids},
+                with_share_data=False)
+        )
+        instances_by_snapshot = {snapshot_id: [] for snapshot_id
+                                 in snapshot_ids}
+        for snapshot_instance in snapshot_instances:
+            instances_by_snapshot[snapshot_instance['snapshot_id']].append(
+                snapshot_instance)
+
+        self._run_concurrently(
+            lambda replica_snapshot: self._update_replica_snapshot(
                 context, replica_snapshot,
-                replica_snapshots=replica_snapshots, share_id=share_id)
+                replica_snapshots=instances_by_snapshot[
+                    replica_snapshot['snapshot_id']],
+                share_id=replica_snapshot['share']['share_id']),
+            transitional_replica_snapshots)
 
     @locked_share_replica_operation
     def _update_replica_snapshot(self, context, replica_snapshot,
@@ -4511,9 +4697,9 @@ class ShareManager(manager.SchedulerDependentManager):
     @add_hooks
     @utils.require_driver_initialized
     def publish_service_capabilities(self, context):
-        """Collect driver status and then publish it."""
+        """Collect driver status and then publish all of it."""
         self._report_driver_status(context)
-        self._publish_service_capabilities(context)
+        self._publish_service_capabilities(context, full_update=True)
 
     def _form_server_setup_info(self, context, share_server, share_network,
                                 share_network_subnets):
@@ -5304,8 +5490,14 @@ class ShareManager(manager.SchedulerDependentManager):
         }
         return export_location_ref
 
-    def _get_share_instance_dict(self, context, share_instance):
+    def _get_share_instance_dict(self, context, share_instance,
+                                 share_servers=None):
         # TODO(gouthamr): remove method when the db layer returns primitives
+        if share_servers is None:
+            share_server = self._get_share_server(context, share_instance)
+        else:
+            share_server = share_servers.get(
+                share_instance.get('share_server_id'))
         share_instance_ref = {
             'id': share_instance.get('id'),
             'name': share_instance.get('name'),
@@ -5323,7 +5515,7 @@ class ShareManager(manager.SchedulerDependentManager):
             'updated_at': share_instance.get('updated_at'),
             'deleted_at': share_instance.get('deleted_at'),
             'created_at': share_instance.get('created_at'),
-            'share_server': self._get_share_server(context, share_instance),
+            'share_server': share_server,
             'access_rules_status': share_instance.get('access_rules_status'),
             # Share details
             'user_id': share_instance.get('user_id'),
@@ -5594,11 +5786,16 @@ class ShareManager(manager.SchedulerDependentManager):
             except Exception:
                 LOG.exception("Gather share usage size failure.")
 
+        # The instances were loaded along with their shares, so the usage
+        # notifications need no further queries.
+        share_instances = {si['id']: si for si in share_instances}
         for si in updated_share_instances:
-            share_instance = self._get_share_instance(context, si['id'])
-            share = self.db.share_get(context, share_instance['share_id'])
+            share_instance = share_instances.get(si['id'])
+            if share_instance is None:
+                continue
             self._notify_about_share_usage(
-                context, share, share_instance, "consumed.size",
+                context, share_instance['share'], share_instance,
+                "consumed.size",
                 extra_usage_info={'used_size': si['used_size'],
                                   'gathered_at': si['gathered_at']})
 
@@ -5610,30 +5807,31 @@ class ShareManager(manager.SchedulerDependentManager):
         share_instances = self.db.share_instance_get_all_by_host(
             context, self.host, with_share_data=True,
             status=constants.STATUS_CREATING_FROM_SNAPSHOT)
+        if not share_instances:
+            return
 
-        for si in share_instances:
-            si_dict = self._get_share_instance_dict(context, si)
-            self._update_share_status(context, si_dict)
-
-    def _update_share_status(self, context, share_instance):
-        share_server = self._get_share_server(context, share_instance)
-        if share_server is not None:
-            share_server = self._get_share_server_dict(context,
-                                                       share_server)
+        share_servers = self._get_share_servers_by_id(context,
+                                                      share_instances)
+        share_instances = [
+            self._get_share_instance_dict(context, si,
+                                          share_servers=share_servers)
+            for si in share_instances]
         try:
-            data_updates = self.driver.get_share_status(share_instance,
-                                                        share_server)
+            share_updates = self.driver.get_share_statuses(context,
+                                                           share_instances)
         except Exception:
-            LOG.exception(
-                ("Unexpected driver error occurred while updating status for "
-                 "share instance %(id)s that belongs to share '%(share_id)s'"),
-                {'id': share_instance['id'],
-                 'share_id': share_instance['share_id']}
-            )
-            data_updates = {
-                'status': constants.STATUS_ERROR
-            }
+            LOG.exception("Unexpected driver error occurred while updating "
+                          "status of share instances. Retrying in the next "
+                          "periodic run.")
+            return
+
+        for share_instance in share_instances:
+            data_updates = share_updates.get(share_instance['id'])
+            if data_updates:
+                self._update_share_status(context, share_instance,
+                                          data_updates)
 
+    def _update_share_status(self, context, share_instance, data_updates):
         status = data_updates.get('status')
         if status == constants.STATUS_ERROR:
             msg = ("Status of share instance %(id)s that belongs to share "
@@ -318,8 +318,12 @@ class ShareAPI(object):
                           share_instance_ids=share_instance_ids,
                           share_server_id=share_server_id)
 
-    def publish_service_capabilities(self, context):
-        call_context = self.client.prepare(fanout=True, version='1.0')
+    def publish_service_capabilities(self, context, host=None):
+        if host:
+            call_context = self.client.prepare(
+                server=utils.extract_host(host), version='1.0')
+        else:
+            call_context = self.client.prepare(fanout=True, version='1.0')
         call_context.cast(context, 'publish_service_capabilities')
 
     def transfer_accept(self, ctxt, share, new_user,
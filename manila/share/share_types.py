@@ -30,6 +30,7 @@ from manila import db
 from manila import exception
 from manila.i18n import _
 from manila import quota
+from manila import utils
 
 CONF = cfg.CONF
 LOG = log.getLogger(__name__)
@@ -39,6 +40,23 @@ MIN_SIZE_KEY = "provisioning:min_share_size"
 MAX_SIZE_KEY = "provisioning:max_share_size"
 MAX_EXTEND_SIZE_KEY = "provisioning:max_share_extend_size"
 
+_CACHE = utils.DBCache('share types', 'share_type_cache_ttl')
+
+
+def _cache_key(ctxt, *args):
+    # Share type visibility depends on the project of non-admin requesters.
+    return (ctxt.is_admin, ctxt.project_id) + args
+
+
+def invalidate_cache():
+    """Drop share types cached by this process."""
+    _CACHE.invalidate()
+
+
+def get_cache_stats():
+    """Return the hit and miss counters of the share types cache."""
+    return _CACHE.get_stats()
+
 
 def create(context, name, extra_specs=None, is_public=True,
            projects=None, description=None):
@@ -65,6 +83,7 @@ def create(context, name, extra_specs=None, is_public=True,
         LOG.exception('DB error.')
         raise exception.ShareTypeCreateFailed(name=name,
                                               extra_specs=extra_specs)
+    invalidate_cache()
     return type_ref
 
 
@@ -92,6 +111,7 @@ def update(context, id, name, description, is_public=None):
     except db_exception.DBError:
         LOG.exception('DB error.')
         raise exception.ShareTypeUpdateFailed(id=id)
+    invalidate_cache()
 
 
 def destroy(context, id):
@@ -101,6 +121,7 @@ def destroy(context, id):
         raise exception.InvalidShareType(reason=msg)
     else:
         db.share_type_destroy(context, id)
+        invalidate_cache()
 
 
 def get_all_types(context, inactive=0, search_opts=None):
@@ -113,7 +134,9 @@ def get_all_types(context, inactive=0, search_opts=None):
     if 'is_public' in search_opts:
         filters['is_public'] = search_opts.pop('is_public')
 
-    share_types = db.share_type_get_all(context, inactive, filters=filters)
+    share_types = _CACHE.get(
+        _cache_key(context, 'all', inactive, filters.get('is_public')),
+        lambda: db.share_type_get_all(context, inactive, filters=filters))
 
     for type_name, type_args in share_types.items():
         required_extra_specs = {}
@@ -193,7 +216,9 @@ def get_share_type(ctxt, id, expected_fields=None):
     if ctxt is None:
         ctxt = context.get_admin_context()
 
-    return db.share_type_get(ctxt, id, expected_fields=expected_fields)
+    return _CACHE.get(
+        _cache_key(ctxt, 'id', id, tuple(expected_fields or ())),
+        lambda: db.share_type_get(ctxt, id, expected_fields=expected_fields))
 
 
 def get_share_type_by_name(context, name):
@@ -204,7 +229,8 @@ def get_share_type_by_name(context, name):
     if not isinstance(name, str):
         msg = _("the share type's name parameter was badly formatted")
         raise exception.InvalidShareType(reason=msg)
-    return db.share_type_get_by_name(context, name)
+    return _CACHE.get(_cache_key(context, 'name', name),
+                      lambda: db.share_type_get_by_name(context, name))
 
 
 def get_share_type_by_name_or_id(context, share_type=None):
@@ -406,7 +432,9 @@ def add_share_type_access(context, share_type_id, project_id):
     if share_type_id is None:
         msg = _("share_type_id cannot be None")
         raise exception.InvalidShareType(reason=msg)
-    return db.share_type_access_add(context, share_type_id, project_id)
+    access = db.share_type_access_add(context, share_type_id, project_id)
+    invalidate_cache()
+    return access
 
 
 def remove_share_type_access(context, share_type_id, project_id):
@@ -414,7 +442,9 @@ def remove_share_type_access(context, share_type_id, project_id):
     if share_type_id is None:
         msg = _("share_type_id cannot be None")
         raise exception.InvalidShareType(reason=msg)
-    return db.share_type_access_remove(context, share_type_id, project_id)
+    access = db.share_type_access_remove(context, share_type_id, project_id)
+    invalidate_cache()
+    return access
 
 
 def get_extra_specs_from_share(share):
@@ -20,10 +20,28 @@ from manila import context
 from manila import db
 from manila import exception
 from manila.i18n import _
+from manila import utils
 
 CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
+_CACHE = utils.DBCache('share group types', 'share_type_cache_ttl')
+
+
+def _cache_key(ctxt, *args):
+    # Group type visibility depends on the project of non-admin requesters.
+    return (ctxt.is_admin, ctxt.project_id) + args
+
+
+def invalidate_cache():
+    """Drop share group types cached by this process."""
+    _CACHE.invalidate()
+
+
+def get_cache_stats():
+    """Return the hit and miss counters of the share group types cache."""
+    return _CACHE.get_stats()
+
 
 def create(context, name, share_types, group_specs=None, is_public=True,
            projects=None):
@@ -40,6 +58,7 @@ def create(context, name, share_types, group_specs=None, is_public=True,
         LOG.exception('DB error')
         raise exception.ShareGroupTypeCreateFailed(
             name=name, group_specs=group_specs)
+    invalidate_cache()
     return type_ref
 
 
@@ -50,6 +69,7 @@ def destroy(context, type_id):
         raise exception.InvalidShareGroupType(reason=msg)
     else:
         db.share_group_type_destroy(context, type_id)
+        invalidate_cache()
 
 
 def get_all(context, inactive=0, search_opts=None):
@@ -60,8 +80,10 @@ def get_all(context, inactive=0, search_opts=None):
     if 'is_public' in search_opts:
         filters['is_public'] = search_opts.pop('is_public')
 
-    share_group_types = db.share_group_type_get_all(
-        context, inactive, filters=filters)
+    share_group_types = _CACHE.get(
+        _cache_key(context, 'all', inactive, filters.get('is_public')),
+        lambda: db.share_group_type_get_all(
+            context, inactive, filters=filters))
 
     if search_opts:
         LOG.debug("Searching by: %s", search_opts)
@@ -102,8 +124,10 @@ def get(ctxt, type_id, expected_fields=None):
     if ctxt is None:
         ctxt = context.get_admin_context()
 
-    return db.share_group_type_get(
-        ctxt, type_id, expected_fields=expected_fields)
+    return _CACHE.get(
+        _cache_key(ctxt, 'id', type_id, tuple(expected_fields or ())),
+        lambda: db.share_group_type_get(
+            ctxt, type_id, expected_fields=expected_fields))
 
 
 def get_by_name(context, name):
@@ -112,7 +136,9 @@ def get_by_name(context, name):
         msg = _("name cannot be None.")
         raise exception.InvalidShareGroupType(reason=msg)
 
-    return db.share_group_type_get_by_name(context, name)
+    return _CACHE.get(
+        _cache_key(context, 'name', name),
+        lambda: db.share_group_type_get_by_name(context, name))
 
 
 def get_by_name_or_id(context, share_group_type=None):
@@ -159,8 +185,10 @@ def add_share_group_type_access(context, share_group_type_id, project_id):
     if share_group_type_id is None:
         msg = _("share_group_type_id cannot be None.")
         raise exception.InvalidShareGroupType(reason=msg)
-    return db.share_group_type_access_add(
+    access = db.share_group_type_access_add(
         context, share_group_type_id, project_id)
+    invalidate_cache()
+    return access
 
 
 def remove_share_group_type_access(context, share_group_type_id, project_id):
@@ -168,5 +196,7 @@ def remove_share_group_type_access(context, share_group_type_id, project_id):
     if share_group_type_id is None:
         msg = _("share_group_type_id cannot be None.")
         raise exception.InvalidShareGroupType(reason=msg)
-    return db.share_group_type_access_remove(
+    access = db.share_group_type_access_remove(
         context, share_group_type_id, project_id)
+    invalidate_cache()
+    return access
@@ -202,7 +202,8 @@ def stub_snapshot_delete(self, context, *args, **param):
 
 def stub_snapshot_get_all_by_project(self, context, search_opts=None,
                                      limit=None, offset=None,
-                                     sort_key=None, sort_dir=None):
+                                     sort_key=None, sort_dir=None,
+                                     marker=None):
     return [stub_snapshot_get(self, context, 2)]
 
 
@@ -216,3 +216,48 @@ class MessageApiTest(test.TestCase):
 
         self.assertRaises(exception.ValidationError,
                           self.controller.index, req)
+
+    def test_index_with_marker(self):
+        msg = stubs.stub_message(fakes.get_fake_uuid())
+        self.mock_object(message_api.API, 'get_all', mock.Mock(
+                         return_value=[msg]))
+        req = fakes.HTTPRequest.blank(
+            '/messages?limit=1&marker=fake_marker',
+            version=messages.MESSAGES_QUERY_BY_MARKER,
+            base_url='http://localhost/share/v2')
+        req.environ['manila.context'] = self.ctxt
+
+        res_dict = self.controller.index(req)
+
+        self.assertEqual([msg['id']],
+                         [m['id'] for m in res_dict['messages']])
+        message_api.API.get_all.assert_called_once_with(
+            self.ctxt, search_opts=mock.ANY, limit=1, offset=None,
+            sort_key='created_at', sort_dir='desc', marker='fake_marker')
+
+    def test_index_with_marker_pre_microversion(self):
+        self.mock_object(message_api.API, 'get_all', mock.Mock(
+                         return_value=[]))
+        req = fakes.HTTPRequest.blank(
+            '/messages?marker=fake_marker',
+            version=messages.MESSAGES_QUERY_BY_TIMESTAMP,
+            base_url='http://localhost/share/v2')
+        req.environ['manila.context'] = self.ctxt
+
+        self.controller.index(req)
+
+        message_api.API.get_all.assert_called_once_with(
+            self.ctxt, search_opts=mock.ANY, limit=None, offset=None,
+            sort_key='created_at', sort_dir='desc', marker=None)
+
+    def test_index_with_marker_not_found(self):
+        self.mock_object(message_api.API, 'get_all', mock.Mock(
+            side_effect=exception.MarkerNotFound(marker='fake_marker')))
+        req = fakes.HTTPRequest.blank(
+            '/messages?marker=fake_marker',
+            version=messages.MESSAGES_QUERY_BY_MARKER,
+            base_url='http://localhost/share/v2')
+        req.environ['manila.context'] = self.ctxt
+
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.index, req)
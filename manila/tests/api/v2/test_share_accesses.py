@@ -174,6 +174,32 @@ class ShareAccessesAPITest(test.TestCase):
         self.assertEqual(
             is_rule_restricted, result_rule_restricted)
 
+    @ddt.data(('2.89', {}),
+              ('2.90', {'limit': 1, 'marker': 'fake_marker'}))
+    @ddt.unpack
+    def test_list_accesses_paginated(self, version, expected_filters):
+        req = self._get_index_request(
+            filters='&limit=1&marker=fake_marker', version=version)
+        self.mock_object(
+            self.controller.share_api, 'access_get_all',
+            mock.Mock(return_value=[]))
+
+        self.controller.index(req)
+
+        self.controller.share_api.access_get_all.assert_called_once_with(
+            req.environ['manila.context'], mock.ANY, expected_filters)
+
+    def test_list_accesses_marker_not_found(self):
+        req = self._get_index_request(
+            filters='&marker=fake_marker', version='2.90')
+        self.mock_object(
+            self.controller.share_api, 'access_get_all',
+            mock.Mock(side_effect=exception.MarkerNotFound(
+                marker='fake_marker')))
+
+        self.assertRaises(
+            exc.HTTPBadRequest, self.controller.index, req)
+
     def test_list_accesses_share_not_found(self):
         self.assertRaises(
             exc.HTTPBadRequest,
@@ -133,6 +133,49 @@ class ShareInstancesAPITest(test.TestCase):
         self.mock_policy_check.assert_called_once_with(
             req_context, self.resource_name, 'index')
 
+    def test_index_with_limit_and_marker(self):
+        test_instances = [
+            db_utils.create_share(size=s + 1).instance for s in range(5)
+        ]
+        expected_ids = [
+            i['id'] for i in db.share_instance_get_all(
+                self.admin_context, {'limit': 5})]
+
+        url = '/v2/fake/share_instances?limit=2'
+        actual_ids = []
+        for page in range(3):
+            req = self._get_request(url, version='2.90')
+            result = self.controller.index(req)['share_instances']
+            actual_ids.extend(i['id'] for i in result)
+            if result:
+                url = ('/v2/fake/share_instances?limit=2&marker=%s' %
+                       result[-1]['id'])
+
+        self.assertEqual(5, len(expected_ids))
+        self.assertEqual(sorted(i['id'] for i in test_instances),
+                         sorted(expected_ids))
+        self.assertEqual(expected_ids, actual_ids)
+
+    @ddt.data('2.69', '2.89')
+    def test_index_with_marker_unsupported(self, version):
+        test_instances = [
+            db_utils.create_share(size=s + 1).instance for s in range(2)
+        ]
+        url = '/v2/fake/share_instances?limit=1&marker=%s' % (
+            test_instances[0]['id'])
+        req = self._get_request(url, version=version)
+
+        actual_result = self.controller.index(req)
+
+        self.assertEqual(2, len(actual_result['share_instances']))
+
+    def test_index_with_marker_not_found(self):
+        url = '/v2/fake/share_instances?marker=fake_marker'
+        req = self._get_request(url, version='2.90')
+
+        self.assertRaises(webob_exc.HTTPBadRequest,
+                          self.controller.index, req)
+
     @ddt.data('2.3', '2.54', '2.71')
     def test_show(self, version):
         test_instance = db_utils.create_share(size=1).instance
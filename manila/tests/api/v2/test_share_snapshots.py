@@ -202,6 +202,7 @@ class ShareSnapshotAPITest(test.TestCase):
         if (api_version.APIVersionRequest(version) >=
                 api_version.APIVersionRequest('2.79')):
             search_opts.update({'with_count': 'true'})
+        search_opts['marker'] = 'fake_marker'
 
         # fake_key should be filtered for non-admin
         url = '/v2/fake/snapshots?fake_key=fake_value'
@@ -239,6 +240,10 @@ class ShareSnapshotAPITest(test.TestCase):
             search_opts_expected['display_name'] = search_opts['name']
         if use_admin_context:
             search_opts_expected.update({'fake_key': 'fake_value'})
+        expected_marker = None
+        if (api_version.APIVersionRequest(version) >=
+                api_version.APIVersionRequest('2.90')):
+            expected_marker = search_opts['marker']
 
         mock_get_all_snapshots.assert_called_once_with(
             req.environ['manila.context'],
@@ -247,6 +252,7 @@ class ShareSnapshotAPITest(test.TestCase):
             sort_key=search_opts['sort_key'],
             sort_dir=search_opts['sort_dir'],
             search_opts=search_opts_expected,
+            marker=expected_marker,
         )
         self.assertEqual(1, len(result['snapshots']))
         self.assertEqual(db_snapshots[1]['id'], result['snapshots'][0]['id'])
@@ -259,9 +265,11 @@ class ShareSnapshotAPITest(test.TestCase):
     @ddt.data({'version': '2.35', 'use_admin_context': True},
               {'version': '2.36', 'use_admin_context': True},
               {'version': '2.79', 'use_admin_context': True},
+              {'version': '2.90', 'use_admin_context': True},
               {'version': '2.35', 'use_admin_context': False},
               {'version': '2.36', 'use_admin_context': False},
-              {'version': '2.79', 'use_admin_context': False})
+              {'version': '2.79', 'use_admin_context': False},
+              {'version': '2.90', 'use_admin_context': False})
     @ddt.unpack
     def test_snapshot_list_summary_with_search_opts(self, version,
                                                     use_admin_context):
@@ -304,6 +312,7 @@ class ShareSnapshotAPITest(test.TestCase):
             sort_key=search_opts['sort_key'],
             sort_dir=search_opts['sort_dir'],
             search_opts=search_opts_expected,
+            marker=None,
         )
         self.assertEqual(1, len(result['snapshots']))
         self.assertEqual(snapshots[0]['id'], result['snapshots'][0]['id'])
@@ -368,6 +377,7 @@ class ShareSnapshotAPITest(test.TestCase):
             sort_key=search_opts['sort_key'],
             sort_dir=search_opts['sort_dir'],
             search_opts=search_opts_expected,
+            marker=None,
         )
         self.assertEqual(1, len(result['snapshots']))
         self.assertEqual(db_snapshots[1]['id'], result['snapshots'][0]['id'])
@@ -1076,3 +1076,28 @@ class ShareTypeAccessTest(test.TestCase):
         self.assertRaises(webob.exc.HTTPNotFound,
                           self.controller._remove_project_access,
                           req, '777', body)
+
+
+class ShareTypesCacheAPITest(test.TestCase):
+
+    def setUp(self):
+        super(ShareTypesCacheAPITest, self).setUp()
+        self.controller = types.ShareTypesController()
+        self.mock_object(policy, 'check_policy',
+                         mock.Mock(return_value=True))
+        self.flags(share_type_cache_ttl=30)
+        share_types.invalidate_cache()
+        self.addCleanup(share_types.invalidate_cache)
+
+    def test_share_types_show_after_delete(self):
+        share_type = share_types.create(
+            context.get_admin_context(), 'cached_type',
+            {constants.ExtraSpecs.DRIVER_HANDLES_SHARE_SERVERS: 'true'})
+        req = fakes.HTTPRequest.blank(
+            '/v2/fake/types/%s' % share_type['id'], use_admin_context=True)
+        self.controller.show(req, share_type['id'])
+
+        self.controller._delete(req, share_type['id'])
+
+        self.assertRaises(webob.exc.HTTPNotFound, self.controller.show,
+                          req, share_type['id'])
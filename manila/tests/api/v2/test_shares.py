@@ -1769,7 +1769,9 @@ class ShareAPITest(test.TestCase):
               {'use_admin_context': True, 'version': '2.42'},
               {'use_admin_context': False, 'version': '2.42'},
               {'use_admin_context': False, 'version': '2.69'},
-              {'use_admin_context': True, 'version': '2.69'})
+              {'use_admin_context': True, 'version': '2.69'},
+              {'use_admin_context': False, 'version': '2.90'},
+              {'use_admin_context': True, 'version': '2.90'})
     @ddt.unpack
     def test_share_list_summary_with_search_opts(self, use_admin_context,
                                                  version):
@@ -1786,6 +1788,7 @@ class ShareAPITest(test.TestCase):
             'sort_dir': 'fake_sort_dir',
             'limit': '1',
             'offset': '1',
+            'marker': 'fake_marker',
             'is_public': 'False',
             'export_location_id': 'fake_export_location_id',
             'export_location_path': 'fake_export_location_path',
@@ -1853,6 +1856,9 @@ class ShareAPITest(test.TestCase):
                 api_version.APIVersionRequest('2.69')):
             search_opts_expected['is_soft_deleted'] = (
                 search_opts['is_soft_deleted'])
+        if (api_version.APIVersionRequest(version) >=
+                api_version.APIVersionRequest('2.90')):
+            search_opts_expected['marker'] = search_opts['marker']
 
         policy.check_policy.assert_called_once_with(
             req.environ['manila.context'],
@@ -1918,6 +1924,15 @@ class ShareAPITest(test.TestCase):
         self.assertEqual(0, len(result['shares']))
         self.assertEqual(0, result['count'])
 
+    def test_share_list_summary_marker_not_found(self):
+        req = fakes.HTTPRequest.blank('/v2/fake/shares?marker=fake_marker',
+                                      version='2.90')
+        self.mock_object(share_api.API, 'get_all', mock.Mock(
+            side_effect=exception.MarkerNotFound(marker='fake_marker')))
+
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.index, req)
+
     def test_share_list_summary(self):
         self.mock_object(share_api.API, 'get_all',
                          stubs.stub_share_get_all_by_project)
@@ -194,6 +194,16 @@ class NovaApiTestCase(test.TestCase):
                                         'fake_flavor', None, None, None)
         self.assertEqual('created_id', result['id'])
 
+    def test_server_list(self):
+        self.mock_object(self.novaclient.servers, 'list',
+                         mock.Mock(return_value=[{'id': 'id1'}]))
+
+        result = self.api.server_list(self.ctx, {'name': 'fake_name'})
+
+        self.assertEqual([{'id': 'id1'}], result)
+        self.novaclient.servers.list.assert_called_once_with(
+            search_opts={'name': 'fake_name'})
+
     def test_server_delete(self):
         self.mock_object(self.novaclient.servers, 'delete')
         self.api.server_delete(self.ctx, 'id1')
@@ -280,6 +290,14 @@ class NovaApiTestCase(test.TestCase):
         self.novaclient.servers.update.assert_called_once_with('id1',
                                                                name='new_name')
 
+    def test_server_interface_attach(self):
+        self.mock_object(self.novaclient.servers, 'interface_attach')
+
+        self.api.server_interface_attach(self.ctx, 'id1', 'fake_port_id')
+
+        self.novaclient.servers.interface_attach.assert_called_once_with(
+            'id1', 'fake_port_id', None, None)
+
     def test_keypair_import(self):
         self.mock_object(self.novaclient.keypairs, 'create')
         self.api.keypair_import(self.ctx, 'keypair_name', 'fake_pub_key')
@@ -16,6 +16,9 @@
 Tests For Data Manager
 """
 
+import os
+import shutil
+import tempfile
 from unittest import mock
 
 import ddt
@@ -53,6 +56,7 @@ class DataManagerTestCase(test.TestCase):
         manager.CONF.set_default(
             'backup_driver',
             'manila.tests.fake_backup_driver.FakeBackupDriver')
+        self.flags(resume_data_copies=True)
 
     def test_init(self):
         manager = self.manager
@@ -82,6 +86,160 @@ class DataManagerTestCase(test.TestCase):
             utils.IsAMatcher(context.RequestContext), share['id'],
             {'task_state': constants.TASK_STATE_DATA_COPYING_ERROR})
 
+    def test_init_host_resume(self):
+        share = db_utils.create_share(
+            task_state=constants.TASK_STATE_DATA_COPYING_IN_PROGRESS)
+        backup = db_utils.create_backup(
+            share['id'], status=constants.STATUS_CREATING)
+        self.manager._save_copy_operation(
+            self.context, share['id'], 'backup', backup_id=backup['id'])
+
+        # mocks
+        self.mock_object(db, 'share_get_all', mock.Mock(
+            return_value=[share]))
+        self.mock_object(db, 'share_update')
+        self.mock_object(manager.eventlet, 'spawn_n')
+
+        # run
+        self.manager.init_host()
+
+        # asserts
+        self.assertFalse(db.share_update.called)
+        self.assertEqual({share['id']}, self.manager.resuming_shares)
+        manager.eventlet.spawn_n.assert_called_once_with(
+            self.manager._run_resumed_copy,
+            utils.IsAMatcher(context.RequestContext), share['id'],
+            self.manager.create_backup, backup=mock.ANY)
+        self.assertEqual(
+            backup['id'],
+            manager.eventlet.spawn_n.call_args[1]['backup']['id'])
+
+    def test_init_host_resume_migration(self):
+        share = db_utils.create_share(
+            task_state=constants.TASK_STATE_DATA_COPYING_STARTING)
+        info = {'mount': 'mount_cmd', 'unmount': 'unmount_cmd'}
+        self.manager._save_copy_operation(
+            self.context, share['id'], 'migration', ignore_list=['item'],
+            share_instance_id='ins1_id', dest_share_instance_id='ins2_id',
+            connection_info_src=info, connection_info_dest=info)
+
+        # mocks
+        self.mock_object(db, 'share_get_all', mock.Mock(
+            return_value=[share]))
+        self.mock_object(manager.eventlet, 'spawn_n')
+
+        # run
+        self.manager.init_host()
+
+        # asserts
+        manager.eventlet.spawn_n.assert_called_once_with(
+            self.manager._run_resumed_copy,
+            utils.IsAMatcher(context.RequestContext), share['id'],
+            self.manager.migration_start, ignore_list=['item'],
+            share_id=share['id'], share_instance_id='ins1_id',
+            dest_share_instance_id='ins2_id', connection_info_src=info,
+            connection_info_dest=info)
+
+    @ddt.data(True, False)
+    def test_init_host_not_resumed(self, resume_data_copies):
+        self.flags(resume_data_copies=resume_data_copies)
+        share = db_utils.create_share(
+            task_state=constants.TASK_STATE_DATA_COPYING_IN_PROGRESS)
+        backup = db_utils.create_backup(
+            share['id'], status=constants.STATUS_CREATING)
+        self.manager._save_copy_operation(
+            self.context, share['id'], 'backup', backup_id=backup['id'])
+        if resume_data_copies:
+            # The data copy was started by another data service.
+            self.manager.host = 'other_host'
+
+        # mocks
+        self.mock_object(db, 'share_get_all', mock.Mock(
+            return_value=[share]))
+        self.mock_object(db, 'share_update')
+        self.mock_object(manager.eventlet, 'spawn_n')
+
+        # run
+        self.manager.init_host()
+
+        # asserts
+        self.assertFalse(manager.eventlet.spawn_n.called)
+        db.share_update.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), share['id'],
+            {'task_state': constants.TASK_STATE_DATA_COPYING_ERROR})
+
+    @ddt.data(None, exception.ShareDataCopyFailed(reason='fake'))
+    def test__run_resumed_copy(self, exc):
+        func = mock.Mock(side_effect=exc)
+        self.manager.resuming_shares.add('share_id')
+
+        self.manager._run_resumed_copy(
+            self.context, 'share_id', func, backup='fake_backup')
+
+        func.assert_called_once_with(self.context, backup='fake_backup')
+        self.assertEqual(set(), self.manager.resuming_shares)
+
+    def test__save_copy_operation_error(self):
+        self.mock_object(db, 'async_operation_data_update',
+                         mock.Mock(side_effect=Exception('fake')))
+        mock_log = self.mock_object(manager, 'LOG')
+
+        self.manager._save_copy_operation(
+            self.context, self.share['id'], 'backup', backup_id='fake')
+
+        self.assertTrue(mock_log.exception.called)
+
+    def test__save_copy_operation_disabled(self):
+        self.flags(resume_data_copies=False)
+        self.mock_object(db, 'async_operation_data_update')
+
+        self.manager._save_copy_operation(
+            self.context, self.share['id'], 'backup', backup_id='fake')
+
+        self.assertFalse(db.async_operation_data_update.called)
+
+    def test__save_copy_operation_too_large(self):
+        self.manager._save_copy_operation(
+            self.context, self.share['id'], 'backup', backup_id='fake')
+        mock_log = self.mock_object(manager, 'LOG')
+        info = {'mount': 'mount_cmd ' + 'a' * 1000, 'unmount': 'unmount_cmd'}
+
+        self.manager._save_copy_operation(
+            self.context, self.share['id'], 'migration', ignore_list=[],
+            share_instance_id='ins1_id', dest_share_instance_id='ins2_id',
+            connection_info_src=info, connection_info_dest=info)
+
+        self.assertTrue(mock_log.error.called)
+        self.assertIsNone(db.async_operation_data_get(
+            self.context, self.share['id'], manager.COPY_OPERATION_KEY))
+
+    def test__clear_copy_operation(self):
+        self.manager._save_copy_operation(
+            self.context, self.share['id'], 'backup', backup_id='fake')
+
+        self.manager._clear_copy_operation(self.context, self.share['id'])
+
+        self.assertIsNone(db.async_operation_data_get(
+            self.context, self.share['id'], manager.COPY_OPERATION_KEY))
+
+    def test_create_share_backup_continue_resuming(self):
+        share_info = db_utils.create_share(
+            status=constants.STATUS_BACKUP_CREATING)
+        backup_info = db_utils.create_backup(
+            share_info['id'], status=constants.STATUS_CREATING)
+        self.manager.resuming_shares.add(share_info['id'])
+
+        # mocks
+        self.mock_object(db, 'share_backups_get_all',
+                         mock.Mock(return_value=[backup_info]))
+        self.mock_object(db, 'share_backup_update')
+        self.mock_object(self.manager, 'data_copy_get_progress')
+
+        self.manager.create_backup_continue(self.context)
+
+        self.assertFalse(self.manager.data_copy_get_progress.called)
+        self.assertFalse(db.share_backup_update.called)
+
     @ddt.data(None, Exception('fake'), exception.ShareDataCopyCancelled())
     def test_migration_start(self, exc):
 
@@ -467,6 +625,40 @@ class DataManagerTestCase(test.TestCase):
         helper.DataServiceHelper.cleanup_temp_folder.assert_has_calls([
             mock.call('/tmp/', 'ins2_id'), mock.call('/tmp/', 'ins1_id')])
 
+    def test__get_copy_rootwrap(self):
+        self.flags(data_copy_engine='rootwrap')
+
+        copy = self.manager._get_copy('/src', '/dest', ['item'], True)
+
+        self.assertIs(data_utils.Copy, type(copy))
+        self.assertTrue(copy.check_hash)
+
+    @ddt.data(('read-back', True), ('trust-on-write', False))
+    @ddt.unpack
+    def test__get_copy_native(self, check_hash_mode, verify_written):
+        self.flags(data_copy_engine='native', data_copy_workers=4,
+                   check_hash_mode=check_hash_mode)
+
+        copy = self.manager._get_copy('/src', '/dest', ['item'])
+
+        self.assertIsInstance(copy, data_utils.ParallelCopy)
+        self.assertEqual(4, copy.workers)
+        self.assertFalse(copy.check_hash)
+        self.assertEqual(verify_written, copy.verify_written)
+        self.assertIsNone(copy.throttle)
+
+    @ddt.data((None, 100), (200, 200))
+    @ddt.unpack
+    def test__get_copy_native_throttled(self, max_bytes_per_second,
+                                        expected):
+        self.flags(data_copy_engine='native',
+                   data_copy_max_bytes_per_second=100)
+
+        copy = self.manager._get_copy(
+            '/src', '/dest', [], max_bytes_per_second=max_bytes_per_second)
+
+        self.assertEqual(expected, copy.throttle.max_bytes_per_second)
+
     def test_data_copy_cancel(self):
 
         share = db_utils.create_share()
@@ -642,6 +834,59 @@ class DataManagerTestCase(test.TestCase):
         else:
             self.manager._run_backup(self.context, backup_info, share_info)
 
+    def test__run_backup_incremental(self):
+        share_info = db_utils.create_share(status=constants.STATUS_AVAILABLE)
+        parent_info = db_utils.create_backup(
+            share_info['id'], status=constants.STATUS_AVAILABLE, size=2)
+        backup_info = db_utils.create_backup(
+            share_info['id'], status=constants.STATUS_CREATING, size=2)
+        share_instance = {
+            'export_locations': [{
+                'path': 'test_path',
+                "is_admin_only": False
+                }, ],
+            'share_proto': 'nfs',
+        }
+
+        # mocks
+        self.mock_object(db, 'share_instance_get',
+                         mock.Mock(return_value=share_instance))
+        self.mock_object(self.manager.backup_driver, 'get_backup_info',
+                         mock.Mock(return_value={
+                             'mount': 'mount %(path)s',
+                             'unmount': 'umount %(path)s',
+                             'incremental': True,
+                             'chunk_size': 1024,
+                             'compression': 'gzip',
+                             'max_bytes_per_second': 1000}))
+        self.mock_object(self.manager, '_copy_share_data')
+
+        self.manager._run_backup(self.context, backup_info, share_info)
+
+        copy = self.manager._copy_share_data.call_args[0][1]
+        self.assertIsInstance(copy, data_utils.ChunkedBackupCopy)
+        self.assertEqual(parent_info['id'], copy.parent_id)
+        self.assertEqual(1024, copy.chunk_size)
+        self.assertEqual('gzip', copy.compression)
+        self.assertEqual(1000, copy.throttle.max_bytes_per_second)
+        self.assertEqual(
+            '/tmp/%s' % backup_info['id'], copy.repository)
+
+    def test__get_latest_backup(self):
+        share_info = db_utils.create_share(status=constants.STATUS_AVAILABLE)
+        backup_info = db_utils.create_backup(
+            share_info['id'], status=constants.STATUS_CREATING, size=2)
+
+        self.assertIsNone(
+            self.manager._get_latest_backup(self.context, backup_info))
+
+        parent_info = db_utils.create_backup(
+            share_info['id'], status=constants.STATUS_AVAILABLE, size=2)
+
+        self.assertEqual(
+            parent_info['id'],
+            self.manager._get_latest_backup(self.context, backup_info)['id'])
+
     def test_delete_share_backup(self):
         share_info = db_utils.create_share(status=constants.STATUS_AVAILABLE)
         backup_info = db_utils.create_backup(
@@ -811,3 +1056,68 @@ class DataManagerTestCase(test.TestCase):
                               backup_info, share_info)
         else:
             self.manager._run_restore(self.context, backup_info, share_info)
+
+    @ddt.data(True, False)
+    def test__run_restore_chunked(self, incremental):
+        share_info = db_utils.create_share(status=constants.STATUS_AVAILABLE)
+        backup_info = db_utils.create_backup(
+            share_info['id'], status=constants.STATUS_AVAILABLE, size=2)
+        share_instance = {
+            'export_locations': [{
+                'path': 'test_path',
+                "is_admin_only": False
+                }, ],
+            'share_proto': 'nfs',
+        }
+
+        # mocks
+        self.mock_object(db, 'share_instance_get',
+                         mock.Mock(return_value=share_instance))
+        self.mock_object(self.manager.backup_driver, 'get_backup_info',
+                         mock.Mock(return_value={
+                             'mount': 'mount %(path)s',
+                             'unmount': 'umount %(path)s',
+                             'incremental': incremental,
+                             'chunk_size': 1024}))
+        self.mock_object(self.manager, '_copy_share_data')
+
+        self.manager._run_restore(self.context, backup_info, share_info)
+
+        copy = self.manager._copy_share_data.call_args[0][1]
+        self.assertIsInstance(copy, data_utils.ChunkedRestoreCopy)
+        self.assertEqual(backup_info['id'], copy.backup_id)
+
+    def test__run_restore_incremental_disabled_after_backup(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.flags(mount_tmp_location=os.path.join(tmp_dir, 'shares'),
+                   backup_mount_tmp_location=os.path.join(tmp_dir, 'backups'))
+        share_info = db_utils.create_share(status=constants.STATUS_AVAILABLE)
+        backup_info = db_utils.create_backup(
+            share_info['id'], status=constants.STATUS_CREATING, size=2)
+        share_path = os.path.join(tmp_dir, 'shares', share_info.instance['id'])
+        os.makedirs(share_path)
+        os.makedirs(os.path.join(tmp_dir, 'backups', backup_info['id']))
+        with open(os.path.join(share_path, 'file'), 'w') as f:
+            f.write('fake_data')
+        backup_info_mock = self.mock_object(
+            self.manager.backup_driver, 'get_backup_info',
+            mock.Mock(return_value={'mount': 'mount %(path)s',
+                                    'unmount': 'umount %(path)s',
+                                    'incremental': True,
+                                    'chunk_size': 4}))
+        self.mock_object(self.manager, '_get_share_mount_info',
+                         mock.Mock(return_value={'mount': 'fake_mount',
+                                                 'unmount': 'fake_unmount'}))
+        self.mock_object(
+            self.manager, '_copy_share_data',
+            mock.Mock(side_effect=lambda ctxt, copy, src, dest: copy.run()))
+
+        self.manager._run_backup(self.context, backup_info, share_info)
+        os.unlink(os.path.join(share_path, 'file'))
+        backup_info_mock.return_value['incremental'] = False
+        self.manager._run_restore(self.context, backup_info, share_info)
+
+        self.assertEqual(['file'], os.listdir(share_path))
+        with open(os.path.join(share_path, 'file')) as f:
+            self.assertEqual('fake_data', f.read())
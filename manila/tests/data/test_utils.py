@@ -13,10 +13,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
 import os
+import shutil
+import tempfile
 import time
 from unittest import mock
 
+import ddt
+from oslo_serialization import jsonutils
+
 from manila.data import utils as data_utils
 from manila import exception
 from manila import test
@@ -238,15 +244,20 @@ class CopyClassTestCase(test.TestCase):
     def test__validate_item(self):
 
         self.mock_object(utils, 'execute', mock.Mock(
-            side_effect=[("abcxyz", ""), ("defrst", "")]))
+            return_value=("abcxyz  src\ndefrst  dest\n", "")))
 
         self.assertRaises(exception.ShareDataCopyFailed,
                           data_utils._validate_item, 'src', 'dest')
 
-        utils.execute.assert_has_calls([
-            mock.call("sha256sum", "src", run_as_root=True),
-            mock.call("sha256sum", "dest", run_as_root=True),
-        ])
+        utils.execute.assert_called_once_with(
+            "sha256sum", "src", "dest", run_as_root=True)
+
+    def test__validate_item_match(self):
+
+        self.mock_object(utils, 'execute', mock.Mock(
+            return_value=("abcxyz  src\nabcxyz  dest\n", "")))
+
+        data_utils._validate_item('src', 'dest')
 
     def test_copy_data_cancelled_1(self):
 
@@ -372,3 +383,517 @@ class CopyClassTestCase(test.TestCase):
         self._copy.copy_data.assert_called_once_with(self._copy.src)
         self._copy.copy_stats.assert_called_once_with(self._copy.src)
         self._copy.get_progress.assert_called_once_with()
+
+
+@ddt.ddt
+class ParallelCopyTestCase(test.TestCase):
+    def setUp(self):
+        super(ParallelCopyTestCase, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.src = os.path.join(self.tmp_dir, 'src')
+        self.dest = os.path.join(self.tmp_dir, 'dest')
+        os.makedirs(os.path.join(self.src, 'folder1', 'folder2'))
+        os.makedirs(os.path.join(self.src, 'item'))
+        os.makedirs(self.dest)
+        self._write(os.path.join(self.src, 'file1'), b'a' * 1000)
+        self._write(os.path.join(self.src, 'folder1', 'file2'), b'b' * 3000)
+        self._write(os.path.join(self.src, 'folder1', 'folder2', 'empty'),
+                    b'')
+        self._write(os.path.join(self.src, 'item', 'ignored'), b'c' * 10)
+        os.symlink('file1', os.path.join(self.src, 'link1'))
+        os.chmod(os.path.join(self.src, 'folder1'), 0o751)
+        os.chmod(os.path.join(self.src, 'file1'), 0o640)
+        os.utime(os.path.join(self.src, 'folder1'), (1000, 2000))
+
+        self._copy = data_utils.ParallelCopy(
+            self.src, self.dest, ['item'], workers=2)
+        self.mock_object(data_utils, 'LOG')
+
+    @staticmethod
+    def _write(path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_run(self):
+        self._copy.run()
+
+        self.assertTrue(self._copy.completed)
+        self.assertEqual(4000, self._copy.total_size)
+        self.assertEqual(4000, self._copy.current_size)
+        self.assertEqual(100, self._copy.get_progress()['total_progress'])
+        self.assertEqual(b'a' * 1000,
+                         self._read(os.path.join(self.dest, 'file1')))
+        self.assertEqual(
+            b'b' * 3000,
+            self._read(os.path.join(self.dest, 'folder1', 'file2')))
+        self.assertEqual(b'', self._read(
+            os.path.join(self.dest, 'folder1', 'folder2', 'empty')))
+        self.assertEqual('file1',
+                         os.readlink(os.path.join(self.dest, 'link1')))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, 'item')))
+        self.assertEqual(
+            0o640,
+            os.stat(os.path.join(self.dest, 'file1')).st_mode & 0o777)
+        folder_stat = os.stat(os.path.join(self.dest, 'folder1'))
+        self.assertEqual(0o751, folder_stat.st_mode & 0o777)
+        self.assertEqual(2000, folder_stat.st_mtime)
+        self.assertEqual({}, self._copy.in_flight)
+
+    def test_run_empty(self):
+        copy = data_utils.ParallelCopy(
+            os.path.join(self.src, 'folder1', 'folder2'), self.dest, [])
+
+        copy.run()
+
+        self.assertEqual({'total_progress': 100}, copy.get_progress())
+
+    def test_run_cancelled(self):
+        self.mock_object(self._copy, 'scan',
+                         mock.Mock(side_effect=self._copy.cancel))
+
+        self._copy.run()
+
+        self.assertTrue(self._copy.cancelled)
+        self.assertEqual([], os.listdir(self.dest))
+
+    def test_copy_contents_fallback(self):
+        self.mock_object(
+            data_utils, '_copy_chunk_copy_file_range',
+            mock.Mock(side_effect=OSError(18, 'Invalid cross-device link')))
+        self.mock_object(
+            data_utils, '_copy_chunk_sendfile',
+            mock.Mock(side_effect=OSError(22, 'Invalid argument')))
+
+        self._copy.run()
+
+        self.assertEqual(
+            b'b' * 3000,
+            self._read(os.path.join(self.dest, 'folder1', 'file2')))
+
+    def test_copy_hash_mismatch(self):
+        self._copy.check_hash = True
+        self.mock_object(data_utils, '_file_digest',
+                         mock.Mock(return_value='def'))
+        self.mock_object(time, 'sleep')
+        self._copy.files = [('file1', os.lstat(
+            os.path.join(self.src, 'file1')))]
+
+        self.assertRaises(exception.ShareDataCopyFailed,
+                          self._copy.copy_files)
+        self.assertEqual(2, data_utils._file_digest.call_count)
+        data_utils._file_digest.assert_called_with(
+            os.path.join(self.dest, 'file1'))
+
+    @ddt.data(True, False)
+    def test_copy_hash_streamed(self, verify_written):
+        self._copy.check_hash = True
+        self._copy.verify_written = verify_written
+        self.mock_object(data_utils, '_file_digest',
+                         mock.Mock(wraps=data_utils._file_digest))
+        self.mock_object(data_utils, '_copy_chunk_copy_file_range')
+        self.mock_object(data_utils, '_copy_chunk_sendfile')
+
+        self._copy.run()
+
+        self.assertEqual(verify_written and 3 or 0,
+                         data_utils._file_digest.call_count)
+        self.assertFalse(data_utils._copy_chunk_copy_file_range.called)
+        self.assertFalse(data_utils._copy_chunk_sendfile.called)
+        self.assertEqual(
+            hashlib.sha256(b'b' * 3000).hexdigest(),
+            self._copy.copied_files[os.path.join('folder1', 'file2')][
+                'sha256'])
+        self.assertEqual(
+            b'b' * 3000,
+            self._read(os.path.join(self.dest, 'folder1', 'file2')))
+
+    @ddt.data(True, False)
+    def test_run_skips_copied_files(self, check_hash):
+        self._copy.check_hash = check_hash
+        self._copy.run()
+        copied_files = self._copy.copied_files
+        os.unlink(os.path.join(self.dest, 'file1'))
+        copy = data_utils.ParallelCopy(
+            self.src, self.dest, ['item'], check_hash=check_hash,
+            copied_files=copied_files)
+        self.mock_object(copy, '_copy_file',
+                         mock.Mock(wraps=copy._copy_file))
+
+        copy.run()
+
+        copy._copy_file.assert_called_once_with(
+            os.path.join(self.src, 'file1'),
+            os.path.join(self.dest, 'file1'))
+        self.assertEqual(100, copy.get_progress()['total_progress'])
+        self.assertEqual(copied_files, copy.copied_files)
+
+    def test_run_checkpoints(self):
+        self._copy.checkpoint_interval = 60
+        self.mock_object(self._copy, 'write_checkpoint',
+                         mock.Mock(wraps=self._copy.write_checkpoint))
+
+        self._copy.run()
+
+        self._copy.write_checkpoint.assert_called_once_with()
+        self.assertFalse(os.path.exists(self._copy.journal_path))
+
+    def test_run_resumes_from_journal(self):
+        self._copy.checkpoint_interval = 60
+        self._copy.files = [('file1', os.lstat(
+            os.path.join(self.src, 'file1')))]
+        self._copy.copy_files()
+        with open(self._copy.journal_path, 'a') as journal:
+            journal.write('{"path": "folder1/fi')
+        copy = data_utils.ParallelCopy(
+            self.src, self.dest, ['item'], checkpoint_interval=60)
+        self.mock_object(copy, '_copy_file',
+                         mock.Mock(wraps=copy._copy_file))
+
+        copy.run()
+
+        self.assertEqual(2, copy._copy_file.call_count)
+        self.assertNotIn(mock.call(os.path.join(self.src, 'file1'),
+                                   os.path.join(self.dest, 'file1')),
+                         copy._copy_file.call_args_list)
+        self.assertEqual(100, copy.get_progress()['total_progress'])
+        self.assertFalse(os.path.exists(copy.journal_path))
+
+    def test_write_checkpoint(self):
+        self._copy.checkpoint_interval = 60
+        self._copy.current_size = 1000
+        self._copy._record_copied('file1', {'size': 1000, 'mtime_ns': 1,
+                                            'sha256': None})
+
+        self._copy.write_checkpoint()
+
+        with open(self._copy.journal_path) as journal:
+            lines = journal.read().splitlines()
+        self.assertEqual(
+            [{'path': 'file1',
+              'record': {'size': 1000, 'mtime_ns': 1, 'sha256': None}},
+             {'checkpoint': {'bytes_copied': 1000, 'files_copied': 1}}],
+            [jsonutils.loads(line) for line in lines])
+        self.assertEqual(0, len(self._copy.journal_pending))
+
+    def test_get_progress(self):
+        self._copy.initialized = True
+        self._copy.total_size = 1000
+        self._copy.current_size = 200
+        self._copy.current_copy = {'file_path': '/fake/path', 'size': 400}
+        self._copy.in_flight = {'/fake/path': 100, '/fake/other': 200}
+        self._copy.transferred_size = 500
+        self._copy.start_time = 10
+        self.mock_object(time, 'monotonic', mock.Mock(return_value=15))
+
+        expected = {'total_progress': 50,
+                    'current_file_path': '/fake/path',
+                    'current_file_progress': 25,
+                    'throughput': 100}
+        self.assertEqual(expected, self._copy.get_progress())
+
+    def test_run_throttled(self):
+        self._copy.throttle = mock.Mock()
+
+        self._copy.run()
+
+        self.assertEqual(4000, sum(
+            c[0][0] for c in self._copy.throttle.consume.call_args_list))
+        self.assertEqual(4000, self._copy.transferred_size)
+
+    def test_get_progress_not_initialized(self):
+        self.assertEqual({'total_progress': 0}, self._copy.get_progress())
+
+
+@ddt.ddt
+class ChunkedBackupCopyTestCase(test.TestCase):
+    def setUp(self):
+        super(ChunkedBackupCopyTestCase, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.src = os.path.join(self.tmp_dir, 'src')
+        self.repository = os.path.join(self.tmp_dir, 'repository')
+        self.restored = os.path.join(self.tmp_dir, 'restored')
+        os.makedirs(os.path.join(self.src, 'folder1'))
+        os.makedirs(os.path.join(self.src, 'lost+found'))
+        os.makedirs(self.restored)
+        self._write('file1', b'a' * 2500)
+        self._write(os.path.join('folder1', 'file2'), b'ab' * 1000)
+        self._write(os.path.join('folder1', 'file3'), b'a' * 1024)
+        os.symlink('file1', os.path.join(self.src, 'link1'))
+        os.chmod(os.path.join(self.src, 'folder1'), 0o751)
+        self.mock_object(data_utils, 'LOG')
+
+    def _write(self, rel_path, data):
+        with open(os.path.join(self.src, rel_path), 'wb') as f:
+            f.write(data)
+
+    def _backup(self, backup_id, parent_id=None):
+        copy = data_utils.ChunkedBackupCopy(
+            self.src, self.repository, backup_id, ['lost+found'],
+            parent_id=parent_id, chunk_size=1024, workers=2)
+        os.makedirs(os.path.join(self.repository, backup_id))
+        copy.run()
+        return copy
+
+    def _restore(self, backup_id):
+        copy = data_utils.ChunkedRestoreCopy(
+            self.repository, backup_id, self.restored, [], workers=2)
+        copy.run()
+        return copy
+
+    def _read_tree(self, root):
+        tree = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                rel_path = os.path.relpath(path, root)
+                if os.path.islink(path):
+                    tree[rel_path] = os.readlink(path)
+                else:
+                    with open(path, 'rb') as f:
+                        tree[rel_path] = f.read()
+        return tree
+
+    def test_backup_and_restore(self):
+        backup = self._backup('backup1')
+
+        self.assertEqual(100, backup.get_progress()['total_progress'])
+        # file1 and file3 share the 1024 bytes chunk of 'a'.
+        self.assertEqual(5524 - 1024 * 2, backup.stored_size)
+        manifest = data_utils.read_manifest(self.repository, 'backup1')
+        self.assertEqual(
+            ['folder1', 'file1', 'folder1/file2', 'folder1/file3', 'link1'],
+            sorted([e['path'] for e in manifest['entries']],
+                   key=lambda p: (p != 'folder1', p)))
+        self.assertFalse(os.path.exists(os.path.join(
+            self.repository, 'backup1', data_utils.MANIFEST_IN_PROGRESS)))
+
+        restore = self._restore('backup1')
+
+        self.assertEqual(100, restore.get_progress()['total_progress'])
+        self.assertEqual(self._read_tree(self.src),
+                         self._read_tree(self.restored))
+        self.assertEqual(
+            0o751,
+            os.stat(os.path.join(self.restored, 'folder1')).st_mode & 0o777)
+
+    def test_incremental_backup(self):
+        self._backup('backup1')
+        self._write(os.path.join('folder1', 'file2'), b'ab' * 1000 + b'c')
+        self.mock_object(data_utils, '_store_chunk',
+                         mock.Mock(wraps=data_utils._store_chunk))
+
+        backup = self._backup('backup2', parent_id='backup1')
+
+        # Only the modified file is read again, and only its last chunk
+        # changed.
+        self.assertEqual(2, data_utils._store_chunk.call_count)
+        self.assertEqual(977, backup.stored_size)
+        self.assertEqual('backup1', data_utils.read_manifest(
+            self.repository, 'backup2')['parent_id'])
+
+        self._restore('backup2')
+
+        self.assertEqual(self._read_tree(self.src),
+                         self._read_tree(self.restored))
+
+    def test_backup_resumed(self):
+        backup = data_utils.ChunkedBackupCopy(
+            self.src, self.repository, 'backup1', ['lost+found'],
+            chunk_size=1024, checkpoint_interval=60)
+        os.makedirs(os.path.join(self.repository, 'backup1'))
+        backup.scan()
+        backup.start_manifest()
+        backup.files = [f for f in backup.files if f[0] == 'file1']
+        backup.copy_files()
+        self.assertTrue(os.path.exists(backup.journal_path))
+        self.mock_object(data_utils, '_store_chunk',
+                         mock.Mock(wraps=data_utils._store_chunk))
+
+        backup = data_utils.ChunkedBackupCopy(
+            self.src, self.repository, 'backup1', ['lost+found'],
+            chunk_size=1024, checkpoint_interval=60)
+        backup.run()
+
+        # file1 is not read again.
+        self.assertEqual(3, data_utils._store_chunk.call_count)
+        self.assertFalse(os.path.exists(backup.journal_path))
+        self._restore('backup1')
+        self.assertEqual(self._read_tree(self.src),
+                         self._read_tree(self.restored))
+
+    @ddt.data(data_utils.COMPRESSION_GZIP, data_utils.COMPRESSION_ZSTD)
+    def test_backup_and_restore_compressed(self, compression):
+        if (compression == data_utils.COMPRESSION_ZSTD and
+                not data_utils.zstandard):
+            self.skipTest("zstandard is not installed.")
+        backup = data_utils.ChunkedBackupCopy(
+            self.src, self.repository, 'backup1', ['lost+found'],
+            chunk_size=1024, compression=compression)
+        os.makedirs(os.path.join(self.repository, 'backup1'))
+
+        backup.run()
+
+        progress = backup.get_progress()
+        self.assertGreater(progress['compression_ratio'], 10)
+        self.assertEqual(compression, data_utils.read_manifest(
+            self.repository, 'backup1')['compression'])
+        self._restore('backup1')
+        self.assertEqual(self._read_tree(self.src),
+                         self._read_tree(self.restored))
+
+    def test_incremental_backup_compression_changed(self):
+        self._backup('backup1')
+        self._write(os.path.join('folder1', 'file2'), b'ab' * 1000 + b'c')
+        backup = data_utils.ChunkedBackupCopy(
+            self.src, self.repository, 'backup2', ['lost+found'],
+            parent_id='backup1', chunk_size=1024,
+            compression=data_utils.COMPRESSION_GZIP)
+        os.makedirs(os.path.join(self.repository, 'backup2'))
+
+        backup.run()
+
+        entries = {
+            entry['path']: entry for entry in data_utils.read_manifest(
+                self.repository, 'backup2')['entries']}
+        self.assertEqual(data_utils.COMPRESSION_NONE,
+                         entries['file1']['compression'])
+        self.assertEqual(data_utils.COMPRESSION_GZIP,
+                         entries['folder1/file2']['compression'])
+        self._restore('backup2')
+        self.assertEqual(self._read_tree(self.src),
+                         self._read_tree(self.restored))
+
+    @mock.patch.object(data_utils, 'zstandard', None)
+    def test_backup_zstd_not_installed(self):
+        self.assertRaises(
+            exception.ShareDataCopyFailed, data_utils.ChunkedBackupCopy,
+            self.src, self.repository, 'backup1', [],
+            compression=data_utils.COMPRESSION_ZSTD)
+
+    def test_restore_corrupted_compressed_chunk(self):
+        backup = data_utils.ChunkedBackupCopy(
+            self.src, self.repository, 'backup1', ['lost+found'],
+            chunk_size=1024, compression=data_utils.COMPRESSION_GZIP)
+        os.makedirs(os.path.join(self.repository, 'backup1'))
+        backup.run()
+        digest = data_utils.read_manifest(
+            self.repository, 'backup1')['entries'][-1]['chunks'][0]
+        with open(data_utils._chunk_path(
+                self.repository, digest, data_utils.COMPRESSION_GZIP),
+                'wb') as f:
+            f.write(b'corrupted')
+        self.mock_object(time, 'sleep')
+
+        self.assertRaises(exception.ShareDataCopyFailed,
+                          self._restore, 'backup1')
+
+    def test_restore_corrupted_chunk(self):
+        self._backup('backup1')
+        digest = data_utils.read_manifest(
+            self.repository, 'backup1')['entries'][-1]['chunks'][0]
+        with open(data_utils._chunk_path(self.repository, digest), 'wb') as f:
+            f.write(b'corrupted')
+        self.mock_object(time, 'sleep')
+
+        self.assertRaises(exception.ShareDataCopyFailed,
+                          self._restore, 'backup1')
+
+    def test_restore_without_manifest(self):
+        shutil.copytree(self.src, os.path.join(self.repository, 'backup1'),
+                        symlinks=True)
+
+        self._restore('backup1')
+
+        self.assertEqual(self._read_tree(self.src),
+                         self._read_tree(self.restored))
+
+    def test_remove_unreferenced_chunks(self):
+        self._backup('backup1')
+        self._write('file1', b'd' * 10)
+        self._backup('backup2', parent_id='backup1')
+
+        self.assertEqual(
+            0, data_utils.remove_unreferenced_chunks(self.repository))
+
+        shutil.rmtree(os.path.join(self.repository, 'backup1'))
+
+        # The last chunk of the previous file1 is only used by backup1.
+        self.assertEqual(
+            1, data_utils.remove_unreferenced_chunks(self.repository))
+        self._restore('backup2')
+        self.assertEqual(self._read_tree(self.src),
+                         self._read_tree(self.restored))
+
+    def test_remove_unreferenced_chunks_backup_in_progress(self):
+        self._backup('backup1')
+        shutil.rmtree(os.path.join(self.repository, 'backup1'))
+        os.makedirs(os.path.join(self.repository, 'backup2'))
+        open(os.path.join(self.repository, 'backup2',
+                          data_utils.MANIFEST_IN_PROGRESS), 'w').close()
+
+        self.assertEqual(
+            0, data_utils.remove_unreferenced_chunks(self.repository))
+
+    def test_remove_unreferenced_chunks_repository_locked(self):
+        self._backup('backup1')
+        shutil.rmtree(os.path.join(self.repository, 'backup1'))
+        lock = data_utils._lock_repository(self.repository)
+
+        self.assertEqual(
+            0, data_utils.remove_unreferenced_chunks(self.repository))
+
+        os.close(lock)
+        self.assertEqual(
+            4, data_utils.remove_unreferenced_chunks(self.repository))
+
+    def test_backup_locks_repository(self):
+        self._backup('backup1')
+        copy = data_utils.ChunkedBackupCopy(
+            self.src, self.repository, 'backup2', ['lost+found'],
+            parent_id='backup1', chunk_size=1024)
+        copy_files = copy.copy_files
+        locks = []
+
+        def _copy_files():
+            locks.append(data_utils._lock_repository(self.repository,
+                                                     exclusive=True))
+            copy_files()
+
+        self.mock_object(copy, 'copy_files',
+                         mock.Mock(side_effect=_copy_files))
+
+        copy.run()
+
+        self.assertEqual([None], locks)
+        lock = data_utils._lock_repository(self.repository, exclusive=True)
+        self.assertIsNotNone(lock)
+        os.close(lock)
+
+    def test_remove_unreferenced_chunks_no_repository(self):
+        self.assertEqual(
+            0, data_utils.remove_unreferenced_chunks(self.repository))
+
+
+class ThrottleTestCase(test.TestCase):
+
+    def test_consume(self):
+        now = [100.0]
+        self.mock_object(time, 'monotonic',
+                         mock.Mock(side_effect=lambda: now[0]))
+        self.mock_object(data_utils.native_time, 'sleep')
+        throttle = data_utils._Throttle(1000)
+
+        throttle.consume(500)
+        throttle.consume(1000)
+        now[0] = 110.0
+        throttle.consume(500)
+
+        data_utils.native_time.sleep.assert_has_calls(
+            [mock.call(0.5), mock.call(1.5), mock.call(0.5)])
@@ -114,6 +114,20 @@ class ShareAccessDatabaseAPITestCase(test.TestCase):
         result_ids = [r['id'] for r in result]
         self.assertEqual(rule_ids, result_ids)
 
+    def test_share_access_get_all_for_share_with_limit_and_marker(self):
+        share = db_utils.create_share()
+        for i in range(3):
+            db_utils.create_access(share_id=share['id'])
+        rules = db_api.share_access_get_all_for_share(
+            self.ctxt, share['id'], filters={'limit': 3})
+
+        result = db_api.share_access_get_all_for_share(
+            self.ctxt, share['id'],
+            filters={'limit': 2, 'marker': rules[0]['id']})
+
+        self.assertEqual([r['id'] for r in rules[1:]],
+                         [r['id'] for r in result])
+
     def test_share_access_get_all_for_share_no_instance_mappings(self):
         share = db_utils.create_share()
         share_instance = share['instance']
@@ -151,6 +165,37 @@ class ShareAccessDatabaseAPITestCase(test.TestCase):
         self.assertTrue(access['updated_at'] < time_now)
         self.assertTrue(instance_access_mapping['updated_at'] < time_now)
 
+    @ddt.data(None, constants.ACCESS_STATE_QUEUED_TO_APPLY)
+    def test_share_instance_access_update_all(self, state):
+        share = db_utils.create_share()
+        access_1 = db_utils.create_access(share_id=share['id'])
+        access_2 = db_utils.create_access(
+            share_id=share['id'], state=constants.ACCESS_STATE_ACTIVE)
+        access_3 = db_utils.create_access(share_id=share['id'])
+
+        updated = db_api.share_instance_access_update_all(
+            self.ctxt, share.instance['id'], [access_1['id'], access_2['id']],
+            {'state': constants.STATUS_ERROR, 'access_key': 'watson4heisman'},
+            state=state)
+
+        rules = db_api.share_access_get_all_for_instance(
+            self.ctxt, share.instance['id'])
+        rules = {r['access_id']: r for r in rules}
+        expected_updated = [access_1['id']]
+        if state is None:
+            expected_updated.append(access_2['id'])
+        self.assertEqual(len(expected_updated), updated)
+        for access_id in (access_1['id'], access_2['id'], access_3['id']):
+            if access_id in expected_updated:
+                self.assertEqual(constants.STATUS_ERROR,
+                                 rules[access_id]['state'])
+                self.assertEqual('watson4heisman',
+                                 rules[access_id]['access_key'])
+            else:
+                self.assertNotEqual(constants.STATUS_ERROR,
+                                    rules[access_id]['state'])
+                self.assertIsNone(rules[access_id]['access_key'])
+
     @ddt.data(True, False)
     def test_share_access_get_all_for_instance_with_share_access_data(
             self, with_share_access_data):
@@ -602,6 +647,21 @@ class ShareDatabaseAPITestCase(test.TestCase):
 
         self.assertEqual(0, len(instances))
 
+    def test_share_instance_provisioned_capacity_get_all(self):
+        share = db_utils.create_share(host='host1#pool0', size=3)
+        db_utils.create_share_instance(share_id=share['id'],
+                                       host='host1#pool0')
+        db_utils.create_share(host='host1#pool0', size=4)
+        db_utils.create_share(host='host1#pool1', size=5)
+        db_utils.create_share(host=None, size=6)
+        deleted = db_utils.create_share(host='host2#pool0', size=7)
+        db_api.share_instance_delete(self.ctxt, deleted.instance['id'])
+
+        capacity = db_api.share_instance_provisioned_capacity_get_all(
+            self.ctxt)
+
+        self.assertEqual({'host1#pool0': 10, 'host1#pool1': 5}, capacity)
+
     def test_share_instance_get_all_by_share_group(self):
         group = db_utils.create_share_group()
         db_utils.create_share(share_group_id=group['id'])
@@ -661,6 +721,17 @@ class ShareDatabaseAPITestCase(test.TestCase):
             self.ctxt, filters={'status': 'error_deferred_deleting'})
         self.assertEqual(1, len(instances))
 
+    def test_share_instance_get_all_with_limit_and_marker(self):
+        for i in range(3):
+            db_utils.create_share()
+        instances = db_api.share_instance_get_all(
+            self.ctxt, filters={'limit': 3})
+
+        result = db_api.share_instance_get_all(
+            self.ctxt, filters={'limit': 1, 'marker': instances[0]['id']})
+
+        self.assertEqual([instances[1]['id']], [i['id'] for i in result])
+
     def test_share_instance_get_all_by_ids(self):
         fake_share = db_utils.create_share()
         expected_share_instance = db_utils.create_share_instance(
@@ -700,6 +771,43 @@ class ShareDatabaseAPITestCase(test.TestCase):
         self.assertEqual(2, len(actual_result))
         self.assertEqual(shares[0]['id'], actual_result[1]['id'])
 
+    @ddt.data(('size', 'desc'), ('size', 'asc'), ('display_name', 'desc'),
+              ('display_name', 'asc'), ('host', 'desc'), ('id', 'asc'))
+    @ddt.unpack
+    def test_share_get_all_with_marker(self, sort_key, sort_dir):
+        for size, name, host in ((1, None, 'host1'), (2, 'b', 'host2'),
+                                 (1, 'a', None), (2, None, 'host1'),
+                                 (3, 'a', 'host2')):
+            db_utils.create_share(size=size, display_name=name, host=host)
+        expected = [s['id'] for s in db_api.share_get_all(
+            self.ctxt, sort_key=sort_key, sort_dir=sort_dir)]
+
+        actual = []
+        filters = {'limit': 2}
+        for page in range(3):
+            result = db_api.share_get_all(
+                self.ctxt, filters=dict(filters), sort_key=sort_key,
+                sort_dir=sort_dir)
+            actual.extend(s['id'] for s in result)
+            filters['marker'] = result[-1]['id']
+
+        self.assertEqual(5, len(expected))
+        self.assertEqual(expected, actual)
+
+    def test_share_get_all_with_marker_not_found(self):
+        db_utils.create_share()
+
+        self.assertRaises(exception.MarkerNotFound,
+                          db_api.share_get_all, self.ctxt,
+                          filters={'marker': 'fake_marker'})
+
+    def test_share_get_all_by_project_with_marker_of_another_project(self):
+        share = db_utils.create_share(project_id='another_project')
+
+        self.assertRaises(exception.MarkerNotFound,
+                          db_api.share_get_all_by_project, self.ctxt,
+                          'fake_project', filters={'marker': share['id']})
+
     @ddt.data('id', 'path')
     def test_share_get_all_by_export_location(self, type):
         share = db_utils.create_share()
@@ -942,6 +1050,24 @@ class ShareDatabaseAPITestCase(test.TestCase):
                     with_share_data,
                     expected_share_keys.issubset(replica.keys()))
 
+    def test_share_replicas_get_all_by_host(self):
+        share = db_utils.create_share()
+        replica_1 = db_utils.create_share_replica(
+            replica_state=constants.REPLICA_STATE_IN_SYNC,
+            share_id=share['id'], host='host1@backend1#pool1')
+        replica_2 = db_utils.create_share_replica(
+            replica_state=constants.REPLICA_STATE_OUT_OF_SYNC,
+            share_id=share['id'], host='host1@backend1')
+        db_utils.create_share_replica(
+            replica_state=constants.REPLICA_STATE_IN_SYNC,
+            share_id=share['id'], host='host1@backend10#pool1')
+
+        share_replicas = db_api.share_replicas_get_all(
+            self.ctxt, host='host1@backend1')
+
+        self.assertEqual({replica_1['id'], replica_2['id']},
+                         {r['id'] for r in share_replicas})
+
     @ddt.data({'with_share_data': False, 'with_share_server': False},
               {'with_share_data': False, 'with_share_server': True},
               {'with_share_data': True, 'with_share_server': False},
@@ -1862,6 +1988,42 @@ class ShareSnapshotDatabaseAPITestCase(test.TestCase):
         self.assertEqual(count, amount_of_share_snapshots)
         self.assertEqual(expected_share_snapshots_len, len(share_snapshots))
 
+    @ddt.data('asc', 'desc')
+    def test_share_snapshot_get_all_with_marker(self, sort_dir):
+        share = db_utils.create_share(size=1)
+        for name in ('snap2', 'snap1', 'snap2', 'snap3'):
+            db_api.share_snapshot_create(
+                self.ctxt, {'share_id': share['id'], 'display_name': name,
+                            'status': constants.STATUS_AVAILABLE})
+        filters = {'share_id': share['id']}
+        expected = [s['id'] for s in db_api.share_snapshot_get_all(
+            self.ctxt, filters=filters, sort_key='display_name',
+            sort_dir=sort_dir)]
+
+        result = db_api.share_snapshot_get_all(
+            self.ctxt, filters=filters, limit=2, sort_key='display_name',
+            sort_dir=sort_dir, marker=expected[1])
+
+        self.assertEqual(4, len(expected))
+        self.assertEqual(expected[2:], [s['id'] for s in result])
+
+    def test_share_snapshot_get_all_with_marker_not_found(self):
+        self.assertRaises(exception.MarkerNotFound,
+                          db_api.share_snapshot_get_all, self.ctxt,
+                          marker='fake_marker')
+
+    def test_share_snapshot_get_all_by_project_with_marker_of_another_project(
+            self):
+        share = db_utils.create_share(project_id='another_project')
+        snapshot = db_api.share_snapshot_create(
+            self.ctxt, {'share_id': share['id'],
+                        'project_id': 'another_project',
+                        'status': constants.STATUS_AVAILABLE})
+
+        self.assertRaises(exception.MarkerNotFound,
+                          db_api.share_snapshot_get_all_by_project,
+                          self.ctxt, 'fake_project', marker=snapshot['id'])
+
     def test_share_snapshot_get_all_with_filters_some(self):
         expected_status = constants.STATUS_AVAILABLE
         filters = {
@@ -2141,6 +2303,28 @@ class ShareSnapshotDatabaseAPITestCase(test.TestCase):
 
         self.assertSubDictMatch(values, out[0].to_dict())
 
+    def test_share_snapshot_access_get_all_for_snapshot_instances(self):
+        access = db_utils.create_snapshot_access(
+            share_snapshot_id=self.snapshot_1['id'])
+        db_api.share_snapshot_instance_access_update(
+            self.ctxt, access['id'], self.snapshot_instances[1]['id'],
+            {'state': constants.ACCESS_STATE_ACTIVE})
+        snapshot_instance_ids = [si['id'] for si in self.snapshot_instances]
+
+        out = db_api.share_snapshot_access_get_all_for_snapshot_instances(
+            self.ctxt, snapshot_instance_ids)
+        pending = db_api.share_snapshot_access_get_all_for_snapshot_instances(
+            self.ctxt, snapshot_instance_ids,
+            filters={'state': [constants.ACCESS_STATE_QUEUED_TO_APPLY]})
+
+        self.assertEqual(
+            sorted(si['id'] for si in self.snapshot_instances[0:3]),
+            sorted(r['share_snapshot_instance_id'] for r in out))
+        self.assertEqual(
+            sorted([self.snapshot_instances[0]['id'],
+                    self.snapshot_instances[2]['id']]),
+            sorted(r['share_snapshot_instance_id'] for r in pending))
+
     def test_share_snapshot_instance_access_update_state(self):
         access = db_utils.create_snapshot_access(
             share_snapshot_id=self.snapshot_1['id'])
@@ -4021,6 +4205,16 @@ class ShareServerDatabaseAPITestCase(test.TestCase):
                 else:
                     self.assertEqual(result[key], filters[key])
 
+    def test_share_server_get_all_with_filters_ids(self):
+        servers = [db_utils.create_share_server() for __ in range(3)]
+        server_ids = [server['id'] for server in servers[0:2]]
+
+        results = db_api.share_server_get_all_with_filters(
+            self.ctxt, {'ids': server_ids})
+
+        self.assertEqual(sorted(server_ids),
+                         sorted(result['id'] for result in results))
+
     @ddt.data('fake@fake', 'host1@backend1')
     def test_share_server_get_all_by_host(self, host):
         db_utils.create_share_server(host='fake@fake')
@@ -4264,6 +4458,34 @@ class NetworkAllocationsDatabaseAPITestCase(test.TestCase):
         for na in result:
             self.assertIn(na.label, ('admin', 'user', None))
 
+    def test_network_allocations_get_ip_addresses(self):
+        self._setup_network_allocations_get_for_share_server()
+        for ip_address, ip_version in (('1.1.1.1', 4), ('5.5.5.5', 4),
+                                       ('fd12::1', 6)):
+            db_api.network_allocation_create(self.ctxt, {
+                'share_server_id': self.share_server_id,
+                'ip_address': ip_address,
+                'ip_version': ip_version,
+                'status': constants.STATUS_ACTIVE})
+        deleted = db_api.network_allocation_create(self.ctxt, {
+            'share_server_id': self.share_server_id,
+            'ip_address': '6.6.6.6',
+            'ip_version': 4,
+            'status': constants.STATUS_ACTIVE})
+        db_api.network_allocation_delete(self.ctxt, deleted['id'])
+
+        all_ips = db_api.network_allocations_get_ip_addresses(self.ctxt)
+        ipv6_ips = db_api.network_allocations_get_ip_addresses(
+            self.ctxt, ip_version=6)
+
+        self.assertEqual(
+            ['1.1.1.1', '2.2.2.2', '3.3.3.3', '4.4.4.4', '5.5.5.5',
+             'fd12::1'],
+            sorted(all_ips))
+        self.assertEqual(
+            ['1.1.1.1', '2.2.2.2', '3.3.3.3', '4.4.4.4', 'fd12::1'],
+            sorted(ipv6_ips))
+
     def test_network_allocation_get(self):
         self._setup_network_allocations_get_for_share_server()
 
@@ -4808,6 +5030,7 @@ class ShareTypeAPITestCase(test.TestCase):
                           self.ctxt, share_type['id'], values)
 
 
+@ddt.ddt
 class MessagesDatabaseAPITestCase(test.TestCase):
 
     def setUp(self):
@@ -4925,6 +5148,28 @@ class MessagesDatabaseAPITestCase(test.TestCase):
         result = db_api.message_get_all(self.ctxt, limit=1, offset=1)
         self.assertEqual(1, len(result))
 
+    @ddt.data('asc', 'desc')
+    def test_message_get_all_with_marker(self, sort_dir):
+        for i in ['002', '001', '002', '003']:
+            db_utils.create_message(project_id=self.project_id,
+                                    action_id=i)
+        expected = [m.id for m in db_api.message_get_all(
+            self.ctxt, sort_key='action_id', sort_dir=sort_dir)]
+
+        result = db_api.message_get_all(
+            self.ctxt, limit=2, sort_key='action_id', sort_dir=sort_dir,
+            marker=expected[1])
+
+        self.assertEqual(expected[2:], [m.id for m in result])
+
+    def test_message_get_all_with_marker_not_found(self):
+        db_utils.create_message(project_id='another-project',
+                                action_id='001')
+        message = db_api.message_get_all(self.ctxt.elevated())[0]
+
+        self.assertRaises(exception.MarkerNotFound, db_api.message_get_all,
+                          self.ctxt, marker=message.id)
+
     def test_message_get_all_sorted(self):
         ids = []
         for i in ['003', '002', '001']:
@@ -68,9 +68,18 @@ class API(object):
     def server_get(self, *args, **kwargs):
         pass
 
+    def server_list(self, *args, **kwargs):
+        pass
+
     def server_get_by_name_or_id(self, *args, **kwargs):
         pass
 
+    def server_update(self, *args, **kwargs):
+        pass
+
+    def server_interface_attach(self, *args, **kwargs):
+        pass
+
     def server_reboot(self, *args, **kwargs):
         pass
 
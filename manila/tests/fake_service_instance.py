@@ -49,6 +49,9 @@ class FakeServiceInstanceManager(object):
     def _delete_server(self, context, server):
         pass
 
+    def fill_service_instance_pool(self):
+        pass
+
     def _get_service_instance_name(self, share_network_id):
         return self.service_instance_name_template % share_network_id
 
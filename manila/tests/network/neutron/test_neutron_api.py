@@ -334,6 +334,19 @@ class NeutronApiTest(test.TestCase):
         self.neutron_api.client.list_ports.assert_called_once_with(
             **search_opts)
 
+    def test_list_ports_NeutronClientException(self):
+        search_opts = {'test_option': 'test_value'}
+        self.mock_object(
+            self.neutron_api.client, 'list_ports',
+            mock.Mock(side_effect=neutron_client_exc.NeutronClientException()))
+
+        self.assertRaises(exception.NetworkException,
+                          self.neutron_api.list_ports,
+                          **search_opts)
+
+        self.neutron_api.client.list_ports.assert_called_once_with(
+            **search_opts)
+
     def test_show_port(self):
         # Set up test data
         port_id = 'test port id'
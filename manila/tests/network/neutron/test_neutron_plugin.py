@@ -19,6 +19,7 @@ import time
 from unittest import mock
 
 import ddt
+import eventlet
 from oslo_config import cfg
 
 from manila.common import constants
@@ -416,6 +417,38 @@ class NeutronNetworkPluginTest(test.TestCase):
         save_subnet_data.stop()
         create_port.stop()
 
+    def test_allocate_network_create_port_exception_rollback(self):
+        self.mock_object(self.plugin, '_has_provider_network_extension',
+                         mock.Mock(return_value=True))
+        self.mock_object(self.plugin, '_store_and_get_neutron_net_info',
+                         mock.Mock(return_value=False))
+        created_ports = [{'id': 'fake_port_id_0'}, {'id': 'fake_port_id_2'}]
+
+        def fake_create_port(context, share_server, share_network,
+                             share_network_subnet, device_owner, count,
+                             is_external_network=False):
+            if count == 1:
+                raise exception.NetworkException
+            return {'id': 'fake_port_id_%s' % count}
+
+        self.mock_object(self.plugin, '_create_port',
+                         mock.Mock(side_effect=fake_create_port))
+        self.mock_object(self.plugin, '_delete_port', mock.Mock(
+            side_effect=[None, exception.NetworkException]))
+
+        self.assertRaises(exception.NetworkException,
+                          self.plugin.allocate_network,
+                          self.fake_context,
+                          fake_share_server,
+                          fake_share_network,
+                          fake_share_network_subnet,
+                          count=3)
+
+        self.assertEqual(3, self.plugin._create_port.call_count)
+        self.plugin._delete_port.assert_has_calls([
+            mock.call(self.fake_context, port, ignore_db=False)
+            for port in created_ports])
+
     def _setup_manage_network_allocations(self):
 
         allocations = ['192.168.0.11', '192.168.0.12', 'fd12::2000']
@@ -628,6 +661,47 @@ class NeutronNetworkPluginTest(test.TestCase):
             {'status': constants.STATUS_ERROR})
         delete_port.stop()
 
+    def test_deallocate_network_concurrently(self):
+        group = self.plugin.neutron_api.config_group_name
+        cfg.CONF.set_override('neutron_port_operations_concurrency', 2,
+                              group=group)
+        self.addCleanup(cfg.CONF.clear_override,
+                        'neutron_port_operations_concurrency', group=group)
+        allocations = [{'id': 'fake_port_id_%s' % i} for i in range(4)]
+        self.mock_object(db_api, 'network_allocations_get_for_share_server',
+                         mock.Mock(return_value=allocations))
+        self.mock_object(db_api, 'network_allocation_update')
+        self.mock_object(db_api, 'network_allocation_delete')
+        running = []
+        max_running = []
+
+        def fake_delete_port(port_id):
+            running.append(port_id)
+            max_running.append(len(running))
+            eventlet.sleep(0)
+            running.remove(port_id)
+            if port_id == 'fake_port_id_1':
+                raise exception.NetworkException
+
+        self.mock_object(self.plugin.neutron_api, 'delete_port',
+                         mock.Mock(side_effect=fake_delete_port))
+
+        self.assertRaises(exception.NetworkException,
+                          self.plugin.deallocate_network,
+                          self.fake_context,
+                          fake_share_server['id'])
+
+        self.assertEqual(2, max(max_running))
+        self.plugin.neutron_api.delete_port.assert_has_calls(
+            [mock.call(port['id']) for port in allocations], any_order=True)
+        db_api.network_allocation_update.assert_called_once_with(
+            self.fake_context, 'fake_port_id_1',
+            {'status': constants.STATUS_ERROR})
+        db_api.network_allocation_delete.assert_has_calls(
+            [mock.call(self.fake_context, port_id) for port_id in
+             ('fake_port_id_0', 'fake_port_id_2', 'fake_port_id_3')],
+            any_order=True)
+
     @mock.patch.object(db_api, 'share_network_subnet_update', mock.Mock())
     def test_save_neutron_network_data(self):
         neutron_nw_info = {
@@ -978,46 +1052,64 @@ class NeutronBindNetworkPluginTest(test.TestCase):
             return plugin.NeutronBindNetworkPlugin()
 
     def test_wait_for_bind(self):
-        self.mock_object(self.bind_plugin.neutron_api, 'show_port')
-        self.bind_plugin.neutron_api.show_port.return_value = fake_neutron_port
+        self.mock_object(self.bind_plugin.neutron_api, 'list_ports',
+                         mock.Mock(return_value=[fake_neutron_port]))
 
         self.bind_plugin._wait_for_ports_bind([fake_neutron_port],
                                               fake_share_server)
 
-        self.bind_plugin.neutron_api.show_port.assert_called_once_with(
-            fake_neutron_port['id'])
+        self.bind_plugin.neutron_api.list_ports.assert_called_once_with(
+            id=[fake_neutron_port['id']])
         self.sleep_mock.assert_not_called()
 
     def test_wait_for_bind_error(self):
-        fake_neut_port = copy.copy(fake_neutron_port)
-        fake_neut_port['status'] = 'ERROR'
-        self.mock_object(self.bind_plugin.neutron_api, 'show_port')
-        self.bind_plugin.neutron_api.show_port.return_value = fake_neut_port
+        fake_neut_port1 = dict(fake_neutron_port, id='fake_port_id_1')
+        fake_neut_port2 = dict(fake_neutron_port, id='fake_port_id_2',
+                               status='ERROR')
+        self.mock_object(self.bind_plugin.neutron_api, 'list_ports',
+                         mock.Mock(return_value=[fake_neut_port1,
+                                                 fake_neut_port2]))
 
         self.assertRaises(exception.NetworkException,
                           self.bind_plugin._wait_for_ports_bind,
-                          [fake_neut_port, fake_neut_port],
+                          [fake_neut_port1, fake_neut_port2],
                           fake_share_server)
 
-        self.bind_plugin.neutron_api.show_port.assert_called_once_with(
-            fake_neutron_port['id'])
+        self.bind_plugin.neutron_api.list_ports.assert_called_once_with(
+            id=['fake_port_id_1', 'fake_port_id_2'])
+        self.sleep_mock.assert_not_called()
+
+    def test_wait_for_bind_port_not_found(self):
+        self.mock_object(self.bind_plugin.neutron_api, 'list_ports',
+                         mock.Mock(return_value=[]))
+
+        self.assertRaises(exception.NetworkException,
+                          self.bind_plugin._wait_for_ports_bind,
+                          [fake_neutron_port],
+                          fake_share_server)
+
+        self.bind_plugin.neutron_api.list_ports.assert_called_once_with(
+            id=[fake_neutron_port['id']])
         self.sleep_mock.assert_not_called()
 
     @ddt.data(('DOWN', 'ACTIVE'), ('DOWN', 'DOWN'), ('ACTIVE', 'DOWN'))
     def test_wait_for_bind_two_ports_no_bind(self, state):
-        fake_neut_port1 = copy.copy(fake_neutron_port)
-        fake_neut_port1['status'] = state[0]
-        fake_neut_port2 = copy.copy(fake_neutron_port)
-        fake_neut_port2['status'] = state[1]
-        self.mock_object(self.bind_plugin.neutron_api, 'show_port')
-        self.bind_plugin.neutron_api.show_port.side_effect = (
-            [fake_neut_port1, fake_neut_port2] * 20)
+        fake_neut_port1 = dict(fake_neutron_port, id='fake_port_id_1',
+                               status=state[0])
+        fake_neut_port2 = dict(fake_neutron_port, id='fake_port_id_2',
+                               status=state[1])
+        self.mock_object(self.bind_plugin.neutron_api, 'list_ports',
+                         mock.Mock(return_value=[fake_neut_port2,
+                                                 fake_neut_port1]))
 
         self.assertRaises(exception.NetworkBindException,
                           self.bind_plugin._wait_for_ports_bind,
                           [fake_neut_port1, fake_neut_port2],
                           fake_share_server)
 
+        self.assertEqual(
+            20, self.bind_plugin.neutron_api.list_ports.call_count)
+
     @mock.patch.object(db_api, 'share_network_get',
                        mock.Mock(return_value=fake_share_network))
     @mock.patch.object(db_api, 'share_server_get',
@@ -1632,46 +1724,64 @@ class NeutronBindSingleNetworkPluginTest(test.TestCase):
         self.assertFalse(instance.db.share_network_update.called)
 
     def test_wait_for_bind(self):
-        self.mock_object(self.bind_plugin.neutron_api, 'show_port')
-        self.bind_plugin.neutron_api.show_port.return_value = fake_neutron_port
+        self.mock_object(self.bind_plugin.neutron_api, 'list_ports',
+                         mock.Mock(return_value=[fake_neutron_port]))
 
         self.bind_plugin._wait_for_ports_bind([fake_neutron_port],
                                               fake_share_server)
 
-        self.bind_plugin.neutron_api.show_port.assert_called_once_with(
-            fake_neutron_port['id'])
+        self.bind_plugin.neutron_api.list_ports.assert_called_once_with(
+            id=[fake_neutron_port['id']])
         self.sleep_mock.assert_not_called()
 
     def test_wait_for_bind_error(self):
-        fake_neut_port = copy.copy(fake_neutron_port)
-        fake_neut_port['status'] = 'ERROR'
-        self.mock_object(self.bind_plugin.neutron_api, 'show_port')
-        self.bind_plugin.neutron_api.show_port.return_value = fake_neut_port
+        fake_neut_port1 = dict(fake_neutron_port, id='fake_port_id_1')
+        fake_neut_port2 = dict(fake_neutron_port, id='fake_port_id_2',
+                               status='ERROR')
+        self.mock_object(self.bind_plugin.neutron_api, 'list_ports',
+                         mock.Mock(return_value=[fake_neut_port1,
+                                                 fake_neut_port2]))
 
         self.assertRaises(exception.NetworkException,
                           self.bind_plugin._wait_for_ports_bind,
-                          [fake_neut_port, fake_neut_port],
+                          [fake_neut_port1, fake_neut_port2],
                           fake_share_server)
 
-        self.bind_plugin.neutron_api.show_port.assert_called_once_with(
-            fake_neutron_port['id'])
+        self.bind_plugin.neutron_api.list_ports.assert_called_once_with(
+            id=['fake_port_id_1', 'fake_port_id_2'])
+        self.sleep_mock.assert_not_called()
+
+    def test_wait_for_bind_port_not_found(self):
+        self.mock_object(self.bind_plugin.neutron_api, 'list_ports',
+                         mock.Mock(return_value=[]))
+
+        self.assertRaises(exception.NetworkException,
+                          self.bind_plugin._wait_for_ports_bind,
+                          [fake_neutron_port],
+                          fake_share_server)
+
+        self.bind_plugin.neutron_api.list_ports.assert_called_once_with(
+            id=[fake_neutron_port['id']])
         self.sleep_mock.assert_not_called()
 
     @ddt.data(('DOWN', 'ACTIVE'), ('DOWN', 'DOWN'), ('ACTIVE', 'DOWN'))
     def test_wait_for_bind_two_ports_no_bind(self, state):
-        fake_neut_port1 = copy.copy(fake_neutron_port)
-        fake_neut_port1['status'] = state[0]
-        fake_neut_port2 = copy.copy(fake_neutron_port)
-        fake_neut_port2['status'] = state[1]
-        self.mock_object(self.bind_plugin.neutron_api, 'show_port')
-        self.bind_plugin.neutron_api.show_port.side_effect = (
-            [fake_neut_port1, fake_neut_port2] * 20)
+        fake_neut_port1 = dict(fake_neutron_port, id='fake_port_id_1',
+                               status=state[0])
+        fake_neut_port2 = dict(fake_neutron_port, id='fake_port_id_2',
+                               status=state[1])
+        self.mock_object(self.bind_plugin.neutron_api, 'list_ports',
+                         mock.Mock(return_value=[fake_neut_port2,
+                                                 fake_neut_port1]))
 
         self.assertRaises(exception.NetworkBindException,
                           self.bind_plugin._wait_for_ports_bind,
                           [fake_neut_port1, fake_neut_port2],
                           fake_share_server)
 
+        self.assertEqual(
+            20, self.bind_plugin.neutron_api.list_ports.call_count)
+
     @mock.patch.object(db_api, 'network_allocation_create',
                        mock.Mock(return_values=fake_network_allocation))
     @mock.patch.object(db_api, 'share_network_get',
@@ -346,6 +346,28 @@ class StandaloneNetworkPluginTest(test.TestCase):
                  ip_version=6,
                  mtu=1500))
 
+    def _mock_allocation_db(self, instance, used_ips=(),
+                            conflicting_ips=()):
+        def fake_network_allocation_create(context, data):
+            return dict(data, id='fake_id_%s' % data['ip_address'])
+
+        def fake_get_allocations_by_ip_address(context, ip_address):
+            allocations = [{'id': 'fake_id_%s' % ip_address}]
+            if ip_address in conflicting_ips:
+                allocations.append({'id': 'fake_other_id'})
+            return allocations
+
+        self.mock_object(
+            instance.db, 'network_allocations_get_ip_addresses',
+            mock.Mock(return_value=list(used_ips)))
+        self.mock_object(
+            instance.db, 'network_allocation_create',
+            mock.Mock(side_effect=fake_network_allocation_create))
+        self.mock_object(
+            instance.db, 'network_allocations_get_by_ip_address',
+            mock.Mock(side_effect=fake_get_allocations_by_ip_address))
+        self.mock_object(instance.db, 'network_allocation_delete')
+
     @ddt.data('admin', 'user')
     def test_allocate_network_one_ip_address_ipv4_no_usages_exist(self, label):
         data = {
@@ -360,10 +382,7 @@ class StandaloneNetworkPluginTest(test.TestCase):
             instance = plugin.StandaloneNetworkPlugin(label=label)
         if label != 'admin':
             self.mock_object(instance.db, 'share_network_subnet_update')
-        self.mock_object(instance.db, 'network_allocation_create')
-        self.mock_object(
-            instance.db, 'network_allocations_get_by_ip_address',
-            mock.Mock(return_value=[]))
+        self._mock_allocation_db(instance)
 
         allocations = instance.allocate_network(
             fake_context, fake_share_server, fake_share_network,
@@ -383,24 +402,18 @@ class StandaloneNetworkPluginTest(test.TestCase):
                 fake_context, fake_share_network_subnet['id'], na_data)
             na_data['share_network_subnet_id'] = \
                 fake_share_network_subnet['id']
-        instance.db.network_allocations_get_by_ip_address.assert_has_calls(
-            [mock.call(fake_context, '10.0.0.2')])
+        instance.db.network_allocations_get_ip_addresses.\
+            assert_called_once_with(fake_context, ip_version=4)
         instance.db.network_allocation_create.assert_called_once_with(
             fake_context,
             dict(share_server_id=fake_share_server['id'],
                  ip_address='10.0.0.2', status=constants.STATUS_ACTIVE,
                  label=label, **na_data))
+        instance.db.network_allocations_get_by_ip_address.\
+            assert_called_once_with(fake_context, '10.0.0.2')
+        self.assertFalse(instance.db.network_allocation_delete.called)
 
     def test_allocate_network_two_ip_addresses_ipv4_two_usages_exist(self):
-        ctxt = type('FakeCtxt', (object,), {'fake': ['10.0.0.2', '10.0.0.4']})
-
-        def fake_get_allocations_by_ip_address(context, ip_address):
-            if ip_address not in context.fake:
-                context.fake.append(ip_address)
-                return []
-            else:
-                return context.fake
-
         data = {
             'DEFAULT': {
                 'standalone_network_plugin_gateway': '10.0.0.1',
@@ -410,13 +423,12 @@ class StandaloneNetworkPluginTest(test.TestCase):
         with test_utils.create_temp_config_with_opts(data):
             instance = plugin.StandaloneNetworkPlugin()
         self.mock_object(instance.db, 'share_network_subnet_update')
-        self.mock_object(instance.db, 'network_allocation_create')
-        self.mock_object(
-            instance.db, 'network_allocations_get_by_ip_address',
-            mock.Mock(side_effect=fake_get_allocations_by_ip_address))
+        self._mock_allocation_db(
+            instance, used_ips=['10.0.0.2', '10.0.0.4', '10.1.0.3',
+                                'fd12::3', None])
 
         allocations = instance.allocate_network(
-            ctxt, fake_share_server, fake_share_network,
+            fake_context, fake_share_server, fake_share_network,
             fake_share_network_subnet, count=2)
 
         self.assertEqual(2, len(allocations))
@@ -429,24 +441,93 @@ class StandaloneNetworkPluginTest(test.TestCase):
             'mtu': 1500,
         }
         instance.db.share_network_subnet_update.assert_called_once_with(
-            ctxt, fake_share_network_subnet['id'], dict(**na_data))
-        instance.db.network_allocations_get_by_ip_address.assert_has_calls(
-            [mock.call(ctxt, '10.0.0.2'), mock.call(ctxt, '10.0.0.3'),
-             mock.call(ctxt, '10.0.0.4'), mock.call(ctxt, '10.0.0.5')])
+            fake_context, fake_share_network_subnet['id'], dict(**na_data))
+        instance.db.network_allocations_get_ip_addresses.\
+            assert_called_once_with(fake_context, ip_version=4)
         na_data['share_network_subnet_id'] = fake_share_network_subnet['id']
         instance.db.network_allocation_create.assert_has_calls([
             mock.call(
-                ctxt,
+                fake_context,
                 dict(share_server_id=fake_share_server['id'],
                      ip_address='10.0.0.3', status=constants.STATUS_ACTIVE,
                      label='user', **na_data)),
             mock.call(
-                ctxt,
+                fake_context,
                 dict(share_server_id=fake_share_server['id'],
                      ip_address='10.0.0.5', status=constants.STATUS_ACTIVE,
                      label='user', **na_data)),
         ])
 
+    def test_allocate_network_overlapping_allowed_ip_ranges(self):
+        data = {
+            'DEFAULT': {
+                'standalone_network_plugin_gateway': '10.0.0.1',
+                'standalone_network_plugin_mask': '24',
+                'standalone_network_plugin_allowed_ip_ranges': (
+                    '10.0.0.10-10.0.0.11,10.0.0.11-10.0.0.12'),
+            },
+        }
+        with test_utils.create_temp_config_with_opts(data):
+            instance = plugin.StandaloneNetworkPlugin()
+        self.mock_object(instance.db, 'share_network_subnet_update')
+        self._mock_allocation_db(instance)
+
+        allocations = instance.allocate_network(
+            fake_context, fake_share_server, fake_share_network,
+            fake_share_network_subnet, count=3)
+
+        self.assertEqual(['10.0.0.10', '10.0.0.11', '10.0.0.12'],
+                         [a['ip_address'] for a in allocations])
+
+    def test_allocate_network_concurrent_allocation(self):
+        data = {
+            'DEFAULT': {
+                'standalone_network_plugin_gateway': '10.0.0.1',
+                'standalone_network_plugin_mask': '24',
+            },
+        }
+        with test_utils.create_temp_config_with_opts(data):
+            instance = plugin.StandaloneNetworkPlugin()
+        self.mock_object(instance.db, 'share_network_subnet_update')
+        self._mock_allocation_db(instance, conflicting_ips=['10.0.0.3'])
+
+        allocations = instance.allocate_network(
+            fake_context, fake_share_server, fake_share_network,
+            fake_share_network_subnet, count=2)
+
+        self.assertEqual(['10.0.0.2', '10.0.0.4'],
+                         [a['ip_address'] for a in allocations])
+        instance.db.network_allocation_delete.assert_called_once_with(
+            fake_context, 'fake_id_10.0.0.3')
+        self.assertEqual(
+            2, instance.db.network_allocations_get_ip_addresses.call_count)
+
+    def test_allocate_network_concurrent_allocation_attempts_exceeded(self):
+        data = {
+            'DEFAULT': {
+                'standalone_network_plugin_gateway': '10.0.0.1',
+                'standalone_network_plugin_mask': '24',
+            },
+        }
+        with test_utils.create_temp_config_with_opts(data):
+            instance = plugin.StandaloneNetworkPlugin()
+        self.mock_object(instance.db, 'share_network_subnet_update')
+        self._mock_allocation_db(
+            instance, conflicting_ips=['10.0.0.3', '10.0.0.4', '10.0.0.5'])
+
+        self.assertRaises(
+            exception.NetworkException,
+            instance.allocate_network,
+            fake_context, fake_share_server, fake_share_network,
+            fake_share_network_subnet, count=2)
+
+        instance.db.network_allocation_delete.assert_has_calls([
+            mock.call(fake_context, 'fake_id_10.0.0.3'),
+            mock.call(fake_context, 'fake_id_10.0.0.4'),
+            mock.call(fake_context, 'fake_id_10.0.0.5'),
+            mock.call(fake_context, 'fake_id_10.0.0.2'),
+        ])
+
     def test_allocate_network_no_available_ipv4_addresses(self):
         data = {
             'DEFAULT': {
@@ -457,10 +538,7 @@ class StandaloneNetworkPluginTest(test.TestCase):
         with test_utils.create_temp_config_with_opts(data):
             instance = plugin.StandaloneNetworkPlugin()
         self.mock_object(instance.db, 'share_network_subnet_update')
-        self.mock_object(instance.db, 'network_allocation_create')
-        self.mock_object(
-            instance.db, 'network_allocations_get_by_ip_address',
-            mock.Mock(return_value=['not empty list']))
+        self._mock_allocation_db(instance, used_ips=['10.0.0.2'])
 
         self.assertRaises(
             exception.NetworkBadConfigurationException,
@@ -475,8 +553,9 @@ class StandaloneNetworkPluginTest(test.TestCase):
                  gateway=str(instance.gateway),
                  ip_version=4,
                  mtu=1500))
-        instance.db.network_allocations_get_by_ip_address.assert_has_calls(
-            [mock.call(fake_context, '10.0.0.2')])
+        instance.db.network_allocations_get_ip_addresses.\
+            assert_called_once_with(fake_context, ip_version=4)
+        self.assertFalse(instance.db.network_allocation_create.called)
 
     def _setup_manage_network_allocations(self, label=None):
         data = {
@@ -24,6 +24,7 @@ from oslo_utils import timeutils
 
 from manila import context
 from manila import db
+from manila import exception
 from manila.scheduler.drivers import base
 from manila import test
 from manila import utils
@@ -54,7 +55,9 @@ class SchedulerTestCase(test.TestCase):
                 service_name, host, capabilities, timestamp)
             (self.driver.host_manager.update_service_capabilities.
                 assert_called_once_with(service_name, host,
-                                        capabilities, timestamp))
+                                        capabilities, timestamp,
+                                        capabilities_version=None,
+                                        capabilities_delta=None))
 
     def test_hosts_up(self):
         service1 = {'host': 'host1'}
@@ -90,6 +93,19 @@ class SchedulerDriverBaseTestCase(SchedulerTestCase):
                           self.context, self.topic, 'schedule_something',
                           *fake_args, **fake_kwargs)
 
+    def test_schedule_create_shares(self):
+        error = exception.NoValidHost(reason='fake')
+        self.mock_object(self.driver, 'schedule_create_share',
+                         mock.Mock(side_effect=[None, error]))
+
+        failures = self.driver.schedule_create_shares(
+            self.context, ['spec1', 'spec2'], [{}, {'fake': 'fake'}])
+
+        self.assertEqual([('spec2', error)], failures)
+        self.driver.schedule_create_share.assert_has_calls([
+            mock.call(self.context, 'spec1', {}),
+            mock.call(self.context, 'spec2', {'fake': 'fake'})])
+
 
 class SchedulerDriverModuleTestCase(test.TestCase):
     """Test case for scheduler driver module methods."""
@@ -28,6 +28,7 @@ from manila.message import message_field
 from manila.scheduler.drivers import base
 from manila.scheduler.drivers import filter
 from manila.scheduler import host_manager
+from manila.scheduler.weighers import base_host as base_host_weigher
 from manila.tests.scheduler.drivers import test_base
 from manila.tests.scheduler import fakes
 
@@ -500,6 +501,116 @@ class FilterSchedulerTestCase(test_base.SchedulerTestCase):
                          filter_properties['retry']['hosts'][0])
         self.assertEqual(1024, host_state.total_capacity_gb)
 
+    def _setup_schedule_create_shares(self, sched, hosts):
+        def _get_filtered_hosts(hosts, filter_properties):
+            return [host for host in hosts
+                    if host.free_capacity_gb >= filter_properties['size']
+                    ], 'CapacityFilter'
+
+        def _get_weighed_hosts(hosts, filter_properties):
+            return sorted(
+                (base_host_weigher.WeighedHost(host, host.free_capacity_gb)
+                 for host in hosts),
+                key=lambda weighed_host: -weighed_host.weight)
+
+        self.mock_object(sched.host_manager, 'get_all_host_states_share',
+                         mock.Mock(return_value=hosts))
+        self.mock_object(sched.host_manager, 'get_filtered_hosts',
+                         mock.Mock(side_effect=_get_filtered_hosts))
+        self.mock_object(sched.host_manager, 'get_weighed_hosts',
+                         mock.Mock(side_effect=_get_weighed_hosts))
+        self.mock_object(base, 'share_update_db',
+                         mock.Mock(side_effect=lambda ctxt, share_id, host:
+                                   mock.Mock(instance=share_id)))
+        self.mock_object(sched.share_rpcapi, 'create_share_instance')
+
+    def _get_request_spec(self, share_id, size):
+        return {
+            'share_properties': {'project_id': 1, 'size': size},
+            'share_instance_properties': {},
+            'share_type': {'id': 'fake_type', 'name': 'NFS'},
+            'share_id': share_id,
+            'snapshot_id': None,
+        }
+
+    def test_schedule_create_shares(self):
+        sched = fakes.FakeFilterScheduler()
+        fake_context = context.RequestContext('user', 'project')
+        hosts = [fakes.FakeHostState(host, {'free_capacity_gb': free})
+                 for host, free in (('host1', 10), ('host2', 5))]
+        self._setup_schedule_create_shares(sched, hosts)
+        request_specs = [self._get_request_spec('fake-id%s' % i, size)
+                         for i, size in enumerate((4, 4, 4, 1))]
+
+        failures = sched.schedule_create_shares(
+            fake_context, request_specs, [None] * len(request_specs))
+
+        self.assertEqual([], failures)
+        (sched.host_manager.get_all_host_states_share.
+            assert_called_once_with(mock.ANY, consider_disabled=False))
+        base.share_update_db.assert_has_calls([
+            mock.call(fake_context, 'fake-id0', 'host1'),
+            mock.call(fake_context, 'fake-id1', 'host1'),
+            mock.call(fake_context, 'fake-id2', 'host2'),
+            mock.call(fake_context, 'fake-id3', 'host1'),
+        ])
+        self.assertEqual([1, 1], [host.free_capacity_gb for host in hosts])
+        # One filtering of all hosts per kind of share, and of the chosen
+        # host after each placement
+        self.assertEqual(
+            [2, 1, 1, 1, 2, 1],
+            [len(call[0][0]) for call in
+             sched.host_manager.get_filtered_hosts.call_args_list])
+        self.assertEqual(
+            4, sched.share_rpcapi.create_share_instance.call_count)
+        self.assertEqual(
+            [['host1'], ['host1'], ['host2'], ['host1']],
+            [call[1]['filter_properties']['retry']['hosts'] for call in
+             sched.share_rpcapi.create_share_instance.call_args_list])
+
+    def test_schedule_create_shares_no_valid_host(self):
+        sched = fakes.FakeFilterScheduler()
+        fake_context = context.RequestContext('user', 'project')
+        hosts = [fakes.FakeHostState('host1', {'free_capacity_gb': 5})]
+        self._setup_schedule_create_shares(sched, hosts)
+        request_specs = [self._get_request_spec('fake-id%s' % i, size)
+                         for i, size in enumerate((3, 3, 8))]
+
+        failures = sched.schedule_create_shares(
+            fake_context, request_specs, [{}, {}, {}])
+
+        self.assertEqual([request_specs[1], request_specs[2]],
+                         [failure[0] for failure in failures])
+        for failure in failures:
+            self.assertIsInstance(failure[1], exception.NoValidHost)
+        base.share_update_db.assert_called_once_with(
+            fake_context, 'fake-id0', 'host1')
+
+    def test_schedule_create_shares_no_hosts(self):
+        sched = fakes.FakeFilterScheduler()
+        fake_context = context.RequestContext('user', 'project')
+        self._setup_schedule_create_shares(sched, [])
+        create_mock_message = self.mock_object(sched.message_api, 'create')
+        request_specs = [self._get_request_spec('fake-id%s' % i, 1)
+                         for i in range(2)]
+
+        failures = sched.schedule_create_shares(
+            fake_context, request_specs, [{}, {}])
+
+        self.assertEqual(request_specs, [failure[0] for failure in failures])
+        for failure in failures:
+            self.assertIsInstance(failure[1], exception.WillNotSchedule)
+        self.assertFalse(sched.share_rpcapi.create_share_instance.called)
+        create_mock_message.assert_has_calls([
+            mock.call(
+                fake_context,
+                message_field.Action.CREATE,
+                fake_context.project_id,
+                resource_type=message_field.Resource.SHARE,
+                resource_id='fake-id%s' % i,
+                detail=message_field.Detail.SHARE_BACKEND_NOT_READY_YET)
+            for i in range(2)])
+
     def test_schedule_create_share_group(self):
         # Ensure empty hosts/child_zones result in NoValidHosts exception.
         sched = fakes.FakeFilterScheduler()
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from unittest import mock
+
 from manila import exception
 from manila.scheduler.evaluator import evaluator
 from manila import test
@@ -139,3 +141,29 @@ class EvaluatorTestCase(test.TestCase):
         self.assertRaises(exception.EvaluatorParseException,
                           evaluator.evaluate,
                           "7 / 0")
+
+    @mock.patch.object(evaluator, '_expressions', new_callable=dict)
+    def test_parsed_expression_reused(self, _expressions):
+        parser = evaluator._def_parser()
+        self.mock_object(evaluator, '_parser', parser)
+        self.mock_object(parser, 'parseString',
+                         mock.Mock(side_effect=parser.parseString))
+
+        for free in (10, 200, 30):
+            self.assertEqual(
+                free > 50,
+                evaluator.evaluate("stats.free > 50 AND extra.fast == 'x'",
+                                   stats={'free': free},
+                                   extra={'fast': 'x'}))
+
+        parser.parseString.assert_called_once_with(
+            "stats.free > 50 AND extra.fast == 'x'", parseAll=True)
+
+    @mock.patch.object(evaluator, '_expressions', new_callable=dict)
+    def test_parsed_expressions_cache_bounded(self, _expressions):
+        self.mock_object(evaluator, '_MAX_CACHED_EXPRESSIONS', 2)
+
+        for i in range(3):
+            self.assertEqual(i + 1, evaluator.evaluate("%s + 1" % i))
+
+        self.assertEqual(['2 + 1'], list(_expressions))
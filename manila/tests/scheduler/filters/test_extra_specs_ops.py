@@ -78,3 +78,42 @@ class ExtraSpecsOpsTestCase(test.TestCase):
     def test_extra_specs_matches_simple(self, value, req, matches):
         self._do_extra_specs_ops_test(
             value, req, matches)
+
+    @ddt.unpack
+    @ddt.data(
+        ('1', '1', True),
+        ('', '1', False),
+        ('', '', True),
+        ('nfs', 'NFS', True),
+        ('cifs', 'nfs', False),
+        ('Thin Pool', 'thin pool', True),
+        (True, 'True', True),
+        (True, 'true', True),
+        (True, 'False', False),
+        (True, 'Nonsense', False),
+        ('True', 'True', True),
+        ('true', 'True', True),
+        (1, '1', False),
+        (None, 'True', False),
+        (True, '<is> True', True),
+        (True, '<is> False', False),
+        (False, '<is> False', True),
+        (False, '<is> Nonsense', True),
+        ('yes', '<is> True', True),
+        ('TRUE', '<is> true', True),
+        (1, '<is> True', True),
+        (None, '<is> False', False),
+        (True, '<is>', False),
+    )
+    def test_index_keys_consistent_with_match(self, value, req, matches):
+        required_keys = extra_specs_ops.required_index_keys(req)
+
+        self.assertEqual(matches, extra_specs_ops.match(value, req))
+        self.assertEqual(
+            matches,
+            bool(set(extra_specs_ops.index_keys(value)) &
+                 set(required_keys)))
+
+    @ddt.data('= 123', '<in> abc', '<or> 11 <or> 12', 's== abc', '>= 3')
+    def test_required_index_keys_not_indexable(self, req):
+        self.assertIsNone(extra_specs_ops.required_index_keys(req))
@@ -28,7 +28,9 @@ from oslo_utils import timeutils
 from manila import context
 from manila import db
 from manila import exception
+from manila.message import message_field
 from manila.scheduler.filters import base_host
+from manila.scheduler.filters import capabilities
 from manila.scheduler import host_manager
 from manila.scheduler import utils as scheduler_utils
 from manila import test
@@ -105,6 +107,17 @@ class HostManagerTestCase(test.TestCase):
             self.host_manager._choose_host_filters.assert_called_once_with(
                 mock.ANY)
 
+    def test_update_service_capabilities_invalidates_provisioned_capacity(
+            self):
+        self.mock_object(self.host_manager.provisioned_capacity,
+                         'invalidate')
+
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', dict(free_capacity_gb=4321), 31337)
+
+        (self.host_manager.provisioned_capacity.invalidate.
+            assert_called_once_with())
+
     def test_update_service_capabilities_for_shares(self):
         service_states = self.host_manager.service_states
         self.assertDictEqual(service_states, {})
@@ -137,6 +150,61 @@ class HostManagerTestCase(test.TestCase):
         }
         self.assertDictEqual(service_states, expected)
 
+    def test_update_service_capabilities_with_delta(self):
+        capabilities = {
+            'driver_version': '1.0',
+            'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 10},
+                      {'pool_name': 'pool2', 'free_capacity_gb': 20}],
+        }
+        delta = {
+            'changed': {},
+            'removed': [],
+            'pools': {
+                'changed': {'pool1': {'changed': {'free_capacity_gb': 5},
+                                      'removed': []}},
+                'removed': ['pool2'],
+            },
+        }
+
+        self.assertTrue(self.host_manager.update_service_capabilities(
+            'share', 'host1', capabilities, 31337, capabilities_version=1))
+        self.assertTrue(self.host_manager.update_service_capabilities(
+            'share', 'host1', {}, 31338, capabilities_version=2,
+            capabilities_delta=delta))
+
+        expected = {
+            'driver_version': '1.0',
+            'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 5}],
+            'timestamp': 31338,
+        }
+        self.assertEqual(expected, self.host_manager.service_states['host1'])
+        self.assertEqual(2, self.host_manager.capabilities_versions['host1'])
+
+    @ddt.data((None, 2), (1, 3), (1, None))
+    @ddt.unpack
+    def test_update_service_capabilities_with_delta_gap(
+            self, known_version, version):
+        capabilities = {'driver_version': '1.0'}
+        delta = {'changed': {'driver_version': '1.1'}, 'removed': []}
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', capabilities, 31337,
+            capabilities_version=known_version)
+
+        result = self.host_manager.update_service_capabilities(
+            'share', 'host1', {}, 31338, capabilities_version=version,
+            capabilities_delta=delta)
+
+        self.assertFalse(result)
+        self.assertEqual(
+            dict(capabilities, timestamp=31337),
+            self.host_manager.service_states['host1'])
+
+    def test_update_service_capabilities_with_delta_unknown_host(self):
+        self.assertFalse(self.host_manager.update_service_capabilities(
+            'share', 'host1', {}, 31337, capabilities_version=2,
+            capabilities_delta={'changed': {}, 'removed': []}))
+        self.assertNotIn('host1', self.host_manager.service_states)
+
     def test_get_all_host_states_share(self):
         fake_context = context.RequestContext('user', 'project')
         topic = CONF.share_topic
@@ -171,6 +239,95 @@ class HostManagerTestCase(test.TestCase):
             db.service_get_all_by_topic.assert_called_once_with(
                 fake_context, topic, consider_disabled=False)
 
+    def test_get_filtered_hosts_capability_index(self):
+        fake_context = context.RequestContext('user', 'project')
+        self.mock_object(
+            db, 'service_get_all_by_topic',
+            mock.Mock(return_value=fakes.SHARE_SERVICES_WITH_POOLS[:3]))
+        self.mock_object(utils, 'service_is_up', mock.Mock(return_value=True))
+        self.mock_object(self.host_manager, '_choose_host_filters',
+                         mock.Mock(return_value=[
+                             capabilities.CapabilitiesFilter]))
+        self.mock_object(capabilities.CapabilitiesFilter, '_filter_one',
+                         mock.Mock(return_value=True))
+        unindexed_host = host_manager.HostState('host4@DDD#pool4')
+        filter_properties = {
+            'resource_type': {
+                'extra_specs': {'share_backend_name': 'BBB',
+                                'revert_to_snapshot_support': '<is> False'},
+            },
+        }
+
+        with mock.patch.dict(self.host_manager.service_states,
+                             fakes.SHARE_SERVICE_STATES_WITH_POOLS):
+            hosts = list(self.host_manager.get_all_host_states_share(
+                fake_context))
+            result, last_filter = self.host_manager.get_filtered_hosts(
+                hosts + [unindexed_host], filter_properties)
+
+        self.assertEqual({'host1@AAA#pool1', 'host2@BBB#pool2',
+                          'host3@CCC#pool3'},
+                         self.host_manager.capability_indexed_hosts)
+        self.assertEqual(['host2@BBB#pool2', 'host4@DDD#pool4'],
+                         [host.host for host in result])
+        self.assertEqual(
+            2, capabilities.CapabilitiesFilter._filter_one.call_count)
+
+    def test_get_filtered_hosts_capability_index_no_hosts(self):
+        fake_context = context.RequestContext('user', 'project')
+        self.mock_object(
+            db, 'service_get_all_by_topic',
+            mock.Mock(return_value=fakes.SHARE_SERVICES_WITH_POOLS[:3]))
+        self.mock_object(utils, 'service_is_up', mock.Mock(return_value=True))
+        self.mock_object(self.host_manager, '_choose_host_filters',
+                         mock.Mock(return_value=[
+                             FakeFilterClass1,
+                             capabilities.CapabilitiesFilter]))
+        self.mock_object(FakeFilterClass1, '_filter_one',
+                         mock.Mock(return_value=True))
+        filter_properties = {
+            'resource_type': {
+                'extra_specs': {'share_backend_name': 'ZZZ'},
+            },
+        }
+
+        with mock.patch.dict(self.host_manager.service_states,
+                             fakes.SHARE_SERVICE_STATES_WITH_POOLS):
+            hosts = self.host_manager.get_all_host_states_share(fake_context)
+            result, last_filter = self.host_manager.get_filtered_hosts(
+                hosts, filter_properties)
+
+        self.assertEqual([], result)
+        self.assertEqual('CapabilitiesFilter', last_filter)
+        FakeFilterClass1._filter_one.assert_not_called()
+        no_valid_host = exception.NoValidHost(
+            reason='', detail_data={'last_filter': last_filter})
+        self.assertEqual(
+            message_field.Detail.FILTER_CAPABILITIES[0],
+            message_field.translate_detail_id(no_valid_host, None))
+
+    def test_update_service_capabilities_capability_index_stale(self):
+        fake_context = context.RequestContext('user', 'project')
+        self.mock_object(
+            db, 'service_get_all_by_topic',
+            mock.Mock(return_value=fakes.SHARE_SERVICES_WITH_POOLS[:1]))
+        self.mock_object(utils, 'service_is_up', mock.Mock(return_value=True))
+        self.mock_object(self.host_manager, '_update_capability_index',
+                         mock.Mock(
+                             wraps=self.host_manager._update_capability_index))
+
+        with mock.patch.dict(self.host_manager.service_states,
+                             fakes.SHARE_SERVICE_STATES_WITH_POOLS):
+            self.host_manager.get_all_host_states_share(fake_context)
+            self.host_manager.get_all_host_states_share(fake_context)
+            self.host_manager.update_service_capabilities(
+                'share', 'host1@AAA',
+                fakes.SHARE_SERVICE_STATES_WITH_POOLS['host1@AAA'], None)
+            self.host_manager.get_all_host_states_share(fake_context)
+
+        self.assertEqual(
+            2, self.host_manager._update_capability_index.call_count)
+
     def test_get_pools_no_pools(self):
         fake_context = context.RequestContext('user', 'project')
         self.mock_object(utils, 'service_is_up', mock.Mock(return_value=True))
@@ -1297,3 +1454,94 @@ class PoolStateTestCase(test.TestCase):
         if 'ipv6_support' in share_capability:
             self.assertEqual(share_capability['ipv6_support'],
                              fake_pool.ipv6_support)
+
+    def _get_thin_capability(self):
+        return {
+            'total_capacity_gb': 1024, 'free_capacity_gb': 512,
+            'allocated_capacity_gb': 0, 'reserved_percentage': 0,
+            'reserved_snapshot_percentage': 0,
+            'reserved_share_extend_percentage': 0,
+            'thin_provisioning': True, 'timestamp': None,
+        }
+
+    def test_update_from_share_capability_provisioned_capacity_cache(self):
+        fake_context = context.RequestContext('user', 'project', is_admin=True)
+        self.mock_object(db, 'share_instance_get_all_by_host')
+        self.mock_object(
+            db, 'share_instance_provisioned_capacity_get_all',
+            mock.Mock(return_value={'host1#pool0': 40, 'host1#pool1': 2}))
+        cache = host_manager.ProvisionedCapacityCache()
+        pools = [host_manager.PoolState('host1', None, 'pool%s' % x)
+                 for x in range(3)]
+
+        for pool in pools:
+            pool.update_from_share_capability(
+                self._get_thin_capability(), context=fake_context,
+                provisioned_capacity=cache)
+
+        self.assertEqual([40, 2, 0],
+                         [pool.provisioned_capacity_gb for pool in pools])
+        (db.share_instance_provisioned_capacity_get_all.
+            assert_called_once_with(fake_context))
+        self.assertFalse(db.share_instance_get_all_by_host.called)
+
+    def test_consume_from_share_provisioned_capacity_cache(self):
+        fake_context = context.RequestContext('user', 'project', is_admin=True)
+        self.mock_object(
+            db, 'share_instance_provisioned_capacity_get_all',
+            mock.Mock(return_value={'host1#pool0': 40}))
+        cache = host_manager.ProvisionedCapacityCache()
+        fake_pool = host_manager.PoolState('host1', None, 'pool0')
+        fake_pool.update_from_share_capability(
+            self._get_thin_capability(), context=fake_context,
+            provisioned_capacity=cache)
+
+        fake_pool.consume_from_share({'id': 'foo', 'size': 10})
+
+        self.assertEqual(50, fake_pool.provisioned_capacity_gb)
+        self.assertEqual(50, cache.get(fake_context, 'host1#pool0'))
+        (db.share_instance_provisioned_capacity_get_all.
+            assert_called_once_with(fake_context))
+
+
+class ProvisionedCapacityCacheTestCase(test.TestCase):
+    """Test case for ProvisionedCapacityCache class."""
+
+    def setUp(self):
+        super(ProvisionedCapacityCacheTestCase, self).setUp()
+        self.context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        self.mock_object(
+            db, 'share_instance_provisioned_capacity_get_all',
+            mock.Mock(side_effect=lambda ctxt: {'host1#pool0': 5}))
+        self.cache = host_manager.ProvisionedCapacityCache()
+
+    def test_get(self):
+        self.assertEqual(5, self.cache.get(self.context, 'host1#pool0'))
+        self.assertEqual(0, self.cache.get(self.context, 'host2#pool0'))
+        (db.share_instance_provisioned_capacity_get_all.
+            assert_called_once_with(self.context))
+
+    def test_consume(self):
+        self.cache.get(self.context, 'host1#pool0')
+
+        self.cache.consume('host1#pool0', 3)
+        self.cache.consume('host2#pool0', 4)
+
+        self.assertEqual(8, self.cache.get(self.context, 'host1#pool0'))
+        self.assertEqual(4, self.cache.get(self.context, 'host2#pool0'))
+
+    def test_consume_not_loaded(self):
+        self.cache.consume('host1#pool0', 3)
+
+        self.assertEqual(5, self.cache.get(self.context, 'host1#pool0'))
+
+    def test_invalidate(self):
+        self.cache.get(self.context, 'host1#pool0')
+        self.cache.consume('host1#pool0', 3)
+
+        self.cache.invalidate()
+
+        self.assertEqual(5, self.cache.get(self.context, 'host1#pool0'))
+        self.assertEqual(
+            2, db.share_instance_provisioned_capacity_get_all.call_count)
@@ -17,6 +17,7 @@
 Tests For Scheduler Manager
 """
 
+import datetime
 from importlib import reload
 from unittest import mock
 
@@ -123,7 +124,9 @@ class SchedulerManagerTestCase(test.TestCase):
             self.manager.update_service_capabilities(
                 self.context, service_name=service_name, host=host)
             (self.manager.driver.update_service_capabilities.
-                assert_called_once_with(service_name, host, {}, None))
+                assert_called_once_with(service_name, host, {}, None,
+                                        capabilities_version=None,
+                                        capabilities_delta=None))
         with mock.patch.object(self.manager.driver,
                                'update_service_capabilities', mock.Mock()):
             capabilities = {'fake_capability': 'fake_value'}
@@ -132,7 +135,34 @@ class SchedulerManagerTestCase(test.TestCase):
                 capabilities=capabilities)
             (self.manager.driver.update_service_capabilities.
                 assert_called_once_with(service_name, host,
-                                        capabilities, None))
+                                        capabilities, None,
+                                        capabilities_version=None,
+                                        capabilities_delta=None))
+
+    @ddt.data(True, False)
+    def test_update_service_capabilities_delta(self, in_sync):
+        self.mock_object(self.manager.driver, 'update_service_capabilities',
+                         mock.Mock(return_value=in_sync))
+        mock_publish = self.mock_object(
+            share_rpcapi.ShareAPI, 'publish_service_capabilities')
+        delta = {'changed': {'fake_capability': 'fake_value'},
+                 'removed': []}
+
+        self.manager.update_service_capabilities(
+            self.context, service_name='share', host='fake_host',
+            timestamp='2024-01-01T00:00:00.000000', capabilities_version=2,
+            capabilities_delta=delta)
+
+        (self.manager.driver.update_service_capabilities.
+            assert_called_once_with(
+                'share', 'fake_host', {},
+                datetime.datetime(2024, 1, 1, 0, 0),
+                capabilities_version=2, capabilities_delta=delta))
+        if in_sync:
+            mock_publish.assert_not_called()
+        else:
+            mock_publish.assert_called_once_with(
+                self.context, host='fake_host')
 
     @mock.patch.object(db, 'share_update', mock.Mock())
     @mock.patch('manila.message.api.API.create')
@@ -192,6 +222,36 @@ class SchedulerManagerTestCase(test.TestCase):
                 assert_called_once_with(self.context, request_spec, {}))
             manager.LOG.error.assert_called_once_with(mock.ANY, mock.ANY)
 
+    @mock.patch.object(db, 'share_update', mock.Mock())
+    @mock.patch('manila.message.api.API.create')
+    def test_create_share_instances(self, _mock_message_create):
+        request_specs = [{'share_id': share_id}
+                         for share_id in ('fake1', 'fake2', 'fake3')]
+        no_valid_host = exception.NoValidHost(reason='')
+        quota_error = exception.QuotaError()
+        self.mock_object(
+            self.manager.driver, 'schedule_create_shares',
+            mock.Mock(return_value=[(request_specs[0], no_valid_host),
+                                    (request_specs[2], quota_error)]))
+        self.mock_object(manager.LOG, 'error')
+
+        self.manager.create_share_instances(
+            self.context, request_specs=request_specs,
+            filter_properties_list=[{}, {}, {}])
+
+        self.manager.driver.schedule_create_shares.assert_called_once_with(
+            self.context, request_specs, [{}, {}, {}])
+        db.share_update.assert_has_calls([
+            mock.call(self.context, 'fake1', {'status': 'error'}),
+            mock.call(self.context, 'fake3', {'status': 'error'}),
+        ])
+        self.assertEqual(2, db.share_update.call_count)
+        _mock_message_create.assert_called_once_with(
+            self.context,
+            message_field.Action.ALLOCATE_HOST,
+            self.context.project_id, resource_type='SHARE',
+            exception=no_valid_host, resource_id='fake1')
+
     @mock.patch.object(quota.QUOTAS, 'expire')
     def test__expire_reservations(self, mock_expire):
         self.manager._expire_reservations(self.context)
@@ -78,6 +78,21 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  fanout=True,
                                  version='1.10')
 
+    def test_update_service_capabilities_delta(self):
+        self.mock_object(scheduler_rpcapi.SchedulerAPI,
+                         'can_send_capabilities_delta',
+                         mock.Mock(return_value=True))
+        self._test_scheduler_api('update_service_capabilities',
+                                 rpc_method='cast',
+                                 service_name='fake_name',
+                                 host='fake_host',
+                                 capabilities=None,
+                                 capabilities_version=2,
+                                 capabilities_delta={'changed': {},
+                                                     'removed': []},
+                                 fanout=True,
+                                 version='1.13')
+
     def test_create_share_instance(self):
         self._test_scheduler_api('create_share_instance',
                                  rpc_method='cast',
@@ -85,6 +100,13 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  filter_properties='filter_properties',
                                  version='1.2')
 
+    def test_create_share_instances(self):
+        self._test_scheduler_api('create_share_instances',
+                                 rpc_method='cast',
+                                 request_specs=['fake_request_spec'],
+                                 filter_properties_list=['filter_properties'],
+                                 version='1.12')
+
     def test_get_pools(self):
         self._test_scheduler_api('get_pools',
                                  rpc_method='call',
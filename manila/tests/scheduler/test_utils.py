@@ -59,3 +59,106 @@ class UtilsTestCase(test.TestCase):
     def test_thin_provisioning(self, thin_capabilities, thin):
         thin_provisioning = utils.thin_provisioning(thin_capabilities)
         self.assertEqual(thin, thin_provisioning)
+
+    def test_hosts_satisfying_capabilities(self):
+        capabilities = {
+            'host1#pool1': {'snapshot_support': True,
+                            'driver_handles_share_servers': False,
+                            'replication_type': 'dr',
+                            'thin_provisioning': [True, False]},
+            'host1#pool2': {'snapshot_support': False,
+                            'driver_handles_share_servers': False,
+                            'replication_type': None,
+                            'thin_provisioning': False},
+            'host2#pool1': {'snapshot_support': 'True',
+                            'driver_handles_share_servers': True,
+                            'thin_provisioning': True},
+        }
+        capability_index = {}
+        for host, caps in capabilities.items():
+            for key in utils.capability_index_keys(caps):
+                capability_index.setdefault(key, set()).add(host)
+        extra_specs = {
+            'snapshot_support': '<is> True',
+            'capabilities:thin_provisioning': '<is> True',
+            'availability_zones': 'az1',
+            'vendor:fancy': 'yes',
+            'size': '>= 3',
+        }
+
+        hosts = utils.hosts_satisfying_capabilities(capability_index,
+                                                    extra_specs)
+
+        self.assertEqual({'host1#pool1', 'host2#pool1'}, hosts)
+        self.assertEqual(
+            {'host1#pool1'},
+            utils.hosts_satisfying_capabilities(
+                capability_index, {'replication_type': 'DR'}))
+        self.assertEqual(
+            {'host1#pool1', 'host1#pool2'},
+            utils.hosts_satisfying_capabilities(
+                capability_index, {'driver_handles_share_servers': 'False'}))
+        extra_specs.pop('size')
+        for host, caps in capabilities.items():
+            self.assertEqual(host in hosts,
+                             utils.capabilities_satisfied(caps, extra_specs))
+
+    @ddt.data({}, {'size': '>= 3', 'vendor:fancy': 'yes',
+                   'capabilities:nested:key': 'value'})
+    def test_hosts_satisfying_capabilities_not_indexable(self, extra_specs):
+        self.assertIsNone(utils.hosts_satisfying_capabilities(
+            {('size', '=', 'str', '4'): {'host1'}}, extra_specs))
+
+    @ddt.data(
+        ({'driver_version': '1.0', 'pools': None},
+         {'driver_version': '1.1', 'pools': None, 'qos': True}),
+        ({'driver_version': '1.0', 'free_capacity_gb': 10},
+         {'driver_version': '1.0', 'free_capacity_gb': 5}),
+        ({'driver_version': '1.0', 'qos': False,
+          'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 10,
+                     'thin_provisioning': True},
+                    {'pool_name': 'pool2', 'free_capacity_gb': 20},
+                    {'pool_name': 'pool3', 'free_capacity_gb': 30}]},
+         {'driver_version': '1.0', 'server_pools_mapping': {'s1': []},
+          'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 5},
+                    {'pool_name': 'pool3', 'free_capacity_gb': 30},
+                    {'pool_name': 'pool4', 'free_capacity_gb': 40}]}),
+        ({'pools': [{'pool_name': 'pool1'}]}, {'pools': []}),
+    )
+    @ddt.unpack
+    def test_apply_capabilities_delta(self, old, new):
+        delta = utils.capabilities_delta(old, new)
+
+        result = utils.apply_capabilities_delta(old, delta)
+
+        self.assertEqual(
+            sorted(new.pop('pools', None) or [],
+                   key=lambda pool: pool['pool_name']),
+            sorted(result.pop('pools', None) or [],
+                   key=lambda pool: pool['pool_name']))
+        self.assertEqual(new, result)
+
+    def test_capabilities_delta_per_pool(self):
+        old = {'driver_version': '1.0',
+               'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 10,
+                          'total_capacity_gb': 100},
+                         {'pool_name': 'pool2', 'free_capacity_gb': 20,
+                          'total_capacity_gb': 100}]}
+        new = {'driver_version': '1.0',
+               'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 5,
+                          'total_capacity_gb': 100},
+                         {'pool_name': 'pool2', 'free_capacity_gb': 20,
+                          'total_capacity_gb': 100}]}
+
+        delta = utils.capabilities_delta(old, new)
+
+        expected = {
+            'changed': {},
+            'removed': [],
+            'pools': {
+                'changed': {'pool1': {'changed': {'free_capacity_gb': 5},
+                                      'removed': []}},
+                'removed': [],
+            },
+        }
+        self.assertEqual(expected, delta)
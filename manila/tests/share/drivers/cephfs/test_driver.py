@@ -676,9 +676,21 @@ class CephFSDriverTestCase(test.TestCase):
                        f"not exist")
         expected_exception = exception.ShareBackendException(err_message)
 
+        share_export_locations = {
+            shares[0]['id']: expected_exception,
+            shares[1]['id']: export_locations[0],
+            shares[2]['id']: export_locations[1],
+        }
+
+        def _get_export_locations(share):
+            result = share_export_locations[share['id']]
+            if isinstance(result, Exception):
+                raise result
+            return result
+
         self.mock_object(
             self._driver, '_get_export_locations',
-            mock.Mock(side_effect=[expected_exception] + export_locations))
+            mock.Mock(side_effect=_get_export_locations))
         self.mock_object(
             self._driver, 'get_optional_share_creation_data',
             mock.Mock(return_value=share_backend_info))
@@ -687,7 +699,8 @@ class CephFSDriverTestCase(test.TestCase):
 
         self.assertEqual(3, self._driver._get_export_locations.call_count)
         self._driver._get_export_locations.assert_has_calls([
-            mock.call(shares[0]), mock.call(shares[1]), mock.call(shares[2])])
+            mock.call(shares[0]), mock.call(shares[1]), mock.call(shares[2])],
+            any_order=True)
         self.assertTrue(self._driver.get_optional_share_creation_data.called)
         self.assertEqual(expected_updates, actual_updates)
 
@@ -938,6 +951,47 @@ class CephFSDriverTestCase(test.TestCase):
 
         self.assertEqual(2, driver.rados_command.call_count)
 
+    def test_get_share_statuses(self):
+        shares = [
+            fake_share.fake_share(
+                id=share_id, share_group_id=None,
+                status=constants.STATUS_CREATING_FROM_SNAPSHOT)
+            for share_id in ('complete', 'in-progress', 'failed', 'gone')
+        ]
+        shares.append(fake_share.fake_share(
+            id='available', status=constants.STATUS_AVAILABLE))
+
+        def fake_rados_command(client, prefix, argdict, json_obj):
+            if argdict['clone_name'] == 'gone':
+                raise exception.ShareBackendException(msg='fake')
+            return {'status': {'state': argdict['clone_name']}}
+
+        driver.rados_command.side_effect = fake_rados_command
+        self.mock_object(self._driver, '_get_export_locations',
+                         mock.Mock(return_value=['fake_el']))
+        self.mock_object(driver.tpool, 'execute')
+
+        result = self._driver.get_share_statuses(self._context, shares)
+
+        self.assertEqual({
+            'complete': {
+                'status': constants.STATUS_AVAILABLE,
+                'progress': '100%',
+                'export_locations': ['fake_el'],
+            },
+            'in-progress': {
+                'status': constants.STATUS_CREATING_FROM_SNAPSHOT,
+                'progress': None,
+                'export_locations': [],
+            },
+            'failed': {'status': constants.STATUS_ERROR},
+            'gone': {'status': constants.STATUS_ERROR},
+        }, result)
+        self.assertEqual(4, driver.rados_command.call_count)
+        self._driver._get_export_locations.assert_called_once_with(shares[0])
+        # Only the ceph commands may run in native threads.
+        driver.tpool.execute.assert_not_called()
+
     def test_delete_share_from_snapshot(self):
         clone_status_prefix = "fs clone status"
 
@@ -1001,7 +1055,7 @@ class CephFSDriverTestCase(test.TestCase):
     )
     def test__get_cephfs_filesystem_allocation(self, share_sizes):
         subvolume_ls_args = {"vol_name": self._driver.volname}
-        rados_returns = []
+        rados_returns = {}
         rados_subvolume_list_result = []
         subvolume_info_mock_calls = []
         subvolume_names = []
@@ -1010,7 +1064,7 @@ class CephFSDriverTestCase(test.TestCase):
         for idx, size in enumerate(share_sizes):
             subvolume_name = f"subvolume{idx}"
             subvolume_names.append(subvolume_name)
-            rados_returns.append({"bytes_quota": share_sizes[idx]})
+            rados_returns[subvolume_name] = {"bytes_quota": share_sizes[idx]}
             rados_subvolume_list_result.append({"name": subvolume_name})
             if size != "infinite":
                 expected_allocated_size_gb += size
@@ -1020,9 +1074,13 @@ class CephFSDriverTestCase(test.TestCase):
                 round(int(expected_allocated_size_gb) / units.Gi, 2)
             )
 
-        # first call we make to rados is the subvolume ls
-        rados_returns.insert(0, rados_subvolume_list_result)
-        driver.rados_command.side_effect = rados_returns
+        def _rados_command(client, prefix, argdict, json_obj=False):
+            if prefix == "fs subvolume ls":
+                return rados_subvolume_list_result
+            # subvolume info calls may be issued in any order
+            return rados_returns[argdict["sub_name"]]
+
+        driver.rados_command.side_effect = _rados_command
 
         allocated_size_gb = self._driver._get_cephfs_filesystem_allocation()
 
@@ -1044,7 +1102,9 @@ class CephFSDriverTestCase(test.TestCase):
                 self._driver._rados_client,
                 "fs subvolume ls", subvolume_ls_args, json_obj=True),
             *subvolume_info_mock_calls
-        ])
+        ], any_order=True)
+        self.assertEqual(len(share_sizes) + 1,
+                         driver.rados_command.call_count)
 
     @ddt.data(True, False)
     def test_update_share_stats(self, cache_expired):
@@ -1349,17 +1409,24 @@ class NativeProtocolHelperTestCase(test.TestCase):
             'access_to': 'dabo'
         }
 
-        allow_access_side_effects = [
-            'abc123',
-            exception.InvalidShareAccess(reason='not'),
-            exception.InvalidShareAccess(reason='allowed'),
-            exception.InvalidShareAccessLevel(level='rwx')
-        ]
+        allow_access_side_effects = {
+            'alice': 'abc123',
+            'manila': exception.InvalidShareAccess(reason='not'),
+            'admin': exception.InvalidShareAccess(reason='allowed'),
+            'dabo': exception.InvalidShareAccessLevel(level='rwx')
+        }
+
+        def _allow_access(context, share, access, sub_name=None):
+            result = allow_access_side_effects[access['access_to']]
+            if isinstance(result, Exception):
+                raise result
+            return result
+
         self.mock_object(self._native_protocol_helper.message_api, 'create')
         self.mock_object(self._native_protocol_helper, '_deny_access')
         self.mock_object(self._native_protocol_helper,
                          '_allow_access',
-                         mock.Mock(side_effect=allow_access_side_effects))
+                         mock.Mock(side_effect=_allow_access))
 
         access_updates = self._native_protocol_helper.update_access(
             self._context,
@@ -1384,7 +1451,7 @@ class NativeProtocolHelperTestCase(test.TestCase):
              mock.call(self._context, self._share, manila,
                        sub_name=self._share['id']),
              mock.call(self._context, self._share, admin,
-                       sub_name=self._share['id'])])
+                       sub_name=self._share['id'])], any_order=True)
         self._native_protocol_helper._deny_access.assert_called_once_with(
             self._context, self._share, bob, sub_name=self._share['id'])
         self.assertEqual(
@@ -2167,3 +2234,22 @@ class MiscTests(test.TestCase):
                                  driver.json_command)
             mock_import_class.assert_called_once_with(
                 'ceph_argparse.json_command')
+
+    def test_rados_command(self):
+        mock_json_command = mock.Mock(return_value=(0, b' {"a": 1} ', ''))
+        self.mock_object(driver, 'json_command', mock_json_command)
+        mock_execute = self.mock_object(
+            driver.tpool, 'execute',
+            mock.Mock(side_effect=lambda func, *args, **kwargs:
+                      func(*args, **kwargs)))
+
+        result = driver.rados_command('fake_client', 'fs volume ls',
+                                      {'fs': 'cephfs'}, json_obj=True,
+                                      target=('mon-mgr', ))
+
+        self.assertEqual({'a': 1}, result)
+        mock_execute.assert_called_once_with(
+            mock_json_command, 'fake_client', target=('mon-mgr', ),
+            prefix='fs volume ls',
+            argdict={'fs': 'cephfs', 'format': 'json'}, inbuf=b'',
+            timeout=driver.RADOS_TIMEOUT)
@@ -14,6 +14,7 @@
 #    under the License.
 
 import copy
+import errno
 import io
 import re
 from unittest import mock
@@ -73,7 +74,10 @@ class MockRadosModule(object):
         pass
 
     class OSError(Exception):
-        pass
+
+        def __init__(self, message=None, errno=None):
+            super(MockRadosModule.OSError, self).__init__(message)
+            self.errno = errno
 
     class WriteOpCtx():
 
@@ -86,6 +90,12 @@ class MockRadosModule(object):
         def write_full(self, bytes_to_write):
             pass
 
+        def append(self, bytes_to_write):
+            pass
+
+        def assert_version(self, version):
+            pass
+
 
 @ddt.ddt
 class MiscTests(test.TestCase):
@@ -109,6 +119,7 @@ class MiscTests(test.TestCase):
             mock_import_module.assert_called_once_with('rados')
 
 
+@ddt.ddt
 class GaneshaConfigTests(test.TestCase):
     """Tests Ganesha config file format convertor functions."""
 
@@ -154,7 +165,7 @@ class GaneshaConfigTests(test.TestCase):
 
         return (_conf_mangle(conf) for conf in confs)
 
-    def test_conf2json(self):
+    def test__parse_conf(self):
         test_ganesha_cnf_with_comment = """EXPORT {
 # fake_export_block
     Export_Id = 101;
@@ -168,8 +179,50 @@ class GaneshaConfigTests(test.TestCase):
                 u'Export_Id': 101
             }
         }
-        ret = manager._conf2json(test_ganesha_cnf_with_comment)
-        self.assertEqual(result_dict_unicode, jsonutils.loads(ret))
+        ret = manager._parse_conf(test_ganesha_cnf_with_comment)
+        self.assertEqual(result_dict_unicode, ret)
+
+    def test__parse_conf_values(self):
+        test_ganesha_cnf_values = """EXPORT{
+    Path = "/fake # path";  # comment
+    Tag = "fake\\"" "tag";
+    Clients = 10.0.0.1, 10.0.0.2;
+    Anonymous_Uid = -2;
+    Squash = 0;
+    Ratio = 1.50;
+    FSAL { Name = CEPH }
+};"""
+        result_dict = {
+            'EXPORT': {
+                'Path': '/fake # path',
+                'Tag': 'fake"tag',
+                'Clients': '10.0.0.1,10.0.0.2',
+                'Anonymous_Uid': -2,
+                'Squash': '0',
+                'Ratio': 1.5,
+                'FSAL': {'Name': 'CEPH'},
+            }
+        }
+        ret = manager._parse_conf(test_ganesha_cnf_values)
+        self.assertEqual(result_dict, ret)
+
+    def test__parse_conf_repeated_blocks(self):
+        conf = ''.join('CLIENT { Clients = ip%d; }' % i for i in range(3))
+        ret = manager._parse_conf(conf)
+        self.assertEqual(
+            {'CLIENT': [{'Clients': 'ip0'}, {'Clients': 'ip1'},
+                        {'Clients': 'ip2'}]},
+            ret)
+
+    def test__parse_conf_unterminated_quote(self):
+        self.assertRaises(RuntimeError, manager._parse_conf,
+                          'EXPORT { Path = "/fakepath; }')
+
+    @ddt.data('EXPORT { Export_Id = 101; ', 'EXPORT { Export_Id = 101; }}',
+              'EXPORT { Export_Id 101; }', 'EXPORT { Export_Id = ; }',
+              'EXPORT { Export_Id = = 101; }', '{ Export_Id = 101; }')
+    def test__parse_conf_invalid(self, conf):
+        self.assertRaises(ValueError, manager._parse_conf, conf)
 
     def test_parseconf_ganesha_cnf_input(self):
         ret = manager.parseconf(test_ganesha_cnf)
@@ -190,6 +243,29 @@ class GaneshaConfigTests(test.TestCase):
         self.assertEqual(*self.conf_mangle(self.ref_ganesha_cnf,
                                            ganesha_cnf))
 
+    def test_mkconf_parseconf_round_trip(self):
+        ganesha_cnf = manager.mkconf(test_dict_str)
+        self.assertEqual(test_dict_str, manager.parseconf(ganesha_cnf))
+
+    def test_mkconf_parseconf_round_trip_repeated_values(self):
+        confdict = {
+            'EXPORT': {
+                'Protocols': [3, 4],
+                'CLIENT': [{'Clients': 'ip1', 'Access_Level': 'ro'},
+                           {'Clients': 'ip2', 'Access_Level': 'rw'}],
+            },
+        }
+
+        ganesha_cnf = manager.mkconf(confdict)
+
+        self.assertIn('Protocols = 3;\n', ganesha_cnf)
+        self.assertIn('Protocols = 4;\n', ganesha_cnf)
+        self.assertEqual(confdict, manager.parseconf(ganesha_cnf))
+        self.assertEqual(confdict, manager.parseconf(
+            'EXPORT { Protocols = 3; Protocols = 4; '
+            'CLIENT { Clients = ip1; Access_Level = "ro"; } '
+            'CLIENT { Clients = ip2; Access_Level = "rw"; } }'))
+
 
 @ddt.ddt
 class GaneshaManagerTestCase(test.TestCase):
@@ -688,68 +764,163 @@ class GaneshaManagerTestCase(test.TestCase):
             'RemoveExport', 'uint16:101')
         self.assertIsNone(ret)
 
-    @ddt.data('',
-              '%url rados://fakepool/fakeobj2')
-    def test_add_rados_object_url_to_index_with_index_data(
-            self, index_data):
+    def test_update_index_file(self):
+        self.mock_object(self._manager, '_check_file_exists',
+                         mock.Mock(return_value=True))
         self.mock_object(
-            self._manager_with_rados_store, '_get_rados_object',
-            mock.Mock(return_value=index_data))
+            self._manager, 'execute',
+            mock.Mock(return_value=(
+                '%include /fakedir0/export.d/fakename0.conf\n'
+                '%include /fakedir0/export.d/fakename2.conf\n'
+                '%include /fakedir0/export.d/fakename3.conf\n\n', '')))
+        self.mock_object(self._manager, '_write_conf_file')
+
+        ret = self._manager._update_index_file(
+            ['fakename1', 'fakename3'], ['fakename2'])
+
+        self._manager._check_file_exists.assert_called_once_with(
+            '/fakedir0/export.d/INDEX.conf')
+        self._manager.execute.assert_called_once_with(
+            'cat', '/fakedir0/export.d/INDEX.conf',
+            message='reading export index')
+        self._manager._write_conf_file.assert_called_once_with(
+            'INDEX',
+            '%include /fakedir0/export.d/fakename0.conf\n'
+            '%include /fakedir0/export.d/fakename3.conf\n'
+            '%include /fakedir0/export.d/fakename1.conf\n')
+        self.assertIsNone(ret)
+
+    def test_update_index_file_no_index(self):
+        self.mock_object(self._manager, '_check_file_exists',
+                         mock.Mock(return_value=False))
+        self.mock_object(self._manager, 'execute')
+        self.mock_object(self._manager, '_write_conf_file')
+
+        self._manager._update_index_file(['fakename1'], ['fakename2'])
+
+        self._manager.execute.assert_not_called()
+        self._manager._write_conf_file.assert_called_once_with(
+            'INDEX', '%include /fakedir0/export.d/fakename1.conf\n')
+
+    @ddt.data(True, False)
+    def test_update_index(self, rados_store_enable):
+        self._manager.ganesha_rados_store_enable = rados_store_enable
+        self.mock_object(self._manager, '_update_index_file')
+        self.mock_object(self._manager, '_update_rados_export_index')
+
+        self._manager._update_index(added=['fakename1'],
+                                    removed=['fakename2'])
+
+        if rados_store_enable:
+            self._manager._update_rados_export_index.assert_called_once_with(
+                ['fakename1'], ['fakename2'])
+            self.assertFalse(self._manager._update_index_file.called)
+        else:
+            self._manager._update_index_file.assert_called_once_with(
+                ['fakename1'], ['fakename2'])
+            self.assertFalse(self._manager._update_rados_export_index.called)
+
+    @ddt.data(
+        ('', ['fakeobj1'], [], '%url rados://fakepool/fakeobj1', True),
+        ('%url rados://fakepool/fakeobj2', ['fakeobj1'], [],
+         '\n%url rados://fakepool/fakeobj1', True),
+        ('%url rados://fakepool/fakeobj1\n%url rados://fakepool/fakeobj2',
+         ['fakeobj3'], ['fakeobj1'],
+         '%url rados://fakepool/fakeobj2\n%url rados://fakepool/fakeobj3',
+         False),
+    )
+    @ddt.unpack
+    def test_update_rados_export_index(self, index_data, added, removed,
+                                       data, append):
         self.mock_object(
-            self._manager_with_rados_store, '_get_export_rados_object_name',
-            mock.Mock(return_value='fakeobj1'))
+            self._manager_with_rados_store, '_get_rados_object_and_version',
+            mock.Mock(return_value=(index_data, 7)))
         self.mock_object(
-            self._manager_with_rados_store, '_put_rados_object')
+            self._manager_with_rados_store, '_get_export_rados_object_name',
+            mock.Mock(side_effect=lambda name: name))
+        self.mock_object(self._manager_with_rados_store, '_put_rados_object')
 
-        ret = (self._manager_with_rados_store.
-               _add_rados_object_url_to_index('fakename'))
+        ret = self._manager_with_rados_store._update_rados_export_index(
+            added, removed)
 
-        (self._manager_with_rados_store._get_rados_object.
+        (self._manager_with_rados_store._get_rados_object_and_version.
          assert_called_once_with('fakeindex'))
-        (self._manager_with_rados_store._get_export_rados_object_name.
-         assert_called_once_with('fakename'))
-        if index_data:
-            urls = ('%url rados://fakepool/fakeobj2\n'
-                    '%url rados://fakepool/fakeobj1')
-        else:
-            urls = '%url rados://fakepool/fakeobj1'
         (self._manager_with_rados_store._put_rados_object.
-         assert_called_once_with('fakeindex', urls))
+         assert_called_once_with('fakeindex', data, version=7,
+                                 append=append))
         self.assertIsNone(ret)
 
-    @ddt.data('',
-              '%url rados://fakepool/fakeobj1\n'
-              '%url rados://fakepool/fakeobj2')
-    def test_remove_rados_object_url_from_index_with_index_data(
-            self, index_data):
+    @ddt.data(([], ['fakeobj1']), (['fakeobj2'], []))
+    @ddt.unpack
+    def test_update_rados_export_index_nothing_to_do(self, added, removed):
         self.mock_object(
-            self._manager_with_rados_store, '_get_rados_object',
-            mock.Mock(return_value=index_data))
+            self._manager_with_rados_store, '_get_rados_object_and_version',
+            mock.Mock(return_value=('%url rados://fakepool/fakeobj2', 7)))
         self.mock_object(
             self._manager_with_rados_store, '_get_export_rados_object_name',
-            mock.Mock(return_value='fakeobj1'))
+            mock.Mock(side_effect=lambda name: name))
+        self.mock_object(self._manager_with_rados_store, '_put_rados_object')
+
+        self._manager_with_rados_store._update_rados_export_index(
+            added, removed)
+
+        self.assertFalse(
+            self._manager_with_rados_store._put_rados_object.called)
+
+    def test_update_rados_export_index_version_mismatch(self):
         self.mock_object(
-            self._manager_with_rados_store, '_put_rados_object')
+            self._manager_with_rados_store, '_get_rados_object_and_version',
+            mock.Mock(side_effect=[('', 7), ('%url rados://fakepool/obj', 8)]))
+        self.mock_object(
+            self._manager_with_rados_store, '_get_export_rados_object_name',
+            mock.Mock(side_effect=lambda name: name))
+        self.mock_object(
+            self._manager_with_rados_store, '_put_rados_object',
+            mock.Mock(side_effect=[
+                MockRadosModule.OSError(errno=errno.ERANGE), None]))
 
-        ret = (self._manager_with_rados_store.
-               _remove_rados_object_url_from_index('fakename'))
+        self._manager_with_rados_store._update_rados_export_index(
+            ['fakeobj1'], [])
 
-        if index_data:
-            (self._manager_with_rados_store._get_rados_object.
-             assert_called_once_with('fakeindex'))
-            (self._manager_with_rados_store._get_export_rados_object_name.
-             assert_called_once_with('fakename'))
-            urls = '%url rados://fakepool/fakeobj2'
-            (self._manager_with_rados_store._put_rados_object.
-             assert_called_once_with('fakeindex', urls))
-        else:
-            (self._manager_with_rados_store._get_rados_object.
-             assert_called_once_with('fakeindex'))
-            self.assertFalse(self._manager_with_rados_store.
-                             _get_export_rados_object_name.called)
-            self.assertFalse(self._manager_with_rados_store.
-                             _put_rados_object.called)
-        self.assertIsNone(ret)
+        (self._manager_with_rados_store._put_rados_object.
+         assert_has_calls([
+             mock.call('fakeindex', '%url rados://fakepool/fakeobj1',
+                       version=7, append=True),
+             mock.call('fakeindex', '\n%url rados://fakepool/fakeobj1',
+                       version=8, append=True)]))
+
+    def test_update_rados_export_index_too_many_attempts(self):
+        self.mock_object(
+            self._manager_with_rados_store, '_get_rados_object_and_version',
+            mock.Mock(return_value=('', 7)))
+        self.mock_object(
+            self._manager_with_rados_store, '_put_rados_object',
+            mock.Mock(side_effect=MockRadosModule.OSError(
+                errno=errno.EOVERFLOW)))
+
+        self.assertRaises(
+            exception.ShareBackendException,
+            self._manager_with_rados_store._update_rados_export_index,
+            ['fakeobj1'], [])
+
+        self.assertEqual(
+            manager.RADOS_UPDATE_ATTEMPTS,
+            self._manager_with_rados_store._put_rados_object.call_count)
+
+    def test_update_rados_export_index_error(self):
+        self.mock_object(
+            self._manager_with_rados_store, '_get_rados_object_and_version',
+            mock.Mock(return_value=('', 7)))
+        self.mock_object(
+            self._manager_with_rados_store, '_put_rados_object',
+            mock.Mock(side_effect=MockRadosModule.OSError(errno=errno.EIO)))
+
+        self.assertRaises(
+            MockRadosModule.OSError,
+            self._manager_with_rados_store._update_rados_export_index,
+            ['fakeobj1'], [])
+
+        self._manager_with_rados_store._put_rados_object.assert_called_once()
 
     @ddt.data(False, True)
     def test_add_export_with_rados_store(self, rados_store_enable):
@@ -758,8 +929,7 @@ class GaneshaManagerTestCase(test.TestCase):
                          mock.Mock(return_value=test_path))
         self.mock_object(self._manager, '_dbus_send_ganesha')
         self.mock_object(self._manager, '_rm_file')
-        self.mock_object(self._manager, '_add_rados_object_url_to_index')
-        self.mock_object(self._manager, '_mkindex')
+        self.mock_object(self._manager, '_update_index')
 
         ret = self._manager.add_export(test_name, test_dict_str)
 
@@ -768,23 +938,19 @@ class GaneshaManagerTestCase(test.TestCase):
         self._manager._dbus_send_ganesha.assert_called_once_with(
             'AddExport', 'string:' + test_path,
             'string:EXPORT(Export_Id=101)')
+        self._manager._update_index.assert_called_once_with([test_name], [])
         if rados_store_enable:
             self._manager._rm_file.assert_called_once_with(test_path)
-            self._manager._add_rados_object_url_to_index(test_name)
-            self.assertFalse(self._manager._mkindex.called)
         else:
-            self._manager._mkindex.assert_called_once_with()
             self.assertFalse(self._manager._rm_file.called)
-            self.assertFalse(
-                self._manager._add_rados_object_url_to_index.called)
         self.assertIsNone(ret)
 
-    def test_add_export_error_during_mkindex(self):
+    def test_add_export_error_during_update_index(self):
         self.mock_object(self._manager, '_write_export',
                          mock.Mock(return_value=test_path))
         self.mock_object(self._manager, '_dbus_send_ganesha')
         self.mock_object(
-            self._manager, '_mkindex',
+            self._manager, '_update_index',
             mock.Mock(side_effect=exception.GaneshaCommandFailure))
         self.mock_object(self._manager, '_rm_export_file')
         self.mock_object(self._manager, '_remove_export_dbus')
@@ -797,29 +963,25 @@ class GaneshaManagerTestCase(test.TestCase):
         self._manager._dbus_send_ganesha.assert_called_once_with(
             'AddExport', 'string:' + test_path,
             'string:EXPORT(Export_Id=101)')
-        self._manager._mkindex.assert_called_once_with()
+        self._manager._update_index.assert_called_once_with([test_name], [])
         self._manager._rm_export_file.assert_called_once_with(test_name)
         self._manager._remove_export_dbus.assert_called_once_with(
             test_export_id)
 
-    @ddt.data(True, False)
-    def test_add_export_error_during_write_export_with_rados_store(
-            self, rados_store_enable):
-        self._manager.ganesha_rados_store_enable = rados_store_enable
+    def test_add_export_error_during_write_export(self):
         self.mock_object(
             self._manager, '_write_export',
             mock.Mock(side_effect=exception.GaneshaCommandFailure))
-        self.mock_object(self._manager, '_mkindex')
+        self.mock_object(self._manager, '_dbus_send_ganesha')
+        self.mock_object(self._manager, '_update_index')
 
         self.assertRaises(exception.GaneshaCommandFailure,
                           self._manager.add_export, test_name, test_dict_str)
 
         self._manager._write_export.assert_called_once_with(
             test_name, test_dict_str)
-        if rados_store_enable:
-            self.assertFalse(self._manager._mkindex.called)
-        else:
-            self._manager._mkindex.assert_called_once_with()
+        self.assertFalse(self._manager._dbus_send_ganesha.called)
+        self.assertFalse(self._manager._update_index.called)
 
     @ddt.data(True, False)
     def test_add_export_error_during_dbus_send_ganesha_with_rados_store(
@@ -830,7 +992,7 @@ class GaneshaManagerTestCase(test.TestCase):
         self.mock_object(
             self._manager, '_dbus_send_ganesha',
             mock.Mock(side_effect=exception.GaneshaCommandFailure))
-        self.mock_object(self._manager, '_mkindex')
+        self.mock_object(self._manager, '_update_index')
         self.mock_object(self._manager, '_rm_export_file')
         self.mock_object(self._manager, '_rm_export_rados_object')
         self.mock_object(self._manager, '_rm_file')
@@ -849,12 +1011,11 @@ class GaneshaManagerTestCase(test.TestCase):
                 test_name)
             self._manager._rm_file.assert_called_once_with(test_path)
             self.assertFalse(self._manager._rm_export_file.called)
-            self.assertFalse(self._manager._mkindex.called)
         else:
             self._manager._rm_export_file.assert_called_once_with(test_name)
-            self._manager._mkindex.assert_called_once_with()
             self.assertFalse(self._manager._rm_export_rados_object.called)
             self.assertFalse(self._manager._rm_file.called)
+        self.assertFalse(self._manager._update_index.called)
         self.assertFalse(self._manager._remove_export_dbus.called)
 
     @ddt.data(True, False)
@@ -872,6 +1033,7 @@ class GaneshaManagerTestCase(test.TestCase):
                          mock.Mock(return_value=test_path))
         self.mock_object(self._manager, '_dbus_send_ganesha')
         self.mock_object(self._manager, '_rm_file')
+        self.mock_object(self._manager, '_update_index')
 
         self._manager.update_export(test_name, confdict)
 
@@ -881,6 +1043,7 @@ class GaneshaManagerTestCase(test.TestCase):
         self._manager._dbus_send_ganesha.assert_called_once_with(
             'UpdateExport', 'string:' + test_path,
             'string:EXPORT(Export_Id=101)')
+        self.assertFalse(self._manager._update_index.called)
         if rados_store_enable:
             self._manager._rm_file.assert_called_once_with(test_path)
         else:
@@ -898,7 +1061,7 @@ class GaneshaManagerTestCase(test.TestCase):
         self.mock_object(self._manager, '_read_export',
                          mock.Mock(return_value=test_dict_unicode))
         self.mock_object(self._manager, '_write_export',
-                         mock.Mock(return_value=test_path))
+                         mock.Mock(side_effect=[test_path, test_tmp_path]))
         self.mock_object(
             self._manager, '_dbus_send_ganesha',
             mock.Mock(side_effect=exception.GaneshaCommandFailure))
@@ -915,7 +1078,8 @@ class GaneshaManagerTestCase(test.TestCase):
             'UpdateExport', 'string:' + test_path,
             'string:EXPORT(Export_Id=101)')
         if rados_store_enable:
-            self._manager._rm_file.assert_called_once_with(test_path)
+            self._manager._rm_file.assert_has_calls([
+                mock.call(test_tmp_path), mock.call(test_path)])
         else:
             self.assertFalse(self._manager._rm_file.called)
 
@@ -924,11 +1088,8 @@ class GaneshaManagerTestCase(test.TestCase):
         self._manager.ganesha_rados_store_enable = rados_store_enable
         self.mock_object(self._manager, '_read_export',
                          mock.Mock(return_value=test_dict_unicode))
-        self.mock_object(self._manager, '_get_export_rados_object_name',
-                         mock.Mock(return_value='fakeobj'))
-        methods = ('_remove_export_dbus', '_rm_export_file', '_mkindex',
-                   '_remove_rados_object_url_from_index',
-                   '_delete_rados_object')
+        methods = ('_remove_export_dbus', '_rm_export_file',
+                   '_rm_export_rados_object', '_update_index')
         for method in methods:
             self.mock_object(self._manager, method)
 
@@ -937,109 +1098,110 @@ class GaneshaManagerTestCase(test.TestCase):
         self._manager._read_export.assert_called_once_with(test_name)
         self._manager._remove_export_dbus.assert_called_once_with(
             test_dict_unicode['EXPORT']['Export_Id'])
+        self._manager._update_index.assert_called_once_with(
+            removed=[test_name])
         if rados_store_enable:
-            (self._manager._get_export_rados_object_name.
-             assert_called_once_with(test_name))
-            self._manager._delete_rados_object.assert_called_once_with(
-                'fakeobj')
-            (self._manager._remove_rados_object_url_from_index.
-             assert_called_once_with(test_name))
+            self._manager._rm_export_rados_object.assert_called_once_with(
+                test_name)
             self.assertFalse(self._manager._rm_export_file.called)
-            self.assertFalse(self._manager._mkindex.called)
         else:
             self._manager._rm_export_file.assert_called_once_with(test_name)
-            self._manager._mkindex.assert_called_once_with()
-            self.assertFalse(
-                self._manager._get_export_rados_object_name.called)
-            self.assertFalse(self._manager._delete_rados_object.called)
-            self.assertFalse(
-                self._manager._remove_rados_object_url_from_index.called)
+            self.assertFalse(self._manager._rm_export_rados_object.called)
         self.assertIsNone(ret)
 
-    @ddt.data(True, False)
-    def test_remove_export_error_during_read_export_with_rados_store(
-            self, rados_store_enable):
-        self._manager.ganesha_rados_store_enable = rados_store_enable
-        self.mock_object(
-            self._manager, '_read_export',
-            mock.Mock(side_effect=exception.GaneshaCommandFailure))
-        self.mock_object(self._manager, '_get_export_rados_object_name',
-                         mock.Mock(return_value='fakeobj'))
-        methods = ('_remove_export_dbus', '_rm_export_file', '_mkindex',
-                   '_remove_rados_object_url_from_index',
-                   '_delete_rados_object')
+    @ddt.data('_read_export', '_remove_export_dbus')
+    def test_remove_export_error(self, failing_method):
+        self.mock_object(self._manager, '_read_export',
+                         mock.Mock(return_value=test_dict_unicode))
+        methods = ('_remove_export_dbus', '_rm_export_file', '_update_index')
         for method in methods:
             self.mock_object(self._manager, method)
+        self.mock_object(
+            self._manager, failing_method,
+            mock.Mock(side_effect=exception.GaneshaCommandFailure))
 
         ret = self._manager.remove_export(test_name)
 
         self._manager._read_export.assert_called_once_with(test_name)
-        self.assertFalse(self._manager._remove_export_dbus.called)
-        if rados_store_enable:
-            (self._manager._get_export_rados_object_name.
-             assert_called_once_with(test_name))
-            self._manager._delete_rados_object.assert_called_once_with(
-                'fakeobj')
-            (self._manager._remove_rados_object_url_from_index.
-             assert_called_once_with(test_name))
-            self.assertFalse(self._manager._rm_export_file.called)
-            self.assertFalse(self._manager._mkindex.called)
-        else:
-            self._manager._rm_export_file.assert_called_once_with(test_name)
-            self._manager._mkindex.assert_called_once_with()
-            self.assertFalse(
-                self._manager._get_export_rados_object_name.called)
-            self.assertFalse(self._manager._delete_rados_object.called)
-            self.assertFalse(
-                self._manager._remove_rados_object_url_from_index.called)
+        self._manager._rm_export_file.assert_called_once_with(test_name)
+        self._manager._update_index.assert_called_once_with(
+            removed=[test_name])
         self.assertIsNone(ret)
 
-    @ddt.data(True, False)
-    def test_remove_export_error_during_remove_export_dbus_with_rados_store(
-            self, rados_store_enable):
-        self._manager.ganesha_rados_store_enable = rados_store_enable
+    def test_coalesce(self):
         self.mock_object(self._manager, '_read_export',
                          mock.Mock(return_value=test_dict_unicode))
-        self.mock_object(self._manager, '_get_export_rados_object_name',
-                         mock.Mock(return_value='fakeobj'))
-        self.mock_object(
-            self._manager, '_remove_export_dbus',
-            mock.Mock(side_effect=exception.GaneshaCommandFailure))
-        methods = ('_rm_export_file', '_mkindex',
-                   '_remove_rados_object_url_from_index',
-                   '_delete_rados_object')
+        self.mock_object(self._manager, '_write_export',
+                         mock.Mock(return_value=test_path))
+        methods = ('_dbus_send_ganesha', '_remove_export_dbus',
+                   '_rm_export_file', '_update_index')
         for method in methods:
             self.mock_object(self._manager, method)
 
-        ret = self._manager.remove_export(test_name)
+        with self._manager.coalesce():
+            self._manager.add_export('fakename1', test_dict_str)
+            self._manager.add_export('fakename2', test_dict_str)
+            self._manager.update_export('fakename2', test_dict_str)
+            self._manager.update_export('fakename3', test_dict_str)
+            self._manager.add_export('fakename4', test_dict_str)
+            self._manager.remove_export('fakename4')
+            self._manager.remove_export('fakename5')
+            with self._manager.coalesce():
+                self._manager.add_export('fakename6', test_dict_str)
+            self.assertFalse(self._manager._dbus_send_ganesha.called)
+            self.assertFalse(self._manager._update_index.called)
+
+        self._manager._dbus_send_ganesha.assert_has_calls([
+            mock.call('AddExport', 'string:' + test_path,
+                      'string:EXPORT(Export_Id=101)'),
+            mock.call('AddExport', 'string:' + test_path,
+                      'string:EXPORT(Export_Id=101)'),
+            mock.call('UpdateExport', 'string:' + test_path,
+                      'string:EXPORT(Export_Id=101)'),
+            mock.call('AddExport', 'string:' + test_path,
+                      'string:EXPORT(Export_Id=101)')])
+        self.assertEqual(4, self._manager._dbus_send_ganesha.call_count)
+        self._manager._update_index.assert_called_once_with(
+            ['fakename1', 'fakename2', 'fakename6'],
+            ['fakename4', 'fakename5'])
+        # only the exports that were known to Ganesha are read
+        self.assertEqual(
+            [mock.call('fakename3'), mock.call('fakename5')],
+            self._manager._read_export.call_args_list)
+        self._manager._remove_export_dbus.assert_called_once_with(101)
 
-        self._manager._read_export.assert_called_once_with(test_name)
-        self._manager._remove_export_dbus.assert_called_once_with(
-            test_dict_unicode['EXPORT']['Export_Id'])
-        if rados_store_enable:
-            (self._manager._get_export_rados_object_name.
-             assert_called_once_with(test_name))
-            self._manager._delete_rados_object.assert_called_once_with(
-                'fakeobj')
-            (self._manager._remove_rados_object_url_from_index.
-             assert_called_once_with(test_name))
-            self.assertFalse(self._manager._rm_export_file.called)
-            self.assertFalse(self._manager._mkindex.called)
-        else:
-            self._manager._rm_export_file.assert_called_once_with(test_name)
-            self._manager._mkindex.assert_called_once_with()
-            self.assertFalse(
-                self._manager._get_export_rados_object_name.called)
-            self.assertFalse(self._manager._delete_rados_object.called)
-            self.assertFalse(
-                self._manager._remove_rados_object_url_from_index.called)
-        self.assertIsNone(ret)
+    def test_coalesce_error(self):
+        self.mock_object(self._manager, '_write_export',
+                         mock.Mock(return_value=test_path))
+        self.mock_object(
+            self._manager, '_dbus_send_ganesha',
+            mock.Mock(side_effect=[exception.GaneshaCommandFailure, None,
+                                   None]))
+        self.mock_object(self._manager, '_rm_export_file')
+        self.mock_object(self._manager, '_update_index')
+
+        def _add_exports():
+            with self._manager.coalesce():
+                self._manager.add_export('fakename1', test_dict_str)
+                self._manager.add_export('fakename2', test_dict_str)
+
+        self.assertRaises(exception.GaneshaCommandFailure, _add_exports)
+
+        self.assertEqual(2, self._manager._dbus_send_ganesha.call_count)
+        self._manager._rm_export_file.assert_called_once_with('fakename1')
+        self._manager._update_index.assert_called_once_with(
+            ['fakename2'], [])
+
+        # the manager is back to applying export changes right away
+        self._manager.add_export('fakename3', test_dict_str)
+        self.assertEqual(3, self._manager._dbus_send_ganesha.call_count)
 
     def test_get_rados_object(self):
         fakebin = chr(246).encode('utf-8')
 
         ioctx = mock.Mock()
         ioctx.read.side_effect = [fakebin, fakebin]
+        ioctx.get_last_version.return_value = 7
 
         self._rados_client.open_ioctx = mock.Mock(return_value=ioctx)
         self._rados_client.conf_get = mock.Mock(return_value=256)
@@ -1056,6 +1218,23 @@ class GaneshaManagerTestCase(test.TestCase):
 
         self.assertEqual(fakebin.decode('utf-8'), ret)
 
+    def test_get_rados_object_and_version(self):
+        fakebin = chr(246).encode('utf-8')
+
+        ioctx = mock.Mock()
+        ioctx.read.return_value = fakebin
+        ioctx.get_last_version.return_value = 7
+
+        self._rados_client.open_ioctx = mock.Mock(return_value=ioctx)
+        self._rados_client.conf_get = mock.Mock(return_value=256)
+
+        ret = self._manager_with_rados_store._get_rados_object_and_version(
+            'fakeobj')
+
+        ioctx.get_last_version.assert_called_once_with()
+        ioctx.close.assert_called_once()
+        self.assertEqual((fakebin.decode('utf-8'), 7), ret)
+
     def test_put_rados_object(self):
         faketext = chr(246)
 
@@ -1077,6 +1256,29 @@ class GaneshaManagerTestCase(test.TestCase):
 
         self.assertIsNone(ret)
 
+    def test_put_rados_object_versioned_append(self):
+        faketext = chr(246)
+
+        ioctx = mock.Mock()
+        self.mock_object(manager.rados.WriteOpCtx, 'write_full')
+        self.mock_object(manager.rados.WriteOpCtx, 'append')
+        self.mock_object(manager.rados.WriteOpCtx, 'assert_version')
+
+        self._rados_client.open_ioctx = mock.Mock(return_value=ioctx)
+        self._rados_client.conf_get = mock.Mock(return_value=256)
+
+        ret = self._manager_with_rados_store._put_rados_object(
+            'fakeobj', faketext, version=7, append=True)
+
+        manager.rados.WriteOpCtx.assert_version.assert_called_once_with(7)
+        manager.rados.WriteOpCtx.append.assert_called_once_with(
+            faketext.encode('utf-8'))
+        self.assertFalse(manager.rados.WriteOpCtx.write_full.called)
+        ioctx.operate_write_op.assert_called_once_with(mock.ANY, 'fakeobj')
+        ioctx.close.assert_called_once()
+
+        self.assertIsNone(ret)
+
     def test_delete_rados_object(self):
         ioctx = mock.Mock()
 
@@ -1092,14 +1294,18 @@ class GaneshaManagerTestCase(test.TestCase):
 
     def test_get_export_id(self):
         self.mock_object(self._manager, 'execute',
-                         mock.Mock(return_value=('exportid|101', '')))
-        ret = self._manager.get_export_id()
-        self._manager.execute.assert_called_once_with(
-            'sqlite3', self._manager.ganesha_db_path,
-            'update ganesha set value = value + 1;'
-            'select * from ganesha where key = "exportid";',
-            run_as_root=False)
-        self.assertEqual(101, ret)
+                         mock.Mock(return_value=('exportid|164', '')))
+        ret = [self._manager.get_export_id() for i in range(65)]
+        self._manager.execute.assert_has_calls([
+            mock.call(
+                'sqlite3', self._manager.ganesha_db_path,
+                'begin immediate;'
+                'update ganesha set value = value + 64;'
+                'select * from ganesha where key = "exportid";'
+                'commit;',
+                run_as_root=False)] * 2)
+        self.assertEqual(2, self._manager.execute.call_count)
+        self.assertEqual(list(range(101, 165)) + [101], ret)
 
     def test_get_export_id_nobump(self):
         self.mock_object(self._manager, 'execute',
@@ -1110,6 +1316,7 @@ class GaneshaManagerTestCase(test.TestCase):
             'select * from ganesha where key = "exportid";',
             run_as_root=False)
         self.assertEqual(101, ret)
+        self.assertEqual(0, len(self._manager._export_ids))
 
     def test_get_export_id_error_invalid_export_db(self):
         self.mock_object(self._manager, 'execute',
@@ -1121,23 +1328,28 @@ class GaneshaManagerTestCase(test.TestCase):
             mock.ANY, mock.ANY)
         self._manager.execute.assert_called_once_with(
             'sqlite3', self._manager.ganesha_db_path,
-            'update ganesha set value = value + 1;'
-            'select * from ganesha where key = "exportid";',
+            'begin immediate;'
+            'update ganesha set value = value + 64;'
+            'select * from ganesha where key = "exportid";'
+            'commit;',
             run_as_root=False)
 
     @ddt.data(True, False)
     def test_get_export_id_with_rados_store_and_bump(self, bump):
         self.mock_object(self._manager_with_rados_store,
                          '_get_rados_object', mock.Mock(return_value='1000'))
+        self.mock_object(self._manager_with_rados_store,
+                         '_get_rados_object_and_version',
+                         mock.Mock(return_value=('1000', 3)))
         self.mock_object(self._manager_with_rados_store, '_put_rados_object')
 
         ret = self._manager_with_rados_store.get_export_id(bump=bump)
 
         if bump:
-            (self._manager_with_rados_store._get_rados_object.
+            (self._manager_with_rados_store._get_rados_object_and_version.
              assert_called_once_with('fakecounter'))
             (self._manager_with_rados_store._put_rados_object.
-             assert_called_once_with('fakecounter', '1001'))
+             assert_called_once_with('fakecounter', '1064', version=3))
             self.assertEqual(1001, ret)
         else:
             (self._manager_with_rados_store._get_rados_object.
@@ -1146,6 +1358,107 @@ class GaneshaManagerTestCase(test.TestCase):
                 self._manager_with_rados_store._put_rados_object.called)
             self.assertEqual(1000, ret)
 
+    def test_get_export_id_with_rados_store_version_mismatch(self):
+        self.mock_object(self._manager_with_rados_store,
+                         '_get_rados_object_and_version',
+                         mock.Mock(side_effect=[('1000', 3), ('1064', 4)]))
+        self.mock_object(
+            self._manager_with_rados_store, '_put_rados_object',
+            mock.Mock(side_effect=[
+                MockRadosModule.OSError(errno=errno.ERANGE), None]))
+
+        ret = self._manager_with_rados_store.get_export_id()
+
+        (self._manager_with_rados_store._put_rados_object.
+         assert_has_calls([
+             mock.call('fakecounter', '1064', version=3),
+             mock.call('fakecounter', '1128', version=4)]))
+        self.assertEqual(1065, ret)
+
+    def test_get_export_id_with_rados_store_too_many_attempts(self):
+        self.mock_object(self._manager_with_rados_store,
+                         '_get_rados_object_and_version',
+                         mock.Mock(return_value=('1000', 3)))
+        self.mock_object(
+            self._manager_with_rados_store, '_put_rados_object',
+            mock.Mock(side_effect=MockRadosModule.OSError(
+                errno=errno.ERANGE)))
+
+        self.assertRaises(exception.ShareBackendException,
+                          self._manager_with_rados_store.get_export_id)
+
+        self.assertEqual(
+            manager.RADOS_UPDATE_ATTEMPTS,
+            self._manager_with_rados_store._put_rados_object.call_count)
+
+    def test_get_export_id_wraparound(self):
+        self.mock_object(
+            self._manager, '_bump_export_counter',
+            mock.Mock(return_value=manager.MAX_EXPORT_ID + 3))
+        self.mock_object(self._manager, '_get_export_ids_in_use',
+                         mock.Mock(return_value={101, 65535}))
+
+        ret = [self._manager.get_export_id() for i in range(62)]
+
+        self._manager._bump_export_counter.assert_called_once_with(
+            manager.EXPORT_ID_BLOCK_SIZE)
+        self.assertEqual(list(range(65475, 65535)) + [102, 103], ret)
+
+    def test_get_export_id_no_free_export_id(self):
+        self.mock_object(
+            self._manager, '_bump_export_counter',
+            mock.Mock(return_value=manager.MAX_EXPORT_ID + 64))
+        self.mock_object(self._manager, '_get_export_ids_in_use',
+                         mock.Mock(return_value=set(range(101, 165))))
+
+        self.assertRaises(exception.GaneshaException,
+                          self._manager.get_export_id)
+
+    def test_get_export_ids_in_use(self):
+        self.mock_object(
+            self._manager, 'execute',
+            mock.Mock(side_effect=[
+                ('INDEX.conf\nfakefile1.conf\nfakefile2.conf\n'
+                 'fakefile3.conf.Xk8AZ2\n', ''),
+                ('EXPORT {\n    Export_Id = 101;\n}\n'
+                 'EXPORT {\n    export_id=102;\n}\n', '')]))
+
+        ret = self._manager._get_export_ids_in_use()
+
+        self._manager.execute.assert_has_calls([
+            mock.call('ls', '/fakedir0/export.d', run_as_root=False),
+            mock.call('cat', '/fakedir0/export.d/fakefile1.conf',
+                      '/fakedir0/export.d/fakefile2.conf',
+                      check_exit_code=False, message='reading export ids'),
+        ])
+        self.assertEqual({101, 102}, ret)
+
+    def test_get_export_ids_in_use_no_exports(self):
+        self.mock_object(self._manager, 'execute',
+                         mock.Mock(return_value=('INDEX.conf\n', '')))
+
+        ret = self._manager._get_export_ids_in_use()
+
+        self._manager.execute.assert_called_once_with(
+            'ls', '/fakedir0/export.d', run_as_root=False)
+        self.assertEqual(set(), ret)
+
+    def test_get_export_ids_in_use_with_rados_store(self):
+        def _get_rados_object(name):
+            if name == 'fakeindex':
+                return ('%url rados://fakepool/ganesha-export-a\n'
+                        '%url rados://fakepool/ganesha-export-b')
+            elif name == 'ganesha-export-a':
+                return test_ganesha_cnf
+            raise MockRadosModule.ObjectNotFound()
+
+        self.mock_object(self._manager_with_rados_store, '_get_rados_object',
+                         mock.Mock(side_effect=_get_rados_object))
+
+        ret = self._manager_with_rados_store._get_export_ids_in_use()
+
+        self.assertEqual({101}, ret)
+
     def test_restart_service(self):
         self.mock_object(self._manager, 'execute')
         ret = self._manager.restart_service()
@@ -68,7 +68,7 @@ class GaneshaNASHelperTestCase(test.TestCase):
         self.fake_conf_dir_path = '/fakedir0/exports.d'
         self._helper = ganesha.GaneshaNASHelper(
             self._execute, self.fake_conf, tag='faketag')
-        self._helper.ganesha = mock.Mock()
+        self._helper.ganesha = mock.MagicMock()
         self._helper.export_template = {'key': 'value'}
         self.share = fake_share.fake_share()
         self.access = fake_share.fake_access()
@@ -275,6 +275,7 @@ class GaneshaNASHelperTestCase(test.TestCase):
 
         self._helper._allow_access.assert_called_once_with(
             '/', self.share, self.access)
+        self._helper.ganesha.coalesce.assert_called_once_with()
 
         self.assertFalse(self._helper._deny_access.called)
         self.assertFalse(self._helper.ganesha.reset_exports.called)
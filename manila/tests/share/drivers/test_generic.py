@@ -183,9 +183,13 @@ class GenericShareDriverTestCase(test.TestCase):
                 assert_called_once_with())
             self._driver._is_share_server_active.assert_called_once_with(
                 self._context, fake_server)
+            (self._driver.service_instance_manager.fill_service_instance_pool.
+                assert_not_called())
         else:
             self.assertFalse(
                 self._driver.service_instance_manager.get_common_server.called)
+            (self._driver.service_instance_manager.fill_service_instance_pool.
+                assert_called_once_with())
             self.assertFalse(self._driver._is_share_server_active.called)
 
     @mock.patch('time.sleep')
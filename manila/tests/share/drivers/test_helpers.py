@@ -159,20 +159,69 @@ class NFSHelperTestCase(test.TestCase):
         self._helper._ssh_exec.assert_has_calls([
             mock.call(self.server, ['sudo', 'exportfs']),
             mock.call(self.server, ['sudo', 'exportfs', '-u',
-                                    ':'.join(['3.3.3.3', local_path])]),
-            mock.call(self.server, ['sudo', 'exportfs', '-u',
-                                    ':'.join(['*',
-                                              local_path])]),
-            mock.call(self.server, ['sudo', 'exportfs', '-o',
-                                    expected_mount_options % access_level,
-                                    ':'.join(['2.2.2.2', local_path])]),
+                                    ':'.join(['3.3.3.3', local_path]),
+                                    ':'.join(['*', local_path])]),
             mock.call(self.server, ['sudo', 'exportfs', '-o',
                                     expected_mount_options % access_level,
-                                    ':'.join(['5.5.5.0/24',
-                                              local_path])]),
+                                    ':'.join(['2.2.2.2', local_path]),
+                                    ':'.join(['5.5.5.0/24', local_path])]),
         ])
-        self._helper._sync_nfs_temp_and_perm_files.assert_has_calls([
-            mock.call(self.server), mock.call(self.server)])
+        self.assertEqual(3, self._helper._ssh_exec.call_count)
+        self._helper._sync_nfs_temp_and_perm_files.assert_called_once_with(
+            self.server)
+
+    def test_update_access_recovery_mode_many_rules(self):
+        self.mock_object(self._helper, '_sync_nfs_temp_and_perm_files')
+        self.mock_object(helpers, 'EXPORTFS_MAX_CLIENTS', 2)
+        local_path = os.path.join(CONF.share_mount_path, self.share_name)
+        exec_result = '\n'.join(
+            [' '.join([local_path, '3.3.3.%d' % i]) for i in range(3)])
+        self.mock_object(self._helper, '_ssh_exec',
+                         mock.Mock(return_value=(exec_result, '')))
+        access_rules = [
+            test_generic.get_fake_access_rule('1.1.1.1', 'rw'),
+            test_generic.get_fake_access_rule('1.1.1.2', 'ro'),
+            test_generic.get_fake_access_rule('1.1.1.3', 'rw'),
+            test_generic.get_fake_access_rule('1.1.1.4', 'rw')]
+
+        self._helper.update_access(self.server, self.share_name, access_rules,
+                                   [], [])
+
+        options = '%s,no_subtree_check,no_root_squash'
+        self._helper._ssh_exec.assert_has_calls([
+            mock.call(self.server, ['sudo', 'exportfs']),
+            mock.call(self.server, ['sudo', 'exportfs', '-u',
+                                    '3.3.3.0:' + local_path,
+                                    '3.3.3.1:' + local_path]),
+            mock.call(self.server, ['sudo', 'exportfs', '-u',
+                                    '3.3.3.2:' + local_path]),
+            mock.call(self.server, ['sudo', 'exportfs', '-o', options % 'rw',
+                                    '1.1.1.1:' + local_path,
+                                    '1.1.1.3:' + local_path]),
+            mock.call(self.server, ['sudo', 'exportfs', '-o', options % 'rw',
+                                    '1.1.1.4:' + local_path]),
+            mock.call(self.server, ['sudo', 'exportfs', '-o', options % 'ro',
+                                    '1.1.1.2:' + local_path]),
+        ])
+        self.assertEqual(6, self._helper._ssh_exec.call_count)
+        self._helper._sync_nfs_temp_and_perm_files.assert_called_once_with(
+            self.server)
+
+    def test_update_access_delete_rules_unexpected_error(self):
+        self.mock_object(self._helper, '_sync_nfs_temp_and_perm_files')
+        stderr = ("exportfs: Could not find '1.1.1.1:/shares/fake' to "
+                  "unexport.\nexportfs: fake error\n")
+        self.mock_object(self._helper, '_ssh_exec', mock.Mock(
+            side_effect=[('', ''),
+                         exception.ProcessExecutionError(stderr=stderr)]))
+        delete_rules = [
+            test_generic.get_fake_access_rule('1.1.1.1', 'rw'),
+            test_generic.get_fake_access_rule('1.1.1.2', 'rw')]
+
+        self.assertRaises(exception.ProcessExecutionError,
+                          self._helper.update_access,
+                          self.server, self.share_name, [], [], delete_rules)
+        self.assertFalse(self._helper._sync_nfs_temp_and_perm_files.called)
 
     @ddt.data({'access': '10.0.0.1', 'result': '10.0.0.1'},
               {'access': '10.0.0.1/32', 'result': '10.0.0.1'},
@@ -403,12 +452,8 @@ class NFSHelperTestCase(test.TestCase):
             self._helper._ssh_exec.assert_has_calls([
                 mock.call(self.server,
                           ['sudo', 'exportfs', '-u',
-                           '"{}"'.format(':'.join(['1.1.1.10', local_path]))]),
-                mock.call(self.server,
-                          ['sudo', 'exportfs', '-u',
-                           '"{}"'.format(':'.join(['1.1.1.16', local_path]))]),
-                mock.call(self.server,
-                          ['sudo', 'exportfs', '-u',
+                           '"{}"'.format(':'.join(['1.1.1.10', local_path])),
+                           '"{}"'.format(':'.join(['1.1.1.16', local_path])),
                            '"{}"'.format(':'.join(['*', local_path]))]),
             ])
 
@@ -740,17 +740,15 @@ class LVMShareDriverTestCase(test.TestCase):
                        return_value='fake_date'))
     def test_update_share_usage_size(self):
         mount_path = self._get_mount_path(self.share)
-        self._os.path.exists.return_value = True
         self.mock_object(
             self._driver,
             '_execute',
             mock.Mock(return_value=(
-                "Mounted on                    Used "
-                + mount_path + "               1G", None)))
+                "Mounted on                    Used\n"
+                + mount_path + "               1G\n", None)))
 
         update_shares = self._driver.update_share_usage_size(
             self._context, [self.share, ])
-        self._os.path.exists.assert_called_with(mount_path)
         self.assertEqual(
             [{'id': 'fakeid', 'used_size': '1',
               'gathered_at': 'fake_date'}],
@@ -764,26 +762,32 @@ class LVMShareDriverTestCase(test.TestCase):
     def test_update_share_usage_size_multiple_share(self):
         share1 = fake_share(id='fakeid_get_fail', name='get_fail')
         share2 = fake_share(id='fakeid_success', name='get_success')
-        share3 = fake_share(id='fakeid_not_exist', name='get_not_exist')
+        share3 = fake_share(id='fakeid_prefix', name='get_success1')
+        share4 = fake_share(id='fakeid_special', name='get (success)+')
 
         mount_path2 = self._get_mount_path(share2)
-        mount_path3 = self._get_mount_path(share3)
-        self._os.path.exists.side_effect = [True, True, False]
+        mount_path4 = self._get_mount_path(share4)
         self.mock_object(
             self._driver,
             '_execute',
             mock.Mock(return_value=(
-                "Mounted on                    Used "
-                + mount_path2 + "               1G", None)))
+                "Mounted on                    Used\n"
+                "/                               5G\n"
+                + mount_path2 + "1               3G\n"
+                + mount_path2 + "               1G\n"
+                + mount_path4 + "               2G\n", None)))
 
         update_shares = self._driver.update_share_usage_size(
-            self._context, [share1, share2, share3])
-        self._os.path.exists.assert_called_with(mount_path3)
+            self._context, [share1, share2, share3, share4])
         self.assertEqual(
             [{'gathered_at': 'fake_date',
-              'id': 'fakeid_success', 'used_size': '1'}],
+              'id': 'fakeid_success', 'used_size': '1'},
+             {'gathered_at': 'fake_date',
+              'id': 'fakeid_prefix', 'used_size': '3'},
+             {'gathered_at': 'fake_date',
+              'id': 'fakeid_special', 'used_size': '2'}],
             update_shares)
-        self._driver._execute.assert_called_with(
+        self._driver._execute.assert_called_once_with(
             'df', '-l', '--output=target,used',
             '--block-size=g')
 
@@ -77,6 +77,8 @@ def fake_get_config_option(key):
         return None
     elif key == 'backend_availability_zone':
         return None
+    elif key == 'service_instance_pool_size':
+        return 0
     else:
         return mock.Mock()
 
@@ -1435,6 +1437,228 @@ class ServiceInstanceManagerTestCase(test.TestCase):
             expected_try_count=1,
             expected_ret_val=mock_instance)
 
+    def test_wait_for_instance_available_without_networks(self):
+        mock_instance = {'status': 'ACTIVE', 'networks': {}}
+        self.mock_object(self._manager.compute_api, 'server_get',
+                         mock.Mock(return_value=mock_instance))
+
+        result = self._manager.wait_for_instance_to_be_active(
+            'fake_instance_id', 3, require_networks=False)
+
+        self.assertEqual(mock_instance, result)
+        self._manager.compute_api.server_get.assert_called_once_with(
+            self._manager.admin_context, 'fake_instance_id')
+
+    def test___create_service_instance_from_pool(self):
+        self._manager.pool_size = 2
+        self._manager._pool = ['fake_pooled_id']
+        self.mock_object(self._manager, 'fill_service_instance_pool')
+        ip_address = 'fake_ip_address'
+        network_data = {
+            'nics': [{'port-id': 'fake_service_port'},
+                     {'port-id': 'fake_admin_port'}],
+            'router': {'id': 'fake_router_id'},
+            'service_port': {'id': 'fake_service_port',
+                             'fixed_ips': [{'ip_address': ip_address}]},
+            'admin_port': {'id': 'fake_admin_port',
+                           'fixed_ips': [{'ip_address': ip_address}]},
+            'service_subnet': {'id': 'fake_subnet_id',
+                               'cidr': '10.254.0.0/28'},
+        }
+        server_get = {'id': 'fake_pooled_id', 'status': 'ACTIVE',
+                      'networks': {'fake_net': [ip_address]}}
+        self.mock_object(self._manager.network_helper, 'setup_network',
+                         mock.Mock(return_value=network_data))
+        self.mock_object(self._manager, '_get_service_image',
+                         mock.Mock(return_value='fake_image_id'))
+        self.mock_object(self._manager, '_get_key', mock.Mock(
+            return_value=('fake_key_name', 'fake_key_path')))
+        self.mock_object(self._manager, '_get_or_create_security_groups',
+                         mock.Mock(return_value=[]))
+        self.mock_object(self._manager.compute_api, 'server_update')
+        self.mock_object(self._manager.compute_api, 'server_create')
+        self.mock_object(self._manager.compute_api,
+                         'server_interface_attach')
+        self.mock_object(self._manager.compute_api, 'server_get',
+                         mock.Mock(return_value=server_get))
+
+        result = self._manager._create_service_instance(
+            self._manager.admin_context, 'fake_instance_name', {})
+
+        self.assertEqual('fake_pooled_id', result['instance_id'])
+        self.assertEqual(ip_address, result['ip'])
+        self.assertEqual('fake_admin_port', result['admin_port_id'])
+        self.assertEqual([], self._manager._pool)
+        self._manager.compute_api.server_create.assert_not_called()
+        self._manager.compute_api.server_update.assert_called_once_with(
+            self._manager.admin_context, 'fake_pooled_id',
+            'fake_instance_name')
+        self._manager.compute_api.server_interface_attach.assert_has_calls([
+            mock.call(self._manager.admin_context, 'fake_pooled_id',
+                      'fake_service_port'),
+            mock.call(self._manager.admin_context, 'fake_pooled_id',
+                      'fake_admin_port'),
+        ])
+        self._manager.compute_api.server_get.assert_called_once_with(
+            self._manager.admin_context, 'fake_pooled_id')
+        self._manager.fill_service_instance_pool.assert_called_once_with()
+
+    def test__claim_pool_service_instance_pool_disabled(self):
+        self.mock_object(self._manager, 'fill_service_instance_pool')
+
+        result = self._manager._claim_pool_service_instance(
+            self._manager.admin_context, 'fake_instance_name')
+
+        self.assertIsNone(result)
+        self._manager.fill_service_instance_pool.assert_not_called()
+
+    @ddt.data(None, [])
+    def test__claim_pool_service_instance_pool_empty(self, pool):
+        self._manager.pool_size = 1
+        self._manager._pool = pool
+        self.mock_object(self._manager, 'fill_service_instance_pool')
+        self.mock_object(self._manager.compute_api, 'server_update')
+
+        result = self._manager._claim_pool_service_instance(
+            self._manager.admin_context, 'fake_instance_name')
+
+        self.assertIsNone(result)
+        self._manager.compute_api.server_update.assert_not_called()
+        self._manager.fill_service_instance_pool.assert_called_once_with()
+
+    def test__claim_pool_service_instance_skip_deleted(self):
+        self._manager.pool_size = 3
+        self._manager._pool = ['fake_id_1', 'fake_id_2', 'fake_id_3']
+        self.mock_object(self._manager, 'fill_service_instance_pool')
+        self.mock_object(
+            self._manager.compute_api, 'server_update',
+            mock.Mock(side_effect=[
+                exception.InstanceNotFound(instance_id='fake_id_1'), {}]))
+
+        result = self._manager._claim_pool_service_instance(
+            self._manager.admin_context, 'fake_instance_name')
+
+        self.assertEqual('fake_id_2', result)
+        self.assertEqual(['fake_id_3'], self._manager._pool)
+        self._manager.compute_api.server_update.assert_has_calls([
+            mock.call(self._manager.admin_context, 'fake_id_1',
+                      'fake_instance_name'),
+            mock.call(self._manager.admin_context, 'fake_id_2',
+                      'fake_instance_name'),
+        ])
+        self._manager.fill_service_instance_pool.assert_called_once_with()
+
+    @ddt.data((0, False), (1, True))
+    @ddt.unpack
+    def test_fill_service_instance_pool_not_started(self, pool_size,
+                                                    filling):
+        self._manager.pool_size = pool_size
+        self._manager._pool_filling = filling
+        mock_spawn = self.mock_object(service_instance.eventlet, 'spawn_n')
+
+        self._manager.fill_service_instance_pool()
+
+        mock_spawn.assert_not_called()
+
+    def test_fill_service_instance_pool(self):
+        self._manager.pool_size = 2
+        self._manager._pool = None
+        self.mock_object(service_instance.eventlet, 'spawn_n',
+                         mock.Mock(side_effect=lambda func: func()))
+        self.mock_object(self._manager, '_load_service_instance_pool',
+                         mock.Mock(return_value=['fake_id_1']))
+        self.mock_object(self._manager, '_create_pool_service_instance',
+                         mock.Mock(return_value='fake_id_2'))
+
+        self._manager.fill_service_instance_pool()
+
+        self.assertEqual(['fake_id_1', 'fake_id_2'], self._manager._pool)
+        self.assertFalse(self._manager._pool_filling)
+        self._manager._load_service_instance_pool.assert_called_once_with()
+        (self._manager._create_pool_service_instance.
+            assert_called_once_with())
+
+    def test_fill_service_instance_pool_error(self):
+        self._manager.pool_size = 2
+        self._manager._pool = []
+        self.mock_object(service_instance.eventlet, 'spawn_n',
+                         mock.Mock(side_effect=lambda func: func()))
+        self.mock_object(self._manager, '_load_service_instance_pool')
+        self.mock_object(
+            self._manager, '_create_pool_service_instance',
+            mock.Mock(side_effect=exception.ServiceInstanceException('')))
+        mock_log = self.mock_object(service_instance, 'LOG')
+
+        self._manager.fill_service_instance_pool()
+
+        self.assertEqual([], self._manager._pool)
+        self.assertFalse(self._manager._pool_filling)
+        self._manager._load_service_instance_pool.assert_not_called()
+        self.assertEqual(1, mock_log.exception.call_count)
+
+    def test__load_service_instance_pool(self):
+        prefix = self._manager._get_pool_instance_name_prefix()
+        servers = [
+            {'id': 'fake_id_1', 'name': prefix + 'foo', 'status': 'ACTIVE'},
+            {'id': 'fake_id_2', 'name': prefix + 'bar', 'status': 'ERROR'},
+            {'id': 'fake_id_3', 'name': 'x' + prefix, 'status': 'ACTIVE'},
+        ]
+        self.mock_object(self._manager.compute_api, 'server_list',
+                         mock.Mock(return_value=servers))
+        self.mock_object(self._manager, '_delete_server')
+
+        result = self._manager._load_service_instance_pool()
+
+        self.assertEqual(['fake_id_1'], result)
+        self._manager.compute_api.server_list.assert_called_once_with(
+            self._manager.admin_context, {'name': mock.ANY})
+        self._manager._delete_server.assert_called_once_with(
+            self._manager.admin_context, 'fake_id_2')
+
+    def test__create_pool_service_instance(self):
+        self.mock_object(self._manager, '_get_service_image',
+                         mock.Mock(return_value='fake_image_id'))
+        self.mock_object(self._manager, '_get_key', mock.Mock(
+            return_value=('fake_key_name', 'fake_key_path')))
+        self.mock_object(self._manager.compute_api, 'server_create',
+                         mock.Mock(return_value={'id': 'fake_id'}))
+        self.mock_object(self._manager, 'wait_for_instance_to_be_active')
+        self.mock_object(self._manager, '_delete_server')
+
+        result = self._manager._create_pool_service_instance()
+
+        self.assertEqual('fake_id', result)
+        self._manager.compute_api.server_create.assert_called_once_with(
+            self._manager.admin_context, name=mock.ANY,
+            image='fake_image_id', flavor='100', key_name='fake_key_name',
+            nics='none',
+            availability_zone=service_instance.CONF.storage_availability_zone)
+        name = self._manager.compute_api.server_create.call_args[1]['name']
+        self.assertTrue(
+            name.startswith(self._manager._get_pool_instance_name_prefix()))
+        self._manager.wait_for_instance_to_be_active.assert_called_once_with(
+            'fake_id', self._manager.max_time_to_build_instance,
+            require_networks=False)
+        self._manager._delete_server.assert_not_called()
+
+    def test__create_pool_service_instance_failed_to_build(self):
+        self.mock_object(self._manager, '_get_service_image',
+                         mock.Mock(return_value='fake_image_id'))
+        self.mock_object(self._manager, '_get_key', mock.Mock(
+            return_value=('fake_key_name', 'fake_key_path')))
+        self.mock_object(self._manager.compute_api, 'server_create',
+                         mock.Mock(return_value={'id': 'fake_id'}))
+        self.mock_object(
+            self._manager, 'wait_for_instance_to_be_active',
+            mock.Mock(side_effect=exception.ServiceInstanceException('')))
+        self.mock_object(self._manager, '_delete_server')
+
+        self.assertRaises(exception.ServiceInstanceException,
+                          self._manager._create_pool_service_instance)
+
+        self._manager._delete_server.assert_called_once_with(
+            self._manager.admin_context, 'fake_id')
+
     def test_reboot_server(self):
         fake_server = {'instance_id': mock.sentinel.instance_id}
         soft_reboot = True
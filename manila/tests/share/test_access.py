@@ -114,7 +114,7 @@ class ShareInstanceAccessDatabaseMixinTestCase(test.TestCase):
         share = db_utils.create_share(status=constants.STATUS_AVAILABLE)
         rule_1 = db_utils.create_access(share_id=share['id'])
         rule_2 = db_utils.create_access(share_id=share['id'])
-        self.mock_object(db, 'share_instance_access_update')
+        self.mock_object(db, 'share_instance_access_update_all')
 
         rules = self.access_helper.get_and_update_share_instance_access_rules(
             self.context, share_instance_id=share['instance']['id'])
@@ -123,7 +123,7 @@ class ShareInstanceAccessDatabaseMixinTestCase(test.TestCase):
         rule_ids = [r['access_id'] for r in rules]
         self.assertIn(rule_1['id'], rule_ids)
         self.assertIn(rule_2['id'], rule_ids)
-        self.assertFalse(db.share_instance_access_update.called)
+        self.assertFalse(db.share_instance_access_update_all.called)
 
     @ddt.data(
         ([constants.ACCESS_STATE_QUEUED_TO_APPLY], 2),
@@ -138,8 +138,8 @@ class ShareInstanceAccessDatabaseMixinTestCase(test.TestCase):
         share = db_utils.create_share(status=constants.STATUS_AVAILABLE)
         db_utils.create_access(share_id=share['id'], state=statuses[0])
         db_utils.create_access(share_id=share['id'], state=statuses[-1])
-        self.mock_object(db, 'share_instance_access_update', mock.Mock(
-            side_effect=db.share_instance_access_update))
+        self.mock_object(db, 'share_instance_access_update_all', mock.Mock(
+            side_effect=db.share_instance_access_update_all))
         updates = {
             'access_key': 'renfrow2stars'
         }
@@ -163,11 +163,15 @@ class ShareInstanceAccessDatabaseMixinTestCase(test.TestCase):
             r['state'] == constants.ACCESS_STATE_QUEUED_TO_DENY
         ]
         self.assertEqual(changes_allowed, len(state_changed_rules))
-        self.assertEqual(2, db.share_instance_access_update.call_count)
-        db.share_instance_access_update.assert_has_calls([
-            mock.call(self.context, mock.ANY, share['instance']['id'],
-                      expected_updates),
-        ] * changes_allowed)
+        self.assertEqual(['renfrow2stars'] * 2,
+                         [r['access_key'] for r in rules])
+        # Rules in the same state are updated at once
+        self.assertEqual(len(set(statuses)),
+                         db.share_instance_access_update_all.call_count)
+        for status in set(statuses).intersection(conditionally_change):
+            db.share_instance_access_update_all.assert_any_call(
+                self.context, share['instance']['id'], mock.ANY,
+                expected_updates, state=status)
 
     def test_get_and_update_access_rule_just_get(self):
         share = db_utils.create_share(status=constants.STATUS_AVAILABLE)
@@ -511,7 +515,10 @@ class ShareInstanceAccessTestCase(test.TestCase):
                 constants.ACCESS_STATE_UPDATING: constants.ACCESS_STATE_ACTIVE,
             }
             expected_get_and_update_calls.append(
-                mock.call(self.context, share_instance_id=share_instance_id,
+                mock.call(self.context,
+                          filters={'state': (constants.ACCESS_STATE_APPLYING,
+                                             constants.ACCESS_STATE_UPDATING)},
+                          share_instance_id=share_instance_id,
                           conditionally_change=expected_conditionally_change))
 
         all_access_rules_update_call.assert_has_calls(
@@ -947,6 +947,7 @@ class ShareAPITestCase(test.TestCase):
             az_request_multiple_subnet_support_map=compatible_azs_multiple,
             snapshot_host=None,
             scheduler_hints=None, mount_point_name=None,
+            scheduling_batch=None,
         )
         db_api.share_get.assert_called_once()
 
@@ -1293,6 +1294,64 @@ class ShareAPITestCase(test.TestCase):
                 filter_properties={'scheduler_hints': None}))
         self.assertFalse(self.api.share_rpcapi.create_share_instance.called)
 
+    def test_create_share_instance_without_host_in_batch(self):
+        _, share, share_instance = self._setup_create_instance_mocks()
+        scheduling_batch = []
+
+        self.api.create_instance(self.context, share,
+                                 scheduler_hints={'same_host': 'fake'},
+                                 scheduling_batch=scheduling_batch)
+
+        self.assertEqual(
+            [(mock.ANY, {'scheduler_hints': {'same_host': 'fake'}})],
+            scheduling_batch)
+        self.assertFalse(
+            self.api.scheduler_rpcapi.create_share_instance.called)
+        self.assertFalse(self.api.share_rpcapi.create_share_instance.called)
+
+    def test_create_shares(self):
+        share_requests = [{'share_proto': 'NFS', 'size': size,
+                           'name': 'share%s' % size, 'description': None}
+                          for size in (1, 2)]
+
+        def _create(context, scheduling_batch=None, **kwargs):
+            scheduling_batch.append(('spec%s' % kwargs['size'],
+                                     {'scheduler_hints': None}))
+            return 'share%s' % kwargs['size']
+
+        self.mock_object(self.api, 'create', mock.Mock(side_effect=_create))
+        self.mock_object(self.api.scheduler_rpcapi, 'create_share_instances')
+
+        shares = self.api.create_shares(self.context, share_requests)
+
+        self.assertEqual(['share1', 'share2'], shares)
+        self.api.create.assert_has_calls([
+            mock.call(self.context, scheduling_batch=mock.ANY,
+                      **share_request)
+            for share_request in share_requests])
+        (self.api.scheduler_rpcapi.create_share_instances.
+            assert_called_once_with(
+                self.context, request_specs=['spec1', 'spec2'],
+                filter_properties_list=[{'scheduler_hints': None}] * 2))
+
+    def test_create_shares_schedules_created_shares_on_failure(self):
+        def _create(context, scheduling_batch=None, **kwargs):
+            if kwargs['size'] > 1:
+                raise exception.InvalidInput(reason='fake')
+            scheduling_batch.append(('spec1', {'scheduler_hints': None}))
+            return 'share1'
+
+        self.mock_object(self.api, 'create', mock.Mock(side_effect=_create))
+        self.mock_object(self.api.scheduler_rpcapi, 'create_share_instances')
+
+        self.assertRaises(exception.InvalidInput, self.api.create_shares,
+                          self.context, [{'size': 1}, {'size': 2}])
+
+        (self.api.scheduler_rpcapi.create_share_instances.
+            assert_called_once_with(
+                self.context, request_specs=['spec1'],
+                filter_properties_list=[{'scheduler_hints': None}]))
+
     def test_create_share_instance_from_snapshot(self):
         snapshot, share, _, _ = self._setup_create_from_snapshot_mocks()
 
@@ -2689,7 +2748,8 @@ class ShareAPITestCase(test.TestCase):
             availability_zones=None,
             az_request_multiple_subnet_support_map=None,
             snapshot_host=snapshot['share']['instance']['host'],
-            scheduler_hints=None, mount_point_name=None)
+            scheduler_hints=None, mount_point_name=None,
+            scheduling_batch=None)
         share_api.policy.check_policy.assert_called_once_with(
             self.context, 'share_snapshot', 'get_snapshot',
             snapshot, do_raise=False)
@@ -3131,7 +3191,8 @@ class ShareAPITestCase(test.TestCase):
                 do_raise=False)])
         db_api.share_snapshot_get_all_by_project.assert_called_once_with(
             ctx, 'fakepid', limit=None, offset=None, sort_dir='desc',
-            sort_key='share_id', filters={})
+            sort_key='share_id', filters={},
+            marker=None)
 
     @mock.patch.object(db_api, 'share_snapshot_get_all', mock.Mock())
     def test_get_all_snapshots_admin_all_tenants(self):
@@ -3152,7 +3213,8 @@ class ShareAPITestCase(test.TestCase):
                 do_raise=False)])
         db_api.share_snapshot_get_all.assert_called_once_with(
             self.context, limit=None, offset=None, sort_dir='desc',
-            sort_key='share_id', filters={})
+            sort_key='share_id', filters={},
+            marker=None)
 
     @mock.patch.object(db_api, 'share_snapshot_get_all_by_project',
                        mock.Mock())
@@ -3169,7 +3231,8 @@ class ShareAPITestCase(test.TestCase):
                 do_raise=False)])
         db_api.share_snapshot_get_all_by_project.assert_called_once_with(
             ctx, 'fakepid', limit=None, offset=None, sort_dir='desc',
-            sort_key='share_id', filters={})
+            sort_key='share_id', filters={},
+            marker=None)
 
     def test_get_all_snapshots_not_admin_search_opts(self):
         search_opts = {'size': 'fakesize'}
@@ -3191,7 +3254,8 @@ class ShareAPITestCase(test.TestCase):
                 do_raise=False)])
         db_api.share_snapshot_get_all_by_project.assert_called_once_with(
             ctx, 'fakepid', limit=None, offset=None, sort_dir='desc',
-            sort_key='share_id', filters=search_opts)
+            sort_key='share_id', filters=search_opts,
+            marker=None)
 
     @ddt.data(({'name': 'fo'}, 0, []), ({'description': 'd'}, 0, []),
               ({'name': 'foo', 'description': 'd'}, 0, []),
@@ -3232,7 +3296,8 @@ class ShareAPITestCase(test.TestCase):
                 do_raise=False)])
         db_api.share_snapshot_get_all_by_project.assert_called_once_with(
             ctx, 'fakepid', limit=None, offset=None, sort_dir='desc',
-            sort_key='share_id', filters=search_opts)
+            sort_key='share_id', filters=search_opts,
+            marker=None)
 
     def test_get_all_snapshots_with_sorting_valid(self):
         self.mock_object(
@@ -3252,7 +3317,8 @@ class ShareAPITestCase(test.TestCase):
 
         db_api.share_snapshot_get_all_by_project.assert_called_once_with(
             ctx, 'fake_pid_1', limit=None, offset=None, sort_dir='asc',
-            sort_key='status', filters={})
+            sort_key='status', filters={},
+            marker=None)
         self.assertEqual(_FAKE_LIST_OF_ALL_SNAPSHOTS[0], snapshots)
 
     def test_get_all_snapshots_sort_key_invalid(self):
@@ -163,6 +163,28 @@ class ShareDriverTestCase(test.TestCase):
                           share_driver.get_share_status,
                           None, None)
 
+    def test_get_share_statuses(self):
+        share_driver = self._instantiate_share_driver(None, False)
+        shares = [
+            {'id': 'fake_id_1', 'share_id': 'fake_share_id_1',
+             'share_server': 'fake_server'},
+            {'id': 'fake_id_2', 'share_id': 'fake_share_id_2',
+             'share_server': None},
+        ]
+        self.mock_object(share_driver, 'get_share_status', mock.Mock(
+            side_effect=[{'status': constants.STATUS_AVAILABLE},
+                         exception.ShareBackendException(msg='fake')]))
+
+        result = share_driver.get_share_statuses('fake_context', shares)
+
+        self.assertEqual(
+            {'fake_id_1': {'status': constants.STATUS_AVAILABLE},
+             'fake_id_2': {'status': constants.STATUS_ERROR}},
+            result)
+        share_driver.get_share_status.assert_has_calls([
+            mock.call(shares[0], 'fake_server'),
+            mock.call(shares[1], None)])
+
     @ddt.data(
         {'opt': True, 'allowed': True},
         {'opt': True, 'allowed': (True, False)},
@@ -721,6 +743,12 @@ class ShareDriverTestCase(test.TestCase):
                           share_driver.update_replica_state,
                           'fake_context', ['r1', 'r2'], 'fake_replica', [], [])
 
+    def test_update_replica_states(self):
+        share_driver = self._instantiate_share_driver(None, True)
+        self.assertRaises(NotImplementedError,
+                          share_driver.update_replica_states,
+                          'fake_context', [{'replica': 'fake_replica'}])
+
     def test_create_replicated_snapshot(self):
         share_driver = self._instantiate_share_driver(None, False)
         self.assertRaises(NotImplementedError,
@@ -45,6 +45,7 @@ from manila.share import utils as share_utils
 from manila import test
 from manila.tests.api import fakes as test_fakes
 from manila.tests import db_utils
+from manila.tests import fake_driver
 from manila.tests import fake_notifier
 from manila.tests import fake_share as fakes
 from manila.tests import fake_utils
@@ -218,16 +219,14 @@ class ShareManagerTestCase(test.TestCase):
         mock_share_get_all_by_host = self.mock_object(
             self.share_manager.db, 'share_instance_get_all_by_host',
             mock.Mock(return_value=instances))
-        self.mock_object(self.share_manager.db, 'share_instance_get',
-                         mock.Mock(side_effect=[instances[0], instances[2],
-                                                instances[4]]))
         self.mock_object(self.share_manager.db, 'export_locations_update')
         mock_ensure_shares = self.mock_object(
             self.share_manager.driver, 'ensure_shares',
             mock.Mock(return_value=fake_update_instances))
         self.mock_object(self.share_manager, '_ensure_share_instance_has_pool')
-        self.mock_object(self.share_manager, '_get_share_server',
-                         mock.Mock(return_value='share_server'))
+        share_server = fakes.fake_share_server_get()
+        mock_share_servers_get = self._mock_share_servers_get(
+            instances, share_server)
         self.mock_object(self.share_manager,
                          '_get_share_server_dict',
                          mock.Mock(return_value='share_server'))
@@ -251,7 +250,7 @@ class ShareManagerTestCase(test.TestCase):
             [dict_instances[0], dict_instances[2], dict_instances[4]])
         mock_share_get_all_by_host.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext),
-            self.share_manager.host)
+            self.share_manager.host, with_share_data=True)
         exports_update.assert_has_calls([
             mock.call(mock.ANY, instances[0]['id'], fake_export_locations),
             mock.call(mock.ANY, instances[2]['id'], fake_export_locations),
@@ -262,12 +261,9 @@ class ShareManagerTestCase(test.TestCase):
             mock.call(utils.IsAMatcher(context.RequestContext),
                       instances[2]),
         ])
-        self.share_manager._get_share_server.assert_has_calls([
-            mock.call(utils.IsAMatcher(context.RequestContext),
-                      instances[0]),
-            mock.call(utils.IsAMatcher(context.RequestContext),
-                      instances[2]),
-        ])
+        mock_share_servers_get.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext),
+            {'ids': [share_server['id']]})
         self.share_manager.db.service_get_by_args.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext),
             self.share_manager.host,
@@ -295,9 +291,9 @@ class ShareManagerTestCase(test.TestCase):
             ])
             mock_update_rules_method.assert_has_calls([
                 mock.call(mock.ANY, instances[0]['id'],
-                          share_server='share_server'),
+                          share_server=share_server),
                 mock.call(mock.ANY, instances[2]['id'],
-                          share_server='share_server'),
+                          share_server=share_server),
             ])
         else:
             # none of the share instances in the fake data have syncing rules
@@ -333,16 +329,14 @@ class ShareManagerTestCase(test.TestCase):
         mock_share_get_all_by_host = self.mock_object(
             self.share_manager.db, 'share_instance_get_all_by_host',
             mock.Mock(return_value=instances))
-        self.mock_object(self.share_manager.db, 'share_instance_get',
-                         mock.Mock(side_effect=[instances[0], instances[2],
-                                                instances[4]]))
         self.mock_object(self.share_manager.db, 'share_metadata_update')
         mock_ensure_shares = self.mock_object(
             self.share_manager.driver, 'ensure_shares',
             mock.Mock(return_value=fake_update_instances))
         self.mock_object(self.share_manager, '_ensure_share_instance_has_pool')
-        self.mock_object(self.share_manager, '_get_share_server',
-                         mock.Mock(return_value='share_server'))
+        share_server = fakes.fake_share_server_get()
+        mock_share_servers_get = self._mock_share_servers_get(
+            instances, share_server)
         self.mock_object(self.share_manager,
                          '_get_share_server_dict',
                          mock.Mock(return_value='share_server'))
@@ -363,7 +357,7 @@ class ShareManagerTestCase(test.TestCase):
             [dict_instances[0], dict_instances[2], dict_instances[4]])
         mock_share_get_all_by_host.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext),
-            self.share_manager.host)
+            self.share_manager.host, with_share_data=True)
         self.share_manager._ensure_share_instance_has_pool.assert_has_calls([
             mock.call(utils.IsAMatcher(context.RequestContext),
                       instances[0]),
@@ -378,12 +372,9 @@ class ShareManagerTestCase(test.TestCase):
                 self.context, instances[2]['share_id'], metadata_updates, False
             ),
         ])
-        self.share_manager._get_share_server.assert_has_calls([
-            mock.call(utils.IsAMatcher(context.RequestContext),
-                      instances[0]),
-            mock.call(utils.IsAMatcher(context.RequestContext),
-                      instances[2]),
-        ])
+        mock_share_servers_get.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext),
+            {'ids': [share_server['id']]})
         # none of the share instances in the fake data have syncing rules
         mock_reset_rules_method.assert_not_called()
         self.share_manager.db.service_get_by_args.assert_called_once_with(
@@ -404,6 +395,90 @@ class ShareManagerTestCase(test.TestCase):
             )
         ])
 
+    def test_ensure_driver_resources_snapshot_rules_and_status_updates(self):
+        self.flags(update_shares_status_on_ensure=True)
+        self.mock_object(self.share_manager.db, 'backend_info_get',
+                         mock.Mock(return_value=None))
+        self.mock_object(self.share_manager.driver, 'get_backend_info',
+                         mock.Mock(return_value={'val': 'newval'}))
+        self.mock_object(self.share_manager.db, 'backend_info_update')
+        instances = self._setup_init_mocks(setup_access_rules=False)
+        fake_update_instances = {
+            instances[0]['id']: {},
+            instances[2]['id']: {'status': constants.STATUS_ERROR},
+        }
+        snapshot_instances = [
+            {'id': 'fake_snap_instance_1',
+             'share_instance_id': instances[0]['id']},
+            {'id': 'fake_snap_instance_2',
+             'share_instance_id': instances[0]['id']},
+            {'id': 'fake_snap_instance_3',
+             'share_instance_id': instances[2]['id']},
+        ]
+        pending_rules = [
+            {'share_snapshot_instance_id': 'fake_snap_instance_2'},
+            {'share_snapshot_instance_id': 'fake_snap_instance_3'},
+        ]
+        fake_service = {'id': 'fake_service_id', 'binary': 'manila-share'}
+        self.mock_object(self.share_manager.db, 'service_get_by_args',
+                         mock.Mock(return_value=fake_service))
+        self.mock_object(self.share_manager.db, 'service_update')
+        self.mock_object(self.share_manager.db,
+                         'share_instance_get_all_by_host',
+                         mock.Mock(return_value=instances))
+        mock_status_update = self.mock_object(
+            self.share_manager.db, 'share_instance_status_update')
+        mock_instance_update = self.mock_object(
+            self.share_manager.db, 'share_instance_update')
+        mock_snapshot_instances_get = self.mock_object(
+            self.share_manager.db,
+            'share_snapshot_instance_get_all_with_filters',
+            mock.Mock(return_value=snapshot_instances))
+        mock_snapshot_rules_get = self.mock_object(
+            self.share_manager.db,
+            'share_snapshot_access_get_all_for_snapshot_instances',
+            mock.Mock(return_value=pending_rules))
+        self.mock_object(self.share_manager.driver, 'ensure_shares',
+                         mock.Mock(return_value=fake_update_instances))
+        self.mock_object(self.share_manager, '_ensure_share_instance_has_pool')
+        self.mock_object(self.share_manager.access_helper,
+                         'update_access_rules')
+        mock_snapshot_rules_update = self.mock_object(
+            self.share_manager.snapshot_access_helper, 'update_access_rules')
+
+        self.share_manager.ensure_driver_resources(self.context)
+
+        mock_status_update.assert_has_calls([
+            mock.call(utils.IsAMatcher(context.RequestContext),
+                      [instances[0]['id'], instances[2]['id'],
+                       instances[4]['id']],
+                      {'status': constants.STATUS_ENSURING}),
+            mock.call(utils.IsAMatcher(context.RequestContext),
+                      [instances[0]['id']],
+                      {'status': constants.STATUS_AVAILABLE}),
+        ])
+        mock_instance_update.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), instances[2]['id'],
+            {'status': constants.STATUS_ERROR, 'host': instances[2]['host']})
+        mock_snapshot_instances_get.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext),
+            {'share_instance_ids': [instances[0]['id'], instances[2]['id']]})
+        mock_snapshot_rules_get.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext),
+            ['fake_snap_instance_1', 'fake_snap_instance_2',
+             'fake_snap_instance_3'],
+            filters={'state': [constants.ACCESS_STATE_DENYING,
+                               constants.ACCESS_STATE_QUEUED_TO_DENY,
+                               constants.ACCESS_STATE_APPLYING,
+                               constants.ACCESS_STATE_QUEUED_TO_APPLY]})
+        mock_snapshot_rules_update.assert_has_calls([
+            mock.call(utils.IsAMatcher(context.RequestContext),
+                      'fake_snap_instance_2', None),
+            mock.call(utils.IsAMatcher(context.RequestContext),
+                      'fake_snap_instance_3', None),
+        ])
+        self.assertEqual(2, mock_snapshot_rules_update.call_count)
+
     def test_init_host_with_no_shares(self):
         self.mock_object(self.share_manager.db,
                          'share_instance_get_all_by_host',
@@ -414,7 +489,8 @@ class ShareManagerTestCase(test.TestCase):
         self.assertTrue(self.share_manager.driver.initialized)
         (self.share_manager.db.share_instance_get_all_by_host.
             assert_called_once_with(utils.IsAMatcher(context.RequestContext),
-                                    self.share_manager.host))
+                                    self.share_manager.host,
+                                    with_share_data=True))
         self.share_manager.driver.do_setup.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext))
         (self.share_manager.driver.check_for_setup_error.
@@ -487,42 +563,54 @@ class ShareManagerTestCase(test.TestCase):
              'host': self.share_manager.host})
         self.assertFalse(self.share_manager.driver.initialized)
 
+    def _mock_share_servers_get(self, instances, share_server):
+        for instance in instances:
+            instance['share_server_id'] = share_server['id']
+        return self.mock_object(
+            self.share_manager.db, 'share_server_get_all_with_filters',
+            mock.Mock(return_value=[share_server]))
+
     def _setup_init_mocks(self, setup_access_rules=True):
         share_type = db_utils.create_share_type()
-        instances = [
+        shares = [
             db_utils.create_share(id='fake_id_1',
                                   share_type_id=share_type['id'],
                                   status=constants.STATUS_AVAILABLE,
-                                  display_name='fake_name_1').instance,
+                                  display_name='fake_name_1'),
             db_utils.create_share(id='fake_id_2',
                                   share_type_id=share_type['id'],
                                   status=constants.STATUS_ERROR,
-                                  display_name='fake_name_2').instance,
+                                  display_name='fake_name_2'),
             db_utils.create_share(id='fake_id_3',
                                   share_type_id=share_type['id'],
                                   status=constants.STATUS_AVAILABLE,
-                                  display_name='fake_name_3').instance,
+                                  display_name='fake_name_3'),
             db_utils.create_share(
                 id='fake_id_4',
                 share_type_id=share_type['id'],
                 status=constants.STATUS_MIGRATING,
                 task_state=constants.TASK_STATE_MIGRATION_IN_PROGRESS,
-                display_name='fake_name_4').instance,
+                display_name='fake_name_4'),
             db_utils.create_share(id='fake_id_5',
                                   share_type_id=share_type['id'],
                                   status=constants.STATUS_AVAILABLE,
-                                  display_name='fake_name_5').instance,
+                                  display_name='fake_name_5'),
             db_utils.create_share(
                 id='fake_id_6',
                 share_type_id=share_type['id'],
                 status=constants.STATUS_MIGRATING,
                 task_state=constants.TASK_STATE_MIGRATION_DRIVER_IN_PROGRESS,
-                display_name='fake_name_6').instance,
+                display_name='fake_name_6'),
             db_utils.create_share(
                 id='fake_id_7', share_type_id=share_type['id'],
                 status=constants.STATUS_CREATING_FROM_SNAPSHOT,
-                display_name='fake_name_7').instance,
+                display_name='fake_name_7'),
         ]
+        instances = []
+        for share in shares:
+            instance = share.instance
+            instance.share = share
+            instances.append(instance)
 
         instances[4]['access_rules_status'] = (
             constants.SHARE_INSTANCE_RULES_SYNCING)
@@ -579,17 +667,14 @@ class ShareManagerTestCase(test.TestCase):
                          'service_get_by_args',
                          mock.Mock(return_value=fake_service))
         self.mock_object(self.share_manager.db, 'service_update')
-        self.mock_object(self.share_manager.db, 'share_instance_get',
-                         mock.Mock(side_effect=[instances[0], instances[2],
-                                                instances[4]]))
         self.mock_object(self.share_manager.db,
                          'export_locations_update')
         mock_ensure_shares = self.mock_object(
             self.share_manager.driver, 'ensure_shares',
             mock.Mock(return_value=fake_update_instances))
         self.mock_object(self.share_manager, '_ensure_share_instance_has_pool')
-        self.mock_object(self.share_manager, '_get_share_server',
-                         mock.Mock(return_value=share_server))
+        mock_share_servers_get = self._mock_share_servers_get(
+            instances, share_server)
         self.mock_object(self.share_manager, '_get_share_server_dict',
                          mock.Mock(return_value=share_server))
         self.mock_object(self.share_manager, 'publish_service_capabilities',
@@ -628,7 +713,7 @@ class ShareManagerTestCase(test.TestCase):
                 [dict_instances[0], dict_instances[2], dict_instances[4]])
             mock_share_get_all_by_host.assert_called_once_with(
                 utils.IsAMatcher(context.RequestContext),
-                self.share_manager.host)
+                self.share_manager.host, with_share_data=True)
             exports_update.assert_has_calls([
                 mock.call(mock.ANY, instances[0]['id'], fake_export_locations),
                 mock.call(mock.ANY, instances[2]['id'], fake_export_locations)
@@ -640,12 +725,9 @@ class ShareManagerTestCase(test.TestCase):
                     mock.call(utils.IsAMatcher(context.RequestContext),
                               instances[2]),
                 ]))
-            self.share_manager._get_share_server.assert_has_calls([
-                mock.call(utils.IsAMatcher(context.RequestContext),
-                          instances[0]),
-                mock.call(utils.IsAMatcher(context.RequestContext),
-                          instances[2]),
-            ])
+            mock_share_servers_get.assert_called_once_with(
+                utils.IsAMatcher(context.RequestContext),
+                {'ids': [share_server['id']]})
             (self.share_manager.publish_service_capabilities.
                 assert_called_once_with(
                     utils.IsAMatcher(context.RequestContext)))
@@ -727,7 +809,7 @@ class ShareManagerTestCase(test.TestCase):
             mock_ensure_shares.assert_not_called()
             mock_share_instance_get_all_by_host.assert_called_once_with(
                 utils.IsAMatcher(context.RequestContext),
-                self.share_manager.host)
+                self.share_manager.host, with_share_data=True)
 
     @ddt.data(exception.ManilaException, ['fake/path/1', 'fake/path'])
     def test_init_host_with_ensure_share(self, expected_ensure_share_result):
@@ -740,9 +822,6 @@ class ShareManagerTestCase(test.TestCase):
         self.mock_object(self.share_manager.db,
                          'share_instance_get_all_by_host',
                          mock.Mock(return_value=instances))
-        self.mock_object(self.share_manager.db, 'share_instance_get',
-                         mock.Mock(side_effect=[instances[0], instances[2],
-                                                instances[3]]))
         self.mock_object(
             self.share_manager.driver, 'ensure_shares',
             mock.Mock(side_effect=raise_NotImplementedError))
@@ -750,8 +829,8 @@ class ShareManagerTestCase(test.TestCase):
                          mock.Mock(side_effect=expected_ensure_share_result))
         self.mock_object(
             self.share_manager, '_ensure_share_instance_has_pool')
-        self.mock_object(self.share_manager, '_get_share_server',
-                         mock.Mock(return_value=share_server))
+        mock_share_servers_get = self._mock_share_servers_get(
+            instances, share_server)
         self.mock_object(self.share_manager, '_get_share_server_dict',
                          mock.Mock(return_value=share_server))
         self.mock_object(self.share_manager, 'publish_service_capabilities')
@@ -771,7 +850,8 @@ class ShareManagerTestCase(test.TestCase):
         # verification of call
         (self.share_manager.db.share_instance_get_all_by_host.
             assert_called_once_with(utils.IsAMatcher(context.RequestContext),
-                                    self.share_manager.host))
+                                    self.share_manager.host,
+                                    with_share_data=True))
         self.share_manager.driver.do_setup.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext))
         self.share_manager.driver.check_for_setup_error.assert_called_with()
@@ -781,11 +861,10 @@ class ShareManagerTestCase(test.TestCase):
         ])
         self.share_manager.driver.ensure_shares.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext),
-            [dict_instances[0], dict_instances[2], dict_instances[3]])
-        self.share_manager._get_share_server.assert_has_calls([
-            mock.call(utils.IsAMatcher(context.RequestContext), instances[0]),
-            mock.call(utils.IsAMatcher(context.RequestContext), instances[2]),
-        ])
+            [dict_instances[0], dict_instances[2], dict_instances[4]])
+        mock_share_servers_get.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext),
+            {'ids': [share_server['id']]})
         self.share_manager.driver.ensure_share.assert_has_calls([
             mock.call(utils.IsAMatcher(context.RequestContext),
                       dict_instances[0],
@@ -878,9 +957,6 @@ class ShareManagerTestCase(test.TestCase):
                          'service_get_by_args',
                          mock.Mock(return_value=fake_service))
         self.mock_object(self.share_manager.db, 'service_update')
-        self.mock_object(self.share_manager.db, 'share_instance_get',
-                         mock.Mock(side_effect=[instances[0], instances[2],
-                                                instances[3]]))
         self.mock_object(
             self.share_manager.driver, 'ensure_shares',
             mock.Mock(side_effect=raise_exception))
@@ -898,7 +974,8 @@ class ShareManagerTestCase(test.TestCase):
         # verification of call
         (self.share_manager.db.share_instance_get_all_by_host.
          assert_called_once_with(utils.IsAMatcher(context.RequestContext),
-                                 self.share_manager.host))
+                                 self.share_manager.host,
+                                 with_share_data=True))
         self.share_manager.driver.do_setup.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext))
         self.share_manager.driver.check_for_setup_error.assert_called_with()
@@ -922,7 +999,7 @@ class ShareManagerTestCase(test.TestCase):
         ])
         self.share_manager.driver.ensure_shares.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext),
-            [dict_instances[0], dict_instances[2], dict_instances[3]])
+            [dict_instances[0], dict_instances[2], dict_instances[4]])
         mock_ensure_share.assert_not_called()
 
     def test_init_host_with_exception_on_get_backend_info(self):
@@ -969,9 +1046,6 @@ class ShareManagerTestCase(test.TestCase):
         fake_service = {'id': 'fake_service_id', 'binary': 'manila-share'}
         self.mock_object(smanager.db, 'share_instance_get_all_by_host',
                          mock.Mock(return_value=instances))
-        self.mock_object(self.share_manager.db, 'share_instance_get',
-                         mock.Mock(side_effect=[instances[0], instances[2],
-                                                instances[4]]))
         self.mock_object(self.share_manager.db,
                          'service_get_by_args',
                          mock.Mock(return_value=fake_service))
@@ -981,8 +1055,7 @@ class ShareManagerTestCase(test.TestCase):
         self.mock_object(self.share_manager.driver, 'ensure_shares',
                          mock.Mock(return_value=fake_update_instances))
         self.mock_object(smanager, '_ensure_share_instance_has_pool')
-        self.mock_object(smanager, '_get_share_server',
-                         mock.Mock(return_value=share_server))
+        self._mock_share_servers_get(instances, share_server)
         self.mock_object(smanager, 'publish_service_capabilities')
         self.mock_object(manager.LOG, 'exception')
         self.mock_object(manager.LOG, 'info')
@@ -1002,7 +1075,7 @@ class ShareManagerTestCase(test.TestCase):
         # verification of call
         (smanager.db.share_instance_get_all_by_host.
             assert_called_once_with(utils.IsAMatcher(context.RequestContext),
-                                    smanager.host))
+                                    smanager.host, with_share_data=True))
         smanager.driver.do_setup.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext))
         smanager.driver.check_for_setup_error.assert_called_with()
@@ -1957,22 +2030,185 @@ class ShareManagerTestCase(test.TestCase):
         replicas = [
             fake_replica(host='openstack1@watson#pool4'),
             fake_replica(host='openstack1@watson#pool5'),
-            fake_replica(host='openstack1@newton#pool5'),
-            fake_replica(host='openstack1@newton#pool5'),
-
+            fake_replica(host='openstack1@watson#pool5',
+                         replica_state=constants.REPLICA_STATE_ACTIVE),
         ]
         self.mock_object(self.share_manager.db, 'share_replicas_get_all',
                          mock.Mock(return_value=replicas))
         mock_update_method = self.mock_object(
             self.share_manager, '_share_replica_update')
+        self.share_manager._bulk_replica_state_update = False
 
         self.share_manager.host = host
 
         self.share_manager.periodic_share_replica_update(self.context)
 
+        self.share_manager.db.share_replicas_get_all.assert_called_once_with(
+            self.context, with_share_data=False, with_share_server=False,
+            host=host.split('#')[0])
+        mock_update_method.assert_has_calls([
+            mock.call(self.context, replicas[0]['id'],
+                      share_id=replicas[0]['share_id']),
+            mock.call(self.context, replicas[1]['id'],
+                      share_id=replicas[1]['share_id']),
+        ], any_order=True)
         self.assertEqual(2, mock_update_method.call_count)
         self.assertEqual(1, mock_debug_log.call_count)
 
+    def test_periodic_share_replica_update_bulk(self):
+        replicas = [fake_replica(), fake_replica(), fake_replica()]
+        replica_updates = {
+            replicas[0]['id']: {'replica': replicas[0]},
+            replicas[1]['id']: None,
+            replicas[2]['id']: {'replica': replicas[2]},
+        }
+        self.mock_object(self.share_manager.db, 'share_replicas_get_all',
+                         mock.Mock(return_value=replicas))
+        self.mock_object(
+            self.share_manager, '_get_share_replica_update',
+            mock.Mock(side_effect=lambda ctxt, r_id: replica_updates[r_id]))
+        self.mock_object(
+            self.share_manager.driver, 'update_replica_states',
+            mock.Mock(return_value={
+                replicas[0]['id']: constants.REPLICA_STATE_IN_SYNC}))
+        mock_set_state = self.mock_object(
+            self.share_manager, '_set_polled_share_replica_state')
+        mock_update_method = self.mock_object(
+            self.share_manager, '_share_replica_update')
+        self.share_manager._bulk_replica_state_update = True
+
+        self.share_manager.periodic_share_replica_update(self.context)
+
+        self.assertEqual(
+            3, self.share_manager._get_share_replica_update.call_count)
+        mock_bulk_update = self.share_manager.driver.update_replica_states
+        mock_bulk_update.assert_called_once_with(self.context, mock.ANY)
+        self.assertCountEqual(
+            [{'replica': replicas[0]}, {'replica': replicas[2]}],
+            mock_bulk_update.call_args[0][1])
+        mock_set_state.assert_called_once_with(
+            self.context, replicas[0]['id'], constants.REPLICA_STATE_IN_SYNC,
+            share_id=replicas[0]['share_id'])
+        self.assertFalse(mock_update_method.called)
+        self.assertTrue(self.share_manager._bulk_replica_state_update)
+
+    def test_periodic_share_replica_update_bulk_not_implemented(self):
+        replicas = [fake_replica(), fake_replica()]
+        self.mock_object(self.share_manager.db, 'share_replicas_get_all',
+                         mock.Mock(return_value=replicas))
+        self.mock_object(
+            self.share_manager, '_get_share_replica_update',
+            mock.Mock(side_effect=lambda ctxt, r_id: {'replica': r_id}))
+        self.mock_object(
+            self.share_manager.driver, 'update_replica_states',
+            mock.Mock(side_effect=NotImplementedError))
+        mock_update_method = self.mock_object(
+            self.share_manager, '_share_replica_update')
+        self.share_manager._bulk_replica_state_update = True
+
+        self.share_manager.periodic_share_replica_update(self.context)
+        self.share_manager.periodic_share_replica_update(self.context)
+
+        mock_bulk_update = self.share_manager.driver.update_replica_states
+        mock_bulk_update.assert_called_once_with(self.context, mock.ANY)
+        self.assertFalse(self.share_manager._bulk_replica_state_update)
+        self.assertEqual(4, mock_update_method.call_count)
+
+    def test_periodic_share_replica_update_bulk_driver_exception(self):
+        replicas = [fake_replica(), fake_replica()]
+        self.mock_object(self.share_manager.db, 'share_replicas_get_all',
+                         mock.Mock(return_value=replicas))
+        self.mock_object(
+            self.share_manager, '_get_share_replica_update',
+            mock.Mock(side_effect=lambda ctxt, r_id: {
+                'replica': {'id': r_id, 'share_id': 'fake_share_id'}}))
+        self.mock_object(
+            self.share_manager.driver, 'update_replica_states',
+            mock.Mock(side_effect=exception.ManilaException))
+        mock_set_error = self.mock_object(
+            self.share_manager, '_set_polled_share_replica_update_error')
+        mock_set_state = self.mock_object(
+            self.share_manager, '_set_polled_share_replica_state')
+        self.share_manager._bulk_replica_state_update = True
+
+        self.share_manager.periodic_share_replica_update(self.context)
+
+        mock_set_error.assert_has_calls([
+            mock.call(self.context, replica['id'], mock.ANY,
+                      share_id='fake_share_id')
+            for replica in replicas], any_order=True)
+        self.assertEqual(2, mock_set_error.call_count)
+        self.assertFalse(mock_set_state.called)
+        self.assertTrue(self.share_manager._bulk_replica_state_update)
+
+    def test__run_concurrently(self):
+        mock_error_log = self.mock_object(manager.LOG, 'error')
+        items = [{'id': 'fake_id1'}, {'id': 'fake_id2'}]
+        called = []
+
+        def func(item):
+            called.append(item['id'])
+            if item['id'] == 'fake_id2':
+                raise exception.ManilaException()
+
+        self.share_manager._run_concurrently(func, items)
+
+        self.assertCountEqual(['fake_id1', 'fake_id2'], called)
+        mock_error_log.assert_called_once_with(
+            mock.ANY, {'id': 'fake_id2', 'err': mock.ANY})
+
+    def test_bulk_replica_state_update_not_implemented(self):
+        self.assertFalse(self.share_manager._bulk_replica_state_update)
+
+    def test_bulk_replica_state_update_implemented(self):
+        self.mock_object(fake_driver.FakeShareDriver,
+                         'update_replica_states')
+
+        share_manager = manager.ShareManager()
+
+        self.assertTrue(share_manager._bulk_replica_state_update)
+
+    @ddt.data((constants.STATUS_AVAILABLE, True),
+              (constants.STATUS_DELETING, False))
+    @ddt.unpack
+    def test__set_polled_share_replica_update_error(self, status, pollable):
+        replica = fake_replica(status=status)
+        self.mock_object(self.share_manager.db, 'share_replica_get',
+                         mock.Mock(return_value=replica))
+        mock_set_error = self.mock_object(
+            self.share_manager, '_set_share_replica_update_error')
+        excep = exception.ManilaException()
+
+        self.share_manager._set_polled_share_replica_update_error(
+            self.context, replica['id'], excep, share_id=replica['share_id'])
+
+        if pollable:
+            mock_set_error.assert_called_once_with(
+                self.context, replica, excep)
+        else:
+            self.assertFalse(mock_set_error.called)
+
+    @ddt.data((constants.STATUS_AVAILABLE, True),
+              (constants.STATUS_DELETING, False))
+    @ddt.unpack
+    def test__set_polled_share_replica_state(self, status, pollable):
+        replica = fake_replica(status=status)
+        self.mock_object(self.share_manager.db, 'share_replica_get',
+                         mock.Mock(return_value=replica))
+        mock_db_update_call = self.mock_object(
+            self.share_manager.db, 'share_replica_update')
+
+        self.share_manager._set_polled_share_replica_state(
+            self.context, replica['id'], constants.REPLICA_STATE_IN_SYNC,
+            share_id=replica['share_id'])
+
+        if pollable:
+            mock_db_update_call.assert_called_once_with(
+                self.context, replica['id'],
+                {'replica_state': constants.REPLICA_STATE_IN_SYNC})
+        else:
+            self.assertFalse(mock_db_update_call.called)
+
     @ddt.data(constants.REPLICA_STATE_IN_SYNC,
               constants.REPLICA_STATE_OUT_OF_SYNC)
     def test__share_replica_update_driver_exception(self, replica_state):
@@ -4571,6 +4807,8 @@ class ShareManagerTestCase(test.TestCase):
         self.share_manager.db.share_instance_update.assert_any_call(
             mock.ANY, 1, {'host': 'host@backend#fake_pool'})
         self.assertEqual(fake_host_expected_value, host)
+        self.assertEqual('host@backend#fake_pool',
+                         fake_share_instance['host'])
 
     def test__form_server_setup_info(self):
         def fake_network_allocations_get_for_share_server(*args, **kwargs):
@@ -8732,7 +8970,8 @@ class ShareManagerTestCase(test.TestCase):
         snapshot = fakes.fake_snapshot(create_instance=True,
                                        status=constants.STATUS_DELETING)
         snapshot_instances = 3 * [
-            fakes.fake_snapshot_instance(base_snapshot=snapshot)
+            fakes.fake_snapshot_instance(base_snapshot=snapshot,
+                                         share={'share_id': 'fake_share_id'})
         ]
         self.mock_object(
             db, 'share_replicas_get_all', mock.Mock(return_value=replicas))
@@ -8740,13 +8979,31 @@ class ShareManagerTestCase(test.TestCase):
                          mock.Mock(return_value=snapshot_instances))
         mock_snapshot_update_call = self.mock_object(
             self.share_manager, '_update_replica_snapshot')
+        self.share_manager.host = 'malfoy@manor'
 
         retval = self.share_manager.periodic_share_replica_snapshot_update(
             self.context)
 
         self.assertIsNone(retval)
         self.assertEqual(1, mock_debug_log.call_count)
-        self.assertEqual(0, mock_snapshot_update_call.call_count)
+        db.share_replicas_get_all.assert_called_once_with(
+            self.context, with_share_data=False, with_share_server=False,
+            host='malfoy@manor')
+        db.share_snapshot_instance_get_all_with_filters.assert_has_calls([
+            mock.call(self.context,
+                      {'share_instance_ids': [r['id'] for r in replicas[:3]],
+                       'statuses': (constants.STATUS_CREATING,
+                                    constants.STATUS_DELETING)},
+                      with_share_data=True),
+            mock.call(self.context,
+                      {'snapshot_ids': [snapshot_instances[0]['snapshot_id']]},
+                      with_share_data=False),
+        ])
+        self.assertEqual(3, mock_snapshot_update_call.call_count)
+        mock_snapshot_update_call.assert_called_with(
+            self.context, snapshot_instances[0],
+            replica_snapshots=snapshot_instances,
+            share_id='fake_share_id')
 
     @ddt.data(True, False)
     def test_periodic_share_replica_snapshot_update_nothing_to_update(
@@ -8960,7 +9217,9 @@ class ShareManagerTestCase(test.TestCase):
     @mock.patch('manila.tests.fake_notifier.FakeNotifier._notify')
     def test_update_share_usage_size(self, mock_notify):
         instances = self._setup_init_mocks(setup_access_rules=False)
-        update_shares = [{'id': 'fake_id', 'used_size': '3',
+        update_shares = [{'id': instances[0]['id'], 'used_size': '3',
+                          'gathered_at': 'fake'},
+                         {'id': 'fake_unknown_id', 'used_size': '1',
                           'gathered_at': 'fake'}]
         mock_notify.assert_not_called()
 
@@ -8968,16 +9227,22 @@ class ShareManagerTestCase(test.TestCase):
         self.mock_object(manager, 'driver')
         self.mock_object(manager.db, 'share_instance_get_all_by_host',
                          mock.Mock(return_value=instances))
-        self.mock_object(manager.db, 'share_instance_get',
-                         mock.Mock(side_effect=instances))
+        self.mock_object(manager.db, 'share_instance_get')
+        self.mock_object(manager.db, 'share_get')
         mock_driver_call = self.mock_object(
             manager.driver, 'update_share_usage_size',
             mock.Mock(return_value=update_shares))
         self.share_manager.update_share_usage_size(self.context)
         self.assert_notify_called(mock_notify,
                                   (['INFO', 'share.consumed.size'], ))
+        self.assertEqual(1, mock_notify.call_count)
+        payload = mock_notify.call_args[0][3]
+        self.assertEqual(instances[0]['share_id'], payload['share_id'])
+        self.assertEqual('3', payload['used_size'])
         mock_driver_call.assert_called_once_with(
             self.context, instances)
+        self.assertFalse(manager.db.share_instance_get.called)
+        self.assertFalse(manager.db.share_get.called)
 
     @mock.patch('manila.tests.fake_notifier.FakeNotifier._notify')
     def test_update_share_usage_size_fail(self, mock_notify):
@@ -9007,17 +9272,61 @@ class ShareManagerTestCase(test.TestCase):
         self.mock_object(self.share_manager.db,
                          'share_instance_get_all_by_host',
                          mock.Mock(return_value=instances_creating_from_snap))
-        mock_update_share_status = self.mock_object(
-            self.share_manager, '_update_share_status')
+        self.mock_object(self.share_manager, '_get_share_servers_by_id',
+                         mock.Mock(return_value={}))
         instances_dict = [
-            self.share_manager._get_share_instance_dict(self.context, si)
+            self.share_manager._get_share_instance_dict(
+                self.context, si, share_servers={})
             for si in instances_creating_from_snap]
+        share_updates = {
+            si['id']: {'status': constants.STATUS_AVAILABLE}
+            for si in instances_dict[1:]
+        }
+        self.share_manager.driver.get_share_statuses.return_value = (
+            share_updates)
+        mock_update_share_status = self.mock_object(
+            self.share_manager, '_update_share_status')
 
         self.share_manager.periodic_share_status_update(self.context)
+
+        self.share_manager._get_share_servers_by_id.assert_called_once_with(
+            self.context, instances_creating_from_snap)
+        self.share_manager.driver.get_share_statuses.assert_called_once_with(
+            self.context, instances_dict)
         mock_update_share_status.assert_has_calls([
-            mock.call(self.context, share_instance)
-            for share_instance in instances_dict
+            mock.call(self.context, share_instance,
+                      share_updates[share_instance['id']])
+            for share_instance in instances_dict[1:]
         ])
+        self.assertEqual(len(instances_dict) - 1,
+                         mock_update_share_status.call_count)
+
+    def test_periodic_share_status_update_no_instances(self):
+        self.mock_object(self.share_manager, 'driver')
+        self.mock_object(self.share_manager.db,
+                         'share_instance_get_all_by_host',
+                         mock.Mock(return_value=[]))
+
+        self.share_manager.periodic_share_status_update(self.context)
+
+        self.assertFalse(self.share_manager.driver.get_share_statuses.called)
+
+    def test_periodic_share_status_update_driver_exception(self):
+        instances = self._setup_init_mocks(setup_access_rules=False)
+        self.mock_object(self.share_manager, 'driver')
+        self.mock_object(self.share_manager.db,
+                         'share_instance_get_all_by_host',
+                         mock.Mock(return_value=instances))
+        self.share_manager.driver.get_share_statuses.side_effect = (
+            exception.ShareBackendException(msg='fake_msg'))
+        mock_update_share_status = self.mock_object(
+            self.share_manager, '_update_share_status')
+        mock_log = self.mock_object(manager.LOG, 'exception')
+
+        self.share_manager.periodic_share_status_update(self.context)
+
+        self.assertTrue(mock_log.called)
+        self.assertFalse(mock_update_share_status.called)
 
     def test__update_share_status(self):
         instances = self._setup_init_mocks(setup_access_rules=False)
@@ -9030,9 +9339,6 @@ class ShareManagerTestCase(test.TestCase):
             'status': constants.STATUS_AVAILABLE,
             'progress': '100%'
         }
-        driver_get_status = self.mock_object(
-            self.share_manager.driver, 'get_share_status',
-            mock.Mock(return_value=instance_model_update))
         db_si_update = self.mock_object(self.share_manager.db,
                                         'share_instance_update')
         db_el_update = self.mock_object(self.share_manager.db,
@@ -9043,26 +9349,20 @@ class ShareManagerTestCase(test.TestCase):
                                  constants.STATUS_CREATING_FROM_SNAPSHOT]
         instance = self.share_manager.db.share_instance_get(
             self.context, in_progress_instances[0]['id'], with_share_data=True)
-        self.share_manager._update_share_status(self.context, instance)
+        self.share_manager._update_share_status(self.context, instance,
+                                                instance_model_update)
 
-        driver_get_status.assert_called_once_with(instance, None)
         db_si_update.assert_called_once_with(self.context, instance['id'],
                                              expected_si_update_info)
         db_el_update.assert_called_once_with(self.context, instance['id'],
                                              fake_export_locations)
 
-    @ddt.data(mock.Mock(return_value={'status': constants.STATUS_ERROR}),
-              mock.Mock(side_effect=exception.ShareBackendException(
-                  msg='fake_msg')))
-    def test__update_share_status_share_with_error_or_exception(self,
-                                                                driver_error):
+    def test__update_share_status_share_with_error(self):
         instances = self._setup_init_mocks(setup_access_rules=False)
         expected_si_update_info = {
             'status': constants.STATUS_ERROR,
             'progress': None,
         }
-        driver_get_status = self.mock_object(
-            self.share_manager.driver, 'get_share_status', driver_error)
         db_si_update = self.mock_object(self.share_manager.db,
                                         'share_instance_update')
 
@@ -9072,8 +9372,9 @@ class ShareManagerTestCase(test.TestCase):
         instance = self.share_manager.db.share_instance_get(
             self.context, in_progress_instances[0]['id'], with_share_data=True)
 
-        self.share_manager._update_share_status(self.context, instance)
-        driver_get_status.assert_called_once_with(instance, None)
+        self.share_manager._update_share_status(
+            self.context, instance, {'status': constants.STATUS_ERROR})
+
         db_si_update.assert_called_once_with(self.context, instance['id'],
                                              expected_si_update_info)
         self.share_manager.message_api.create.assert_called_once_with(
@@ -542,6 +542,14 @@ class ShareRpcAPITestCase(test.TestCase):
             share_network_id='fake_net_id',
             new_share_network_subnet_id='new_share_network_subnet_id')
 
+    def test_publish_service_capabilities_to_host(self):
+        self._test_share_api(
+            'publish_service_capabilities',
+            rpc_method='cast',
+            version='1.0',
+            host=self.fake_host,
+        )
+
     def test_ensure_driver_resources(self):
         self._test_share_api(
             'ensure_driver_resources',
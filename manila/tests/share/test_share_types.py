@@ -284,6 +284,45 @@ class ShareTypesTestCase(test.TestCase):
         extra_spec = share_types.get_share_type_extra_specs(id)
         self.assertEqual(share_type['extra_specs'], extra_spec)
 
+    def test_get_share_type_cached(self):
+        self.flags(share_type_cache_ttl=30)
+        share_types.invalidate_cache()
+        self.addCleanup(share_types.invalidate_cache)
+        stats = share_types.get_cache_stats()
+        share_type = share_types.create(
+            self.context, 'type1', {
+                constants.ExtraSpecs.DRIVER_HANDLES_SHARE_SERVERS: 'true'})
+        self.mock_object(db, 'share_type_get',
+                         mock.Mock(side_effect=db.share_type_get))
+
+        for i in range(3):
+            share_types.get_share_type(self.context, share_type['id'])
+        share_types.update(self.context, share_type['id'], 'type2', None)
+        updated = share_types.get_share_type(self.context, share_type['id'])
+
+        self.assertEqual('type2', updated['name'])
+        self.assertEqual(2, db.share_type_get.call_count)
+        new_stats = share_types.get_cache_stats()
+        self.assertEqual(stats['hits'] + 2, new_stats['hits'])
+        self.assertEqual(stats['misses'] + 2, new_stats['misses'])
+
+    def test_get_share_type_cached_per_project(self):
+        self.flags(share_type_cache_ttl=30)
+        share_types.invalidate_cache()
+        self.addCleanup(share_types.invalidate_cache)
+        share_type = share_types.create(
+            self.context, 'type1', {
+                constants.ExtraSpecs.DRIVER_HANDLES_SHARE_SERVERS: 'true'},
+            is_public=False, projects=['fake_project'])
+        allowed = context.RequestContext('fake_user', 'fake_project')
+        denied = context.RequestContext('fake_user', 'other_project')
+
+        share_types.get_share_type(allowed, share_type['id'])
+
+        self.assertRaises(exception.ShareTypeNotFound,
+                          share_types.get_share_type,
+                          denied, share_type['id'])
+
     def test_get_extra_specs_from_share(self):
         expected = self.fake_extra_specs
         self.mock_object(share_types, 'get_share_type_extra_specs',
@@ -113,9 +113,55 @@ class SchedulerDependentManagerTestCase(test.TestCase):
 
         (self.sched_manager.scheduler_rpcapi.update_service_capabilities.
             assert_called_once_with(
-                self.context, self.service_name, self.host, last_capabilities))
+                self.context, self.service_name, self.host, last_capabilities,
+                capabilities_version=1))
         manager.LOG.debug.assert_called_once_with(mock.ANY)
 
+    @ddt.data(True, False)
+    def test__publish_service_capabilities_delta(self, can_send_delta):
+        self.sched_manager.last_capabilities = {'foo': 'bar', 'baz': 1}
+        self.mock_object(
+            self.sched_manager.scheduler_rpcapi, 'update_service_capabilities')
+        self.mock_object(
+            self.sched_manager.scheduler_rpcapi,
+            'can_send_capabilities_delta',
+            mock.Mock(return_value=can_send_delta))
+
+        self.sched_manager._publish_service_capabilities(self.context)
+        self.sched_manager.last_capabilities = {'foo': 'qux', 'baz': 1}
+        self.sched_manager._publish_service_capabilities(self.context)
+
+        rpcapi = self.sched_manager.scheduler_rpcapi
+        if can_send_delta:
+            second_call = mock.call(
+                self.context, self.service_name, self.host, None,
+                capabilities_version=2,
+                capabilities_delta={'changed': {'foo': 'qux'},
+                                    'removed': []})
+        else:
+            second_call = mock.call(
+                self.context, self.service_name, self.host,
+                {'foo': 'qux', 'baz': 1}, capabilities_version=2)
+        rpcapi.update_service_capabilities.assert_has_calls([
+            mock.call(self.context, self.service_name, self.host,
+                      {'foo': 'bar', 'baz': 1}, capabilities_version=1),
+            second_call,
+        ])
+
+    def test__publish_service_capabilities_full_update(self):
+        self.sched_manager.last_capabilities = {'foo': 'bar'}
+        self.mock_object(
+            self.sched_manager.scheduler_rpcapi, 'update_service_capabilities')
+
+        self.sched_manager._publish_service_capabilities(self.context)
+        self.sched_manager._publish_service_capabilities(
+            self.context, full_update=True)
+
+        (self.sched_manager.scheduler_rpcapi.update_service_capabilities.
+            assert_called_with(
+                self.context, self.service_name, self.host, {'foo': 'bar'},
+                capabilities_version=2))
+
     @ddt.data(None, '', [], {}, {'foo': 'bar'})
     def test_update_service_capabilities(self, capabilities):
         self.sched_manager.update_service_capabilities(capabilities)
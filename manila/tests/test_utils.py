@@ -147,6 +147,20 @@ class GenericUtilsTestCase(test.TestCase):
         actual = utils.translate_string_size_to_float(string, multiplier)
         self.assertIsNone(actual)
 
+    @ddt.data(1, 4)
+    def test_run_concurrently(self, max_in_flight):
+        items = ['a', 'b', 'c']
+        error = exception.ManilaException()
+
+        def func(item):
+            if item == 'b':
+                raise error
+            return item.upper()
+
+        result = utils.run_concurrently(func, items, max_in_flight)
+
+        self.assertEqual([('A', None), (None, error), ('C', None)], result)
+
 
 class MonkeyPatchTestCase(test.TestCase):
     """Unit test for utils.monkey_patch()."""
@@ -795,3 +809,73 @@ class TestAllTenantsValueCase(test.TestCase):
         self.assertRaises(exception.ManilaException,
                           utils.convert_time_duration_to_iso_format,
                           'invalid_duration')
+
+
+class DBCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(DBCacheTestCase, self).setUp()
+        self.flags(share_type_cache_ttl=30)
+        self.cache = utils.DBCache('fake_name', 'share_type_cache_ttl')
+        self.loader = mock.Mock(side_effect=lambda: {'value': 'fake'})
+
+    def test_get(self):
+        value = self.cache.get('key', self.loader)
+        value['value'] = 'changed'
+        cached = self.cache.get('key', self.loader)
+
+        self.assertEqual({'value': 'fake'}, cached)
+        self.loader.assert_called_once_with()
+        self.assertEqual({'hits': 1, 'misses': 1, 'size': 1, 'version': 0},
+                         self.cache.get_stats())
+
+    def test_get_disabled(self):
+        self.flags(share_type_cache_ttl=0)
+
+        self.cache.get('key', self.loader)
+        self.cache.get('key', self.loader)
+
+        self.assertEqual(2, self.loader.call_count)
+        self.assertEqual({'hits': 0, 'misses': 0, 'size': 0, 'version': 0},
+                         self.cache.get_stats())
+
+    def test_get_expired(self):
+        self.mock_object(utils.time, 'monotonic',
+                         mock.Mock(side_effect=[100, 129, 131]))
+
+        self.cache.get('key', self.loader)
+        self.cache.get('key', self.loader)
+        self.cache.get('key', self.loader)
+
+        self.assertEqual(2, self.loader.call_count)
+        self.assertEqual(1, self.cache.hits)
+
+    def test_get_log_stats(self):
+        mock_log = self.mock_object(utils, 'LOG')
+        self.mock_object(utils.time, 'monotonic',
+                         mock.Mock(side_effect=[100, 110, 701, 800]))
+
+        for i in range(4):
+            self.cache.get('key', self.loader)
+
+        mock_log.info.assert_called_once_with(
+            mock.ANY, {'name': 'fake_name', 'hits': 1, 'misses': 1,
+                       'size': 1, 'version': 0})
+
+    def test_invalidate(self):
+        self.cache.get('key', self.loader)
+
+        self.cache.invalidate()
+        self.cache.get('key', self.loader)
+
+        self.assertEqual(2, self.loader.call_count)
+        self.assertEqual(1, self.cache.version)
+
+    def test_invalidate_while_loading(self):
+        def loader():
+            self.cache.invalidate()
+            return 'stale'
+
+        self.assertEqual('stale', self.cache.get('key', loader))
+
+        self.assertEqual(0, self.cache.get_stats()['size'])
@@ -18,6 +18,7 @@
 """Utilities and helper functions."""
 
 import contextlib
+import copy
 import functools
 import inspect
 import pyclbr
@@ -26,8 +27,10 @@ import shutil
 import sys
 import tempfile
 import tenacity
+import threading
 import time
 
+from eventlet import greenpool
 import logging
 import netaddr
 from oslo_concurrency import lockutils
@@ -572,6 +575,24 @@ def wait_for_access_update(context, db, share_instance,
             time.sleep(1.414 ** tries)
 
 
+def run_concurrently(func, items, max_in_flight):
+    """Call func on each of items, with up to max_in_flight calls in flight.
+
+    The calls are made from green threads.
+
+    :return: a list holding a (result, exception) pair per item, in the
+             order of items.
+    """
+    def _call(item):
+        try:
+            return func(item), None
+        except Exception as e:
+            return None, e
+
+    pool = greenpool.GreenPool(max_in_flight)
+    return list(pool.imap(_call, items))
+
+
 class DoNothing(str):
     """Class that literrally does nothing.
 
@@ -588,6 +609,91 @@ class DoNothing(str):
 DO_NOTHING = DoNothing()
 
 
+class DBCache(object):
+    """Process-wide cache of database lookups.
+
+    Entries expire after the number of seconds set in the config option
+    named ``ttl_opt``; a value of 0 disables the cache. Calling
+    :meth:`invalidate` drops all entries and bumps the version of the
+    cache, so that lookups already in flight do not store what they read
+    before the invalidation. Cached values are deep copied on the way in
+    and out, callers are free to modify what they get. While the cache is
+    in use, its counters are logged every ``STATS_LOG_INTERVAL`` seconds.
+    """
+
+    STATS_LOG_INTERVAL = 600
+
+    def __init__(self, name, ttl_opt, maxsize=1024):
+        self._name = name
+        self._ttl_opt = ttl_opt
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._next_stats_log = None
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, loader):
+        """Return the value cached for key, calling loader on a miss."""
+        ttl = getattr(CONF, self._ttl_opt)
+        if ttl <= 0:
+            return loader()
+
+        now = time.monotonic()
+        self._log_stats(now)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            self.misses += 1
+            version = self.version
+
+        value = loader()
+
+        with self._lock:
+            if version == self.version:
+                if len(self._entries) >= self._maxsize:
+                    self._entries = {k: v for k, v in self._entries.items()
+                                     if v[0] > now}
+                if len(self._entries) >= self._maxsize:
+                    self._entries.clear()
+                self._entries[key] = (now + ttl, copy.deepcopy(value))
+        return value
+
+    def invalidate(self):
+        """Drop all entries of the cache."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def get_stats(self):
+        """Return the hit and miss counters of the cache."""
+        with self._lock:
+            return self._get_stats()
+
+    def _get_stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'version': self.version,
+        }
+
+    def _log_stats(self, now):
+        with self._lock:
+            if self._next_stats_log is not None and now < self._next_stats_log:
+                return
+            first = self._next_stats_log is None
+            self._next_stats_log = now + self.STATS_LOG_INTERVAL
+            stats = self._get_stats()
+        if not first:
+            LOG.info("Cache of %(name)s: %(hits)s hits, %(misses)s misses, "
+                     "%(size)s entries, invalidated %(version)s times.",
+                     dict(stats, name=self._name))
+
+
 def notifications_enabled(conf):
     """Check if oslo notifications are enabled."""
     notifications_driver = set(conf.oslo_messaging_notifications.driver)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+# Measure the cost of syncing the access rules of a share instance that
+# already has many rules applied, as done by the share manager every time a
+# rule is added to or removed from the share. Runs against an in-memory
+# SQLite database with a no-op driver.
+#
+# Usage: access_rules_benchmark.py [<number of rules>]
+
+import sys
+import tempfile
+import time
+
+from oslo_config import cfg
+from sqlalchemy import event
+
+from manila.common import constants
+from manila import context
+from manila import db
+from manila.db.sqlalchemy import api as db_api
+from manila.db.sqlalchemy import models
+from manila.share import access
+
+CONF = cfg.CONF
+
+
+class NoopDriver(object):
+    ipv6_implemented = True
+
+    def update_access(self, context, share_instance, access_rules,
+                      add_rules, delete_rules, update_rules,
+                      share_server=None):
+        return {}
+
+
+def _ip(i):
+    return '10.%d.%d.%d' % (i >> 16 & 255, i >> 8 & 255, i & 255)
+
+
+def main():
+    num_rules = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    CONF([], project='manila')
+    CONF.set_override('connection', 'sqlite://', group='database')
+    CONF.set_override('lock_path', tempfile.mkdtemp(),
+                      group='oslo_concurrency')
+    engine = db_api.get_engine()
+    models.BASE.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, 'before_cursor_execute',
+                 lambda *args: statements.append(1))
+
+    ctxt = context.get_admin_context()
+    share = db.share_create(ctxt, {'share_proto': 'NFS', 'size': 1})
+    instance_id = share.instance['id']
+    helper = access.ShareInstanceAccess(db, NoopDriver())
+
+    def add_rules(start, count):
+        for i in range(start, start + count):
+            db.share_access_create(ctxt, {
+                'share_id': share['id'], 'access_type': 'ip',
+                'access_to': _ip(i), 'access_level': 'rw'})
+
+    def sync(label):
+        del statements[:]
+        start = time.monotonic()
+        helper.update_access_rules(ctxt, instance_id)
+        print("%-28s %8.1f ms %8d SQL statements" % (
+            label, (time.monotonic() - start) * 1e3, len(statements)))
+
+    add_rules(0, num_rules)
+    print("%d access rules on share instance %s" % (num_rules, instance_id))
+    sync('initial sync')
+    add_rules(num_rules, 1)
+    sync('add one rule')
+    access_id = db.share_access_get_all_for_share(ctxt, share['id'])[0]['id']
+    db.share_instance_access_update(
+        ctxt, access_id, instance_id,
+        {'state': constants.ACCESS_STATE_QUEUED_TO_DENY})
+    sync('deny one rule')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+# Measure the cost of evaluating a filter and a goodness function for every
+# pool of a scheduling request, with and without reusing parsed expressions.
+#
+# Usage: evaluator_benchmark.py [<number of pools>] [<number of requests>]
+
+import sys
+import timeit
+
+from manila.scheduler.evaluator import evaluator
+
+FILTER_FUNCTION = ("share.size < 100 AND stats.free_capacity_gb > "
+                   "share.size * 2 AND capabilities.fast == 'True'")
+GOODNESS_FUNCTION = ("stats.free_capacity_gb > 500 ? 100 : "
+                     "max(stats.free_capacity_gb / 10, 10)")
+
+
+def schedule(pools, cached):
+    for stats in pools:
+        for function in (FILTER_FUNCTION, GOODNESS_FUNCTION):
+            if not cached:
+                evaluator._expressions.clear()
+            evaluator.evaluate(function,
+                               extra={},
+                               stats=stats,
+                               capabilities={'fast': 'True'},
+                               share={'size': 10})
+
+
+def main():
+    num_pools = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    num_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    pools = [{'free_capacity_gb': i * 5} for i in range(num_pools)]
+
+    print("%d pools, %d scheduling requests" % (num_pools, num_requests))
+    for cached in (False, True):
+        seconds = timeit.timeit(lambda: schedule(pools, cached),
+                                number=num_requests)
+        print("%-8s %8.1f us per pool" % (
+            'cached' if cached else 'uncached',
+            seconds * 1e6 / (num_pools * num_requests)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+# Measure the cost of parsing and rendering Ganesha export files, as done by
+# the Ganesha share drivers for every export they read back or write out.
+#
+# Usage: ganesha_conf_benchmark.py [<number of exports>] [<clients per export>]
+
+import sys
+import timeit
+
+from manila.share.drivers.ganesha import manager
+
+EXPORT_TEMPLATE = """
+# Export for share %(id)d.
+EXPORT {
+    Export_Id = %(id)d;
+    Path = "/shares/share-%(id)d";
+    Pseudo = "/shares/share-%(id)d";
+    Tag = "share-%(id)d";
+    SecType = "sys";
+    Squash = "None";
+    Anonymous_Uid = -2;
+    FSAL {
+        Name = "CEPH";
+        User_Id = "manila-%(id)d";
+        Secret_Access_Key = "c2VjcmV0\\"key";
+    }
+%(clients)s}
+"""
+
+CLIENT_TEMPLATE = """    CLIENT {
+        Clients = 10.%(net)d.%(host)d.0/24, 192.168.%(host)d.1;
+        Access_Type = "rw";
+    }
+"""
+
+
+def make_corpus(num_exports, num_clients):
+    corpus = []
+    for i in range(1, num_exports + 1):
+        clients = ''.join(CLIENT_TEMPLATE % {'net': i % 256, 'host': j % 256}
+                          for j in range(num_clients))
+        corpus.append(EXPORT_TEMPLATE % {'id': i, 'clients': clients})
+    return corpus
+
+
+def main():
+    num_exports = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    num_clients = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    corpus = make_corpus(num_exports, num_clients)
+    confdicts = [manager.parseconf(conf) for conf in corpus]
+
+    print("%d export files, %d clients each, %d KiB in total" % (
+        num_exports, num_clients, sum(map(len, corpus)) // 1024))
+    for name, func, inputs in (('parseconf', manager.parseconf, corpus),
+                               ('mkconf', manager.mkconf, confdicts)):
+        seconds = min(timeit.repeat(lambda: [func(i) for i in inputs],
+                                    number=1, repeat=3))
+        print("%-10s %8.1f us per export file" % (
+            name, seconds * 1e6 / num_exports))
+
+
+if __name__ == '__main__':
+    main()